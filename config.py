@@ -11,11 +11,16 @@ DEFAULT_CONFIG = {
     "Database": {
         "name": "hr_system.db",
         "backup_dir": "db_backups",
+        "busy_timeout_ms": "5000", # How long a connection waits on a locked database
+        "cache_size_kib": "20000", # Page cache per connection (~20 MB)
+        "mmap_size_mb": "256", # Memory-mapped I/O window, 0 disables it
     },
     "ZKTeco": {
         "device_ip": "192.168.1.201",
         "device_port": "4370",
         "timeout": "10", # Default timeout in seconds
+        "devices": "", # Device registry, e.g. "Main Gate=192.168.1.201:4370, Warehouse=192.168.1.202:4370"
+        "max_parallel_syncs": "4", # Devices downloaded at the same time during a sync
     },
     "Telegram": {
         "bot_token": "YOUR_TELEGRAM_BOT_TOKEN_HERE", # Placeholder
@@ -117,10 +122,15 @@ def get_setting(section, key, fallback_type=str):
 
 DATABASE_NAME = get_setting("Database", "name")
 BACKUP_DIR = get_setting("Database", "backup_dir")
+DATABASE_BUSY_TIMEOUT_MS = get_setting("Database", "busy_timeout_ms", fallback_type=int)
+DATABASE_CACHE_SIZE_KIB = get_setting("Database", "cache_size_kib", fallback_type=int)
+DATABASE_MMAP_SIZE_MB = get_setting("Database", "mmap_size_mb", fallback_type=int)
 
 ZKTECO_DEVICE_IP = get_setting("ZKTeco", "device_ip")
 ZKTECO_DEVICE_PORT = get_setting("ZKTeco", "device_port", fallback_type=int)
 ZKTECO_TIMEOUT = get_setting("ZKTeco", "timeout", fallback_type=int)
+ZKTECO_DEVICES = get_setting("ZKTeco", "devices")
+ZKTECO_MAX_PARALLEL_SYNCS = get_setting("ZKTeco", "max_parallel_syncs", fallback_type=int)
 
 # For sensitive data, prioritize environment variables
 TELEGRAM_BOT_TOKEN_ENV = os.environ.get("HR_TELEGRAM_BOT_TOKEN")
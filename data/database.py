@@ -1,8 +1,11 @@
 # c:\Users\mahmo\OneDrive\Documents\GitHub\hr_management_system\data\database.py
 import sqlite3
 import logging
+import threading
+from contextlib import contextmanager
+from datetime import date as dt_date, time as dt_time
 import bcrypt # For default admin user password hashing
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator, Iterable, Tuple, FrozenSet, Callable
 
 # Assuming config.py is in the project root, one level above 'data'
 import sys
@@ -59,6 +62,29 @@ COL_ATT_LOG_DATE = "log_date"
 COL_ATT_SOURCE = "source"
 COL_ATT_NOTES = "notes"
 
+# Per employee-day rollup of attendance_log, kept current by refresh_attendance_daily()
+TABLE_ATTENDANCE_DAILY = "attendance_daily"
+COL_AD_EMP_ID = "employee_id"
+COL_AD_WORK_DATE = "work_date" # attendance_log.log_date
+COL_AD_FIRST_IN = "first_in" # Earliest clock-in of the day
+COL_AD_LAST_OUT = "last_out" # Latest clock-out of the day (NULL while no segment is closed)
+COL_AD_WORKED_SECONDS = "worked_seconds" # Sum of closed segments
+COL_AD_OVERTIME_SECONDS = "overtime_seconds" # worked_seconds beyond the standard work day
+COL_AD_LATE_MINUTES = "late_minutes" # Minutes after the standard start, 0 if within the grace period
+COL_AD_SEGMENTS = "segments" # Number of attendance_log rows for the day
+
+# Incremental ZKTeco sync: one watermark row per device (see utils.zkteco_utils)
+TABLE_ZKTECO_SYNC_STATE = "zkteco_sync_state"
+COL_ZKS_DEVICE_KEY = "device_key" # "ip:port"
+COL_ZKS_LAST_RECORD_COUNT = "last_record_count" # Records in the device log at the last sync
+COL_ZKS_LAST_RECORD_KEY = "last_record_key" # "user_id|timestamp" of the last of those records, to detect a cleared log
+COL_ZKS_LAST_PUNCH_TIME = "last_punch_time" # Latest punch timestamp ingested (YYYY-MM-DD HH:MM:SS)
+COL_ZKS_LAST_SYNC_AT = "last_sync_at"
+COL_ZKS_LAST_SYNC_PUNCHES = "last_sync_punches" # New punches ingested by the last sync
+
+ATTENDANCE_SOURCE_ZKTECO_PREFIX = "ZKTeco" # attendance_log.source of device punches is "ZKTeco: <ip:port>"
+ATTENDANCE_SOURCE_FINGERPRINT_PREFIX = "Fingerprint CSV" # ...and of imported fingerprint logs "Fingerprint CSV[: <device id>]"
+
 TABLE_LEAVE_REQUESTS = "leave_requests"
 COL_LR_ID = "request_id"
 COL_LR_EMP_ID = "employee_id"
@@ -274,10 +300,16 @@ VALID_EMPLOYEE_STATUSES = [STATUS_ACTIVE, STATUS_TERMINATED, STATUS_ON_LEAVE, ST
 
 # --- Leave Status Constants ---
 STATUS_LEAVE_PENDING_APPROVAL = "Pending Approval"
+STATUS_LEAVE_PENDING_HR_APPROVAL = "Pending HR Approval"
 STATUS_LEAVE_APPROVED = "Approved"
 STATUS_LEAVE_REJECTED = "Rejected"
 STATUS_LEAVE_CANCELLED = "Cancelled"
 
+# --- HR Alert Types (generate_hr_alerts_report) ---
+ALERT_TYPE_ABSENCE = "Absence"
+ALERT_TYPE_TARDINESS = "Tardiness"
+ALERT_TYPE_NEW_LEAVE_REQUEST = "New Leave Request"
+
 ROLE_ADMIN = "Admin"
 ROLE_DEPT_MANAGER = "Department Manager"
 ROLE_EMPLOYEE = "Employee"
@@ -305,6 +337,7 @@ SETTING_TELEGRAM_CHAT_ID = "telegram_chat_id"
 SETTING_ZKTECO_DEVICE_IP = "zkteco_device_ip"
 SETTING_ZKTECO_DEVICE_PORT = "zkteco_device_port"
 SETTING_ZKTECO_TIMEOUT = "zkteco_timeout" # New setting key
+SETTING_ZKTECO_DEVICES = "zkteco_devices" # Device registry: "Name=IP:Port" entries, comma-separated
 SETTING_AUTO_BACKUP_ENABLED = "auto_backup_enabled"
 SETTING_AUTO_BACKUP_FREQUENCY = "auto_backup_frequency" # Daily, Weekly, Monthly
 SETTING_DEFAULT_ANNUAL_LEAVE_DAYS = "default_annual_leave_days"
@@ -351,11 +384,429 @@ COL_TASK_COMPLETION_DATE = "completion_date"
 # Constants for specific counter names
 COUNTER_EMPLOYEES_ADDED = "employees_added"
 
+# --- Connection Management ---
+class PooledConnection(sqlite3.Connection):
+    """
+    Connection handed out by get_connection(); one is kept open per thread.
+
+    `with conn:` blocks nest: only the outermost block commits or rolls back, so
+    query functions that call each other share the caller's transaction.
+    close() does not close the connection (it only discards uncommitted work, as a
+    real close would); use close_connection() to release it.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.block_depth = 0
+        self.transaction_depth = 0
+        self._saved_row_factories: List[Any] = []
+
+    def __enter__(self):
+        self._saved_row_factories.append(self.row_factory)
+        self.block_depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.block_depth -= 1
+        self.row_factory = self._saved_row_factories.pop()
+        if self.block_depth == 0:
+            return super().__exit__(exc_type, exc_value, traceback)
+        return False
+
+    def commit(self):
+        # Inside transaction() the outermost block decides when to commit.
+        if self.transaction_depth == 0:
+            super().commit()
+
+    def close(self):
+        if self.block_depth == 0 and self.in_transaction:
+            self.rollback()
+
+_thread_local = threading.local()
+
+def _apply_connection_pragmas(conn: sqlite3.Connection) -> None:
+    """Applies the standard pragmas to a freshly opened connection."""
+    cursor = conn.cursor()
+    cursor.execute(f"PRAGMA busy_timeout = {int(config.DATABASE_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA cache_size = -{int(config.DATABASE_CACHE_SIZE_KIB)}") # Negative value = KiB
+    cursor.execute(f"PRAGMA mmap_size = {int(config.DATABASE_MMAP_SIZE_MB) * 1024 * 1024}")
+    try:
+        cursor.execute("PRAGMA journal_mode = WAL") # Readers no longer block the writer
+        cursor.execute("PRAGMA synchronous = NORMAL") # Safe with WAL, avoids an fsync per commit
+    except sqlite3.Error as e:
+        logger.warning(f"Could not enable WAL journal mode on '{config.DATABASE_NAME}': {e}")
+
+def create_connection(database_name: Optional[str] = None, factory: type = sqlite3.Connection) -> sqlite3.Connection:
+    """
+    Opens a new connection with the standard pragmas applied.
+    Most code should use get_connection() instead, which reuses one connection per thread.
+    """
+    conn = sqlite3.connect(database_name or config.DATABASE_NAME,
+                           timeout=config.DATABASE_BUSY_TIMEOUT_MS / 1000.0, factory=factory)
+    _apply_connection_pragmas(conn)
+    return conn
+
+def get_connection() -> PooledConnection:
+    """
+    Returns the calling thread's shared connection, opening it on first use.
+    Use it as `with get_connection() as conn:` exactly like sqlite3.connect().
+    """
+    conn = getattr(_thread_local, "connection", None)
+    if conn is not None and _thread_local.database_name != config.DATABASE_NAME:
+        close_connection() # Database file was switched (e.g. after a restore)
+        conn = None
+    if conn is None:
+        conn = create_connection(factory=PooledConnection)
+        _thread_local.connection = conn
+        _thread_local.database_name = config.DATABASE_NAME
+        logger.debug(f"Opened pooled database connection for thread '{threading.current_thread().name}'.")
+    elif conn.block_depth == 0:
+        conn.row_factory = None # Don't leak a previous caller's row factory
+    return conn
+
+def close_connection() -> None:
+    """Closes the calling thread's pooled connection, if any (call when a worker thread finishes)."""
+    conn = getattr(_thread_local, "connection", None)
+    _thread_local.connection = None
+    if conn is not None:
+        try:
+            sqlite3.Connection.close(conn)
+        except sqlite3.Error as e:
+            logger.warning(f"Error closing pooled database connection: {e}")
+
+@contextmanager
+def transaction(mode: str = "DEFERRED") -> Iterator[PooledConnection]:
+    """
+    Runs the enclosed block as one transaction on the thread's pooled connection.
+    Commits on success and rolls back on any exception. Nested use becomes a savepoint,
+    and commit() calls made by query functions inside the block are deferred to its end.
+
+    Args:
+        mode (str): "DEFERRED", "IMMEDIATE" or "EXCLUSIVE" (ignored when nested).
+    """
+    conn = get_connection()
+    saved_row_factory = conn.row_factory
+    savepoint = None
+    if conn.in_transaction:
+        savepoint = f"hr_savepoint_{conn.transaction_depth + 1}"
+        conn.execute(f"SAVEPOINT {savepoint}")
+    else:
+        conn.execute(f"BEGIN {mode}")
+    conn.transaction_depth += 1
+    conn.block_depth += 1
+    try:
+        yield conn
+    except BaseException:
+        if conn.in_transaction:
+            if savepoint:
+                conn.execute(f"ROLLBACK TO {savepoint}")
+                conn.execute(f"RELEASE {savepoint}")
+            else:
+                conn.rollback()
+        raise
+    else:
+        if savepoint:
+            if conn.in_transaction:
+                conn.execute(f"RELEASE {savepoint}")
+        else:
+            sqlite3.Connection.commit(conn)
+    finally:
+        conn.transaction_depth -= 1
+        conn.block_depth -= 1
+        conn.row_factory = saved_row_factory
+
+# --- Schema Migrations ---
+# Each entry is (version, description, statements). init_db applies every migration whose
+# version is above the database's PRAGMA user_version, in order, then bumps user_version.
+# Append new migrations at the end; never edit or renumber one that has shipped.
+SCHEMA_MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, "Secondary indexes for hot lookups", [
+        f"CREATE INDEX IF NOT EXISTS idx_attendance_emp_date ON {TABLE_ATTENDANCE_LOG} ({COL_ATT_EMP_ID}, {COL_ATT_LOG_DATE})",
+        f"CREATE INDEX IF NOT EXISTS idx_attendance_date ON {TABLE_ATTENDANCE_LOG} ({COL_ATT_LOG_DATE})",
+        f"CREATE INDEX IF NOT EXISTS idx_leave_emp_status_dates ON {TABLE_LEAVE_REQUESTS} ({COL_LR_EMP_ID}, {COL_LR_STATUS}, {COL_LR_START_DATE}, {COL_LR_END_DATE})",
+        f"CREATE INDEX IF NOT EXISTS idx_evaluations_emp_date ON {TABLE_EMPLOYEE_EVALUATIONS} ({COL_EVAL_EMP_ID}, {COL_EVAL_DATE})",
+        f"CREATE INDEX IF NOT EXISTS idx_payslips_period ON {TABLE_PAYSLIPS} ({COL_PAY_PERIOD_START}, {COL_PAY_PERIOD_END})",
+        f"CREATE INDEX IF NOT EXISTS idx_action_log_emp ON {TABLE_EMPLOYEE_ACTION_LOG} ({COL_EAL_EMP_ID})",
+        f"CREATE INDEX IF NOT EXISTS idx_interviews_interviewer_date ON {TABLE_INTERVIEWS} ({COL_INT_INTERVIEWER_EMP_ID}, {COL_INT_DATE})",
+    ]),
+    (2, "Keyset pagination index for the employee list", [
+        f"CREATE INDEX IF NOT EXISTS idx_employees_name_id ON {TABLE_EMPLOYEES} ({COL_EMP_NAME}, {COL_EMP_ID})",
+    ]),
+    (3, "Department lookup index for employee search", [
+        f"CREATE INDEX IF NOT EXISTS idx_employees_department ON {TABLE_EMPLOYEES} ({COL_EMP_DEPARTMENT_ID})",
+    ]),
+    (4, "Daily attendance rollup table", [
+        f"""CREATE TABLE IF NOT EXISTS {TABLE_ATTENDANCE_DAILY} (
+            {COL_AD_EMP_ID} TEXT NOT NULL,
+            {COL_AD_WORK_DATE} TEXT NOT NULL,
+            {COL_AD_FIRST_IN} TEXT,
+            {COL_AD_LAST_OUT} TEXT,
+            {COL_AD_WORKED_SECONDS} INTEGER NOT NULL DEFAULT 0,
+            {COL_AD_OVERTIME_SECONDS} INTEGER NOT NULL DEFAULT 0,
+            {COL_AD_LATE_MINUTES} INTEGER NOT NULL DEFAULT 0,
+            {COL_AD_SEGMENTS} INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY ({COL_AD_EMP_ID}, {COL_AD_WORK_DATE}),
+            FOREIGN KEY ({COL_AD_EMP_ID}) REFERENCES {TABLE_EMPLOYEES}({COL_EMP_ID}) ON DELETE CASCADE
+        ) WITHOUT ROWID""",
+        f"CREATE INDEX IF NOT EXISTS idx_attendance_daily_date ON {TABLE_ATTENDANCE_DAILY} ({COL_AD_WORK_DATE})",
+    ]),
+    (5, "ZKTeco incremental sync watermark and punch de-duplication", [
+        f"""CREATE TABLE IF NOT EXISTS {TABLE_ZKTECO_SYNC_STATE} (
+            {COL_ZKS_DEVICE_KEY} TEXT PRIMARY KEY,
+            {COL_ZKS_LAST_RECORD_COUNT} INTEGER,
+            {COL_ZKS_LAST_RECORD_KEY} TEXT,
+            {COL_ZKS_LAST_PUNCH_TIME} TEXT,
+            {COL_ZKS_LAST_SYNC_AT} TEXT,
+            {COL_ZKS_LAST_SYNC_PUNCHES} INTEGER DEFAULT 0
+        )""",
+        # Partial, so manual/GUI rows (which may legitimately repeat) are never rejected
+        f"""CREATE UNIQUE INDEX IF NOT EXISTS idx_attendance_device_punch
+            ON {TABLE_ATTENDANCE_LOG} ({COL_ATT_EMP_ID}, {COL_ATT_CLOCK_IN}, {COL_ATT_SOURCE})
+            WHERE {COL_ATT_SOURCE} GLOB '{ATTENDANCE_SOURCE_ZKTECO_PREFIX}*'""",
+    ]),
+    # Version 6 (a watermark column rename) was folded into 5 before release; it is never reused
+    (7, "Fingerprint CSV punch de-duplication", [
+        f"""CREATE UNIQUE INDEX IF NOT EXISTS idx_attendance_fingerprint_punch
+            ON {TABLE_ATTENDANCE_LOG} ({COL_ATT_EMP_ID}, {COL_ATT_CLOCK_IN}, {COL_ATT_SOURCE})
+            WHERE {COL_ATT_SOURCE} GLOB '{ATTENDANCE_SOURCE_FINGERPRINT_PREFIX}*'""",
+    ]),
+    (8, "Employee search index keyed by employee ID", [
+        # Drops the rowid-keyed index; init_db rebuilds it through ensure_employee_search_index()
+        "DROP TRIGGER IF EXISTS trg_employees_fts_insert",
+        "DROP TRIGGER IF EXISTS trg_employees_fts_delete",
+        "DROP TRIGGER IF EXISTS trg_employees_fts_update",
+        "DROP TABLE IF EXISTS employees_fts", # TABLE_EMPLOYEES_FTS (defined below)
+    ]),
+]
+ATTENDANCE_DAILY_SCHEMA_VERSION = 4 # init_db fills the rollup when upgrading past this version
+
+def get_schema_version(cursor: sqlite3.Cursor) -> int:
+    """Returns the schema version recorded in PRAGMA user_version."""
+    cursor.execute("PRAGMA user_version")
+    return cursor.fetchone()[0]
+
+def run_schema_migrations(cursor: sqlite3.Cursor) -> int:
+    """
+    Applies pending SCHEMA_MIGRATIONS on the given cursor's connection.
+    The caller owns the transaction (init_db commits or rolls back around this).
+    Returns the resulting schema version.
+    """
+    current_version = get_schema_version(cursor)
+    starting_version = current_version
+    for version, description, statements in SCHEMA_MIGRATIONS:
+        if version <= current_version:
+            continue
+        logger.info(f"Applying schema migration {version}: {description}")
+        for statement in statements:
+            cursor.execute(statement)
+        cursor.execute(f"PRAGMA user_version = {int(version)}")
+        current_version = version
+    if current_version != starting_version:
+        # Refresh planner statistics so grouped report queries pick the new covering indexes
+        cursor.execute("ANALYZE")
+    return current_version
+
+# --- Employee Full-Text Search ---
+# FTS5 index over the searchable employee text columns. It is a separate (not external-content)
+# table maintained by triggers, because it stores a normalized copy of the text: Arabic letter
+# variants are folded and harakat/tatweel stripped so "احمد" finds "أحمد". Rows are keyed by the
+# UNINDEXED employee_id column holding employees.id as stored; the implicit rowid of the TEXT-keyed
+# employees table is not stable (VACUUM may renumber it), so it is never used to join.
+# If the SQLite build has no FTS5, the table is simply not created and searches fall back to LIKE.
+TABLE_EMPLOYEES_FTS = "employees_fts"
+COL_EMP_FTS_EMPLOYEE_ID = "employee_id"
+EMPLOYEE_FTS_COLUMNS: List[str] = [COL_EMP_ID, COL_EMP_NAME, COL_EMP_POSITION, COL_EMP_EMAIL,
+                                   COL_EMP_PHONE, COL_EMP_MARITAL_STATUS, COL_EMP_EDUCATION]
+
+ARABIC_SEARCH_NORMALIZATION: Dict[str, str] = {
+    "\u0623": "\u0627", "\u0625": "\u0627", "\u0622": "\u0627", "\u0671": "\u0627", # Alef with hamza/madda/wasla -> alef
+    "\u0649": "\u064a", # Alef maksura -> yeh
+    "\u0629": "\u0647", # Teh marbuta -> heh
+    "\u0624": "\u0648", # Waw with hamza -> waw
+    "\u0626": "\u064a", # Yeh with hamza -> yeh
+    "\u0640": "",        # Tatweel
+    **{chr(code): "" for code in range(0x064B, 0x0653)}, # Harakat (fathatan .. sukun, maddah)
+    "\u0670": "",        # Superscript alef
+}
+_ARABIC_SEARCH_TRANSLATION = str.maketrans(ARABIC_SEARCH_NORMALIZATION)
+
+_fts_available_lock = threading.Lock()
+_fts_available_by_db: Dict[str, bool] = {}
+
+def normalize_search_text(text: str) -> str:
+    """Python side of the search normalization applied by the FTS triggers."""
+    return text.translate(_ARABIC_SEARCH_TRANSLATION)
+
+def _normalized_search_sql(column_expr: str) -> str:
+    """Wraps a column expression in the nested replace() calls matching normalize_search_text()."""
+    expr = f"COALESCE({column_expr}, '')"
+    for source, target in ARABIC_SEARCH_NORMALIZATION.items():
+        expr = f"replace({expr}, '{source}', '{target}')"
+    return expr
+
+def ensure_employee_search_index(cursor: sqlite3.Cursor) -> bool:
+    """
+    Creates the employees FTS5 table and its sync triggers if missing, and fills it on creation.
+    Returns False (and leaves the schema unchanged) when this SQLite build lacks FTS5.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (TABLE_EMPLOYEES_FTS,))
+    if cursor.fetchone():
+        return True
+    try:
+        cursor.execute(f"""
+            CREATE VIRTUAL TABLE {TABLE_EMPLOYEES_FTS} USING fts5(
+                {', '.join(EMPLOYEE_FTS_COLUMNS)},
+                {COL_EMP_FTS_EMPLOYEE_ID} UNINDEXED,
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        logger.warning(f"FTS5 not available in this SQLite build ({e}). Employee search will use LIKE.")
+        return False
+
+    fts_columns = ", ".join(EMPLOYEE_FTS_COLUMNS)
+    new_values = ", ".join(_normalized_search_sql(f"new.{col}") for col in EMPLOYEE_FTS_COLUMNS)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_employees_fts_insert AFTER INSERT ON {TABLE_EMPLOYEES} BEGIN
+            INSERT INTO {TABLE_EMPLOYEES_FTS} ({fts_columns}, {COL_EMP_FTS_EMPLOYEE_ID}) VALUES ({new_values}, new.{COL_EMP_ID});
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_employees_fts_delete AFTER DELETE ON {TABLE_EMPLOYEES} BEGIN
+            DELETE FROM {TABLE_EMPLOYEES_FTS} WHERE {COL_EMP_FTS_EMPLOYEE_ID} = old.{COL_EMP_ID};
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_employees_fts_update AFTER UPDATE OF {fts_columns} ON {TABLE_EMPLOYEES} BEGIN
+            DELETE FROM {TABLE_EMPLOYEES_FTS} WHERE {COL_EMP_FTS_EMPLOYEE_ID} = old.{COL_EMP_ID};
+            INSERT INTO {TABLE_EMPLOYEES_FTS} ({fts_columns}, {COL_EMP_FTS_EMPLOYEE_ID}) VALUES ({new_values}, new.{COL_EMP_ID});
+        END
+    """)
+    existing_values = ", ".join(_normalized_search_sql(col) for col in EMPLOYEE_FTS_COLUMNS)
+    cursor.execute(f"""
+        INSERT INTO {TABLE_EMPLOYEES_FTS} ({fts_columns}, {COL_EMP_FTS_EMPLOYEE_ID})
+        SELECT {existing_values}, {COL_EMP_ID} FROM {TABLE_EMPLOYEES}
+    """)
+    logger.info(f"Created employee search index ({cursor.rowcount} employees indexed).")
+    return True
+
+def is_employee_search_index_available() -> bool:
+    """True if the current database has the employees FTS table (checked once per database file)."""
+    with _fts_available_lock:
+        available = _fts_available_by_db.get(config.DATABASE_NAME)
+        if available is None:
+            cursor = get_connection().cursor()
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (TABLE_EMPLOYEES_FTS,))
+            available = _fts_available_by_db[config.DATABASE_NAME] = cursor.fetchone() is not None
+        return available
+
+# --- Daily Attendance Rollup ---
+# attendance_daily holds one pre-aggregated row per employee and log_date so reports do not
+# re-derive hours from raw punches. Every writer of attendance_log calls
+# refresh_attendance_daily() for the days it touched, in the same transaction.
+# overtime_seconds and late_minutes depend on the work schedule settings listed in
+# ATTENDANCE_DAILY_SETTING_KEYS; changing one of those calls recompute_attendance_daily_policy().
+ATTENDANCE_DAILY_SETTING_KEYS: FrozenSet[str] = frozenset({
+    SETTING_STANDARD_WORK_HOURS_PER_DAY, SETTING_STANDARD_START_TIME, SETTING_LATE_ARRIVAL_ALLOWED_MINUTES,
+})
+
+# Setting-dependent columns, computed from the other rollup columns (shared by the aggregate and the policy update)
+_ATTENDANCE_DAILY_OVERTIME_SQL = f"MAX(0, {COL_AD_WORKED_SECONDS} - :standard_seconds)"
+_ATTENDANCE_DAILY_LATE_MINUTES_SQL = f"""CASE
+    WHEN (julianday({COL_AD_FIRST_IN}) - julianday({COL_AD_WORK_DATE} || ' ' || :start_time)) * 1440 > :grace_minutes
+    THEN CAST(round((julianday({COL_AD_FIRST_IN}) - julianday({COL_AD_WORK_DATE} || ' ' || :start_time)) * 1440) AS INTEGER)
+    ELSE 0 END"""
+
+def _attendance_daily_select_sql(log_filter_sql: str) -> str:
+    """The aggregate that produces attendance_daily rows from the attendance_log rows matching log_filter_sql."""
+    return f"""
+        SELECT {COL_AD_EMP_ID}, {COL_AD_WORK_DATE}, {COL_AD_FIRST_IN}, {COL_AD_LAST_OUT}, {COL_AD_WORKED_SECONDS},
+               {_ATTENDANCE_DAILY_OVERTIME_SQL}, {_ATTENDANCE_DAILY_LATE_MINUTES_SQL}, {COL_AD_SEGMENTS}
+        FROM (
+            SELECT {COL_ATT_EMP_ID} AS {COL_AD_EMP_ID}, {COL_ATT_LOG_DATE} AS {COL_AD_WORK_DATE},
+                   MIN({COL_ATT_CLOCK_IN}) AS {COL_AD_FIRST_IN}, MAX({COL_ATT_CLOCK_OUT}) AS {COL_AD_LAST_OUT},
+                   COALESCE(SUM(MAX(0, CAST(round((julianday({COL_ATT_CLOCK_OUT}) - julianday({COL_ATT_CLOCK_IN})) * 86400) AS INTEGER))), 0) AS {COL_AD_WORKED_SECONDS},
+                   COUNT(*) AS {COL_AD_SEGMENTS}
+            FROM {TABLE_ATTENDANCE_LOG}
+            WHERE {log_filter_sql}
+            GROUP BY {COL_ATT_EMP_ID}, {COL_ATT_LOG_DATE}
+        )
+    """
+
+def _attendance_daily_policy_params() -> Dict[str, Any]:
+    """Current work schedule settings as named parameters for the rollup SQL."""
+    return {
+        "standard_seconds": int(round(get_standard_work_hours_per_day() * 3600)),
+        "start_time": get_standard_start_time().strftime("%H:%M:%S"),
+        "grace_minutes": get_late_arrival_allowed_minutes(),
+    }
+
+def refresh_attendance_daily(cursor: sqlite3.Cursor, employee_dates: Iterable[Tuple[str, str]]) -> int:
+    """
+    Recomputes the attendance_daily rows for the given (employee_id, log_date) pairs from attendance_log.
+    Days that no longer have any log lose their row. The caller owns the transaction.
+    Returns the number of distinct days refreshed.
+    """
+    keys = sorted(set(employee_dates))
+    if not keys:
+        return 0
+    params = _attendance_daily_policy_params()
+    cursor.executemany(f"DELETE FROM {TABLE_ATTENDANCE_DAILY} WHERE {COL_AD_EMP_ID} = ? AND {COL_AD_WORK_DATE} = ?", keys)
+    insert_sql = (f"INSERT INTO {TABLE_ATTENDANCE_DAILY} "
+                  + _attendance_daily_select_sql(f"{COL_ATT_EMP_ID} = :employee_id AND {COL_ATT_LOG_DATE} = :log_date"))
+    cursor.executemany(insert_sql, ({**params, "employee_id": emp_id, "log_date": log_date} for emp_id, log_date in keys))
+    return len(keys)
+
+def rebuild_attendance_daily(cursor: sqlite3.Cursor, start_date: Optional[str] = None, end_date: Optional[str] = None) -> int:
+    """
+    Rebuilds attendance_daily from attendance_log, for all dates or for an inclusive YYYY-MM-DD range.
+    The caller owns the transaction. Returns the number of rollup rows written.
+    """
+    params = _attendance_daily_policy_params()
+    where_clauses, daily_where = ["1 = 1"], ["1 = 1"]
+    if start_date:
+        where_clauses.append(f"{COL_ATT_LOG_DATE} >= :start_date")
+        daily_where.append(f"{COL_AD_WORK_DATE} >= :start_date")
+        params["start_date"] = start_date
+    if end_date:
+        where_clauses.append(f"{COL_ATT_LOG_DATE} <= :end_date")
+        daily_where.append(f"{COL_AD_WORK_DATE} <= :end_date")
+        params["end_date"] = end_date
+    range_params = {key: params[key] for key in ("start_date", "end_date") if key in params}
+    cursor.execute(f"DELETE FROM {TABLE_ATTENDANCE_DAILY} WHERE {' AND '.join(daily_where)}", range_params)
+    cursor.execute(f"INSERT INTO {TABLE_ATTENDANCE_DAILY} " + _attendance_daily_select_sql(" AND ".join(where_clauses)), params)
+    return cursor.rowcount
+
+def recompute_attendance_daily_policy(cursor: sqlite3.Cursor) -> int:
+    """
+    Re-derives overtime_seconds and late_minutes of the rollup rows from the current work schedule
+    settings (worked time and punches are unchanged, so no re-aggregation is needed).
+    Only rows whose values actually change are rewritten. The caller owns the transaction.
+    Returns the number of rows updated.
+    """
+    cursor.execute(f"""
+        UPDATE {TABLE_ATTENDANCE_DAILY} SET
+            {COL_AD_OVERTIME_SECONDS} = {_ATTENDANCE_DAILY_OVERTIME_SQL},
+            {COL_AD_LATE_MINUTES} = {_ATTENDANCE_DAILY_LATE_MINUTES_SQL}
+        WHERE {COL_AD_OVERTIME_SECONDS} != {_ATTENDANCE_DAILY_OVERTIME_SQL}
+           OR {COL_AD_LATE_MINUTES} != {_ATTENDANCE_DAILY_LATE_MINUTES_SQL}
+    """, _attendance_daily_policy_params())
+    return cursor.rowcount
+
+def recompute_attendance_daily_for_setting(setting_key: str, previous_value: Optional[str], new_value: Optional[str]) -> None:
+    """Called by the app settings writers after a write; re-derives rollup overtime/lateness if a schedule setting changed."""
+    if setting_key not in ATTENDANCE_DAILY_SETTING_KEYS or previous_value == new_value:
+        return
+    invalidate_app_settings_cache() # The recompute must see the new value
+    with transaction("IMMEDIATE") as conn:
+        updated = recompute_attendance_daily_policy(conn.cursor())
+    logger.info(f"Recomputed overtime/lateness of {updated} attendance days after '{setting_key}' changed.")
+
 def init_db():
     """Initializes the database with all necessary tables and default data."""
     conn = None
     try:
-        conn = sqlite3.connect(config.DATABASE_NAME)
+        conn = create_connection()
         cursor = conn.cursor()
 
         # Enable Foreign Keys
@@ -730,6 +1181,7 @@ def init_db():
             SETTING_ZKTECO_DEVICE_IP: config.ZKTECO_DEVICE_IP,
             SETTING_ZKTECO_DEVICE_PORT: str(config.ZKTECO_DEVICE_PORT),
             SETTING_ZKTECO_TIMEOUT: str(config.ZKTECO_TIMEOUT), # Add new setting to defaults
+            SETTING_ZKTECO_DEVICES: config.ZKTECO_DEVICES,
             SETTING_AUTO_BACKUP_ENABLED: "false",
             SETTING_AUTO_BACKUP_FREQUENCY: "Weekly",
             SETTING_DEFAULT_ANNUAL_LEAVE_DAYS: "21",
@@ -763,6 +1215,13 @@ def init_db():
             cursor.execute(f"INSERT OR IGNORE INTO {TABLE_APP_SETTINGS} ({COL_SETTING_KEY}, {COL_SETTING_VALUE}) VALUES (?, ?)",
                        (SETTING_GCAL_SYNC_VACATIONS, "0")) # Default to off
 
+        # --- Apply versioned schema migrations (indexes etc.) ---
+        previous_schema_version = get_schema_version(cursor)
+        schema_version = run_schema_migrations(cursor)
+        if previous_schema_version < ATTENDANCE_DAILY_SCHEMA_VERSION <= schema_version:
+            logger.info(f"Built daily attendance rollup ({rebuild_attendance_daily(cursor)} employee-days).")
+        employee_fts_enabled = ensure_employee_search_index(cursor)
+
         # --- Create Default Admin User (if not exists) ---
         cursor.execute(f"SELECT {COL_USER_ID} FROM {TABLE_USERS} WHERE {COL_USER_USERNAME} = 'admin'")
         if not cursor.fetchone():
@@ -772,7 +1231,10 @@ def init_db():
             logger.info("Default admin user created.")
 
         conn.commit()
-        logger.info("Database initialized/verified successfully.")
+        invalidate_app_settings_cache() # Defaults may have just been inserted
+        with _fts_available_lock:
+            _fts_available_by_db[config.DATABASE_NAME] = employee_fts_enabled
+        logger.info(f"Database initialized/verified successfully (schema version {schema_version}, full-text search {'on' if employee_fts_enabled else 'off'}).")
 
     except sqlite3.Error as e:
         logger.error(f"Database initialization error: {e}", exc_info=True)
@@ -783,37 +1245,154 @@ def init_db():
         if conn:
             conn.close()
 
+# --- App Settings Cache ---
+# All rows of app_settings are loaded once per process and served from memory.
+# Every write path (set_app_setting_db, queries.update_app_setting_db, init_db) must call
+# invalidate_app_settings_cache() so the next read reloads the table.
+_settings_cache_lock = threading.RLock()
+_settings_cache: Optional[Dict[str, Optional[str]]] = None
+_settings_cache_db_name: Optional[str] = None
+_typed_settings_cache: Dict[str, Any] = {}
+
+def invalidate_app_settings_cache() -> None:
+    """Drops the cached settings (raw and parsed); the next read reloads them from the database."""
+    global _settings_cache, _settings_cache_db_name
+    with _settings_cache_lock:
+        _settings_cache = None
+        _settings_cache_db_name = None
+        _typed_settings_cache.clear()
+
+def _get_settings_cache() -> Dict[str, Optional[str]]:
+    """Returns the cached settings dict, loading it from the database if needed."""
+    global _settings_cache, _settings_cache_db_name
+    with _settings_cache_lock:
+        if _settings_cache is not None and _settings_cache_db_name == config.DATABASE_NAME:
+            return _settings_cache
+        _typed_settings_cache.clear()
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT {COL_SETTING_KEY}, {COL_SETTING_VALUE} FROM {TABLE_APP_SETTINGS}")
+            _settings_cache = {row[0]: row[1] for row in cursor.fetchall()}
+        _settings_cache_db_name = config.DATABASE_NAME
+        logger.debug(f"Loaded {len(_settings_cache)} app settings into cache.")
+        return _settings_cache
+
+def get_all_app_settings() -> Dict[str, Optional[str]]:
+    """Returns a copy of all application settings (served from the cache)."""
+    return dict(_get_settings_cache())
+
 def get_app_setting_db(setting_key: str, default_value: Optional[str] = None) -> Optional[str]: # Ensure default_value is present
-    """Retrieves an application setting from the database."""
+    """Retrieves an application setting (served from the in-memory cache)."""
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
-            cursor = conn.cursor()
-            cursor.execute(f"SELECT {COL_SETTING_VALUE} FROM {TABLE_APP_SETTINGS} WHERE {COL_SETTING_KEY} = ?", (setting_key,))
-            row = cursor.fetchone()
-            return row[0] if row else default_value # Use default_value if row is None
+        settings = _get_settings_cache()
     except sqlite3.Error as e:
         logger.error(f"Error fetching app setting '{setting_key}': {e}. Returning default: {default_value}")
         return default_value
+    return settings[setting_key] if setting_key in settings else default_value # Use default_value if not stored
+
+def _get_typed_setting(setting_key: str, default_value: str, parser: Callable[[str], Any]) -> Any:
+    """Parses a setting once and memoizes the result until the cache is invalidated."""
+    with _settings_cache_lock:
+        raw_value = get_app_setting_db(setting_key, default_value)
+        cached = _typed_settings_cache.get(setting_key)
+        if cached is not None and cached[0] == raw_value:
+            return cached[1]
+        parsed = parser(raw_value if raw_value is not None else default_value)
+        _typed_settings_cache[setting_key] = (raw_value, parsed)
+        return parsed
+
+def _parse_holiday_list(holidays_str: str) -> FrozenSet[dt_date]:
+    holidays = set()
+    for item in holidays_str.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            holidays.add(dt_date.fromisoformat(item))
+        except ValueError:
+            logger.warning(f"Ignoring invalid public holiday entry '{item}' (expected YYYY-MM-DD).")
+    return frozenset(holidays)
+
+def _parse_work_day_indices(indices_str: str) -> FrozenSet[int]:
+    try:
+        indices = frozenset(int(i.strip()) for i in indices_str.split(',') if i.strip())
+        if indices and all(0 <= i <= 6 for i in indices):
+            return indices
+    except ValueError:
+        pass
+    logger.warning(f"Invalid work days setting '{indices_str}'. Using default: {config.DEFAULT_WORK_DAYS_INDICES_STR}")
+    return frozenset(config.DEFAULT_WORK_DAYS_INDICES)
+
+def _parse_start_time(time_str: str) -> dt_time:
+    try:
+        return dt_time.fromisoformat(time_str.strip())
+    except (ValueError, AttributeError):
+        logger.warning(f"Invalid standard start time '{time_str}'. Using default: {config.STANDARD_START_TIME_CONFIG_DEFAULT}")
+        return dt_time.fromisoformat(config.STANDARD_START_TIME_CONFIG_DEFAULT)
+
+def _parse_work_hours(hours_str: str) -> float:
+    try:
+        hours = float(hours_str)
+        if 0 < hours <= 24:
+            return hours
+    except (ValueError, TypeError):
+        pass
+    logger.warning(f"Invalid standard work hours '{hours_str}'. Using default: {config.STANDARD_WORK_HOURS_PER_DAY}")
+    return config.STANDARD_WORK_HOURS_PER_DAY
+
+def _parse_grace_minutes(minutes_str: str) -> int:
+    try:
+        minutes = int(minutes_str)
+        if minutes >= 0:
+            return minutes
+    except (ValueError, TypeError):
+        pass
+    logger.warning(f"Invalid late arrival grace period '{minutes_str}'. Using default: {config.LATE_ARRIVAL_ALLOWED_MINUTES}")
+    return config.LATE_ARRIVAL_ALLOWED_MINUTES
+
+def get_public_holidays() -> FrozenSet[dt_date]:
+    """Returns the configured public holidays as a frozenset of dates."""
+    return _get_typed_setting(SETTING_PUBLIC_HOLIDAYS_LIST, "", _parse_holiday_list)
+
+def get_work_day_indices() -> FrozenSet[int]:
+    """Returns the configured work days as weekday indices (0=Monday)."""
+    return _get_typed_setting(SETTING_WORK_DAYS_INDICES, config.DEFAULT_WORK_DAYS_INDICES_STR, _parse_work_day_indices)
+
+def get_standard_start_time() -> dt_time:
+    """Returns the official work start time."""
+    return _get_typed_setting(SETTING_STANDARD_START_TIME, config.STANDARD_START_TIME_CONFIG_DEFAULT, _parse_start_time)
+
+def get_standard_work_hours_per_day() -> float:
+    """Returns the standard work hours per day."""
+    return _get_typed_setting(SETTING_STANDARD_WORK_HOURS_PER_DAY, str(config.STANDARD_WORK_HOURS_PER_DAY), _parse_work_hours)
+
+def get_late_arrival_allowed_minutes() -> int:
+    """Returns the late arrival grace period in minutes."""
+    return _get_typed_setting(SETTING_LATE_ARRIVAL_ALLOWED_MINUTES, str(config.LATE_ARRIVAL_ALLOWED_MINUTES), _parse_grace_minutes)
 
 def set_app_setting_db(setting_key: str, setting_value: str) -> bool:
     """Sets or updates an application setting in the database."""
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        previous_value = get_app_setting_db(setting_key)
+        with get_connection() as conn:
             cursor = conn.cursor()
             # Use INSERT OR REPLACE to handle both new and existing settings
             cursor.execute(f"INSERT OR REPLACE INTO {TABLE_APP_SETTINGS} ({COL_SETTING_KEY}, {COL_SETTING_VALUE}) VALUES (?, ?)",
                            (setting_key, setting_value))
             conn.commit()
             logger.info(f"App setting '{setting_key}' set to '{setting_value}'.")
-            return True
+        recompute_attendance_daily_for_setting(setting_key, previous_value, setting_value)
+        return True
     except sqlite3.Error as e:
         logger.error(f"Error setting app setting '{setting_key}': {e}")
         return False
+    finally:
+        invalidate_app_settings_cache()
 
 def increment_app_counter(counter_name: str, increment_by: int = 1):
     """Increments a specific application counter in the database."""
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(f"""
                 INSERT INTO {TABLE_APP_COUNTERS} ({COL_COUNTER_NAME}, {COL_COUNTER_VALUE})
@@ -829,9 +1408,15 @@ def increment_app_counter(counter_name: str, increment_by: int = 1):
 if __name__ == '__main__': # pragma: no cover
     # This allows running this script directly to initialize the DB
     # (e.g., python -m data.database)
+    # python -m data.database --rebuild-attendance-daily [START_DATE [END_DATE]] rebuilds the daily rollup
     print("Initializing database directly...")
     init_db()
     print("Database initialization complete.")
+    if len(sys.argv) > 1 and sys.argv[1] == "--rebuild-attendance-daily":
+        range_args = sys.argv[2:4]
+        with transaction("IMMEDIATE") as rebuild_conn:
+            rebuilt_days = rebuild_attendance_daily(rebuild_conn.cursor(), *range_args)
+        print(f"Daily attendance rollup rebuilt: {rebuilt_days} employee-days.")
     # Example: Set a setting
     # set_app_setting_db("test_setting", "test_value")
     # print(f"Test setting value: {get_app_setting_db('test_setting')}")
@@ -1,12 +1,15 @@
 # hr_dashboard_project/data/queries.py
 import sqlite3
-from typing import Optional, List, Dict, Union, Any, Tuple
+from typing import Optional, List, Dict, Union, Any, Tuple, Callable, Iterator
 from datetime import datetime, timedelta, date as dt_date
 import os
+import re
 import hashlib # Added missing import for password hashing
 # Add project root to sys.path to allow importing 'config'
 import sys
 import logging # Added logging
+import threading
+from itertools import islice
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import config # Now this should work
 from . import database # To import constants from database.py in the same directory
@@ -38,7 +41,7 @@ def update_employee_details_db(emp_id: str, new_details: Dict[str, Union[str, fl
 
     # Get actual column names from the employees table to be safe
     actual_employee_table_columns = []
-    with sqlite3.connect(config.DATABASE_NAME) as conn_schema_check:
+    with database.get_connection() as conn_schema_check:
         cursor_schema = conn_schema_check.cursor()
         actual_employee_table_columns = [info[1] for info in cursor_schema.execute(f"PRAGMA table_info({TABLE_EMPLOYEES})")]
 
@@ -73,7 +76,7 @@ def update_employee_details_db(emp_id: str, new_details: Dict[str, Union[str, fl
     sql_query = f"UPDATE {database.TABLE_EMPLOYEES} SET {', '.join(set_clauses)} WHERE UPPER({database.COL_EMP_ID}) = ?"
 
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(sql_query, tuple(params))
             conn.commit()
@@ -109,7 +112,7 @@ def search_employees(search_term: str, search_field: str, include_archived: bool
 def list_departments_db() -> List[Dict]:
     """Lists all departments."""
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             cursor.execute(f"SELECT {database.COL_DEPT_ID}, {database.COL_DEPT_NAME}, {database.COL_DEPT_DESCRIPTION} FROM {database.TABLE_DEPARTMENTS} ORDER BY {database.COL_DEPT_NAME}")
@@ -143,34 +146,90 @@ def verify_password(stored_password_hash: str, provided_password: str) -> bool:
 logger = logging.getLogger(__name__)
 # --- Employee Queries ---
 
+EMPLOYEE_ID_BLOCK_SIZE = 100 # IDs an EmployeeIdAllocator reserves per counter transaction
+
+def format_employee_id(number: int) -> str:
+    return f"{config.EMPLOYEE_ID_PREFIX}{number:04d}" # Uses prefix from config
+
+def _reserve_employee_id_block(cursor: sqlite3.Cursor, count: int) -> range:
+    """Advances the employee ID counter by count inside the caller's transaction; returns the counter values reserved."""
+    cursor.execute(f"UPDATE {database.TABLE_APP_COUNTERS} SET {database.COL_COUNTER_VALUE} = {database.COL_COUNTER_VALUE} + ? WHERE {database.COL_COUNTER_NAME} = ?",
+                   (count, database.COUNTER_NEXT_EMPLOYEE_ID))
+    if cursor.rowcount != 1:
+        # This case should ideally not happen if init_db correctly initializes the counter
+        logger.error(f"Counter '{database.COUNTER_NEXT_EMPLOYEE_ID}' not found in {database.TABLE_APP_COUNTERS}.")
+        raise DatabaseOperationError(f"Counter '{database.COUNTER_NEXT_EMPLOYEE_ID}' not found.")
+    cursor.execute(f"SELECT {database.COL_COUNTER_VALUE} FROM {database.TABLE_APP_COUNTERS} WHERE {database.COL_COUNTER_NAME} = ?",
+                   (database.COUNTER_NEXT_EMPLOYEE_ID,))
+    next_value = cursor.fetchone()[0]
+    return range(next_value - count, next_value)
+
+def reserve_employee_ids_db(count: int) -> range:
+    """
+    Atomically advances the employee ID counter by count and returns the reserved counter values
+    (format them with format_employee_id). One short write transaction whatever the count.
+    """
+    if count < 1:
+        raise InvalidInputError("At least one employee ID must be reserved.")
+    try:
+        with database.transaction("IMMEDIATE") as conn: # The counter update takes the write lock straight away
+            return _reserve_employee_id_block(conn.cursor(), count)
+    except sqlite3.Error as e:
+        logger.error(f"Database error reserving {count} employee IDs: {e}")
+        raise DatabaseOperationError(f"Failed to reserve employee IDs: {e}")
+
 def get_next_employee_id_db() -> str:
     """
     Retrieves the next available employee ID from the app_counters table.
     Increments the counter after retrieval.
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
-        cursor = conn.cursor()
-        try:
-            conn.execute("BEGIN EXCLUSIVE TRANSACTION") # Lock for atomicity
-            cursor.execute(f"SELECT {database.COL_COUNTER_VALUE} FROM {database.TABLE_APP_COUNTERS} WHERE {database.COL_COUNTER_NAME} = ?", # Corrected
-                           (database.COUNTER_NEXT_EMPLOYEE_ID,))
-            row = cursor.fetchone()
-            if row: # Corrected indentation
-                next_id_num = row[0] # Example: 1
-                next_id_str = f"{config.EMPLOYEE_ID_PREFIX}{next_id_num:04d}" # Uses prefix from config
-                cursor.execute(f"UPDATE {database.TABLE_APP_COUNTERS} SET {database.COL_COUNTER_VALUE} = ? WHERE {database.COL_COUNTER_NAME} = ?",
-                               (next_id_num + 1, database.COUNTER_NEXT_EMPLOYEE_ID))
-                conn.commit()
-                return next_id_str
-            else:
-                # This case should ideally not happen if init_db correctly initializes the counter
-                logger.error(f"Counter '{database.COUNTER_NEXT_EMPLOYEE_ID}' not found in {database.TABLE_APP_COUNTERS}.")
-                conn.rollback() # Rollback if counter not found
-                raise database.DatabaseOperationError(f"Counter '{database.COUNTER_NEXT_EMPLOYEE_ID}' not found.")
-        except sqlite3.Error as e:
-            conn.rollback()
-            logger.error(f"Database error getting next employee ID: {e}")
-            raise database.DatabaseOperationError(f"Failed to get next employee ID: {e}")
+    return format_employee_id(reserve_employee_ids_db(1)[0])
+
+class EmployeeIdAllocator:
+    """
+    Hands out employee IDs from blocks reserved with reserve_employee_ids_db, so callers that create
+    many employees (bulk hiring, API clients) touch the counter once per block_size IDs instead of
+    once per ID. Thread-safe. IDs left in a block when the process exits are never used, so IDs
+    from an allocator are unique but not necessarily contiguous.
+    """
+
+    def __init__(self, block_size: int = EMPLOYEE_ID_BLOCK_SIZE):
+        if block_size < 1:
+            raise InvalidInputError("Employee ID block size must be at least 1.")
+        self.block_size = block_size
+        self._block = iter(())
+        self._remaining = 0
+        self._lock = threading.Lock()
+
+    @property
+    def remaining(self) -> int:
+        """IDs left in the current block."""
+        return self._remaining
+
+    def next_id(self) -> str:
+        return self.take(1)[0]
+
+    def take(self, count: int) -> List[str]:
+        """Returns count new employee IDs, reserving a larger block first if the current one is short."""
+        with self._lock:
+            emp_ids = [format_employee_id(number) for number in islice(self._block, min(count, self._remaining))]
+            self._remaining -= len(emp_ids)
+            if len(emp_ids) < count:
+                needed = count - len(emp_ids)
+                block = reserve_employee_ids_db(max(self.block_size, needed))
+                self._block = iter(block)
+                self._remaining = len(block) - needed
+                emp_ids.extend(format_employee_id(number) for number in islice(self._block, needed))
+            return emp_ids
+
+_employee_id_allocator: Optional[EmployeeIdAllocator] = None
+
+def get_employee_id_allocator() -> EmployeeIdAllocator:
+    """The application-wide employee ID allocator (created on first use)."""
+    global _employee_id_allocator
+    if _employee_id_allocator is None:
+        _employee_id_allocator = EmployeeIdAllocator()
+    return _employee_id_allocator
 
 
 def add_employee_db(emp_id: str, name: str, department_id: Optional[int], position: str, salary: float,
@@ -197,7 +256,7 @@ def add_employee_db(emp_id: str, name: str, department_id: Optional[int], positi
         manager_id, device_user_id, 1 if exclude_vacation_policy else 0
     )
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, values)
             conn.commit()
@@ -214,6 +273,43 @@ def add_employee_db(emp_id: str, name: str, department_id: Optional[int], positi
         logger.error(f"Database error adding employee {emp_id}: {e}")
         raise DatabaseOperationError(f"Failed to add employee: {e}")
 
+# Columns set by add_employees_bulk_db, in the order of each employee tuple (the ID is added in front)
+EMPLOYEE_BULK_INSERT_COLUMNS = (
+    database.COL_EMP_NAME, database.COL_EMP_DEPARTMENT_ID, database.COL_EMP_POSITION, database.COL_EMP_SALARY,
+    database.COL_EMP_VACATION_DAYS, database.COL_EMP_STATUS, database.COL_EMP_PHONE, database.COL_EMP_EMAIL,
+    database.COL_EMP_PHOTO_PATH, database.COL_EMP_GENDER, database.COL_EMP_START_DATE, database.COL_EMP_MARITAL_STATUS,
+    database.COL_EMP_EDUCATION, database.COL_EMP_EMPLOYMENT_HISTORY, database.COL_EMP_CURRENT_SHIFT,
+    database.COL_EMP_MANAGER_ID, database.COL_EMP_DEVICE_USER_ID, database.COL_EMP_EXCLUDE_VACATION_POLICY,
+)
+
+def add_employees_bulk_db(employees: List[tuple]) -> List[str]:
+    """
+    Adds many employees in one transaction: a block of IDs is taken from the counter with a single
+    update and the rows are inserted with executemany. Each employee is a tuple of values in
+    EMPLOYEE_BULK_INSERT_COLUMNS order. All or nothing: on a conflict nothing is added (and no IDs
+    are used up). Returns the new employee IDs in input order.
+    """
+    if not employees:
+        return []
+    columns = ", ".join(f'"{column}"' for column in (database.COL_EMP_ID,) + EMPLOYEE_BULK_INSERT_COLUMNS)
+    placeholders = ", ".join("?" * (len(EMPLOYEE_BULK_INSERT_COLUMNS) + 1))
+    try:
+        with database.transaction("IMMEDIATE") as conn:
+            cursor = conn.cursor()
+            emp_ids = [format_employee_id(number) for number in _reserve_employee_id_block(cursor, len(employees))]
+            cursor.executemany(f"INSERT INTO {database.TABLE_EMPLOYEES} ({columns}) VALUES ({placeholders})",
+                               [(emp_id,) + tuple(employee) for emp_id, employee in zip(emp_ids, employees)])
+        logger.info(f"Added {len(emp_ids)} employees ({emp_ids[0]} to {emp_ids[-1]}).")
+        return emp_ids
+    except sqlite3.IntegrityError as e:
+        logger.warning(f"Integrity error adding {len(employees)} employees: {e}")
+        if "UNIQUE constraint failed: employees.device_user_id" in str(e):
+            raise DatabaseOperationError("A Device User ID is already assigned to another employee.")
+        raise DatabaseOperationError(f"Failed to add employees due to a data conflict: {e}")
+    except sqlite3.Error as e:
+        logger.error(f"Database error adding {len(employees)} employees: {e}")
+        raise DatabaseOperationError(f"Failed to add employees: {e}")
+
 def get_employee_by_id_db(emp_id: str, include_archived: bool = False) -> Optional[Dict]:
     """Retrieves an employee by their ID."""
     archived_clause = "" if include_archived else f"AND (e.{database.COL_EMP_IS_ARCHIVED} = 0 OR e.{database.COL_EMP_IS_ARCHIVED} IS NULL)"
@@ -225,7 +321,7 @@ def get_employee_by_id_db(emp_id: str, include_archived: bool = False) -> Option
         LEFT JOIN {database.TABLE_EMPLOYEES} m ON e.{database.COL_EMP_MANAGER_ID} = m.{database.COL_EMP_ID}
         WHERE e."{database.COL_EMP_ID}" = ? {archived_clause}
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query, (emp_id,))
@@ -259,7 +355,7 @@ def check_interviewer_availability_db(interviewer_emp_id: str, interview_date_st
         query += f" AND {database.COL_INT_ID} != ?"
         params_query.append(exclude_interview_id)
 
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query, tuple(params_query))
@@ -296,7 +392,7 @@ def add_interview_db(candidate_name: str, interviewer_emp_id: str, interview_dat
     query = f"INSERT INTO {database.TABLE_INTERVIEWS} ({database.COL_INT_CANDIDATE_NAME}, {database.COL_INT_INTERVIEWER_EMP_ID}, {database.COL_INT_DATE}, {database.COL_INT_TIME}, {database.COL_INT_DURATION_MINUTES}, {database.COL_INT_LOCATION}, {database.COL_INT_STATUS}, {database.COL_INT_NOTES}, {database.COL_INT_CREATED_AT}, {database.COL_INT_UPDATED_AT}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)" # Corrected
     params_insert = (candidate_name, interviewer_emp_id, interview_date_str, interview_time_str, duration_minutes, location, status, notes, now_iso, now_iso)
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor(); cursor.execute(query, params_insert); conn.commit(); interview_id = cursor.lastrowid
             logger.info(f"Interview ID {interview_id} for {candidate_name} scheduled with {interviewer_emp_id}.")
             interviewer_details = _find_employee_by_id(interviewer_emp_id)
@@ -331,7 +427,7 @@ def get_all_employees_db(include_archived: bool = False, department_filter: Opti
         {archived_clause}
         ORDER BY e.{database.COL_EMP_NAME}
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query, params)
@@ -339,6 +435,100 @@ def get_all_employees_db(include_archived: bool = False, department_filter: Opti
             employees.append(dict(row))
     return employees
 
+# Columns available to iter_employees_for_export_db, mapped to their SQL (e: employees, d: departments, m: manager)
+EMPLOYEE_EXPORT_COLUMNS: Dict[str, str] = {
+    column: f"e.{column}" for column in (
+        database.COL_EMP_ID, database.COL_EMP_NAME, database.COL_EMP_POSITION, database.COL_EMP_SALARY,
+        database.COL_EMP_VACATION_DAYS, database.COL_EMP_START_DATE, database.COL_EMP_PHONE, database.COL_EMP_EMAIL,
+        database.COL_EMP_GENDER, database.COL_EMP_MARITAL_STATUS, database.COL_EMP_EDUCATION,
+        database.COL_EMP_EMPLOYMENT_HISTORY, database.COL_EMP_DEVICE_USER_ID, database.COL_EMP_PHOTO_PATH,
+        database.COL_EMP_EXCLUDE_VACATION_POLICY, database.COL_EMP_STATUS, database.COL_EMP_TERMINATION_DATE,
+        database.COL_EMP_CURRENT_SHIFT, database.COL_EMP_MANAGER_ID,
+    )
+}
+EMPLOYEE_EXPORT_COLUMNS["department_name"] = f"d.{database.COL_DEPT_NAME}"
+EMPLOYEE_EXPORT_COLUMNS["manager_name"] = f"m.{database.COL_EMP_NAME}"
+EMPLOYEE_EXPORT_FETCH_SIZE = 2000 # Rows fetched per fetchmany() call while exporting
+
+def iter_employees_for_export_db(columns: List[str], include_archived: bool = False,
+                                 fetch_size: int = EMPLOYEE_EXPORT_FETCH_SIZE) -> Iterator[tuple]:
+    """
+    Yields employees as tuples of the requested EMPLOYEE_EXPORT_COLUMNS, ordered like the employee
+    list (name, ID). Only the requested columns are selected, joins are only made when a department
+    or manager column is requested, and rows are fetched fetch_size at a time, so memory use does
+    not grow with the number of employees. Call from the thread that consumes the rows.
+    """
+    unknown_columns = [column for column in columns if column not in EMPLOYEE_EXPORT_COLUMNS]
+    if unknown_columns or not columns:
+        raise InvalidInputError(f"Invalid export columns: {', '.join(unknown_columns) or '(none)'}")
+    joins = ""
+    if "department_name" in columns:
+        joins += f" LEFT JOIN {database.TABLE_DEPARTMENTS} d ON e.{database.COL_EMP_DEPARTMENT_ID} = d.{database.COL_DEPT_ID}"
+    if "manager_name" in columns:
+        joins += f" LEFT JOIN {database.TABLE_EMPLOYEES} m ON e.{database.COL_EMP_MANAGER_ID} = m.{database.COL_EMP_ID}"
+    archived_clause = "" if include_archived else f"WHERE (e.{database.COL_EMP_IS_ARCHIVED} = 0 OR e.{database.COL_EMP_IS_ARCHIVED} IS NULL)"
+    query = f"""
+        SELECT {', '.join(EMPLOYEE_EXPORT_COLUMNS[column] for column in columns)}
+        FROM {database.TABLE_EMPLOYEES} e{joins}
+        {archived_clause}
+        ORDER BY e.{database.COL_EMP_NAME}, e.{database.COL_EMP_ID}
+    """
+    try:
+        cursor = database.get_connection().cursor()
+        cursor.row_factory = None # Plain tuples, whatever the shared connection's row factory is
+        cursor.execute(query)
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            yield from rows
+    except sqlite3.Error as e:
+        logger.error(f"Database error exporting employees: {e}")
+        raise DatabaseOperationError(f"Failed to read employees for export: {e}")
+
+def get_employee_list_page_db(after_key: Optional[Tuple[str, str]] = None,
+                              before_key: Optional[Tuple[str, str]] = None,
+                              limit: int = 200, include_archived: bool = False) -> List[Dict]:
+    """
+    Returns one page of the main employee list ordered by (name, id), using keyset pagination.
+    after_key/before_key are the (name, id) of the last/first row already shown; pass neither
+    for the first page. Rows are always returned in ascending order and only carry the list columns.
+    """
+    conditions = [] if include_archived else [f"(e.{database.COL_EMP_IS_ARCHIVED} = 0 OR e.{database.COL_EMP_IS_ARCHIVED} IS NULL)"]
+    params: List[Any] = []
+    order = "ASC"
+    if after_key is not None:
+        conditions.append(f"(e.{database.COL_EMP_NAME}, e.{database.COL_EMP_ID}) > (?, ?)")
+        params.extend(after_key)
+    elif before_key is not None:
+        conditions.append(f"(e.{database.COL_EMP_NAME}, e.{database.COL_EMP_ID}) < (?, ?)")
+        params.extend(before_key)
+        order = "DESC"
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = f"""
+        SELECT e.{database.COL_EMP_ID}, e.{database.COL_EMP_NAME}, d.{database.COL_DEPT_NAME} AS department_name,
+               e.{database.COL_EMP_POSITION}, e.{database.COL_EMP_SALARY}, e.{database.COL_EMP_STATUS},
+               e.{database.COL_EMP_TERMINATION_DATE}, e.{database.COL_EMP_EXCLUDE_VACATION_POLICY}
+        FROM {database.TABLE_EMPLOYEES} e
+        LEFT JOIN {database.TABLE_DEPARTMENTS} d ON e.{database.COL_EMP_DEPARTMENT_ID} = d.{database.COL_DEPT_ID}
+        {where_clause}
+        ORDER BY e.{database.COL_EMP_NAME} {order}, e.{database.COL_EMP_ID} {order}
+        LIMIT ?
+    """
+    params.append(limit)
+    try:
+        with database.get_connection() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            rows = [dict(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        logger.error(f"Database error fetching employee list page: {e}")
+        raise DatabaseOperationError(f"Failed to fetch employee list page: {e}")
+    if order == "DESC":
+        rows.reverse()
+    return rows
+
 def get_employees_by_manager_db(manager_id: str, include_archived: bool = False) -> List[Dict]:
     """Retrieves all employees managed by a specific manager_id."""
     if not manager_id:
@@ -354,7 +544,7 @@ def get_employees_by_manager_db(manager_id: str, include_archived: bool = False)
         WHERE e.{database.COL_EMP_MANAGER_ID} = ? {archived_clause}
         ORDER BY e.{database.COL_EMP_NAME}
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query, (manager_id,))
@@ -380,7 +570,7 @@ def get_all_employees_id_name_list(include_archived: bool = False) -> List[Tuple
         {archived_clause}
         ORDER BY {database.COL_EMP_NAME}
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute(query)
         employees_list = cursor.fetchall() # Returns list of tuples
@@ -394,7 +584,7 @@ def get_employee_status_counts_db() -> Dict[str, int]:
 
     query = f"SELECT {database.COL_EMP_STATUS}, COUNT(*) FROM {database.TABLE_EMPLOYEES} GROUP BY {database.COL_EMP_STATUS}"
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query)
             for status, count in cursor.fetchall():
@@ -411,7 +601,7 @@ def get_employee_gender_counts_db() -> Dict[str, int]:
     # Query to count non-null and non-empty gender values
     query = f"SELECT {database.COL_EMP_GENDER}, COUNT(*) FROM {database.TABLE_EMPLOYEES} WHERE {database.COL_EMP_GENDER} IS NOT NULL AND {database.COL_EMP_GENDER} != '' GROUP BY {database.COL_EMP_GENDER}"
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query)
             for gender, count in cursor.fetchall():
@@ -439,7 +629,7 @@ def get_leave_type_counts_db(period_start_str: Optional[str] = None, period_end_
     query += f" GROUP BY {database.COL_LR_LEAVE_TYPE}"
     
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, tuple(params))
             for leave_type, count in cursor.fetchall():
@@ -456,7 +646,7 @@ def get_active_contracts_count_db() -> int:
         WHERE {database.COL_CONTRACT_LIFECYCLE_STATUS} = 'Active'
     """
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query)
             return cursor.fetchone()[0] or 0
@@ -464,8 +654,35 @@ def get_active_contracts_count_db() -> int:
         logger.error(f"Database error fetching active contracts count: {e}")
         return 0 # Return 0 on error
 
+# Column weights for bm25() in the same order as database.EMPLOYEE_FTS_COLUMNS (name matches rank highest)
+_EMPLOYEE_FTS_WEIGHTS = (4.0, 10.0, 3.0, 2.0, 2.0, 1.0, 1.0)
+
+def _build_employee_fts_match(search_term: str, columns: Optional[List[str]] = None) -> Optional[str]:
+    """
+    Builds an FTS5 MATCH expression where every word of search_term must match as a token prefix,
+    optionally restricted to the given columns. Returns None if the term has no searchable words.
+    """
+    tokens = [token for token in re.split(r"[\W_]+", database.normalize_search_text(search_term)) if token]
+    if not tokens:
+        return None
+    expression = " AND ".join(f'"{token}"*' for token in tokens)
+    if columns:
+        expression = f"{{{' '.join(columns)}}} : ({expression})"
+    return expression
+
 def search_employees_db(search_term: str, search_field: str, gender_filter: Optional[str] = None, include_archived: bool = False) -> List[Dict[str, Any]]:
-    """Searches for employees based on a term and field."""
+    """
+    Searches for employees based on a term and field.
+    Text fields use the employees FTS5 index when available (word-prefix matching, best matches
+    first, Arabic letter variants folded); otherwise, and for department/status, a substring LIKE.
+    """
+    fts_match = None
+    if search_term and database.is_employee_search_index_available():
+        if not search_field or search_field.lower() == "all":
+            fts_match = _build_employee_fts_match(search_term)
+        elif search_field in database.EMPLOYEE_FTS_COLUMNS:
+            fts_match = _build_employee_fts_match(search_term, [search_field])
+
     base_query = f"""
         SELECT e.*, d.{database.COL_DEPT_NAME} as department_name, m.{database.COL_EMP_NAME} as manager_name
         FROM {database.TABLE_EMPLOYEES} e
@@ -474,11 +691,40 @@ def search_employees_db(search_term: str, search_field: str, gender_filter: Opti
     """
     where_clauses = []
     params: List[Any] = []
+    order_by = f" ORDER BY e.{database.COL_EMP_NAME}"
+
+    if fts_match:
+        # The hits drive the join, so the cost follows the number of matches rather than the table size.
+        bm25_weights = ", ".join(str(weight) for weight in _EMPLOYEE_FTS_WEIGHTS)
+        search_hits_sql = "SELECT hit_emp_id, hit_rank FROM fts_hits"
+        params.append(fts_match)
+        if not search_field or search_field.lower() == "all": # Department names are not in the index
+            search_hits_sql += f"""
+                UNION ALL
+                SELECT de.{database.COL_EMP_ID}, NULL FROM {database.TABLE_EMPLOYEES} de
+                WHERE de.{database.COL_EMP_DEPARTMENT_ID} IN (SELECT {database.COL_DEPT_ID} FROM {database.TABLE_DEPARTMENTS} WHERE {database.COL_DEPT_NAME} LIKE ?)
+                  AND de.{database.COL_EMP_ID} NOT IN (SELECT hit_emp_id FROM fts_hits)"""
+            params.append(f"%{search_term}%")
+        base_query = f"""
+            WITH fts_hits AS MATERIALIZED (
+                SELECT {database.COL_EMP_FTS_EMPLOYEE_ID} AS hit_emp_id, bm25({database.TABLE_EMPLOYEES_FTS}, {bm25_weights}) AS hit_rank
+                FROM {database.TABLE_EMPLOYEES_FTS} WHERE {database.TABLE_EMPLOYEES_FTS} MATCH ?
+            ),
+            search_hits AS ({search_hits_sql})
+            SELECT e.*, d.{database.COL_DEPT_NAME} as department_name, m.{database.COL_EMP_NAME} as manager_name
+            FROM search_hits h
+            JOIN {database.TABLE_EMPLOYEES} e ON e.{database.COL_EMP_ID} = h.hit_emp_id
+            LEFT JOIN {database.TABLE_DEPARTMENTS} d ON e.{database.COL_EMP_DEPARTMENT_ID} = d.{database.COL_DEPT_ID}
+            LEFT JOIN {database.TABLE_EMPLOYEES} m ON e.{database.COL_EMP_MANAGER_ID} = m.{database.COL_EMP_ID}
+        """
+        order_by = f" ORDER BY h.hit_rank IS NULL, h.hit_rank, e.{database.COL_EMP_NAME}"
 
     if not include_archived:
         where_clauses.append(f"(e.{database.COL_EMP_IS_ARCHIVED} = 0 OR e.{database.COL_EMP_IS_ARCHIVED} IS NULL)")
 
-    if not search_field or search_field.lower() == "all":
+    if fts_match:
+        pass # Term already applied through search_hits
+    elif not search_field or search_field.lower() == "all":
         like_term = f"%{search_term}%"
         where_clauses.append(f"""(
             e.{database.COL_EMP_ID} LIKE ? OR 
@@ -507,10 +753,10 @@ def search_employees_db(search_term: str, search_field: str, gender_filter: Opti
     else: # Should not happen if include_archived is handled, but as a fallback
         query = base_query
     
-    query += f" ORDER BY e.{database.COL_EMP_NAME}"
+    query += order_by
 
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             cursor.execute(query, tuple(params))
@@ -545,7 +791,7 @@ def update_employee_db(emp_id: str, updates: Dict) -> None:
 
     query = f'UPDATE {database.TABLE_EMPLOYEES} SET {set_clause} WHERE "{database.COL_EMP_ID}" = ?'
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, values)
             conn.commit()
@@ -569,7 +815,7 @@ def delete_employee_db(emp_id: str) -> None:
     # This is a hard delete. For production, soft delete (archiving) is often preferred.
     # The archive_employee_db function handles soft delete.
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             # Check if employee is a manager to prevent orphaned employees or handle reassignment
             # For simplicity, this check is omitted here but important in a real system.
@@ -588,17 +834,40 @@ def get_total_employee_count_db(include_archived: bool = False) -> int:
     """Counts the total number of employees."""
     archived_clause = "" if include_archived else f"WHERE ({database.COL_EMP_IS_ARCHIVED} = 0 OR {database.COL_EMP_IS_ARCHIVED} IS NULL)"
     query = f"SELECT COUNT({database.COL_EMP_ID}) FROM {database.TABLE_EMPLOYEES} {archived_clause}"
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute(query)
         return cursor.fetchone()[0] or 0
 
+def get_employee_stats_summary_db() -> Dict[str, float]:
+    """
+    Employee figures for the main window's stats summary in one pass over the table: total
+    employees (archived included), non-archived employees, and the average salary of the
+    non-archived employees with Active status.
+    """
+    not_archived = f"({database.COL_EMP_IS_ARCHIVED} = 0 OR {database.COL_EMP_IS_ARCHIVED} IS NULL)"
+    query = f"""
+        SELECT COUNT(*),
+               COALESCE(SUM(CASE WHEN {not_archived} THEN 1 ELSE 0 END), 0),
+               AVG(CASE WHEN {not_archived} AND {database.COL_EMP_STATUS} = ? THEN {database.COL_EMP_SALARY} END)
+        FROM {database.TABLE_EMPLOYEES}
+    """
+    try:
+        with database.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, (database.STATUS_ACTIVE,))
+            total_employees, active_employees, avg_salary = cursor.fetchone()
+    except sqlite3.Error as e:
+        logger.error(f"Database error fetching employee stats summary: {e}")
+        raise DatabaseOperationError(f"Failed to fetch employee stats: {e}")
+    return {"total_employees": total_employees, "active_employees": active_employees, "avg_salary": avg_salary or 0.0}
+
 # --- Department Queries ---
 def add_department_db(name: str, description: Optional[str] = None) -> int:
     """Adds a new department and returns its ID."""
     query = f"INSERT INTO {database.TABLE_DEPARTMENTS} ({database.COL_DEPT_NAME}, {database.COL_DEPT_DESCRIPTION}) VALUES (?, ?)"
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, (name, description))
             conn.commit()
@@ -615,7 +884,7 @@ def get_all_departments_db() -> List[Dict]:
     """Retrieves all departments."""
     departments = []
     query = f"SELECT * FROM {database.TABLE_DEPARTMENTS} ORDER BY {database.COL_DEPT_NAME}"
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query)
@@ -626,7 +895,7 @@ def get_all_departments_db() -> List[Dict]:
 def get_department_by_id_db(dept_id: int) -> Optional[Dict]:
     """Retrieves a department by its ID."""
     query = f"SELECT * FROM {database.TABLE_DEPARTMENTS} WHERE {database.COL_DEPT_ID} = ?"
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query, (dept_id,))
@@ -637,7 +906,7 @@ def get_department_id_by_name_db(dept_name: str) -> Optional[int]:
     """Retrieves a department's ID by its name."""
     if not dept_name: return None
     query = f"SELECT {database.COL_DEPT_ID} FROM {database.TABLE_DEPARTMENTS} WHERE {database.COL_DEPT_NAME} = ?"
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute(query, (dept_name,))
         row = cursor.fetchone()
@@ -661,7 +930,7 @@ def update_department_db(dept_id: int, name: Optional[str] = None, description:
 
     query = f"UPDATE {database.TABLE_DEPARTMENTS} SET {set_clause} WHERE {database.COL_DEPT_ID} = ?"
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, values)
             conn.commit()
@@ -679,7 +948,7 @@ def update_department_db(dept_id: int, name: Optional[str] = None, description:
 def delete_department_db(dept_id: int) -> None:
     """Deletes a department. Ensure employees are reassigned or handled."""
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             # Check if department is in use by employees
             cursor.execute(f"SELECT COUNT(*) FROM {database.TABLE_EMPLOYEES} WHERE {database.COL_EMP_DEPARTMENT_ID} = ?", (dept_id,))
@@ -706,7 +975,7 @@ def get_employee_count_for_department_db(dept_id: int) -> int:
           AND ({database.COL_EMP_STATUS} = ? OR {database.COL_EMP_STATUS} = ?)
           AND ({database.COL_EMP_IS_ARCHIVED} = 0 OR {database.COL_EMP_IS_ARCHIVED} IS NULL)
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute(query, (dept_id, database.STATUS_ACTIVE, database.STATUS_ON_LEAVE)) # Count active or on leave
         count = cursor.fetchone()[0]
@@ -717,8 +986,8 @@ def calculate_worked_duration(clock_in_str: Optional[str], clock_out_str: Option
     if not clock_in_str or not clock_out_str:
         return None
     try:
-        clock_in_dt = datetime.strptime(clock_in_str, '%Y-%m-%d %H:%M:%S')
-        clock_out_dt = datetime.strptime(clock_out_str, '%Y-%m-%d %H:%M:%S')
+        clock_in_dt = datetime.fromisoformat(clock_in_str)
+        clock_out_dt = datetime.fromisoformat(clock_out_str)
         if clock_out_dt <= clock_in_dt: # Clock out must be after clock in
             logger.warning(f"Clock out time {clock_out_str} is not after clock in time {clock_in_str}. Duration calculated as 0.")
             return 0.0
@@ -731,41 +1000,54 @@ def calculate_worked_duration(clock_in_str: Optional[str], clock_out_str: Option
 # --- Helper function for public holidays ---
 def is_public_holiday(check_date: dt_date) -> bool:
     """Checks if a given date is a public holiday based on app settings."""
-    holidays_str = database.get_app_setting_db(database.SETTING_PUBLIC_HOLIDAYS_LIST, "")
-    holidays = [h.strip() for h in holidays_str.split(',') if h.strip()]
-    return check_date.isoformat() in holidays
+    return check_date in database.get_public_holidays()
 
 # --- New backend function for absences today ---
+def get_absent_employees_on_date_db(date_str: str) -> List[Dict]:
+    """
+    Returns active, non-archived employees with no attendance log on date_str
+    and no approved leave covering it, in one anti-join query.
+    Does not check whether date_str is a workday; callers decide that.
+    Each row: id, name, manager_id, department_name.
+    """
+    query = f"""
+        SELECT e.{database.COL_EMP_ID} AS id, e.{database.COL_EMP_NAME} AS name,
+               e.{database.COL_EMP_MANAGER_ID} AS manager_id, d.{database.COL_DEPT_NAME} AS department_name
+        FROM {database.TABLE_EMPLOYEES} e
+        LEFT JOIN {database.TABLE_DEPARTMENTS} d ON e.{database.COL_EMP_DEPARTMENT_ID} = d.{database.COL_DEPT_ID}
+        WHERE e.{database.COL_EMP_STATUS} = ?
+          AND (e.{database.COL_EMP_IS_ARCHIVED} = 0 OR e.{database.COL_EMP_IS_ARCHIVED} IS NULL)
+          AND NOT EXISTS (
+              SELECT 1 FROM {database.TABLE_ATTENDANCE_LOG} al
+              WHERE al.{database.COL_ATT_EMP_ID} = e.{database.COL_EMP_ID} AND al.{database.COL_ATT_LOG_DATE} = ?
+          )
+          AND NOT EXISTS (
+              SELECT 1 FROM {database.TABLE_LEAVE_REQUESTS} lr
+              WHERE lr.{database.COL_LR_EMP_ID} = e.{database.COL_EMP_ID}
+                AND lr.{database.COL_LR_STATUS} = ?
+                AND ? BETWEEN date(lr.{database.COL_LR_START_DATE}) AND date(lr.{database.COL_LR_END_DATE})
+          )
+        ORDER BY e.{database.COL_EMP_NAME}
+    """
+    try:
+        with database.get_connection() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(query, (database.STATUS_ACTIVE, date_str, database.STATUS_LEAVE_APPROVED, date_str))
+            return [dict(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        logger.error(f"Database error fetching absent employees for {date_str}: {e}")
+        raise DatabaseOperationError(f"Failed to fetch absent employees: {e}")
+
 def get_absences_today_count_db() -> int:
     """
     Counts active employees who are expected to work today,
     have no attendance log, and are not on approved leave.
     """
     today = dt_date.today()
-    today_str = today.isoformat()
-    absent_count = 0
-    active_employees = [emp for emp in get_all_employees_db() if emp.get(database.COL_EMP_STATUS) == database.STATUS_ACTIVE] # Already correct
-    work_day_indices = config.DEFAULT_WORK_DAYS_INDICES
-
-    if today.weekday() not in work_day_indices or is_public_holiday(today):
+    if today.weekday() not in config.DEFAULT_WORK_DAYS_INDICES or is_public_holiday(today):
         return 0 # Not an expected workday or it's a public holiday
-
-    for emp in active_employees:
-        emp_id = emp[database.COL_EMP_ID]
-        # Check if employee is excluded from vacation/attendance policies if such a flag exists
-        # For simplicity, assuming all active employees are expected if it's a workday.
-
-        # Did the employee log any attendance today?
-        logs_today = get_attendance_logs_for_employee_period(emp_id, today_str, today_str)
-        if logs_today:
-            continue # Employee was present
-
-        # Is the employee on approved leave today?
-        if is_employee_on_approved_leave(emp_id, today): # This is the call
-            continue # Employee is on approved leave
-
-        absent_count += 1
-    return absent_count
+    return len(get_absent_employees_on_date_db(today.isoformat()))
 
 # --- User Queries ---
 def add_user_db(username: str, password: str, role: str, employee_id: Optional[str] = None) -> int:
@@ -775,7 +1057,7 @@ def add_user_db(username: str, password: str, role: str, employee_id: Optional[s
                 ({database.COL_USER_USERNAME}, {database.COL_USER_PASSWORD_HASH}, {database.COL_USER_ROLE}, {database.COL_USER_LINKED_EMP_ID})
                 VALUES (?, ?, ?, ?)"""
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, (username, hashed_password, role, employee_id))
             conn.commit()
@@ -791,7 +1073,7 @@ def add_user_db(username: str, password: str, role: str, employee_id: Optional[s
 def get_user_by_username_db(username: str) -> Optional[Dict]:
     """Retrieves a user by username."""
     query = f"SELECT * FROM {database.TABLE_USERS} WHERE {database.COL_USER_USERNAME} = ?"
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query, (username,))
@@ -801,7 +1083,7 @@ def get_user_by_username_db(username: str) -> Optional[Dict]:
 def get_user_by_id_db(user_id: int) -> Optional[Dict]:
     """Retrieves a user by user ID."""
     query = f"SELECT * FROM {database.TABLE_USERS} WHERE {database.COL_USER_ID} = ?"
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query, (user_id,))
@@ -818,7 +1100,7 @@ def log_employee_action(employee_id: str, action_description: str, performed_by_
 
     params = (employee_id, action_description, performed_by_user_id, timestamp_str)
 
-    conn_to_use = existing_conn if existing_conn else sqlite3.connect(config.DATABASE_NAME)
+    conn_to_use = existing_conn if existing_conn else database.get_connection()
     try:
         cursor = conn_to_use.cursor()
         cursor.execute(query, params)
@@ -839,7 +1121,7 @@ def get_all_users_db() -> List[Dict]:
     """Retrieves all users."""
     users = []
     query = f"SELECT {database.COL_USER_ID}, {database.COL_USER_USERNAME}, {database.COL_USER_ROLE}, {database.COL_USER_LINKED_EMP_ID} FROM {database.TABLE_USERS} ORDER BY {database.COL_USER_USERNAME}"
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query)
@@ -861,7 +1143,7 @@ def get_employee_demographics_report() -> List[Dict[str, Any]]:
         WHERE (e.{database.COL_EMP_IS_ARCHIVED} = 0 OR e.{database.COL_EMP_IS_ARCHIVED} IS NULL)
         ORDER BY e.{database.COL_EMP_NAME};
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query)
@@ -883,7 +1165,7 @@ def get_salary_distribution_by_department_report() -> List[Dict[str, Any]]:
         GROUP BY d.{database.COL_DEPT_NAME}
         ORDER BY d.{database.COL_DEPT_NAME};
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query)
@@ -921,7 +1203,7 @@ def get_terminated_employees_report(date_from: Optional[str] = None, date_to: Op
         WHERE {where_sql}
         ORDER BY e.{database.COL_EMP_TERMINATION_DATE} DESC;
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query, tuple(params))
@@ -947,7 +1229,7 @@ def update_user_db(user_id: int, username: Optional[str] = None, password: Optio
 
     query = f"UPDATE {database.TABLE_USERS} SET {set_clause} WHERE {database.COL_USER_ID} = ?"
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, values)
             conn.commit()
@@ -966,7 +1248,7 @@ def delete_user_db(user_id: int) -> None:
     """Deletes a user."""
     query = f"DELETE FROM {database.TABLE_USERS} WHERE {database.COL_USER_ID} = ?"
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, (user_id,))
             conn.commit()
@@ -981,37 +1263,33 @@ def delete_user_db(user_id: int) -> None:
 
 # --- App Settings Queries ---
 def get_app_setting_db(setting_name: str) -> Optional[str]:
-    """Retrieves a specific application setting."""
-    query = f"SELECT {database.COL_SETTING_VALUE} FROM {database.TABLE_APP_SETTINGS} WHERE {database.COL_SETTING_KEY} = ?"
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
-        cursor = conn.cursor()
-        cursor.execute(query, (setting_name,))
-        row = cursor.fetchone()
-        return row[0] if row else None
+    """Retrieves a specific application setting (served from the settings cache)."""
+    return database.get_app_setting_db(setting_name)
 
 def get_all_app_settings_db() -> Dict[str, str]:
-    """Retrieves all application settings."""
-    settings = {}
-    query = f"SELECT {database.COL_SETTING_KEY}, {database.COL_SETTING_VALUE} FROM {database.TABLE_APP_SETTINGS}"
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
-        cursor = conn.cursor()
-        cursor.execute(query)
-        for row in cursor.fetchall():
-            settings[row[0]] = row[1]
-    return settings
+    """Retrieves all application settings (served from the settings cache)."""
+    try:
+        return database.get_all_app_settings()
+    except sqlite3.Error as e:
+        logger.error(f"Database error fetching app settings: {e}")
+        raise DatabaseOperationError(f"Failed to fetch app settings: {e}")
 
 def update_app_setting_db(setting_name: str, setting_value: str) -> None:
     """Updates or adds an application setting."""
     query = f"INSERT OR REPLACE INTO {database.TABLE_APP_SETTINGS} ({database.COL_SETTING_KEY}, {database.COL_SETTING_VALUE}) VALUES (?, ?)"
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        previous_value = database.get_app_setting_db(setting_name)
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, (setting_name, setting_value))
             conn.commit()
             logger.info(f"App setting '{setting_name}' updated to '{setting_value}'.")
+        database.recompute_attendance_daily_for_setting(setting_name, previous_value, setting_value)
     except sqlite3.Error as e:
         logger.error(f"Database error updating app setting '{setting_name}': {e}")
         raise DatabaseOperationError(f"Failed to update app setting: {e}")
+    finally:
+        database.invalidate_app_settings_cache()
 
 # ... (Many more _db functions will be moved here) ...
 
@@ -1027,7 +1305,7 @@ def get_attendance_logs_for_employee_period(employee_id: str, period_start_str:
         ORDER BY {database.COL_ATT_CLOCK_IN} ASC
     """
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             cursor.execute(query, (employee_id, period_start_str, period_end_str))
@@ -1036,6 +1314,39 @@ def get_attendance_logs_for_employee_period(employee_id: str, period_start_str:
         logger.error(f"Database error fetching attendance logs for {employee_id} ({period_start_str}-{period_end_str}): {e}")
         raise DatabaseOperationError(f"Failed to fetch attendance logs: {e}")
 
+def get_attendance_daily_db(employee_id: str, period_start_str: str, period_end_str: str) -> List[Dict]:
+    """Fetches an employee's pre-aggregated attendance_daily rows for a period, oldest first."""
+    query = f"""
+        SELECT *
+        FROM {database.TABLE_ATTENDANCE_DAILY}
+        WHERE {database.COL_AD_EMP_ID} = ?
+          AND {database.COL_AD_WORK_DATE} BETWEEN ? AND ?
+        ORDER BY {database.COL_AD_WORK_DATE} ASC
+    """
+    try:
+        with database.get_connection() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(query, (employee_id, period_start_str, period_end_str))
+            return [dict(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        logger.error(f"Database error fetching daily attendance for {employee_id} ({period_start_str}-{period_end_str}): {e}")
+        raise DatabaseOperationError(f"Failed to fetch daily attendance: {e}")
+
+def rebuild_attendance_daily_db(start_date_str: Optional[str] = None, end_date_str: Optional[str] = None) -> int:
+    """
+    Rebuilds the attendance_daily rollup from attendance_log, for all dates or an inclusive range.
+    Use after editing attendance_log outside the application. Returns the number of employee-days written.
+    """
+    try:
+        with database.transaction("IMMEDIATE") as conn:
+            row_count = database.rebuild_attendance_daily(conn.cursor(), start_date_str, end_date_str)
+        logger.info(f"Rebuilt daily attendance rollup ({row_count} employee-days, range {start_date_str or 'start'} to {end_date_str or 'end'}).")
+        return row_count
+    except sqlite3.Error as e:
+        logger.error(f"Database error rebuilding daily attendance rollup: {e}")
+        raise DatabaseOperationError(f"Failed to rebuild daily attendance: {e}")
+
 def calculate_attendance_and_overtime_for_period(
     employee_id: str,
     period_start_str: str,
@@ -1045,34 +1356,15 @@ def calculate_attendance_and_overtime_for_period(
 ) -> Dict[str, float]:
     """
     Calculates total hours worked, regular hours, and overtime hours for an employee in a period.
-    
-    employee_id: str, 
-    period_start_str: str, 
-    period_end_str: str,
-    standard_hours_per_day: float,
-    work_day_indices: List[int]
-) -> Dict[str, float]:
     """
-    
-    logs = get_attendance_logs_for_employee_period(employee_id, period_start_str, period_end_str)
-    
+    summaries = get_attendance_summaries_for_period_db(period_start_str, period_end_str, standard_hours_per_day,
+                                                       work_day_indices, employee_id=employee_id)
+    return summaries.get(employee_id) or _summarize_daily_hours({}, 0, standard_hours_per_day)
+
+def _summarize_daily_hours(daily_hours: Dict[str, float], actual_workdays_count: int, standard_hours_per_day: float) -> Dict[str, float]:
+    """Turns per-day worked hours into the totals returned by the attendance summary functions."""
     total_hours_worked_on_workdays = 0.0
     total_overtime_hours = 0.0
-    actual_workdays_attended = set()
-    daily_hours: Dict[str, float] = {} # To store hours worked per day: daily_hours['YYYY-MM-DD'] = hours
-
-    for log_entry in logs: # Renamed log to log_entry to avoid conflict with logging module
-        log_date_str = log_entry[database.COL_ATT_LOG_DATE]
-        actual_workdays_attended.add(log_date_str)
-        
-        log_date_obj = dt_date.fromisoformat(log_date_str)
-        if log_date_obj.weekday() not in work_day_indices:
-            continue
-
-        duration = calculate_worked_duration(log_entry[database.COL_ATT_CLOCK_IN], log_entry.get(database.COL_ATT_CLOCK_OUT))
-        if duration is not None:
-            daily_hours[log_date_str] = daily_hours.get(log_date_str, 0) + duration
-
     for day_str, hours_worked_on_day in daily_hours.items():
         total_hours_worked_on_workdays += hours_worked_on_day
         if hours_worked_on_day > standard_hours_per_day:
@@ -1084,9 +1376,71 @@ def calculate_attendance_and_overtime_for_period(
         "total_hours_worked_on_workdays": round(total_hours_worked_on_workdays, 2),
         "total_regular_hours": round(total_regular_hours, 2),
         "total_overtime_hours": round(total_overtime_hours, 2),
-        "actual_workdays_count": len(actual_workdays_attended)
+        "actual_workdays_count": actual_workdays_count
     }
 
+def get_attendance_summaries_for_period_db(
+    period_start_str: str,
+    period_end_str: str,
+    standard_hours_per_day: float,
+    work_day_indices: List[int],
+    employee_id: Optional[str] = None
+) -> Dict[str, Dict[str, float]]:
+    """
+    Batch version of calculate_attendance_and_overtime_for_period for every employee with logs in the period
+    (or only employee_id). Reads one attendance_daily row per employee-day instead of the raw punches.
+    Overtime is derived here from standard_hours_per_day rather than the stored overtime_seconds,
+    so callers can pass a schedule other than the configured one.
+    Employees without any log in the period are not included.
+
+    Returns:
+        Dict[str, Dict[str, float]]: {employee_id: summary}, summary keys as in
+        calculate_attendance_and_overtime_for_period.
+    """
+    query = f"""
+        SELECT {database.COL_AD_EMP_ID}, {database.COL_AD_WORK_DATE}, {database.COL_AD_WORKED_SECONDS}
+        FROM {database.TABLE_ATTENDANCE_DAILY}
+        WHERE {database.COL_AD_WORK_DATE} BETWEEN ? AND ?
+    """
+    params: List[Any] = [period_start_str, period_end_str]
+    if employee_id:
+        query += f" AND {database.COL_AD_EMP_ID} = ?"
+        params.append(employee_id)
+    query += f" ORDER BY {database.COL_AD_EMP_ID}, {database.COL_AD_WORK_DATE}"
+
+    work_days = frozenset(work_day_indices)
+    is_workday_cache: Dict[str, bool] = {}
+    summaries: Dict[str, Dict[str, float]] = {}
+    current_emp_id = None
+    days_attended = 0
+    daily_hours: Dict[str, float] = {}
+    try:
+        with database.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(5000)
+                if not rows:
+                    break
+                for emp_id, work_date_str, worked_seconds in rows:
+                    if emp_id != current_emp_id:
+                        if current_emp_id is not None:
+                            summaries[current_emp_id] = _summarize_daily_hours(daily_hours, days_attended, standard_hours_per_day)
+                        current_emp_id, days_attended, daily_hours = emp_id, 0, {}
+                    days_attended += 1
+
+                    is_workday = is_workday_cache.get(work_date_str)
+                    if is_workday is None:
+                        is_workday = is_workday_cache[work_date_str] = dt_date.fromisoformat(work_date_str).weekday() in work_days
+                    if is_workday:
+                        daily_hours[work_date_str] = worked_seconds / 3600
+            if current_emp_id is not None:
+                summaries[current_emp_id] = _summarize_daily_hours(daily_hours, days_attended, standard_hours_per_day)
+    except sqlite3.Error as e:
+        logger.error(f"Database error summarizing attendance for {period_start_str} to {period_end_str}: {e}")
+        raise DatabaseOperationError(f"Failed to summarize attendance for the period: {e}")
+    return summaries
+
 def is_employee_on_approved_leave(employee_id: str, check_date: dt_date) -> bool:
     """Checks if an employee has an approved leave request covering the check_date."""
     query = f"""
@@ -1096,7 +1450,7 @@ def is_employee_on_approved_leave(employee_id: str, check_date: dt_date) -> bool
           AND ? BETWEEN date({database.COL_LR_START_DATE}) AND date({database.COL_LR_END_DATE}) 
         LIMIT 1 
     """ # Using date() function for SQLite date comparison
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute(query, (employee_id, check_date.isoformat()))
         return cursor.fetchone() is not None
@@ -1157,7 +1511,7 @@ def get_department_summary_report() -> List[Dict]:
     summary_report = []
     departments = get_all_departments_db() # Uses the refactored function
     
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         for dept in departments:
             dept_id = dept[database.COL_DEPT_ID]
             dept_name = dept[database.COL_DEPT_NAME]
@@ -1169,7 +1523,7 @@ def get_department_summary_report() -> List[Dict]:
 
     # Handle employees with no department_id (Unassigned)
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             # Count unassigned employees
             cursor.execute(f"""
@@ -1225,7 +1579,7 @@ def get_salary_distribution_by_department_report_db() -> List[Dict[str, Any]]:
         GROUP BY d.{database.COL_DEPT_NAME}
         ORDER BY d.{database.COL_DEPT_NAME};
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query, (database.STATUS_ACTIVE,))
@@ -1263,10 +1617,20 @@ def advanced_search_employees_db(criteria: Dict[str, Any], include_archived: boo
         database.COL_EMP_MARITAL_STATUS: f"e.{database.COL_EMP_MARITAL_STATUS}",
         database.COL_EMP_EDUCATION: f"e.{database.COL_EMP_EDUCATION}"
     }
+    use_fts = database.is_employee_search_index_available()
+    fts_expressions: List[str] = []
     for key, db_column_expr in text_field_map.items():
         if value := criteria.get(key, "").strip():
-            where_clauses.append(f"LOWER({db_column_expr}) LIKE LOWER(?)")
-            params.append(f"%{value}%")
+            fts_expression = _build_employee_fts_match(value, [key]) if use_fts else None
+            if fts_expression:
+                fts_expressions.append(fts_expression)
+            else:
+                where_clauses.append(f"LOWER({db_column_expr}) LIKE LOWER(?)")
+                params.append(f"%{value}%")
+    if fts_expressions: # All text criteria in one index lookup
+        where_clauses.append(f"e.{database.COL_EMP_ID} IN (SELECT {database.COL_EMP_FTS_EMPLOYEE_ID} FROM {database.TABLE_EMPLOYEES_FTS} "
+                             f"WHERE {database.TABLE_EMPLOYEES_FTS} MATCH ?)")
+        params.append(" AND ".join(fts_expressions))
 
     if dept_name_crit := criteria.get("department_name", "").strip():
         dept = get_department_by_name_db(dept_name_crit)
@@ -1315,7 +1679,7 @@ def advanced_search_employees_db(criteria: Dict[str, Any], include_archived: boo
     query = base_query + " WHERE " + " AND ".join(where_clauses) + f" ORDER BY e.{database.COL_EMP_NAME}"
     
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             logger.debug(f"Advanced Search Query: {query} | Params: {params}")
@@ -1350,56 +1714,78 @@ def archive_terminated_employees_db(cutoff_date_str: str) -> int:
           AND {database.COL_EMP_TERMINATION_DATE} <= ?
           AND ({database.COL_EMP_IS_ARCHIVED} = 0 OR {database.COL_EMP_IS_ARCHIVED} IS NULL)
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute(query, (datetime.now().isoformat(), database.STATUS_TERMINATED, cutoff_date_str))
         conn.commit()
         logger.info(f"Archived {cursor.rowcount} employees terminated on or before {cutoff_date_str}.")
         return cursor.rowcount
 
+def _get_vacation_balances_db(employee_id: Optional[str] = None) -> List[Dict]:
+    """
+    Returns allocated/taken/remaining 'Vacation' days in one grouped query.
+    Days taken are summed in SQL (julianday difference, inclusive) over approved requests.
+    With employee_id, only that employee is returned (any status); otherwise all active,
+    non-archived employees ordered by name.
+    Each row: employee_id, employee_name, total_allocated, days_taken, remaining_balance, is_excluded.
+    """
+    if employee_id is not None:
+        where_clause = f"UPPER(e.{database.COL_EMP_ID}) = UPPER(?)"
+        params: Tuple = (employee_id,)
+    else:
+        where_clause = f"""e.{database.COL_EMP_STATUS} = ?
+          AND (e.{database.COL_EMP_IS_ARCHIVED} = 0 OR e.{database.COL_EMP_IS_ARCHIVED} IS NULL)"""
+        params = (database.STATUS_ACTIVE,)
+    query = f"""
+        SELECT e.{database.COL_EMP_ID} AS employee_id,
+               e.{database.COL_EMP_NAME} AS employee_name,
+               COALESCE(e.{database.COL_EMP_VACATION_DAYS}, 0) AS total_allocated,
+               COALESCE(e.{database.COL_EMP_EXCLUDE_VACATION_POLICY}, 0) AS is_excluded,
+               COALESCE(SUM(CAST(ROUND(julianday(lr.{database.COL_LR_END_DATE}) - julianday(lr.{database.COL_LR_START_DATE})) AS INTEGER) + 1), 0) AS days_taken
+        FROM {database.TABLE_EMPLOYEES} e
+        LEFT JOIN {database.TABLE_LEAVE_REQUESTS} lr
+               ON lr.{database.COL_LR_EMP_ID} = e.{database.COL_EMP_ID}
+              AND lr.{database.COL_LR_STATUS} = 'Approved'
+              AND LOWER(lr.{database.COL_LR_LEAVE_TYPE}) = 'vacation'
+        WHERE {where_clause}
+        GROUP BY e.{database.COL_EMP_ID}
+        ORDER BY e.{database.COL_EMP_NAME}
+    """
+    try:
+        with database.get_connection() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            balances = []
+            for row in cursor.fetchall():
+                balance = dict(row)
+                balance["is_excluded"] = balance["is_excluded"] == 1
+                balance["remaining_balance"] = balance["total_allocated"] - balance["days_taken"]
+                balances.append(balance)
+            return balances
+    except sqlite3.Error as e:
+        logger.error(f"Database error calculating vacation balances: {e}")
+        raise DatabaseOperationError(f"Failed to calculate vacation balances: {e}")
+
 def get_leave_balance_report_db() -> List[Dict]:
     """
     Generates a leave balance report for all active employees.
     Focuses on 'Vacation' leave type and uses allocated days from employee record.
     """
     report_data = []
-    active_employees = get_all_employees_db(include_archived=False, status_filter=database.STATUS_ACTIVE)
-
-    for emp in active_employees:
-        emp_id = emp[database.COL_EMP_ID]
-        emp_name = emp[database.COL_EMP_NAME]
-        allocated_days = emp.get(database.COL_EMP_VACATION_DAYS, 0)
-        is_excluded = emp.get(database.COL_EMP_EXCLUDE_VACATION_POLICY, 0) == 1
-
-        days_taken = 0
-        remaining_balance: Union[int, str] = 0 # Can be int or "N/A"
-
-        if is_excluded:
-            allocated_days_display = "N/A (Excluded)"
-            days_taken_display = "N/A"
-            remaining_balance_display = "N/A"
+    for balance in _get_vacation_balances_db():
+        if balance["is_excluded"]:
+            allocated_days_display: Union[int, str] = "N/A (Excluded)"
+            days_taken_display: Union[int, str] = "N/A"
+            remaining_balance_display: Union[int, str] = "N/A"
         else:
-            allocated_days_display = allocated_days
-            # Calculate days taken for 'Vacation'
-            query = f"""
-                SELECT {database.COL_LR_START_DATE}, {database.COL_LR_END_DATE}
-                FROM {database.TABLE_LEAVE_REQUESTS}
-                WHERE {database.COL_LR_EMP_ID} = ? AND {database.COL_LR_STATUS} = 'Approved' AND LOWER({database.COL_LR_LEAVE_TYPE}) = LOWER('Vacation')
-            """
-            with sqlite3.connect(config.DATABASE_NAME) as conn:
-                cursor = conn.cursor()
-                cursor.execute(query, (emp_id,))
-                for row in cursor.fetchall():
-                    start_date = dt_date.fromisoformat(row[0])
-                    end_date = dt_date.fromisoformat(row[1])
-                    days_taken += (end_date - start_date).days + 1 # Inclusive
-            remaining_balance = allocated_days - days_taken
-            days_taken_display = days_taken
-            remaining_balance_display = remaining_balance
+            allocated_days_display = balance["total_allocated"]
+            days_taken_display = balance["days_taken"]
+            remaining_balance_display = balance["remaining_balance"]
 
         report_data.append({
-            database.COL_LR_EMP_ID: emp_id,
-            "employee_name": emp_name,
+            database.COL_LR_EMP_ID: balance["employee_id"],
+            "employee_name": balance["employee_name"],
             database.COL_LR_LEAVE_TYPE: "Annual Vacation", # Assuming this report is for general vacation
             "total_allocated": allocated_days_display,
             "days_taken": days_taken_display,
@@ -1418,42 +1804,20 @@ def get_attendance_summary_report_db(date_from: str, date_to: str) -> List[Dict]
     Includes employee ID, name, total hours worked, and days present.
     """
     summary_report: List[Dict[str, Any]] = []
-    # Assuming list_all_employees and STATUS_ACTIVE are available
-    active_employees = [emp for emp in get_all_employees_db() if emp.get(database.COL_EMP_STATUS) == database.STATUS_ACTIVE] # Corrected function call
-    
-    # Fetch config values once
-    # Assuming config.DEFAULT_STANDARD_WORK_HOURS_PER_DAY and config.DEFAULT_WORK_DAYS_INDICES are available
-    standard_hours_per_day = config.DEFAULT_STANDARD_WORK_HOURS_PER_DAY
-    work_day_indices = config.DEFAULT_WORK_DAYS_INDICES
+    active_employees = get_all_employees_db(include_archived=False, status_filter=database.STATUS_ACTIVE)
+    attendance_by_emp = get_attendance_summaries_for_period_db(
+        date_from, date_to, config.STANDARD_WORK_HOURS_PER_DAY, config.DEFAULT_WORK_DAYS_INDICES
+    )
 
     for emp in active_employees:
         emp_id = emp[database.COL_EMP_ID]
-        emp_name = emp[database.COL_EMP_NAME]
-        
-        try:
-            # Assuming calculate_attendance_and_overtime_for_period is available
-            attendance_metrics = calculate_attendance_and_overtime_for_period(
-                employee_id=emp_id,
-                period_start_str=date_from,
-                period_end_str=date_to,
-                standard_hours_per_day=standard_hours_per_day,
-                work_day_indices=work_day_indices
-            )
-            
-            summary_report.append({
-                database.COL_ATT_EMP_ID: emp_id, # Use database. directly
-                "employee_name": emp_name,
-                "total_hours_worked": attendance_metrics["total_hours_worked_on_workdays"],
-                "days_present": attendance_metrics["actual_workdays_count"]
-            })
-        except Exception as e:
-            logger.error(f"Error calculating attendance summary for employee {emp_id} ({emp_name}): {e}")
-            summary_report.append({
-                database.COL_ATT_EMP_ID: emp_id, # Use database. directly
-                "employee_name": emp_name,
-                "total_hours_worked": "Error",
-                "days_present": "Error"
-            })
+        attendance_metrics = attendance_by_emp.get(emp_id)
+        summary_report.append({
+            database.COL_ATT_EMP_ID: emp_id, # Use database. directly
+            "employee_name": emp[database.COL_EMP_NAME],
+            "total_hours_worked": attendance_metrics["total_hours_worked_on_workdays"] if attendance_metrics else 0.0,
+            "days_present": attendance_metrics["actual_workdays_count"] if attendance_metrics else 0
+        })
             
     return summary_report
 # --- Interview Scheduling Backend Functions ---
@@ -1484,7 +1848,7 @@ def get_interviews_db(start_date_str: Optional[str] = None, end_date_str: Option
         query += " WHERE " + " AND ".join(filters)
     query += f" ORDER BY i.{database.COL_INT_DATE} ASC, i.{database.COL_INT_TIME} ASC"
 
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query, tuple(params))
@@ -1504,7 +1868,7 @@ def get_employee_contract_type_counts_db() -> Dict[str, int]:
         ORDER BY employee_count DESC
     """
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, (database.STATUS_ACTIVE, "Active")) # Filter for active employees and active contracts
             for row in cursor.fetchall():
@@ -1527,7 +1891,7 @@ def get_new_employees_this_month_count_db() -> int:
     last_day_of_month = (first_day_of_next_month - timedelta(days=1)).isoformat()
 
     query = f"SELECT COUNT({database.COL_EMP_ID}) FROM {database.TABLE_EMPLOYEES} WHERE {database.COL_EMP_STATUS} = ? AND {database.COL_EMP_START_DATE} BETWEEN ? AND ?"
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute(query, (database.STATUS_ACTIVE, first_day_of_month, last_day_of_month))
         count = cursor.fetchone()[0] or 0
@@ -1542,7 +1906,7 @@ def get_user_by_employee_id_db(employee_id: str) -> Optional[Dict]:
         FROM {database.TABLE_USERS}
         WHERE {database.COL_USER_LINKED_EMP_ID} = ?
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query, (employee_id,))
@@ -1556,7 +1920,7 @@ def get_user_by_id_db(user_id: int) -> Optional[Dict]:
         FROM {database.TABLE_USERS}
         WHERE {database.COL_USER_ID} = ?
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query, (user_id,)) # Fetch the result into the 'row' variable
@@ -1574,7 +1938,7 @@ def get_employee_action_log_db(employee_id: str) -> List[Dict]:
         WHERE eal.{database.COL_EAL_EMP_ID} = ?
         ORDER BY eal.{database.COL_EAL_TIMESTAMP} DESC
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
 
 
@@ -1612,7 +1976,7 @@ def add_task_db(assigned_to_emp_id: str, assigned_by_user_id: int, monitor_user_
     params = (assigned_to_emp_id, assigned_by_user_id, monitor_user_id, title, description,
               creation_date_str, due_date_str, status, priority, notes)
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, params)
             conn.commit()
@@ -1663,7 +2027,7 @@ def get_tasks_db(assignee_emp_id: Optional[str] = None,
     
     base_query += f" ORDER BY t.{database.COL_TASK_DUE_DATE} ASC, t.{database.COL_TASK_CREATION_DATE} DESC"
 
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(base_query, tuple(params))
@@ -1689,7 +2053,7 @@ def update_task_db(task_id: int, updates: Dict[str, Any]) -> bool:
     params = list(updates.values()) + [task_id]
     query = f"UPDATE {TABLE_EMPLOYEE_TASKS} SET {set_clause} WHERE {COL_TASK_ID} = ?"
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, tuple(params))
             if cursor.rowcount == 0:
@@ -1704,7 +2068,7 @@ def update_task_db(task_id: int, updates: Dict[str, Any]) -> bool:
 def delete_task_db(task_id: int) -> bool:
     """Deletes a task from the database."""
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(f"DELETE FROM {TABLE_EMPLOYEE_TASKS} WHERE {COL_TASK_ID} = ?", (task_id,))
             if cursor.rowcount == 0:
@@ -1733,7 +2097,7 @@ def get_employee_attendance_status(employee_id: str) -> Dict[str, Union[bool, Op
         ORDER BY {database.COL_ATT_CLOCK_IN} DESC
         LIMIT 1
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute(query, (employee_id,))
         row = cursor.fetchone()
@@ -1741,31 +2105,16 @@ def get_employee_attendance_status(employee_id: str) -> Dict[str, Union[bool, Op
 
 def get_employee_vacation_balance_db(employee_id: str) -> int:
     """Calculates the remaining vacation balance for an employee."""
-    emp = _find_employee_by_id(employee_id)
-    if not emp:
+    balances = _get_vacation_balances_db(employee_id)
+    if not balances:
         raise EmployeeNotFoundError(f"Employee {employee_id} not found.")
      # Check if employee is excluded from vacation policy
-    if emp.get("exclude_vacation_policy", 0) == 1:
+    if balances[0]["is_excluded"]:
         logger.info(f"Employee {employee_id} is excluded from vacation policy. Balance is N/A.")
         return "N/A (Excluded)" # Indicate exclusion instead of a number
     
-    total_allocated_days = emp.get(database.COL_EMP_VACATION_DAYS, 0)
     vacation_accumulation_policy = database.get_app_setting_db(database.SETTING_VACATION_ACCUMULATION_POLICY, "None") # Corrected
-    
-    query = f"""
-        SELECT {database.COL_LR_START_DATE}, {database.COL_LR_END_DATE}
-        FROM {database.TABLE_LEAVE_REQUESTS}
-        WHERE {database.COL_LR_EMP_ID} = ? AND {database.COL_LR_STATUS} = 'Approved' AND LOWER({database.COL_LR_LEAVE_TYPE}) = LOWER('Vacation')
-    """
-    days_taken = 0
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
-        cursor = conn.cursor()
-        cursor.execute(query, (employee_id,))
-        for row in cursor.fetchall():
-            start_date = dt_date.fromisoformat(row[0])
-            end_date = dt_date.fromisoformat(row[1])
-            days_taken += (end_date - start_date).days + 1
-    remaining_balance = total_allocated_days - days_taken
+    remaining_balance = balances[0]["remaining_balance"]
 
     # Apply accumulation policy if applicable (simplified)
     if vacation_accumulation_policy.lower() == "none":
@@ -1780,10 +2129,32 @@ def get_employee_vacation_balance_db(employee_id: str) -> int:
         except (IndexError, ValueError): pass # Invalid policy format
     return remaining_balance
 
+SQLITE_IN_CHUNK_SIZE = 900 # Bound parameters per "IN (...)" query, under SQLite's default limit of 999
+
+def get_employee_names_and_positions_db(emp_ids: List[str]) -> Dict[str, Tuple[str, str]]:
+    """{employee_id: (name, position)} for the given IDs (e.g. for batch payslips), looked up SQLITE_IN_CHUNK_SIZE IDs per query."""
+    wanted_ids = list(dict.fromkeys(emp_ids))
+    employees = {}
+    try:
+        with database.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            for start in range(0, len(wanted_ids), SQLITE_IN_CHUNK_SIZE):
+                chunk = wanted_ids[start:start + SQLITE_IN_CHUNK_SIZE]
+                cursor.execute(f"""
+                    SELECT {database.COL_EMP_ID}, {database.COL_EMP_NAME}, {database.COL_EMP_POSITION} FROM {database.TABLE_EMPLOYEES}
+                    WHERE {database.COL_EMP_ID} IN ({", ".join("?" * len(chunk))})
+                """, chunk)
+                employees.update((emp_id, (name or emp_id, position or "N/A")) for emp_id, name, position in cursor)
+        return employees
+    except sqlite3.Error as e:
+        logger.error(f"Database error loading employee names: {e}")
+        raise DatabaseOperationError(f"Failed to load employee details: {e}")
+
 def _find_employee_by_id(emp_id: str) -> Optional[Dict[str, Union[str, float]]]:
     """Helper function to find an employee by their ID."""
     row_dict = None
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row # Access columns by name
         cursor = conn.cursor()
         # Join with departments table to get department name
@@ -1826,12 +2197,16 @@ def generate_hr_alerts_report(period_start_str: str, period_end_str: str,
     except ValueError:
         raise InvalidInputError("Invalid date or time format for alert generation parameters.")
 
+    attendance_stats = _scan_attendance_for_alerts({emp[database.COL_EMP_ID] for emp in active_employees},
+                                                   period_start_date, period_end_date,
+                                                   standard_start_time, expected_work_days)
+
     for emp in active_employees:
         emp_id = emp[database.COL_EMP_ID]
         emp_name = emp[database.COL_EMP_NAME]
+        potential_absences, tardy_instances = attendance_stats[emp_id]
 
         # Check for absences
-        potential_absences = _get_potential_absences_for_employee(emp_id, period_start_date, period_end_date, expected_work_days)
         if len(potential_absences) >= absence_threshold:
             alerts.append({
                 'employee_id': emp_id, 'employee_name': emp_name,
@@ -1841,10 +2216,9 @@ def generate_hr_alerts_report(period_start_str: str, period_end_str: str,
             })
 
         # Check for tardiness
-        tardy_instances = _get_tardy_instances_for_employee(emp_id, period_start_date, period_end_date, standard_start_time, expected_work_days)
         if len(tardy_instances) >= tardy_threshold:
             # Format tardy details for display (e.g., just the time or full datetime)
-            tardy_details_display = [datetime.strptime(ts, '%Y-%m-%d %H:%M:%S').strftime('%Y-%m-%d %H:%M') for ts in tardy_instances]
+            tardy_details_display = [ts.strftime('%Y-%m-%d %H:%M') for ts in tardy_instances]
             alerts.append({
                 'employee_id': emp_id, 'employee_name': emp_name,
                 'alert_type': database.ALERT_TYPE_TARDINESS,
@@ -1868,66 +2242,70 @@ def generate_hr_alerts_report(period_start_str: str, period_end_str: str,
     alerts.sort(key=lambda x: (x['employee_name'], x['alert_type']))
     return alerts
 
-def _get_potential_absences_for_employee(employee_id: str, period_start_date: dt_date, period_end_date: dt_date,
-                                         expected_work_days: List[int]) -> List[str]:
-    """
-    Identifies potential absence dates for a single employee.
-    An absence is a day within the expected_work_days for which no attendance log exists.
+def _scan_attendance_for_alerts(employee_ids: set, period_start_date: dt_date, period_end_date: dt_date,
+                                standard_start_time: datetime.time, expected_work_days: List[int]) -> Dict[str, Tuple[List[str], List[datetime]]]:
     """
-    absent_dates = []
-    try:
-        # Get all unique dates the employee logged attendance within the period
-        query = f"""
-            SELECT DISTINCT {database.COL_ATT_LOG_DATE}
-            FROM {database.TABLE_ATTENDANCE_LOG}
-            WHERE {database.COL_ATT_EMP_ID} = ? AND {database.COL_ATT_LOG_DATE} BETWEEN ? AND ?
-        """
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
-            cursor = conn.cursor()
-            cursor.execute(query, (employee_id, period_start_date.isoformat(), period_end_date.isoformat()))
-            logged_dates_strs = {row[0] for row in cursor.fetchall()}
+    Computes potential absences and tardy instances for many employees in one pass over attendance_daily.
 
-        current_date = period_start_date
-        while current_date <= period_end_date:
-            if current_date.weekday() in expected_work_days and not is_public_holiday(current_date): # Check if it's an expected workday AND not a public holiday
-                if current_date.isoformat() not in logged_dates_strs:
-                    absent_dates.append(current_date.isoformat())
-            current_date += timedelta(days=1)
-    except sqlite3.Error as e:
-        logger.error(f"DB error checking absences for {employee_id}: {e}")
-        # Decide if to raise or return empty, for batch processing, returning empty might be better
-    return absent_dates
+    The workday/holiday calendar for the period is built once. Rollup rows are then streamed ordered by
+    employee, so work is linear in the number of employee-days plus employees × expected workdays.
+    An absence is an expected workday with no attendance log; tardiness is a first clock-in of the
+    day after standard_start_time on an expected workday.
 
-def _get_tardy_instances_for_employee(employee_id: str, period_start_date: dt_date, period_end_date: dt_date,
-                                      standard_start_time: datetime.time, expected_work_days: List[int]) -> List[str]:
+    Returns:
+        Dict[str, Tuple[List[str], List[datetime]]]: employee_id -> (absent dates as YYYY-MM-DD,
+        tardy clock-in datetimes). Every id in employee_ids is present.
     """
-    Identifies tardy instances for a single employee on their expected work days.
-    Tardiness is clocking in after the standard_start_time on an expected_work_day.
-    Returns a list of clock-in datetime strings for tardy instances.
+    expected_workdays = [] # Ordered YYYY-MM-DD strings
+    current_date = period_start_date
+    while current_date <= period_end_date:
+        if current_date.weekday() in expected_work_days and not is_public_holiday(current_date):
+            expected_workdays.append(current_date.isoformat())
+        current_date += timedelta(days=1)
+    expected_workday_set = frozenset(expected_workdays)
+
+    # Employees with no logs in the period are absent on every expected workday
+    results: Dict[str, Tuple[List[str], List[datetime]]] = {emp_id: (list(expected_workdays), []) for emp_id in employee_ids}
+    query = f"""
+        SELECT {database.COL_AD_EMP_ID}, {database.COL_AD_WORK_DATE}, {database.COL_AD_FIRST_IN}
+        FROM {database.TABLE_ATTENDANCE_DAILY}
+        WHERE {database.COL_AD_WORK_DATE} BETWEEN ? AND ?
+        ORDER BY {database.COL_AD_EMP_ID}, {database.COL_AD_WORK_DATE}
     """
-    tardy_instances = []
+
+    def _finish_employee(emp_id: str, emp_dates: set, emp_tardies: List[datetime]):
+        results[emp_id] = ([d for d in expected_workdays if d not in emp_dates], emp_tardies)
+
     try:
-        query = f"""
-            SELECT {database.COL_ATT_CLOCK_IN}, {database.COL_ATT_LOG_DATE}
-            FROM {database.TABLE_ATTENDANCE_LOG}
-            WHERE {database.COL_ATT_EMP_ID} = ? AND {database.COL_ATT_LOG_DATE} BETWEEN ? AND ?
-              AND {database.COL_ATT_CLOCK_IN} IS NOT NULL
-        """
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
-            cursor = conn.cursor()
-            cursor.execute(query, (employee_id, period_start_date.isoformat(), period_end_date.isoformat()))
-            logs = cursor.fetchall()
-
-        for clock_in_str, log_date_str in logs:
-            log_date_obj = dt_date.fromisoformat(log_date_str) 
-            if log_date_obj.weekday() in expected_work_days and not is_public_holiday(log_date_obj): # Only check tardiness on expected workdayss
-                clock_in_datetime_obj = datetime.strptime(clock_in_str, '%Y-%m-%d %H:%M:%S')
-                clock_in_time_obj = clock_in_datetime_obj.time()
-                if clock_in_time_obj > standard_start_time:
-                    tardy_instances.append(clock_in_str)
-    except (sqlite3.Error, ValueError) as e: # ValueError for strptime
-        logger.error(f"Error checking tardiness for {employee_id}: {e}")
-    return tardy_instances
+        with database.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, (period_start_date.isoformat(), period_end_date.isoformat()))
+            current_emp_id = None
+            emp_dates: set = set()
+            emp_tardies: List[datetime] = []
+            for emp_id, log_date_str, clock_in_str in cursor: # Streamed, not fetchall()
+                if emp_id != current_emp_id:
+                    if current_emp_id is not None:
+                        _finish_employee(current_emp_id, emp_dates, emp_tardies)
+                    current_emp_id = emp_id if emp_id in employee_ids else None
+                    emp_dates, emp_tardies = set(), []
+                if current_emp_id is None: # Not an employee we are reporting on
+                    continue
+                emp_dates.add(log_date_str)
+                if clock_in_str and log_date_str in expected_workday_set:
+                    try:
+                        clock_in_dt = datetime.fromisoformat(clock_in_str)
+                    except ValueError as e:
+                        logger.error(f"Error checking tardiness for {emp_id}: {e}")
+                        continue
+                    if clock_in_dt.time() > standard_start_time:
+                        emp_tardies.append(clock_in_dt)
+            if current_emp_id is not None:
+                _finish_employee(current_emp_id, emp_dates, emp_tardies)
+    except sqlite3.Error as e:
+        logger.error(f"DB error scanning attendance for alerts: {e}")
+        raise DatabaseOperationError(f"Failed to scan attendance for alerts: {e}")
+    return results
 
 def get_pending_leave_requests_db(employee_id: Optional[str] = None, period_start_str: Optional[str] = None, period_end_str: Optional[str] = None) -> List[Dict]:
     """Fetches leave requests with 'Pending Approval' or 'Pending HR Approval' status, optionally filtered by employee_id and request_date. Includes assigned approver's username."""
@@ -1959,7 +2337,7 @@ def get_pending_leave_requests_db(employee_id: Optional[str] = None, period_star
     
     query += f" ORDER BY lr.{database.COL_LR_REQUEST_DATE} DESC"
     
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         try:
@@ -1979,93 +2357,71 @@ def get_pending_leave_approvals_for_user_db(approver_user_id: int) -> List[Dict]
         WHERE lr.{database.COL_LR_ASSIGNED_APPROVER_USER_ID} = ? AND lr.{database.COL_LR_STATUS} = 'Pending Approval'
         ORDER BY lr.{database.COL_LR_REQUEST_DATE} ASC
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query, (approver_user_id,))
         return [dict(row) for row in cursor.fetchall()]
 
 # --- Dashboard 2.0 Backend Functions ---
+def get_department_attendance_rates_db(period_start_str: str, period_end_str: str, work_day_indices: List[int]) -> Dict[str, Dict[str, float]]:
+    """
+    Calculates absenteeism and adherence rates per department for a period in one grouped query.
+    Every active employee is expected on the same number of workdays, so that count is computed once.
+
+    Returns:
+        Dict[str, Dict[str, float]]: {department_name: {"absenteeism_rate": %, "adherence_rate": %}}.
+        Departments without active employees get 0.0 for both.
+    """
+    expected_days_per_employee = get_expected_workdays_in_period(dt_date.fromisoformat(period_start_str),
+                                                                 dt_date.fromisoformat(period_end_str), work_day_indices)
+    query = f"""
+        SELECT d.{database.COL_DEPT_NAME},
+               COUNT(e.{database.COL_EMP_ID}) AS active_employees,
+               COALESCE(SUM(att.attended_days), 0) AS attended_days
+        FROM {database.TABLE_DEPARTMENTS} d
+        LEFT JOIN {database.TABLE_EMPLOYEES} e
+               ON e.{database.COL_EMP_DEPARTMENT_ID} = d.{database.COL_DEPT_ID}
+              AND e.{database.COL_EMP_STATUS} = ?
+              AND (e.{database.COL_EMP_IS_ARCHIVED} = 0 OR e.{database.COL_EMP_IS_ARCHIVED} IS NULL)
+        LEFT JOIN (
+            SELECT {database.COL_AD_EMP_ID}, COUNT(*) AS attended_days
+            FROM {database.TABLE_ATTENDANCE_DAILY}
+            WHERE {database.COL_AD_WORK_DATE} BETWEEN ? AND ?
+            GROUP BY {database.COL_AD_EMP_ID}
+        ) att ON att.{database.COL_AD_EMP_ID} = e.{database.COL_EMP_ID}
+        GROUP BY d.{database.COL_DEPT_ID}
+        ORDER BY d.{database.COL_DEPT_NAME}
+    """
+    rates = {}
+    try:
+        with database.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, (database.STATUS_ACTIVE, period_start_str, period_end_str))
+            for dept_name, active_employees, attended_days in cursor.fetchall():
+                total_expected_workdays_dept = active_employees * expected_days_per_employee
+                if total_expected_workdays_dept > 0:
+                    absent_days = total_expected_workdays_dept - attended_days
+                    rates[dept_name] = {
+                        "absenteeism_rate": round((absent_days / total_expected_workdays_dept) * 100, 2),
+                        "adherence_rate": round((attended_days / total_expected_workdays_dept) * 100, 2),
+                    }
+                else:
+                    rates[dept_name] = {"absenteeism_rate": 0.0, "adherence_rate": 0.0}
+    except sqlite3.Error as e:
+        logger.error(f"Database error calculating department attendance rates: {e}")
+        raise DatabaseOperationError(f"Failed to calculate department attendance rates: {e}")
+    return rates
+
 def get_absenteeism_rate_by_department_db(period_start_str: str, period_end_str: str, work_day_indices: List[int]) -> Dict[str, float]:
     """Calculates absenteeism rate per department for a given period."""
-    absenteeism_rates = {}
-    departments = list_departments_db()
-    period_start_date = dt_date.fromisoformat(period_start_str)
-    period_end_date = dt_date.fromisoformat(period_end_str)
-
-    for dept in departments:
-        dept_id = dept[database.COL_DEPT_ID]
-        dept_name = dept[database.COL_DEPT_NAME]
-        active_employees_in_dept = [emp for emp in get_all_employees_db() if emp.get(COL_EMP_DEPARTMENT_ID) == dept_id and emp.get(COL_EMP_STATUS) == STATUS_ACTIVE]
-        
-        total_expected_workdays_dept = 0
-        total_actual_attended_days_dept = 0
-
-        if not active_employees_in_dept:
-            absenteeism_rates[dept_name] = 0.0 # Or handle as N/A
-            continue
+    rates = get_department_attendance_rates_db(period_start_str, period_end_str, work_day_indices)
+    return {dept_name: dept_rates["absenteeism_rate"] for dept_name, dept_rates in rates.items()}
 
-        for emp in active_employees_in_dept:
-            emp_id = emp[database.COL_EMP_ID]
-            expected_days_emp = get_expected_workdays_in_period(period_start_date, period_end_date, work_day_indices)
-            total_expected_workdays_dept += expected_days_emp
-            
-            # Count actual attended days (unique log_date)
-            query = f"""
-                SELECT COUNT(DISTINCT {database.COL_ATT_LOG_DATE})
-                FROM {database.TABLE_ATTENDANCE_LOG}
-                WHERE {database.COL_ATT_EMP_ID} = ? AND {database.COL_ATT_LOG_DATE} BETWEEN ? AND ?
-            """
-            with sqlite3.connect(config.DATABASE_NAME) as conn:
-                cursor = conn.cursor()
-                cursor.execute(query, (emp_id, period_start_str, period_end_str))
-                attended_days_emp = cursor.fetchone()[0] or 0
-            total_actual_attended_days_dept += attended_days_emp
-        
-        if total_expected_workdays_dept > 0:
-            absent_days = total_expected_workdays_dept - total_actual_attended_days_dept
-            rate = (absent_days / total_expected_workdays_dept) * 100
-            absenteeism_rates[dept_name] = round(rate, 2)
-        else:
-            absenteeism_rates[dept_name] = 0.0
-    return absenteeism_rates
 def get_department_attendance_adherence_db(period_start_str: str, period_end_str: str, work_day_indices: List[int]) -> Dict[str, float]:
-    """Calculates attendance adherence rate per department.""" # Unindented
-    adherence_rates = {}
-    departments = list_departments_db()
-    period_start_date = dt_date.fromisoformat(period_start_str)
-    period_end_date = dt_date.fromisoformat(period_end_str)
-
-    for dept in departments:
-        dept_id = dept[database.COL_DEPT_ID]
-        dept_name = dept[database.COL_DEPT_NAME]
-        active_employees_in_dept = [emp for emp in get_all_employees_db() if emp.get(COL_EMP_DEPARTMENT_ID) == dept_id and emp.get(COL_EMP_STATUS) == STATUS_ACTIVE]
-        
-        total_expected_workdays_dept = 0
-        total_actual_attended_days_dept = 0
-
-        if not active_employees_in_dept:
-            adherence_rates[dept_name] = 0.0
-            continue
-
-        for emp in active_employees_in_dept:
-            emp_id = emp[database.COL_EMP_ID]
-            expected_days_emp = get_expected_workdays_in_period(period_start_date, period_end_date, work_day_indices)
-            total_expected_workdays_dept += expected_days_emp
-            
-            query = f"SELECT COUNT(DISTINCT {database.COL_ATT_LOG_DATE}) FROM {database.TABLE_ATTENDANCE_LOG} WHERE {database.COL_ATT_EMP_ID} = ? AND {database.COL_ATT_LOG_DATE} BETWEEN ? AND ?"
-            with sqlite3.connect(config.DATABASE_NAME) as conn:
-                cursor = conn.cursor()
-                cursor.execute(query, (emp_id, period_start_str, period_end_str))
-                attended_days_emp = cursor.fetchone()[0] or 0
-            total_actual_attended_days_dept += attended_days_emp
-            
-        if total_expected_workdays_dept > 0:
-            rate = (total_actual_attended_days_dept / total_expected_workdays_dept) * 100
-            adherence_rates[dept_name] = round(rate, 2)
-        else:
-            adherence_rates[dept_name] = 0.0
-    return adherence_rates
+    """Calculates attendance adherence rate per department."""
+    rates = get_department_attendance_rates_db(period_start_str, period_end_str, work_day_indices)
+    return {dept_name: dept_rates["adherence_rate"] for dept_name, dept_rates in rates.items()}
 
 def get_leave_request_status_summary_db(period_start_str: Optional[str] = None, period_end_str: Optional[str] = None) -> Dict[str, int]:
     """Gets counts of leave requests by status for a given period (based on request_date)."""
@@ -2077,7 +2433,7 @@ def get_leave_request_status_summary_db(period_start_str: Optional[str] = None,
     query += f" GROUP BY {database.COL_LR_STATUS}"
     
     summary = {}
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute(query, tuple(params))
         for row in cursor.fetchall():
@@ -2096,7 +2452,7 @@ def get_payslips_generated_by_department_db(period_start_str: str, period_end_st
 
     """
     summary = {}
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query, (period_start_str, period_end_str))
@@ -2133,7 +2489,7 @@ def add_salary_advance_db(employee_id: str, advance_date_str: str, amount: float
         ) VALUES (?, ?, ?, ?, ?, 0, 'Active')
     """
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, (employee_id, advance_date_str, amount, repayment_per_period, repayment_start_date_str))
             conn.commit()
@@ -2154,7 +2510,7 @@ def get_salary_advances_for_employee_db(employee_id: str) -> List[Dict]:
         ORDER BY {database.COL_ADV_DATE} DESC
     """
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             cursor.execute(query, (employee_id,))
@@ -2180,7 +2536,7 @@ def add_employee_reward_db(employee_id: str, reward_type: str, amount: float, ef
         VALUES (?, ?, ?, 0, ?, ?)
     """ # is_recurring = 0 for non-recurring, end_date can be same as effective_date
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, (employee_id, reward_type, amount, effective_date_str, effective_date_str))
             conn.commit()
@@ -2207,7 +2563,7 @@ def add_employee_penalty_db(employee_id: str, penalty_type: str, amount: float,
         VALUES (?, ?, ?, 0, ?, ?)
     """ # is_recurring = 0, end_date can be same as effective_date
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, (employee_id, penalty_type, amount, effective_date_str, effective_date_str))
             conn.commit()
@@ -2228,7 +2584,7 @@ def get_non_recurring_allowances_for_employee_db(employee_id: str) -> List[Dict]
         ORDER BY {database.COL_ALLW_EFF_DATE} DESC
     """
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             cursor.execute(query, (employee_id,))
@@ -2247,7 +2603,7 @@ def get_non_recurring_deductions_for_employee_db(employee_id: str) -> List[Dict]
         WHERE {database.COL_DED_EMP_ID} = ? AND {database.COL_DED_IS_RECURRING} = 0
         ORDER BY {database.COL_DED_EFF_DATE} DESC
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query, (employee_id,))
@@ -2262,7 +2618,7 @@ def get_active_employee_allowances_db(employee_id: str, pay_period_end_date_str:
           AND {database.COL_ALLW_EFF_DATE} <= ?
           AND ({database.COL_ALLW_END_DATE} IS NULL OR {database.COL_ALLW_END_DATE} >= ?)
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query, (employee_id, pay_period_end_date_str, pay_period_end_date_str))
@@ -2277,7 +2633,7 @@ def get_active_employee_deductions_db(employee_id: str, pay_period_end_date_str:
           AND {database.COL_DED_EFF_DATE} <= ?
           AND ({database.COL_DED_END_DATE} IS NULL OR {database.COL_DED_END_DATE} >= ?)
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query, (employee_id, pay_period_end_date_str, pay_period_end_date_str))
@@ -2291,7 +2647,7 @@ def get_non_recurring_allowances_for_period_db(employee_id: str, period_start_st
           AND {database.COL_ALLW_IS_RECURRING} = 0
           AND {database.COL_ALLW_EFF_DATE} BETWEEN ? AND ?
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query, (employee_id, period_start_str, period_end_str))
@@ -2305,7 +2661,7 @@ def get_non_recurring_deductions_for_period_db(employee_id: str, period_start_st
           AND {database.COL_DED_IS_RECURRING} = 0
           AND {database.COL_DED_EFF_DATE} BETWEEN ? AND ?
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query, (employee_id, period_start_str, period_end_str))
@@ -2321,7 +2677,7 @@ def get_active_salary_advance_for_repayment_db(employee_id: str, pay_period_end_
         ORDER BY {database.COL_ADV_DATE} ASC
         LIMIT 1
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query, (employee_id, pay_period_end_date_str))
@@ -2344,7 +2700,7 @@ def update_leave_request_approval_status_db(request_id: int, new_status: str, ap
     """
     processed_date_str = datetime.now().isoformat()
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             # First, check if the request exists and is pending
             cursor.execute(f"SELECT {database.COL_LR_STATUS} FROM {database.TABLE_LEAVE_REQUESTS} WHERE {database.COL_LR_ID} = ?", (request_id,))
@@ -2379,7 +2735,7 @@ def get_contract_details_by_id_db(contract_id: int) -> Optional[Dict]:
         LEFT JOIN {database.TABLE_USERS} u ON c.{database.COL_CONTRACT_ASSIGNED_APPROVER_USER_ID} = u.{database.COL_USER_ID}
         WHERE c.{database.COL_CONTRACT_ID} = ?
     """
-    with sqlite3.connect(cosnfig.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query, (contract_id,))
@@ -2425,7 +2781,7 @@ def add_contract_record_db(contract_data: Dict) -> int:
         now_iso, now_iso, 'Pending Approval', assigned_approver_user_id # Initial approval status
     )
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, params)
             conn.commit()
@@ -2478,7 +2834,7 @@ def record_contract_signing_db(doc_id: int, signer_emp_id: Optional[str], signer
     """
     params = (doc_id, signer_emp_id, signer_user_id, signature_image_path, signing_timestamp, signing_notes)
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, params)
             conn.commit()
@@ -2490,13 +2846,13 @@ def record_contract_signing_db(doc_id: int, signer_emp_id: Optional[str], signer
 def _get_employee_open_clock_in(employee_id: str, existing_conn: Optional[sqlite3.Connection] = None) -> Optional[Dict]:
     """Helper to find the most recent open clock-in record for an employee."""
     query = f"""
-        SELECT {database.COL_ATT_LOG_ID}, {database.COL_ATT_CLOCK_IN}
+        SELECT {database.COL_ATT_LOG_ID}, {database.COL_ATT_CLOCK_IN}, {database.COL_ATT_LOG_DATE}
         FROM {database.TABLE_ATTENDANCE_LOG}
         WHERE {database.COL_ATT_EMP_ID} = ? AND {database.COL_ATT_CLOCK_OUT} IS NULL
         ORDER BY {database.COL_ATT_CLOCK_IN} DESC
         LIMIT 1
     """
-    conn_to_use = existing_conn if existing_conn else sqlite3.connect(config.DATABASE_NAME)
+    conn_to_use = existing_conn if existing_conn else database.get_connection()
     try:
         conn_to_use.row_factory = sqlite3.Row
         cursor = conn_to_use.cursor()
@@ -2513,7 +2869,7 @@ def clock_in_employee(employee_id: str, source: str = "Manual: GUI", notes: Opti
     if not employee or employee.get(database.COL_EMP_STATUS) != database.STATUS_ACTIVE:
         raise EmployeeNotFoundError(f"Employee {employee_id} not found or is not active.")
 
-    with sqlite3.connect(config.DATABASE_NAME) as conn: # Use config for DB name
+    with database.get_connection() as conn:
         cursor = conn.cursor()
         if _get_employee_open_clock_in(employee_id, existing_conn=conn): # Pass connection
             raise AlreadyClockedInError(f"Employee {employee_id} is already clocked in.")
@@ -2524,6 +2880,7 @@ def clock_in_employee(employee_id: str, source: str = "Manual: GUI", notes: Opti
         query = f"INSERT INTO {database.TABLE_ATTENDANCE_LOG} ({database.COL_ATT_EMP_ID}, {database.COL_ATT_CLOCK_IN}, {database.COL_ATT_LOG_DATE}, {database.COL_ATT_SOURCE}, {database.COL_ATT_NOTES}) VALUES (?, ?, ?, ?, ?)"
         try:
             cursor.execute(query, (employee_id, now_str, today_str, source, notes))
+            database.refresh_attendance_daily(cursor, [(employee_id, today_str)])
             log_employee_action(employee_id, f"Clocked In ({source})", performed_by_user_id, existing_conn=conn)
             conn.commit()
             logger.info(f"Employee {employee_id} clocked in at {now_str} (Source: {source}).")
@@ -2538,7 +2895,7 @@ def clock_out_employee(employee_id: str, source: str = "Manual: GUI", notes: Opt
     if not employee or employee.get(database.COL_EMP_STATUS) != database.STATUS_ACTIVE:
         raise EmployeeNotFoundError(f"Employee {employee_id} not found or is not active.")
 
-    with sqlite3.connect(config.DATABASE_NAME) as conn: # Use config for DB name
+    with database.get_connection() as conn:
         cursor = conn.cursor()
         open_log = _get_employee_open_clock_in(employee_id, existing_conn=conn) # Pass connection
         if not open_log:
@@ -2553,6 +2910,7 @@ def clock_out_employee(employee_id: str, source: str = "Manual: GUI", notes: Opt
         query = f"UPDATE {database.TABLE_ATTENDANCE_LOG} SET {database.COL_ATT_CLOCK_OUT} = ?, {database.COL_ATT_NOTES} = ? WHERE {database.COL_ATT_LOG_ID} = ?"
         try:
             cursor.execute(query, (now_str, notes, open_log[database.COL_ATT_LOG_ID]))
+            database.refresh_attendance_daily(cursor, [(employee_id, open_log[database.COL_ATT_LOG_DATE])])
             log_employee_action(employee_id, f"Clocked Out ({source})", performed_by_user_id, existing_conn=conn)
             conn.commit()
             logger.info(f"Employee {employee_id} clocked out at {now_str} (Source: {source}).")
@@ -2574,14 +2932,10 @@ def calculate_payroll_for_employee(employee_id: str, pay_period_start_str: str,
     employee = _find_employee_by_id(employee_id)
     if not employee:
         raise EmployeeNotFoundError(f"Employee {employee_id} not found for payroll calculation.")
-    if employee.get(COL_EMP_STATUS) != database.STATUS_ACTIVE:
+    if employee.get(database.COL_EMP_STATUS) != database.STATUS_ACTIVE:
         raise InvalidInputError(f"Employee {employee_id} is not 'Active'. Payroll cannot be calculated.")
 
-    default_deduction_rate = float(database.get_app_setting_db(database.SETTING_DEFAULT_DEDUCTION_RATE, "0.0"))
     default_bonus_rate = float(database.get_app_setting_db(database.SETTING_DEFAULT_BONUS_RATE, "0.0"))
-    monthly_salary = employee.get(COL_EMP_SALARY, 0.0)
-    calculated_basic_salary = monthly_salary
-    overtime_pay = 0.0
 
     try:
         period_start_obj = dt_date.fromisoformat(pay_period_start_str)
@@ -2593,18 +2947,43 @@ def calculate_payroll_for_employee(employee_id: str, pay_period_start_str: str,
 
     attendance_summary = calculate_attendance_and_overtime_for_period(
         employee_id, pay_period_start_str, pay_period_end_str,
-        config.DEFAULT_STANDARD_WORK_HOURS_PER_DAY, config.DEFAULT_WORK_DAYS_INDICES
+        config.STANDARD_WORK_HOURS_PER_DAY, config.DEFAULT_WORK_DAYS_INDICES
     )
+
+    return _build_payslip_data(
+        employee, pay_period_start_str, pay_period_end_str,
+        expected_workdays_in_pay_period, attendance_summary,
+        recurring_allowances=get_active_employee_allowances_db(employee_id, pay_period_end_str),
+        non_recurring_allowances=get_non_recurring_allowances_for_period_db(employee_id, pay_period_start_str, pay_period_end_str),
+        recurring_deductions=get_active_employee_deductions_db(employee_id, pay_period_end_str),
+        non_recurring_deductions=get_non_recurring_deductions_for_period_db(employee_id, pay_period_start_str, pay_period_end_str),
+        active_advance=get_active_salary_advance_for_repayment_db(employee_id, pay_period_end_str),
+        default_bonus_rate=default_bonus_rate
+    )
+
+def _build_payslip_data(
+    employee: Dict, pay_period_start_str: str, pay_period_end_str: str,
+    expected_workdays_in_pay_period: int, attendance_summary: Dict[str, float],
+    recurring_allowances: List[Dict], non_recurring_allowances: List[Dict],
+    recurring_deductions: List[Dict], non_recurring_deductions: List[Dict],
+    active_advance: Optional[Dict], default_bonus_rate: float
+) -> Dict:
+    """
+    Builds the payslip dict for one employee from already-fetched inputs.
+    Shared by calculate_payroll_for_employee and run_payroll_for_period_db.
+    """
+    employee_id = employee[database.COL_EMP_ID]
+    monthly_salary = employee.get(database.COL_EMP_SALARY) or 0.0
+    calculated_basic_salary = monthly_salary
+    overtime_pay = 0.0
     actual_days_worked = attendance_summary["actual_workdays_count"]
 
     if attendance_summary["total_overtime_hours"] > 0 and expected_workdays_in_pay_period > 0:
         approx_daily_rate = monthly_salary / expected_workdays_in_pay_period
-        approx_hourly_rate = approx_daily_rate / config.DEFAULT_STANDARD_WORK_HOURS_PER_DAY
+        approx_hourly_rate = approx_daily_rate / config.STANDARD_WORK_HOURS_PER_DAY
         overtime_pay = attendance_summary["total_overtime_hours"] * approx_hourly_rate * config.OVERTIME_RATE_MULTIPLIER
         overtime_pay = round(overtime_pay, 2)
 
-    recurring_allowances = get_active_employee_allowances_db(employee_id, pay_period_end_str)
-    non_recurring_allowances = get_non_recurring_allowances_for_period_db(employee_id, pay_period_start_str, pay_period_end_str)
     all_allowances_detail = recurring_allowances + non_recurring_allowances
     total_allowances_amount = sum(a[database.COL_ALLW_AMOUNT] for a in all_allowances_detail)
     if default_bonus_rate > 0:
@@ -2614,13 +2993,10 @@ def calculate_payroll_for_employee(employee_id: str, pay_period_start_str: str,
 
     gross_salary = calculated_basic_salary + overtime_pay + total_allowances_amount
 
-    recurring_deductions = get_active_employee_deductions_db(employee_id, pay_period_end_str)
-    non_recurring_deductions = get_non_recurring_deductions_for_period_db(employee_id, pay_period_start_str, pay_period_end_str)
     all_deductions_detail = recurring_deductions + non_recurring_deductions
     total_regular_deductions_amount = sum(d[database.COL_DED_AMOUNT] for d in all_deductions_detail)
 
     advance_repayment_this_period = 0.0
-    active_advance = get_active_salary_advance_for_repayment_db(employee_id, pay_period_end_str)
     advance_details_for_payslip = {}
 
     if active_advance:
@@ -2661,6 +3037,220 @@ def calculate_payroll_for_employee(employee_id: str, pay_period_start_str: str,
         database.COL_PAY_GENERATION_DATE: dt_date.today().isoformat()
     }
 
+def _group_rows_by_employee(cursor: sqlite3.Cursor, query: str, params: Tuple, emp_id_col: str) -> Dict[str, List[Dict]]:
+    """Runs a query and groups its rows (as dicts without the employee column) by employee ID."""
+    grouped: Dict[str, List[Dict]] = {}
+    cursor.execute(query, params)
+    for row in cursor.fetchall():
+        row_dict = dict(row)
+        grouped.setdefault(row_dict.pop(emp_id_col), []).append(row_dict)
+    return grouped
+
+def _fetch_payroll_inputs_for_period(pay_period_start_str: str, pay_period_end_str: str) -> Dict[str, Any]:
+    """
+    Loads the payroll inputs for a period in a fixed number of queries: active employees,
+    recurring/non-recurring allowances and deductions, the advance due for repayment and
+    the employees that already have a payslip. Attendance comes from get_attendance_summaries_for_period_db.
+    """
+    emp_query = f"""
+        SELECT * FROM {database.TABLE_EMPLOYEES}
+        WHERE {database.COL_EMP_STATUS} = ?
+          AND ({database.COL_EMP_IS_ARCHIVED} = 0 OR {database.COL_EMP_IS_ARCHIVED} IS NULL)
+        ORDER BY {database.COL_EMP_ID}
+    """
+    recurring_allw_query = f"""
+        SELECT {database.COL_ALLW_EMP_ID}, {database.COL_ALLW_TYPE}, {database.COL_ALLW_AMOUNT}
+        FROM {database.TABLE_EMP_ALLOWANCES}
+        WHERE {database.COL_ALLW_IS_RECURRING} = 1
+          AND {database.COL_ALLW_EFF_DATE} <= ?
+          AND ({database.COL_ALLW_END_DATE} IS NULL OR {database.COL_ALLW_END_DATE} >= ?)
+    """
+    non_recurring_allw_query = f"""
+        SELECT {database.COL_ALLW_EMP_ID}, {database.COL_ALLW_TYPE}, {database.COL_ALLW_AMOUNT}
+        FROM {database.TABLE_EMP_ALLOWANCES}
+        WHERE {database.COL_ALLW_IS_RECURRING} = 0
+          AND {database.COL_ALLW_EFF_DATE} BETWEEN ? AND ?
+    """
+    recurring_ded_query = f"""
+        SELECT {database.COL_DED_EMP_ID}, {database.COL_DED_TYPE}, {database.COL_DED_AMOUNT}
+        FROM {database.TABLE_EMP_DEDUCTIONS}
+        WHERE {database.COL_DED_IS_RECURRING} = 1
+          AND {database.COL_DED_EFF_DATE} <= ?
+          AND ({database.COL_DED_END_DATE} IS NULL OR {database.COL_DED_END_DATE} >= ?)
+    """
+    non_recurring_ded_query = f"""
+        SELECT {database.COL_DED_EMP_ID}, {database.COL_DED_TYPE}, {database.COL_DED_AMOUNT}
+        FROM {database.TABLE_EMP_DEDUCTIONS}
+        WHERE {database.COL_DED_IS_RECURRING} = 0
+          AND {database.COL_DED_EFF_DATE} BETWEEN ? AND ?
+    """
+    # Oldest active advance first, so the first row seen per employee matches get_active_salary_advance_for_repayment_db.
+    advances_query = f"""
+        SELECT * FROM {database.TABLE_SALARY_ADVANCES}
+        WHERE {database.COL_ADV_STATUS} = 'Active'
+          AND {database.COL_ADV_REPAY_START_DATE} <= ?
+        ORDER BY {database.COL_ADV_EMP_ID}, {database.COL_ADV_DATE} ASC
+    """
+    existing_payslips_query = f"""
+        SELECT {database.COL_PAY_EMP_ID} FROM {database.TABLE_PAYSLIPS}
+        WHERE {database.COL_PAY_PERIOD_START} = ? AND {database.COL_PAY_PERIOD_END} = ?
+    """
+    period_params = (pay_period_start_str, pay_period_end_str)
+    end_params = (pay_period_end_str, pay_period_end_str)
+    try:
+        with database.get_connection() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(emp_query, (database.STATUS_ACTIVE,))
+            employees = [dict(row) for row in cursor.fetchall()]
+
+            advances: Dict[str, Dict] = {}
+            cursor.execute(advances_query, (pay_period_end_str,))
+            for row in cursor.fetchall():
+                advances.setdefault(row[database.COL_ADV_EMP_ID], dict(row))
+
+            cursor.execute(existing_payslips_query, period_params)
+            existing_payslip_emp_ids = {row[0] for row in cursor.fetchall()}
+
+            return {
+                "employees": employees,
+                "recurring_allowances": _group_rows_by_employee(cursor, recurring_allw_query, end_params, database.COL_ALLW_EMP_ID),
+                "non_recurring_allowances": _group_rows_by_employee(cursor, non_recurring_allw_query, period_params, database.COL_ALLW_EMP_ID),
+                "recurring_deductions": _group_rows_by_employee(cursor, recurring_ded_query, end_params, database.COL_DED_EMP_ID),
+                "non_recurring_deductions": _group_rows_by_employee(cursor, non_recurring_ded_query, period_params, database.COL_DED_EMP_ID),
+                "advances": advances,
+                "existing_payslip_emp_ids": existing_payslip_emp_ids,
+            }
+    except sqlite3.Error as e:
+        logger.error(f"Database error loading payroll inputs for {pay_period_start_str} to {pay_period_end_str}: {e}")
+        raise DatabaseOperationError(f"Failed to load payroll data for the period: {e}")
+
+def run_payroll_for_period_db(
+    pay_period_start_str: str,
+    pay_period_end_str: str,
+    employee_ids: Optional[List[str]] = None,
+    dry_run: bool = False,
+    progress_callback: Optional[Callable[[int, int], None]] = None
+) -> Dict[str, Any]:
+    """
+    Calculates (and unless dry_run, records) payslips for all active employees in a period.
+
+    All inputs are preloaded in bulk, the payslips are built in memory and then written
+    (payslips + salary advance updates) in a single transaction, so a failure leaves no
+    partial payroll behind. Employees that already have a payslip for the period are skipped.
+
+    Args:
+        pay_period_start_str (str): Period start date (YYYY-MM-DD).
+        pay_period_end_str (str): Period end date (YYYY-MM-DD).
+        employee_ids (Optional[List[str]]): Restrict the run to these employees. None means all active employees.
+        dry_run (bool): If True, nothing is written; the calculated payslips are only returned.
+        progress_callback (Optional[Callable[[int, int], None]]): Called as (processed, total) while calculating.
+
+    Returns:
+        Dict[str, Any]: {"payslips", "created_count", "skipped_existing", "errors", "total_gross",
+                         "total_net", "dry_run"}.
+    Raises:
+        InvalidInputError: If the dates are invalid.
+        DatabaseOperationError: If loading or writing fails.
+    """
+    try:
+        period_start_obj = dt_date.fromisoformat(pay_period_start_str)
+        period_end_obj = dt_date.fromisoformat(pay_period_end_str)
+    except ValueError:
+        raise InvalidInputError("Invalid pay period date format for payroll calculation.")
+    if period_end_obj < period_start_obj:
+        raise InvalidInputError("Pay period start date cannot be after end date.")
+
+    default_bonus_rate = float(database.get_app_setting_db(database.SETTING_DEFAULT_BONUS_RATE, "0.0"))
+    standard_hours_per_day = config.STANDARD_WORK_HOURS_PER_DAY
+    work_day_indices = config.DEFAULT_WORK_DAYS_INDICES
+    expected_workdays = get_expected_workdays_in_period(period_start_obj, period_end_obj, work_day_indices)
+
+    inputs = _fetch_payroll_inputs_for_period(pay_period_start_str, pay_period_end_str)
+    attendance_by_emp = get_attendance_summaries_for_period_db(
+        pay_period_start_str, pay_period_end_str, standard_hours_per_day, work_day_indices)
+    empty_attendance_summary = _summarize_daily_hours({}, 0, standard_hours_per_day)
+    employees = inputs["employees"]
+    if employee_ids is not None:
+        wanted_ids = set(employee_ids)
+        employees = [emp for emp in employees if emp[database.COL_EMP_ID] in wanted_ids]
+
+    payslips: List[Dict] = []
+    skipped_existing: List[str] = []
+    errors: List[Tuple[str, str]] = []
+    total = len(employees)
+    for index, employee in enumerate(employees, start=1):
+        emp_id = employee[database.COL_EMP_ID]
+        if emp_id in inputs["existing_payslip_emp_ids"]:
+            skipped_existing.append(emp_id)
+        else:
+            try:
+                attendance_summary = attendance_by_emp.get(emp_id, empty_attendance_summary)
+                payslips.append(_build_payslip_data(
+                    employee, pay_period_start_str, pay_period_end_str, expected_workdays, attendance_summary,
+                    recurring_allowances=inputs["recurring_allowances"].get(emp_id, []),
+                    non_recurring_allowances=inputs["non_recurring_allowances"].get(emp_id, []),
+                    recurring_deductions=inputs["recurring_deductions"].get(emp_id, []),
+                    non_recurring_deductions=inputs["non_recurring_deductions"].get(emp_id, []),
+                    active_advance=inputs["advances"].get(emp_id),
+                    default_bonus_rate=default_bonus_rate
+                ))
+            except (KeyError, TypeError, ValueError) as e:
+                logger.error(f"Payroll calculation failed for employee {emp_id}: {e}")
+                errors.append((emp_id, str(e)))
+        if progress_callback and (index % 100 == 0 or index == total):
+            progress_callback(index, total)
+
+    if not dry_run and payslips:
+        _record_payslips_bulk(payslips)
+
+    logger.info(f"Payroll run {pay_period_start_str} to {pay_period_end_str} (dry_run={dry_run}): "
+                f"{len(payslips)} calculated, {len(skipped_existing)} skipped, {len(errors)} errors.")
+    return {
+        "payslips": payslips,
+        "created_count": 0 if dry_run else len(payslips),
+        "skipped_existing": skipped_existing,
+        "errors": errors,
+        "total_gross": round(sum(p[database.COL_PAY_GROSS_SALARY] for p in payslips), 2),
+        "total_net": round(sum(p[database.COL_PAY_NET_PAY] for p in payslips), 2),
+        "dry_run": dry_run,
+    }
+
+def _record_payslips_bulk(payslips: List[Dict]) -> None:
+    """Inserts payslips and applies their salary advance repayments in one transaction."""
+    cols = [
+        database.COL_PAY_EMP_ID, database.COL_PAY_PERIOD_START, database.COL_PAY_PERIOD_END,
+        database.COL_PAY_BASIC_SALARY, database.COL_PAY_TOTAL_ALLOWANCES, database.COL_PAY_GROSS_SALARY,
+        database.COL_PAY_TOTAL_DEDUCTIONS, database.COL_PAY_ADVANCE_REPAYMENT, database.COL_PAY_NET_PAY,
+        database.COL_PAY_GENERATION_DATE, database.COL_PAY_NOTES
+    ]
+    payslip_rows = [tuple(p.get(col) for col in cols) for p in payslips]
+    advance_rows = []
+    for p in payslips:
+        adv = p.get("advance_calculation_details") or {}
+        if adv.get('advance_id') and adv.get('amount_deducted', 0) > 0:
+            new_status = 'Fully Repaid' if adv['new_total_repaid'] >= adv['original_advance_amount'] else 'Active'
+            advance_rows.append((adv['new_total_repaid'], new_status, adv['advance_id']))
+    try:
+        with database.transaction("IMMEDIATE") as conn:
+            cursor = conn.cursor()
+            cursor.executemany(
+                f"INSERT INTO {database.TABLE_PAYSLIPS} ({', '.join(cols)}) VALUES ({', '.join(['?']*len(cols))})",
+                payslip_rows)
+            if advance_rows:
+                cursor.executemany(f"""
+                    UPDATE {database.TABLE_SALARY_ADVANCES}
+                    SET {database.COL_ADV_TOTAL_REPAID} = ?, {database.COL_ADV_STATUS} = ?
+                    WHERE {database.COL_ADV_ID} = ?
+                """, advance_rows)
+    except sqlite3.IntegrityError as e:
+        logger.error(f"Payroll run hit an existing payslip: {e}")
+        raise DatabaseOperationError(f"A payslip for this period already exists for one of the employees.")
+    except sqlite3.Error as e:
+        logger.error(f"Database error recording payroll run: {e}")
+        raise DatabaseOperationError(f"Failed to record payroll run: {e}")
+    logger.info(f"Recorded {len(payslip_rows)} payslips and {len(advance_rows)} advance repayments.")
+
 def record_payslip_db(payslip_data: Dict, existing_conn: Optional[sqlite3.Connection] = None) -> int:
     cols = [
         database.COL_PAY_EMP_ID, database.COL_PAY_PERIOD_START, database.COL_PAY_PERIOD_END,
@@ -2693,7 +3283,7 @@ def record_payslip_db(payslip_data: Dict, existing_conn: Optional[sqlite3.Connec
             """, (new_total_repaid, new_status, adv_id))
         return payslip_id
 
-    conn_to_use = existing_conn if existing_conn else sqlite3.connect(config.DATABASE_NAME)
+    conn_to_use = existing_conn if existing_conn else database.get_connection()
     try:
         cursor = conn_to_use.cursor()
         payslip_id = _perform_operations(cursor)
@@ -2727,7 +3317,7 @@ def get_average_performance_by_department_db(period_start_str: str, period_end_s
         ORDER BY avg_score DESC
     """
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             cursor.execute(query, (database.STATUS_ACTIVE, period_start_str, period_end_str))
@@ -2747,7 +3337,7 @@ def get_overall_average_performance_score_db(period_start_str: str, period_end_s
         WHERE e.{database.COL_EMP_STATUS} = ? 
           AND ev.{database.COL_EVAL_DATE} BETWEEN ? AND ?
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute(query, (database.STATUS_ACTIVE, period_start_str, period_end_str))
         result = cursor.fetchone()
@@ -2778,7 +3368,7 @@ def get_average_performance_by_employee_db(period_start_str: Optional[str] = Non
         GROUP BY e.{database.COL_EMP_ID}, e.{database.COL_EMP_NAME}
         ORDER BY average_score DESC, e.{database.COL_EMP_NAME} ASC
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query, tuple(params))
@@ -2820,10 +3410,10 @@ def get_department_statistics_report(start_date_str: Optional[str] = None, end_d
     query_params = []
     date_filter_sql = ""
     if start_date_str:
-        date_filter_sql += f" AND al.{database.COL_ATT_LOG_DATE} >= ?"
+        date_filter_sql += f" AND ad.{database.COL_AD_WORK_DATE} >= ?"
         query_params.append(start_date_str)
     if end_date_str:
-        date_filter_sql += f" AND al.{database.COL_ATT_LOG_DATE} <= ?"
+        date_filter_sql += f" AND ad.{database.COL_AD_WORK_DATE} <= ?"
         query_params.append(end_date_str)
 
     final_query = f"""
@@ -2833,9 +3423,9 @@ def get_department_statistics_report(start_date_str: Optional[str] = None, end_d
              FROM {database.TABLE_EMPLOYEES} e_active
              WHERE e_active.{database.COL_EMP_DEPARTMENT_ID} = d.{database.COL_DEPT_ID} AND e_active.{database.COL_EMP_STATUS} = '{database.STATUS_ACTIVE}'
             ) as headcount,
-            (SELECT COUNT(DISTINCT al.{database.COL_ATT_EMP_ID} || '-' || al.{database.COL_ATT_LOG_DATE}) -- Count unique employee-day pairs
-             FROM {database.TABLE_ATTENDANCE_LOG} al
-             JOIN {database.TABLE_EMPLOYEES} e_inner ON al.{database.COL_ATT_EMP_ID} = e_inner.{database.COL_EMP_ID}
+            (SELECT COUNT(*) -- One rollup row per employee-day
+             FROM {database.TABLE_ATTENDANCE_DAILY} ad
+             JOIN {database.TABLE_EMPLOYEES} e_inner ON ad.{database.COL_AD_EMP_ID} = e_inner.{database.COL_EMP_ID}
              WHERE e_inner.{database.COL_EMP_DEPARTMENT_ID} = d.{database.COL_DEPT_ID}
                AND e_inner.{database.COL_EMP_STATUS} = '{database.STATUS_ACTIVE}'
                {date_filter_sql}
@@ -2843,7 +3433,7 @@ def get_department_statistics_report(start_date_str: Optional[str] = None, end_d
         FROM {database.TABLE_DEPARTMENTS} d
         ORDER BY d.{database.COL_DEPT_NAME};
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(final_query, tuple(query_params))
@@ -2863,7 +3453,7 @@ def get_employee_documents_db(employee_id: str) -> List[Dict]:
         ORDER BY {database.COL_DOC_UPLOAD_DATE} DESC
     """
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             cursor.execute(query, (employee_id,))
@@ -2883,7 +3473,7 @@ def get_average_employee_tenure_db() -> Optional[float]:
     """
     tenures_in_days = []
     today = dt_date.today()
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute(query, (database.STATUS_ACTIVE,))
         for row in cursor.fetchall():
@@ -2903,7 +3493,7 @@ def get_terminations_in_period_db(start_date_str: str, end_date_str: str) -> int
         WHERE {database.COL_EMP_STATUS} = ? 
           AND {database.COL_EMP_TERMINATION_DATE} BETWEEN ? AND ?
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute(query, (database.STATUS_TERMINATED, start_date_str, end_date_str))
         return cursor.fetchone()[0] or 0
@@ -2915,7 +3505,7 @@ def get_new_hires_in_period_db(start_date_str: str, end_date_str: str) -> int:
         WHERE {database.COL_EMP_START_DATE} BETWEEN ? AND ?
     """ # Assumes new hires are immediately active or status is handled elsewhere.
       # If only 'Active' new hires, add: AND {database.COL_EMP_STATUS} = '{database.STATUS_ACTIVE}'
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute(query, (start_date_str, end_date_str))
         return cursor.fetchone()[0] or 0
@@ -2924,7 +3514,7 @@ def get_all_app_counters_db() -> List[Dict[str, Any]]:
     """Retrieves all application counters from the app_counters table."""
     query = f"SELECT {database.COL_COUNTER_NAME}, {database.COL_COUNTER_VALUE} FROM {database.TABLE_APP_COUNTERS}"
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             cursor.execute(query)
@@ -2945,7 +3535,7 @@ def get_pending_contract_approvals_for_user_db(approver_user_id: int) -> List[Di
           AND c.{database.COL_CONTRACT_APPROVAL_STATUS} = 'Pending Approval'
         ORDER BY c.{database.COL_CONTRACT_CREATED_AT} ASC
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query, (approver_user_id,))
@@ -2978,7 +3568,7 @@ def add_employee_document_db(employee_id: str, doc_type: str, source_file_path:
     upload_date_str = dt_date.today().isoformat() # Ensure dt_date is imported
     query = f"INSERT INTO {database.TABLE_EMPLOYEE_DOCUMENTS} ({database.COL_DOC_EMP_ID}, {database.COL_DOC_TYPE}, {database.COL_DOC_FILE_PATH}, {database.COL_DOC_UPLOAD_DATE}) VALUES (?, ?, ?, ?)"
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, (employee_id, doc_type, destination_file_path, upload_date_str))
             conn.commit()
@@ -2992,7 +3582,7 @@ def add_employee_document_db(employee_id: str, doc_type: str, source_file_path:
 
 def delete_employee_document_db(doc_id: int) -> bool:
     """Deletes a document record from DB and its associated file from storage."""
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(f"SELECT {database.COL_DOC_FILE_PATH} FROM {database.TABLE_EMPLOYEE_DOCUMENTS} WHERE {database.COL_DOC_ID} = ?", (doc_id,))
@@ -3016,7 +3606,7 @@ def get_employee_action_log_db(employee_id: str) -> List[Dict]:
         ORDER BY eal.{database.COL_EAL_TIMESTAMP} DESC
     """
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             cursor.execute(query, (employee_id,))
@@ -3037,7 +3627,7 @@ def list_all_users_db() -> List[Dict]:
             LEFT JOIN {database.TABLE_EMPLOYEES} e ON u.{database.COL_USER_LINKED_EMP_ID} = e.{database.COL_EMP_ID}
             ORDER BY u.{database.COL_USER_USERNAME}
         """
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             cursor.execute(query)
@@ -3085,7 +3675,7 @@ def add_leave_request_db(employee_id: str, leave_type: str, start_date_str: str,
         ) VALUES (?, ?, ?, ?, ?, ?, 'Pending Approval', ?)
     """
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, (employee_id, leave_type, start_date_str, end_date_str, reason, request_date_str, assigned_approver_user_id))
             conn.commit()
@@ -3104,7 +3694,7 @@ def rotate_all_employee_shifts_db() -> int:
     SHIFT_ORDER = ["Morning", "Evening", "Night"]
     employees_updated_count = 0
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             # Fetch all active employees and their current shifts
             cursor.execute(f"SELECT {database.COL_EMP_ID}, {database.COL_EMP_CURRENT_SHIFT} FROM {database.TABLE_EMPLOYEES} WHERE {database.COL_EMP_STATUS} = ? AND ({database.COL_EMP_IS_ARCHIVED} = 0 OR {database.COL_EMP_IS_ARCHIVED} IS NULL)", (database.STATUS_ACTIVE,))
@@ -3135,7 +3725,7 @@ def add_training_course_db(name: str, description: Optional[str] = None, provide
     if not name:
         raise InvalidInputError("Course name cannot be empty.")
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(f"""
                 INSERT INTO {database.TABLE_TRAINING_COURSES} 
@@ -3152,7 +3742,7 @@ def add_training_course_db(name: str, description: Optional[str] = None, provide
 
 def get_all_training_courses_db() -> List[Dict]:
     """Lists all training courses."""
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(f"SELECT * FROM {database.TABLE_TRAINING_COURSES} ORDER BY {database.COL_COURSE_NAME}")
@@ -3171,7 +3761,7 @@ def update_training_course_db(course_id: int, name: Optional[str] = None, descri
     set_clause = ", ".join([f"{key} = ?" for key in updates.keys()])
     params = list(updates.values()) + [course_id]
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(f"UPDATE {database.TABLE_TRAINING_COURSES} SET {set_clause} WHERE {database.COL_COURSE_ID} = ?", tuple(params))
             if cursor.rowcount == 0:
@@ -3188,7 +3778,7 @@ def delete_training_course_db(course_id: int) -> bool:
     """Deletes a training course. Fails if it's used in any training sessions (due to RESTRICT - to be added later)."""
     # TODO: Add check for usage in training_sessions table when it's created.
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(f"DELETE FROM {database.TABLE_TRAINING_COURSES} WHERE {database.COL_COURSE_ID} = ?", (course_id,))
             if cursor.rowcount == 0: raise HRException(f"Training course ID {course_id} not found for deletion.")
@@ -3208,7 +3798,7 @@ def add_skill_db(name: str, description: Optional[str] = None, category: Optiona
     if not name:
         raise InvalidInputError("Skill name cannot be empty.")
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(f"""
                 INSERT INTO {database.TABLE_SKILLS}
@@ -3225,7 +3815,7 @@ def add_skill_db(name: str, description: Optional[str] = None, category: Optiona
 
 def get_all_skills_db() -> List[Dict]:
     """Lists all skills from the skills table."""
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(f"SELECT * FROM {database.TABLE_SKILLS} ORDER BY {database.COL_SKILL_NAME}")
@@ -3243,7 +3833,7 @@ def update_skill_db(skill_id: int, name: Optional[str] = None, description: Opti
     set_clause = ", ".join([f"{key} = ?" for key in updates.keys()])
     params = list(updates.values()) + [skill_id]
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(f"UPDATE {database.TABLE_SKILLS} SET {set_clause} WHERE {database.COL_SKILL_ID} = ?", tuple(params))
             if cursor.rowcount == 0:
@@ -3259,7 +3849,7 @@ def update_skill_db(skill_id: int, name: Optional[str] = None, description: Opti
 def delete_skill_db(skill_id: int) -> bool:
     """Deletes a skill. Fails if it's assigned to any employee (due to RESTRICT)."""
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             # Check if skill is in use before attempting deletion (due to RESTRICT)
             cursor.execute(f"SELECT 1 FROM {database.TABLE_EMPLOYEE_SKILLS} WHERE {database.COL_EMP_SKILL_SKILL_ID} = ?", (skill_id,))
@@ -3284,7 +3874,7 @@ def assign_skill_to_employee_db(employee_id: str, skill_id: int, proficiency_lev
     if not _find_employee_by_id(employee_id): raise EmployeeNotFoundError(f"Employee ID {employee_id} not found.")
     # TODO: Check if skill_id exists in skills table (e.g., create get_skill_by_id_db)
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(f"""
                 INSERT OR REPLACE INTO {database.TABLE_EMPLOYEE_SKILLS}
@@ -3306,7 +3896,7 @@ def get_employee_skills_db(employee_id: str) -> List[Dict]:
         WHERE es.{database.COL_EMP_SKILL_EMP_ID} = ?
         ORDER BY s.{database.COL_SKILL_NAME}
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query, (employee_id,))
@@ -3315,7 +3905,7 @@ def get_employee_skills_db(employee_id: str) -> List[Dict]:
 def remove_skill_from_employee_db(employee_id: str, skill_id: int) -> bool:
     """Removes a specific skill from an employee."""
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(f"""
                 DELETE FROM {database.TABLE_EMPLOYEE_SKILLS}
@@ -3338,7 +3928,7 @@ def add_skill_db(name: str, description: Optional[str] = None, category: Optiona
     if not name:
         raise InvalidInputError("Skill name cannot be empty.")
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(f"""
                 INSERT INTO {database.TABLE_SKILLS} 
@@ -3355,7 +3945,7 @@ def add_skill_db(name: str, description: Optional[str] = None, category: Optiona
 
 def get_all_skills_db() -> List[Dict]:
     """Lists all skills from the skills table."""
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(f"SELECT * FROM {database.TABLE_SKILLS} ORDER BY {database.COL_SKILL_NAME}")
@@ -3373,7 +3963,7 @@ def update_skill_db(skill_id: int, name: Optional[str] = None, description: Opti
     set_clause = ", ".join([f"{key} = ?" for key in updates.keys()])
     params = list(updates.values()) + [skill_id]
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(f"UPDATE {database.TABLE_SKILLS} SET {set_clause} WHERE {database.COL_SKILL_ID} = ?", tuple(params))
             if cursor.rowcount == 0:
@@ -3389,7 +3979,7 @@ def update_skill_db(skill_id: int, name: Optional[str] = None, description: Opti
 def delete_skill_db(skill_id: int) -> bool:
     """Deletes a skill. Fails if it's assigned to any employee (due to RESTRICT)."""
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             # Check if skill is in use before attempting deletion (due to RESTRICT)
             cursor.execute(f"SELECT 1 FROM {database.TABLE_EMPLOYEE_SKILLS} WHERE {database.COL_EMP_SKILL_SKILL_ID} = ?", (skill_id,))
@@ -3414,7 +4004,7 @@ def assign_skill_to_employee_db(employee_id: str, skill_id: int, proficiency_lev
     if not _find_employee_by_id(employee_id): raise EmployeeNotFoundError(f"Employee ID {employee_id} not found.")
     # TODO: Check if skill_id exists in skills table
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(f"""
                 INSERT OR REPLACE INTO {database.TABLE_EMPLOYEE_SKILLS} 
@@ -3436,7 +4026,7 @@ def get_employee_skills_db(employee_id: str) -> List[Dict]:
         WHERE es.{database.COL_EMP_SKILL_EMP_ID} = ?
         ORDER BY s.{database.COL_SKILL_NAME}
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query, (employee_id,))
@@ -3445,7 +4035,7 @@ def get_employee_skills_db(employee_id: str) -> List[Dict]:
 def remove_skill_from_employee_db(employee_id: str, skill_id: int) -> bool:
     """Removes a specific skill from an employee."""
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(f"""
                 DELETE FROM {database.TABLE_EMPLOYEE_SKILLS} 
@@ -3479,7 +4069,7 @@ def get_leave_requests_for_employee_db(employee_id: str) -> List[Dict]:
         WHERE lr.{database.COL_LR_EMP_ID} = ?
         ORDER BY lr.{database.COL_LR_REQUEST_DATE} DESC
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query, (employee_id,))
@@ -3516,7 +4106,7 @@ def is_department_busy_for_leave(department_id: int, leave_start_date_str: str,
           AND lr.{database.COL_LR_START_DATE} <= ? 
           AND lr.{database.COL_LR_END_DATE} >= ?
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute(query, (department_id, requesting_employee_id, leave_end_date_str, leave_start_date_str))
         concurrent_leaves_count = cursor.fetchone()[0] or 0
@@ -3549,7 +4139,7 @@ def get_concurrent_department_leaves(department_id: int, leave_start_date_str: s
           AND lr.{database.COL_LR_START_DATE} <= ? -- Existing leave starts before or on new leave's end date
           AND lr.{database.COL_LR_END_DATE} >= ?   -- Existing leave ends after or on new leave's start date
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query, (department_id, exclude_employee_id, leave_end_date_str, leave_start_date_str))
@@ -3570,7 +4160,7 @@ def get_payslips_for_employee_db(employee_id: str) -> List[Dict]:
         WHERE {database.COL_PAY_EMP_ID} = ?
         ORDER BY {database.COL_PAY_GENERATION_DATE} DESC
     """
-    with sqlite3.connect(config.DATABASE_NAME) as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query, (employee_id,))
@@ -3593,7 +4183,7 @@ def get_leave_request_details_db(request_id: int) -> Optional[Dict]:
         WHERE lr.{db_schema.COL_LR_ID} = ?
     """
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn:
+        with database.get_connection() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             cursor.execute(query, (request_id,))
@@ -3616,7 +4206,7 @@ def is_employee_on_approved_leave_today(employee_id: str, date_str: str) -> bool
         True if the employee is on approved leave, False otherwise.
     """
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn: # Use sqlite3.connect directly
+        with database.get_connection() as conn:
 
             cursor = conn.cursor()
             query = f"""
@@ -3644,7 +4234,7 @@ def add_evaluation_criterion_db(name: str, description: Optional[str] = None, ma
     if not isinstance(max_points, int) or max_points <= 0:
         raise InvalidInputError("Max points must be a positive integer.")
     try:
-        with database.create_connection() as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(f"""
                 INSERT INTO {database.TABLE_EVALUATION_CRITERIA} 
@@ -3661,7 +4251,7 @@ def add_evaluation_criterion_db(name: str, description: Optional[str] = None, ma
 
 def list_evaluation_criteria_db() -> List[Dict]:
     """Lists all evaluation criteria."""
-    with database.create_connection() as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(f"SELECT * FROM {database.TABLE_EVALUATION_CRITERIA} ORDER BY {database.COL_CRITERIA_NAME}")
@@ -3683,7 +4273,7 @@ def update_evaluation_criterion_db(criteria_id: int, name: Optional[str] = None,
     set_clause = ", ".join([f"{key} = ?" for key in updates.keys()])
     params = list(updates.values()) + [criteria_id]
     try:
-        with database.create_connection() as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(f"UPDATE {database.TABLE_EVALUATION_CRITERIA} SET {set_clause} WHERE {database.COL_CRITERIA_ID} = ?", tuple(params))
             if cursor.rowcount == 0:
@@ -3699,7 +4289,7 @@ def update_evaluation_criterion_db(criteria_id: int, name: Optional[str] = None,
 def delete_evaluation_criterion_db(criteria_id: int) -> bool:
     """Deletes an evaluation criterion. Fails if it's used in any evaluation_details (due to RESTRICT)."""
     try:
-        with database.create_connection() as conn:
+        with database.get_connection() as conn:
             cursor = conn.cursor()
             # Check if criterion is in use before attempting deletion
             cursor.execute(f"SELECT 1 FROM {database.TABLE_EVALUATION_DETAILS} WHERE {database.COL_EVAL_DETAIL_CRITERIA_ID} = ?", (criteria_id,))
@@ -3732,39 +4322,33 @@ def add_employee_evaluation_db(employee_id: str, period: str, eval_date_str: str
     except ValueError:
         raise InvalidInputError("Invalid evaluation date format. Use YYYY-MM-DD.")
 
-    conn = None
     try:
-        conn = database.create_connection()
-        cursor = conn.cursor()
-        cursor.execute("BEGIN TRANSACTION")
+        with database.transaction() as conn:
+            cursor = conn.cursor()
 
-        # Insert main evaluation record
-        cursor.execute(f"""
-            INSERT INTO {database.TABLE_EMPLOYEE_EVALUATIONS}
-            ({database.COL_EVAL_EMP_ID}, {database.COL_EVAL_PERIOD}, {database.COL_EVAL_DATE},
-             {database.COL_EVAL_TOTAL_SCORE}, {database.COL_EVAL_COMMENTS}, {database.COL_EVAL_EVALUATOR_ID})
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (employee_id, period, eval_date_str, total_score, comments, evaluator_user_id))
-        evaluation_id = cursor.lastrowid
-
-        # Insert score details
-        for detail in scores_details:
+            # Insert main evaluation record
             cursor.execute(f"""
-                INSERT INTO {database.TABLE_EVALUATION_DETAILS}
-                ({database.COL_EVAL_DETAIL_EVAL_ID}, {database.COL_EVAL_DETAIL_CRITERIA_ID},
-                 {database.COL_EVAL_DETAIL_SCORE}, {database.COL_EVAL_DETAIL_COMMENT})
-                VALUES (?, ?, ?, ?)
-            """, (evaluation_id, detail["criteria_id"], detail["score"], detail.get("comment")))
+                INSERT INTO {database.TABLE_EMPLOYEE_EVALUATIONS}
+                ({database.COL_EVAL_EMP_ID}, {database.COL_EVAL_PERIOD}, {database.COL_EVAL_DATE},
+                 {database.COL_EVAL_TOTAL_SCORE}, {database.COL_EVAL_COMMENTS}, {database.COL_EVAL_EVALUATOR_ID})
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (employee_id, period, eval_date_str, total_score, comments, evaluator_user_id))
+            evaluation_id = cursor.lastrowid
+
+            # Insert score details
+            for detail in scores_details:
+                cursor.execute(f"""
+                    INSERT INTO {database.TABLE_EVALUATION_DETAILS}
+                    ({database.COL_EVAL_DETAIL_EVAL_ID}, {database.COL_EVAL_DETAIL_CRITERIA_ID},
+                     {database.COL_EVAL_DETAIL_SCORE}, {database.COL_EVAL_DETAIL_COMMENT})
+                    VALUES (?, ?, ?, ?)
+                """, (evaluation_id, detail["criteria_id"], detail["score"], detail.get("comment")))
 
-        conn.commit()
         logger.info(f"Employee evaluation ID {evaluation_id} for {employee_id} added successfully.")
         return evaluation_id
     except sqlite3.Error as e:
-        if conn: conn.rollback()
         logger.error(f"Database error adding employee evaluation for {employee_id}: {e}")
         raise DatabaseOperationError(f"Failed to add employee evaluation: {e}")
-    finally:
-        if conn: conn.close()
 
 def get_employee_evaluations_db(employee_id: str) -> List[Dict]:
     """Retrieves all evaluations for a specific employee, including evaluator's username."""
@@ -3775,7 +4359,7 @@ def get_employee_evaluations_db(employee_id: str) -> List[Dict]:
         WHERE ev.{database.COL_EVAL_EMP_ID} = ?
         ORDER BY ev.{database.COL_EVAL_DATE} DESC
     """
-    with database.create_connection() as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(query, (employee_id,))
@@ -3791,7 +4375,7 @@ def get_evaluation_details_db(evaluation_id: int) -> Optional[Dict]:
         LEFT JOIN {database.TABLE_USERS} u ON ev.{database.COL_EVAL_EVALUATOR_ID} = u.{database.COL_USER_ID}
         WHERE ev.{database.COL_EVAL_ID} = ?
     """
-    with database.create_connection() as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(main_eval_query, (evaluation_id,))
@@ -3813,7 +4397,7 @@ def get_evaluation_details_db(evaluation_id: int) -> Optional[Dict]:
 
 def get_all_evaluation_criteria_db() -> List[Dict]:
     """Lists all evaluation criteria (renamed from list_evaluation_criteria_db for consistency)."""
-    with database.create_connection() as conn:
+    with database.get_connection() as conn:
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         cursor.execute(f"SELECT * FROM {database.TABLE_EVALUATION_CRITERIA} ORDER BY {database.COL_CRITERIA_NAME}")
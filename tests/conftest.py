@@ -0,0 +1,24 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from data import database as db_schema
+
+@pytest.fixture
+def temp_db(tmp_path):
+    """Points the application at a freshly initialised database in a temporary directory."""
+    original_database_name = config.DATABASE_NAME
+    db_schema.close_connection()
+    config.DATABASE_NAME = str(tmp_path / "test_hr_system.db")
+    db_schema.init_db()
+    try:
+        yield config.DATABASE_NAME
+    finally:
+        db_schema.close_connection()
+        config.DATABASE_NAME = original_database_name
+        db_schema.invalidate_app_settings_cache()
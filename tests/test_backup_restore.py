@@ -0,0 +1,45 @@
+# tests/test_backup_restore.py
+import sqlite3
+
+from data import database as db_schema
+from data import queries as db_queries
+from utils.file_utils import create_backup_db, restore_database_from_backup
+
+
+def _employee_names(database_path):
+    conn = sqlite3.connect(database_path)
+    try:
+        return [row[0] for row in conn.execute(f"SELECT {db_schema.COL_EMP_NAME} FROM {db_schema.TABLE_EMPLOYEES}")]
+    finally:
+        conn.close()
+
+
+def test_backup_includes_rows_still_in_the_wal(temp_db, tmp_path):
+    db_queries.add_employee_db("E001", "Alice", None, "Clerk", 1000.0, 21)
+
+    backup_path = create_backup_db(backup_directory=str(tmp_path / "backups"), custom_filename="snapshot")
+
+    assert backup_path is not None
+    assert _employee_names(backup_path) == ["Alice"]
+
+
+def test_restore_replaces_the_live_database(temp_db, tmp_path):
+    db_queries.add_employee_db("E001", "Alice", None, "Clerk", 1000.0, 21)
+    backup_path = create_backup_db(backup_directory=str(tmp_path / "backups"), custom_filename="snapshot")
+    db_queries.add_employee_db("E002", "Bob", None, "Clerk", 1000.0, 21)
+
+    assert restore_database_from_backup(backup_path)
+
+    with db_schema.get_connection() as conn:
+        names = [row[0] for row in conn.execute(f"SELECT {db_schema.COL_EMP_NAME} FROM {db_schema.TABLE_EMPLOYEES}")]
+    assert names == ["Alice"]
+    assert _employee_names(temp_db) == ["Alice"]
+
+
+def test_restore_rejects_a_file_that_is_not_a_database(temp_db, tmp_path):
+    db_queries.add_employee_db("E001", "Alice", None, "Clerk", 1000.0, 21)
+    bogus_backup = tmp_path / "not_a_backup.db"
+    bogus_backup.write_bytes(b"not an sqlite database" * 100)
+
+    assert not restore_database_from_backup(str(bogus_backup))
+    assert _employee_names(temp_db) == ["Alice"]
@@ -0,0 +1,60 @@
+# tests/test_schema_indexes.py
+"""EXPLAIN QUERY PLAN checks that the hot lookups are served by the migration indexes, not table scans."""
+import pytest
+
+from data import database as db_schema
+
+HOT_QUERY_INDEXES = [
+    ("idx_attendance_emp_date",
+     f"SELECT * FROM {db_schema.TABLE_ATTENDANCE_LOG} WHERE {db_schema.COL_ATT_EMP_ID} = ? AND {db_schema.COL_ATT_LOG_DATE} = ?",
+     ("EMP001", "2024-01-15")),
+    ("idx_attendance_emp_date",
+     f"SELECT COUNT(DISTINCT {db_schema.COL_ATT_LOG_DATE}) FROM {db_schema.TABLE_ATTENDANCE_LOG} "
+     f"WHERE {db_schema.COL_ATT_EMP_ID} = ? AND {db_schema.COL_ATT_LOG_DATE} BETWEEN ? AND ?",
+     ("EMP001", "2024-01-01", "2024-01-31")),
+    ("idx_attendance_date",
+     f"SELECT * FROM {db_schema.TABLE_ATTENDANCE_LOG} WHERE {db_schema.COL_ATT_LOG_DATE} = ?",
+     ("2024-01-15",)),
+    ("idx_leave_emp_status_dates",
+     f"SELECT * FROM {db_schema.TABLE_LEAVE_REQUESTS} WHERE {db_schema.COL_LR_EMP_ID} = ? AND {db_schema.COL_LR_STATUS} = ? "
+     f"AND {db_schema.COL_LR_START_DATE} <= ? AND {db_schema.COL_LR_END_DATE} >= ?",
+     ("EMP001", "Approved", "2024-01-15", "2024-01-15")),
+    ("idx_evaluations_emp_date",
+     f"SELECT * FROM {db_schema.TABLE_EMPLOYEE_EVALUATIONS} WHERE {db_schema.COL_EVAL_EMP_ID} = ? ORDER BY {db_schema.COL_EVAL_DATE} DESC",
+     ("EMP001",)),
+    ("idx_payslips_period",
+     f"SELECT * FROM {db_schema.TABLE_PAYSLIPS} WHERE {db_schema.COL_PAY_PERIOD_START} = ? AND {db_schema.COL_PAY_PERIOD_END} = ?",
+     ("2024-01-01", "2024-01-31")),
+    ("idx_action_log_emp",
+     f"SELECT * FROM {db_schema.TABLE_EMPLOYEE_ACTION_LOG} WHERE {db_schema.COL_EAL_EMP_ID} = ?",
+     ("EMP001",)),
+    ("idx_interviews_interviewer_date",
+     f"SELECT * FROM {db_schema.TABLE_INTERVIEWS} WHERE {db_schema.COL_INT_INTERVIEWER_EMP_ID} = ? AND {db_schema.COL_INT_DATE} BETWEEN ? AND ?",
+     ("EMP001", "2024-01-01", "2024-01-31")),
+    ("idx_employees_name_id",
+     f"SELECT * FROM {db_schema.TABLE_EMPLOYEES} WHERE ({db_schema.COL_EMP_NAME}, {db_schema.COL_EMP_ID}) > (?, ?) "
+     f"ORDER BY {db_schema.COL_EMP_NAME}, {db_schema.COL_EMP_ID} LIMIT 100",
+     ("Employee 1", "EMP001")),
+    ("idx_employees_department",
+     f"SELECT * FROM {db_schema.TABLE_EMPLOYEES} WHERE {db_schema.COL_EMP_DEPARTMENT_ID} = ?",
+     (1,)),
+]
+
+def _query_plan(sql: str, params: tuple) -> str:
+    # A fresh connection: EXPLAIN doesn't re-check the schema cookie, so a pooled connection opened
+    # during init_db could still plan against the schema from before the migrations
+    conn = db_schema.create_connection()
+    try:
+        return "\n".join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+    finally:
+        conn.close()
+
+def test_migrations_reach_latest_version(temp_db):
+    with db_schema.get_connection() as conn:
+        assert db_schema.get_schema_version(conn.cursor()) == db_schema.SCHEMA_MIGRATIONS[-1][0]
+
+@pytest.mark.parametrize("index_name, sql, params", HOT_QUERY_INDEXES, ids=[index for index, _, _ in HOT_QUERY_INDEXES])
+def test_hot_query_uses_index(temp_db, index_name, sql, params):
+    plan = _query_plan(sql, params)
+    assert index_name in plan, f"Expected {index_name} in query plan:\n{plan}"
+    assert "SCAN" not in plan.replace(f"SCAN {index_name}", ""), f"Unexpected table scan:\n{plan}"
@@ -0,0 +1,52 @@
+# tests/test_zkteco_ingest.py
+"""Attendance ingestion from several ZKTeco devices whose sync histories differ."""
+from datetime import datetime
+
+from data import database as db_schema
+from data import queries as db_queries
+from utils import zkteco_utils
+from utils.zkteco_utils import DeviceAttendance
+
+DEVICE_1 = "10.0.0.1:4370"
+DEVICE_2 = "10.0.0.2:4370"
+
+def _punch(user_id: str, timestamp: str, punch: int, uid: int) -> DeviceAttendance:
+    return DeviceAttendance(user_id, datetime.fromisoformat(timestamp), 1, punch, uid)
+
+def _new_summary() -> dict:
+    return {"db_clock_ins": 0, "db_clock_outs": 0, "unknown_user_id": 0, "skipped_duplicates": 0,
+            "skipped_no_open_in": 0, "skipped_already_out": 0}
+
+def _attendance_rows(emp_id: str) -> list:
+    with db_schema.get_connection() as conn:
+        return conn.execute(f"""
+            SELECT {db_schema.COL_ATT_CLOCK_IN}, {db_schema.COL_ATT_CLOCK_OUT} FROM {db_schema.TABLE_ATTENDANCE_LOG}
+            WHERE {db_schema.COL_ATT_EMP_ID} = ? ORDER BY {db_schema.COL_ATT_CLOCK_IN}
+        """, (emp_id,)).fetchall()
+
+def test_late_device_does_not_reopen_closed_rows_of_other_employees(temp_db):
+    db_queries.add_employee_db("EMPA", "Employee A", None, "Clerk", 1000, 0, device_user_id="1")
+    db_queries.add_employee_db("EMPB", "Employee B", None, "Clerk", 1000, 0, device_user_id="2")
+    device_1 = [_punch("2", "2024-03-04 07:00:00", 0, 1), _punch("2", "2024-03-04 12:00:00", 1, 2)]
+    zkteco_utils.ingest_device_records({DEVICE_1: device_1})
+
+    # Device 2 syncs for the first time, so the merged batch starts with A's 08:00 punch,
+    # before B's 07:00-12:00 row was closed.
+    device_1.append(_punch("2", "2024-03-04 13:00:00", 0, 3))
+    device_2 = [_punch("1", "2024-03-04 08:00:00", 0, 1)]
+    summary = zkteco_utils.ingest_device_records({DEVICE_1: device_1, DEVICE_2: device_2})
+
+    assert summary["skipped_duplicates"] == 0
+    assert _attendance_rows("EMPB") == [("2024-03-04 07:00:00", "2024-03-04 12:00:00"), ("2024-03-04 13:00:00", None)]
+    assert _attendance_rows("EMPA") == [("2024-03-04 08:00:00", None)]
+
+def test_reingesting_the_same_punches_adds_nothing(temp_db):
+    db_queries.add_employee_db("EMPA", "Employee A", None, "Clerk", 1000, 0, device_user_id="1")
+    streams = [[(datetime(2024, 3, 4, 8), 0, zkteco_utils.get_device_source(DEVICE_1), "1"),
+                (datetime(2024, 3, 4, 17), 1, zkteco_utils.get_device_source(DEVICE_1), "1")]]
+    zkteco_utils.ingest_punch_streams(streams, _new_summary())
+    summary = _new_summary()
+    zkteco_utils.ingest_punch_streams(streams, summary)
+
+    assert summary["db_clock_ins"] == 0
+    assert _attendance_rows("EMPA") == [("2024-03-04 08:00:00", "2024-03-04 17:00:00")]
@@ -283,9 +283,6 @@ class AttendanceLogViewerWindow(ThemedToplevel):
 
         try:
             logs = db_queries.get_attendance_logs_for_employee_period(emp_id_to_load, start_date_str, end_date_str)
-            total_hours = 0.0
-            present_days = set()
-
             if not logs:
                 messagebox.showinfo("No Records", "No attendance records found for the selected criteria.", parent=self) # Parent should be self
                 return
@@ -303,8 +300,6 @@ class AttendanceLogViewerWindow(ThemedToplevel):
                     duration = db_queries.calculate_worked_duration(log[db_schema.COL_ATT_CLOCK_IN], clock_out_dt_str)
                     if duration is not None:
                         duration_str = f"{duration:.2f}"
-                        total_hours += duration
-                        present_days.add(log[db_schema.COL_ATT_LOG_DATE]) # Add date to set of present days
                 
                 self.log_tree.insert("", "end", values=(
                     log[db_schema.COL_ATT_LOG_DATE],
@@ -313,6 +308,10 @@ class AttendanceLogViewerWindow(ThemedToplevel):
                     duration_str
                 ))
             
+            # Totals come from the daily rollup; a day counts as present once it has a closed segment
+            daily_rows = db_queries.get_attendance_daily_db(emp_id_to_load, start_date_str, end_date_str)
+            total_hours = sum(row[db_schema.COL_AD_WORKED_SECONDS] for row in daily_rows) / 3600
+            present_days = [row for row in daily_rows if row[db_schema.COL_AD_LAST_OUT]]
             self.total_hours_var.set(_("attendance_log_total_hours_format", hours=f"{total_hours:.2f}")) # Add key
             self.total_days_var.set(_("attendance_log_total_days_format", days=len(present_days))) # Add key
 
@@ -1,6 +1,12 @@
 # c:\Users\mahmo\OneDrive\Documents\GitHub\hr_management_system\ui\components.py
 import tkinter as tk
 from tkinter import ttk
+import logging
+import queue
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
 
 class AutocompleteCombobox(ttk.Combobox):
     def __init__(self, master=None, completevalues=None, **kwargs):
@@ -47,4 +53,123 @@ class AutocompleteCombobox(ttk.Combobox):
             # Let default TCombobox behavior handle navigation and selection from dropdown.
             # For BackSpace/Delete, or when input becomes empty, reset to full list or filter.
             pass # Or specific logic if needed beyond default
-        self.autocomplete()
\ No newline at end of file
+        self.autocomplete()
+
+class VirtualTreeviewPager:
+    """
+    Keeps only a sliding window of rows in a ttk.Treeview for long, keyset-paginated lists.
+
+    fetch_page(after_key, before_key, limit) runs on a background thread and must return a list of
+    (key, values) tuples in display order; key is whatever the source needs to continue from a row
+    (e.g. (name, id) for keyset queries). Pages are requested when the view scrolls near either edge
+    of the window, and rows beyond max_rows are dropped from the opposite edge.
+    """
+    def __init__(self, tree: ttk.Treeview, scrollbar: ttk.Scrollbar, fetch_page: Callable[[Any, Any, int], List[Tuple[Any, tuple]]],
+                 page_size: int = 200, max_rows: int = 600, prefetch_margin: float = 0.2,
+                 on_page_loaded: Optional[Callable[[int], None]] = None):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.fetch_page = fetch_page
+        self.page_size = page_size
+        self.max_rows = max(max_rows, page_size * 2)
+        self.prefetch_margin = prefetch_margin
+        self.on_page_loaded = on_page_loaded # Called on the UI thread with the number of rows now shown
+
+        self._keys: Dict[str, Any] = {} # Treeview iid -> row key
+        self._generation = 0 # Bumped on reset() so stale pages are discarded
+        self._pending = False
+        self._has_more_above = False
+        self._has_more_below = False
+        self._requests: "queue.Queue" = queue.Queue()
+        self._results: "queue.Queue" = queue.Queue()
+        self._worker = threading.Thread(target=self._worker_loop, daemon=True)
+        self._worker.start()
+        self.tree.configure(yscrollcommand=self._on_yscroll)
+
+    def reset(self, fetch_page: Optional[Callable[[Any, Any, int], List[Tuple[Any, tuple]]]] = None):
+        """Clears the tree and loads the first page (optionally from a new source)."""
+        if fetch_page is not None:
+            self.fetch_page = fetch_page
+        self._generation += 1
+        self._pending = False
+        self._has_more_above = False
+        self._has_more_below = False
+        self._keys.clear()
+        self.tree.delete(*self.tree.get_children())
+        self._request("first", None, None)
+
+    def _request(self, direction: str, after_key: Any, before_key: Any):
+        self._pending = True
+        self._requests.put((self._generation, direction, self.fetch_page, after_key, before_key, self.page_size))
+        self.tree.after(30, self._poll_results)
+
+    def _worker_loop(self):
+        while True:
+            generation, direction, fetch_page, after_key, before_key, limit = self._requests.get()
+            try:
+                rows = fetch_page(after_key, before_key, limit)
+                self._results.put((generation, direction, rows, None))
+            except Exception as e: # Reported on the UI thread
+                self._results.put((generation, direction, None, e))
+
+    def _poll_results(self):
+        if not self.tree.winfo_exists():
+            return
+        try:
+            generation, direction, rows, error = self._results.get_nowait()
+        except queue.Empty:
+            if self._pending:
+                self.tree.after(30, self._poll_results)
+            return
+        if generation != self._generation:
+            self._poll_results() # Stale page from before a reset
+            return
+        self._pending = False
+        if error is not None:
+            logger.error(f"Error fetching list page: {error}")
+            return
+        self._apply_page(direction, rows)
+
+    def _apply_page(self, direction: str, rows: List[Tuple[Any, tuple]]):
+        children = self.tree.get_children()
+        top_index = int(round(self.tree.yview()[0] * len(children))) if children else 0
+        if direction == "above":
+            for position, (key, values) in enumerate(rows):
+                self._keys[self.tree.insert("", position, values=values)] = key
+            self._has_more_above = len(rows) == self.page_size
+            top_index += len(rows)
+        else:
+            for key, values in rows:
+                self._keys[self.tree.insert("", "end", values=values)] = key
+            self._has_more_below = len(rows) == self.page_size
+
+        children = self.tree.get_children()
+        overflow = len(children) - self.max_rows
+        if overflow > 0:
+            if direction == "above":
+                dropped = children[-overflow:]
+                self._has_more_below = True
+            else:
+                dropped = children[:overflow]
+                self._has_more_above = True
+                top_index -= overflow
+            for iid in dropped:
+                self._keys.pop(iid, None)
+            self.tree.delete(*dropped)
+            children = self.tree.get_children()
+        if direction != "first" and children:
+            self.tree.yview_moveto(max(0, top_index) / len(children))
+        if self.on_page_loaded:
+            self.on_page_loaded(len(children))
+
+    def _on_yscroll(self, first: str, last: str):
+        self.scrollbar.set(first, last)
+        if self._pending:
+            return
+        children = self.tree.get_children()
+        if not children:
+            return
+        if float(last) >= 1.0 - self.prefetch_margin and self._has_more_below:
+            self._request("below", self._keys.get(children[-1]), None)
+        elif float(first) <= self.prefetch_margin and self._has_more_above:
+            self._request("above", None, self._keys.get(children[0]))
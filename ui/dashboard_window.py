@@ -351,7 +351,9 @@ class DashboardWindow(ThemedToplevel):
                 for ax_att in self.att_axs: # Ensure att_axs is iterable
                     ax_att.clear()
             # Chart 1 (Attendance Tab): Absenteeism Rate by Department
-            absenteeism_data = db_queries.get_absenteeism_rate_by_department_db(period_start, period_end, work_day_indices)
+            # One grouped query feeds both attendance charts
+            dept_attendance_rates = db_queries.get_department_attendance_rates_db(period_start, period_end, work_day_indices)
+            absenteeism_data = {dept: rates["absenteeism_rate"] for dept, rates in dept_attendance_rates.items()}
             if absenteeism_data and hasattr(self, 'att_axs') and len(self.att_axs) > 0:
                 self.att_axs[0].bar(absenteeism_data.keys(), absenteeism_data.values(), color=bar_colors[1 % len(bar_colors)])
                 self.att_axs[0].set_title(_("dashboard_chart_absenteeism_title"))
@@ -359,7 +361,7 @@ class DashboardWindow(ThemedToplevel):
                 self.att_axs[0].tick_params(axis='x', rotation=30)
                 self.att_axs[0].grid(True, axis='y', linestyle='--', alpha=0.7)
             # Chart 2 (Attendance Tab): Department Attendance Adherence
-            adherence_data = db_queries.get_department_attendance_adherence_db(period_start, period_end, work_day_indices)
+            adherence_data = {dept: rates["adherence_rate"] for dept, rates in dept_attendance_rates.items()}
             if adherence_data and hasattr(self, 'att_axs') and len(self.att_axs) > 1:
                 self.att_axs[1].bar(adherence_data.keys(), adherence_data.values(), color=bar_colors[3 % len(bar_colors)])
                 self.att_axs[1].set_title(_("dashboard_chart_dept_adherence_title"))
@@ -41,11 +41,14 @@ from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolb
 import threading
 import queue
 import json
-import csv # Added missing import for csv
 from typing import List, Dict, Union, Any, Optional # Added Any and Optional
 from .employee_profile_window import EmployeeProfileWindow # Added import
 from utils import attendance_utils # For Instant Status Assessment
 from utils import fingerprint_log_processor # For Fingerprint Analysis
+from utils import employee_import # Background employee CSV import
+from utils import csv_export # Streaming CSV exports
+from utils import pdf_utils # Paged PDF exports
+from utils.zkteco_utils import sync_attendance_from_zkteco
 from .skill_management_window import SkillManagementWindow # New Import for Skills
 
 try:
@@ -76,7 +79,7 @@ from utils.gui_utils import (CustomDialog, extract_id_from_combobox_selection, #
 # For now, we'll assume they will be available for import from the 'ui' package.
 from ui.themed_tk_window import ThemedTkWindow
 from ui.themed_toplevel import ThemedToplevel # Base for modal dialogs
-from ui.components import AutocompleteCombobox # Corrected import
+from ui.components import AutocompleteCombobox, VirtualTreeviewPager # Corrected import
 # Import all modal windows that HRAppGUI will open
 from ui.employee_form_window import EmployeeFormWindow
 from ui.department_form_window import DepartmentManagementWindow
@@ -178,6 +181,20 @@ class HRAppGUI:
         # Attributes for storing after IDs for recurring tasks
         self.zk_sync_after_id: Optional[str] = None
         self.csv_export_after_id: Optional[str] = None
+        self.csv_export_queue: Optional[queue.Queue] = None
+        self.csv_export_cancel_event: Optional[threading.Event] = None
+        self.pdf_export_after_id: Optional[str] = None
+        self.pdf_export_queue: Optional[queue.Queue] = None
+        self.pdf_export_cancel_event: Optional[threading.Event] = None
+        self.fp_import_after_id: Optional[str] = None
+        self.fp_import_queue: Optional[queue.Queue] = None
+        self.fp_import_cancel_event: Optional[threading.Event] = None
+        self.emp_import_after_id: Optional[str] = None
+        self.emp_import_queue: Optional[queue.Queue] = None
+        self.emp_import_cancel_event: Optional[threading.Event] = None
+        self.emp_import_row_errors: List[tuple] = []
+        self.stats_summary_after_id: Optional[str] = None
+        self.stats_summary_queue: Optional[queue.Queue] = None
         # --- Build the Main UI ---
         # This method should create all the frames, widgets, etc.
         self._setup_main_ui()
@@ -1438,34 +1455,52 @@ class HRAppGUI:
             self._update_main_tree_headers()
     
     def _populate_treeview(self, employees_to_display: List[Dict]):
-        """Helper to clear and populate the treeview with given employees."""
+        """Shows an in-memory list of employees (e.g. search results) through the virtual list pager."""
         if not hasattr(self, 'tree') or not self.tree.winfo_exists(): # Ensure tree exists
             logger.error("_populate_treeview called but self.tree does not exist or is not visible.")
             return
+        self.employee_list_pager.reset(self._make_employee_list_page_fetcher(employees_to_display))
+
+    def _employee_tree_values(self, emp: Dict, status_data: Dict) -> tuple:
+        """Builds the main Treeview row values for an employee and their today-status dict."""
+        today_status_display = status_data.get("status_message", _("status_not_available"))
+        return (
+            emp.get(db_schema.COL_EMP_ID, ""),
+            emp.get(db_schema.COL_EMP_NAME, ""),
+            today_status_display, # Value for the "today_status" column
+            emp.get("department_name", "") or "Unassigned", # Use "department_name" key
+            emp.get(db_schema.COL_EMP_POSITION, ""),
+            f"{emp.get(db_schema.COL_EMP_SALARY) or 0.0:.2f}",
+            emp.get(db_schema.COL_EMP_STATUS, "N/A"),
+            emp.get(db_schema.COL_EMP_TERMINATION_DATE, ""),
+            "Yes" if emp.get("exclude_vacation_policy", 0) == 1 else "No"
+        )
 
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        if not employees_to_display:
-            return # Nothing to display
-        for emp in employees_to_display:
-            # --- Instant Status Assessment ---
-            # Moved this logic into _populate_treeview
-            status_data = attendance_utils.get_employee_attendance_status_today(emp[db_schema.COL_EMP_ID])
-            today_status_display = status_data.get("status_message", _("status_not_available"))
-            # --- End Instant Status Assessment ---
-
-            department_display_name = emp.get("department_name", _("unassigned_department")) or _("unassigned_department")
-            self.tree.insert("", "end", values=(
-                emp.get(db_schema.COL_EMP_ID, ""),
-                emp.get(db_schema.COL_EMP_NAME, ""),
-                today_status_display, # Value for the new "today_status" column
-                emp.get("department_name", "") or "Unassigned", # Use "department_name" key
-                emp.get(db_schema.COL_EMP_POSITION, ""),
-                f"{emp.get(db_schema.COL_EMP_SALARY, 0.0):.2f}",
-                emp.get(db_schema.COL_EMP_STATUS, "N/A"),
-                emp.get(db_schema.COL_EMP_TERMINATION_DATE, ""),
-                "Yes" if emp.get("exclude_vacation_policy", 0) == 1 else "No"
-            ))
+    def _employee_page_items(self, employees: List[Dict], keys: List[Any]) -> List[tuple]:
+        """Pairs each employee with its pager key and row values (batch today-status lookup). Runs on the pager thread."""
+        statuses_today = attendance_utils.get_employees_attendance_status_today(
+            [emp[db_schema.COL_EMP_ID] for emp in employees])
+        return [(key, self._employee_tree_values(emp, statuses_today.get(emp[db_schema.COL_EMP_ID], {})))
+                for key, emp in zip(keys, employees)]
+
+    def _fetch_employee_list_page(self, after_key: Any, before_key: Any, limit: int) -> List[tuple]:
+        """Pager source for the full employee list: keyset pages ordered by (name, id)."""
+        employees = db_queries.get_employee_list_page_db(after_key=after_key, before_key=before_key, limit=limit)
+        keys = [(emp[db_schema.COL_EMP_NAME], emp[db_schema.COL_EMP_ID]) for emp in employees]
+        return self._employee_page_items(employees, keys)
+
+    def _make_employee_list_page_fetcher(self, employees: List[Dict]):
+        """Pager source over an already-fetched list; keys are list positions."""
+        def _fetch(after_key: Optional[int], before_key: Optional[int], limit: int) -> List[tuple]:
+            if after_key is not None:
+                start = after_key + 1
+            elif before_key is not None:
+                start = max(0, before_key - limit)
+                limit = before_key - start
+            else:
+                start = 0
+            return self._employee_page_items(employees[start:start + limit], list(range(start, start + limit)))
+        return _fetch
             
     def _create_table_action_buttons(self, parent_frame):
         """Creates action buttons that appear below the employee table."""
@@ -1831,6 +1866,7 @@ class HRAppGUI:
         columns = (
             db_schema.COL_EMP_ID, # Corrected
             db_schema.COL_EMP_NAME, # Corrected
+            "today_status", # Instant status, filled per page by VirtualTreeviewPager
             "department_name", 
             db_schema.COL_EMP_POSITION, # Corrected
             db_schema.COL_EMP_SALARY, # Corrected
@@ -1853,11 +1889,12 @@ class HRAppGUI:
 
         scrollbar = ttk.Scrollbar(parent_frame, orient="vertical", command=self.tree.yview)
         h_scrollbar = ttk.Scrollbar(parent_frame, orient="horizontal", command=self.tree.xview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
         self.tree.configure(xscrollcommand=h_scrollbar.set) # Corrected xscrollcommand
         self.tree.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
         h_scrollbar.pack(side="bottom", fill="x", before=self.tree) # Pack horizontal scrollbar below tree
+        # Only a window of rows is kept in the tree; pages are fetched in the background while scrolling
+        self.employee_list_pager = VirtualTreeviewPager(self.tree, scrollbar, self._fetch_employee_list_page)
         self._update_main_tree_headers() # Set initial headers
 
     def _update_main_tree_headers(self):
@@ -1866,6 +1903,7 @@ class HRAppGUI:
             return
         header_map = {
             db_schema.COL_EMP_ID: _("header_emp_id"), db_schema.COL_EMP_NAME: _("header_emp_name"), # Corrected
+            "today_status": _("header_emp_today_status"),
             "department_name": _("header_emp_department"), db_schema.COL_EMP_POSITION: _("header_emp_position"), # Corrected
             db_schema.COL_EMP_SALARY: _("header_emp_salary"), db_schema.COL_EMP_STATUS: _("header_emp_status"), # Corrected
             db_schema.COL_EMP_TERMINATION_DATE: _("header_emp_termination_date"), # Corrected
@@ -1875,9 +1913,9 @@ class HRAppGUI:
             self.tree.heading(col_id, text=header_map.get(col_id, col_id.replace("_", " ").title()))
             
     def gui_show_all_employees(self):
-        all_employees = db_queries.get_all_employees_db() # Corrected
-        self._populate_treeview(all_employees)
-        self.status_var.set(f"Displaying all {len(all_employees)} employees. Select one to see details.")
+        self.employee_list_pager.reset(self._fetch_employee_list_page)
+        total_employees = db_queries.get_total_employee_count_db()
+        self.status_var.set(f"Displaying all {total_employees} employees. Select one to see details.")
         self._reset_selection_dependent_ui()
         self._update_stats_summary() # Update stats after showing all
 
@@ -1985,27 +2023,47 @@ class HRAppGUI:
         )
 
     def _update_stats_summary(self):
-        """Fetches and updates the miniature statistics display."""
+        """Refreshes the miniature statistics display; the figures are fetched on a worker thread."""
         if not all(hasattr(self, var_name) for var_name in ['total_employees_var_stats', 'active_employees_var_stats', 'avg_salary_var_stats']):
             logger.warning("Statistics summary StringVars not initialized. Skipping update.")
             return
-        try:
-            total_employees = len(db_queries.get_all_employees_db(include_archived=True))
-            active_employees_count = db_queries.get_total_employee_count_db() # Fetches active
-
-            active_employees_list = [emp for emp in db_queries.get_all_employees_db() if emp.get(db_schema.COL_EMP_STATUS) == db_schema.STATUS_ACTIVE]
-            salaries = [emp.get(db_schema.COL_EMP_SALARY, 0.0) for emp in active_employees_list if emp.get(db_schema.COL_EMP_SALARY) is not None]
-            avg_salary = sum(salaries) / len(salaries) if salaries else 0.0
-
-            self.total_employees_var_stats.set(f"{_('stats_total_employees_label')}: {total_employees}")
-            self.active_employees_var_stats.set(f"{_('stats_active_employees_label')}: {active_employees_count}")
-            self.avg_salary_var_stats.set(f"{_('stats_avg_salary_label')}: {avg_salary:,.2f}")
+        if self.stats_summary_after_id:
+            self.root.after_cancel(self.stats_summary_after_id) # A newer refresh supersedes the pending one
+        self.stats_summary_queue = queue.Queue()
+        thread = threading.Thread(target=self._fetch_stats_summary_threaded, args=(self.stats_summary_queue,), daemon=True)
+        thread.start()
+        self.stats_summary_after_id = self.root.after(200, self._check_stats_summary_status, self.stats_summary_queue)
 
+    def _fetch_stats_summary_threaded(self, q_comm: queue.Queue):
+        """Worker function running the stats summary aggregate in a separate thread."""
+        try:
+            q_comm.put({"type": "summary", "data": db_queries.get_employee_stats_summary_db()})
         except Exception as e:
-            logger.error(f"Error updating stats summary: {e}")
+            q_comm.put({"type": "error", "data": e})
+        finally:
+            db_schema.close_connection()
+
+    def _check_stats_summary_status(self, q_comm: queue.Queue):
+        """Polls the stats summary queue and fills in the StringVars once the figures arrive."""
+        self.stats_summary_after_id = None
+        if q_comm is not self.stats_summary_queue:
+            return # Result of a superseded refresh
+        try:
+            result = q_comm.get_nowait()
+        except queue.Empty:
+            self.stats_summary_after_id = self.root.after(200, self._check_stats_summary_status, q_comm)
+            return
+        self.stats_summary_queue = None
+        if result["type"] == "error":
+            logger.error(f"Error updating stats summary: {result['data']}")
             self.total_employees_var_stats.set(f"{_('stats_total_employees_label')}: Error")
             self.active_employees_var_stats.set(f"{_('stats_active_employees_label')}: Error")
             self.avg_salary_var_stats.set(f"{_('stats_avg_salary_label')}: Error")
+            return
+        stats = result["data"]
+        self.total_employees_var_stats.set(f"{_('stats_total_employees_label')}: {stats['total_employees']}")
+        self.active_employees_var_stats.set(f"{_('stats_active_employees_label')}: {stats['active_employees']}")
+        self.avg_salary_var_stats.set(f"{_('stats_avg_salary_label')}: {stats['avg_salary']:,.2f}")
 
     def gui_clock_in(self):
         emp_id = None
@@ -2337,9 +2395,6 @@ class HRAppGUI:
 
         try:
             logs = db_queries.get_attendance_logs_for_employee_period(emp_id, start_date_str, end_date_str) # Corrected
-            total_hours = 0.0
-            present_days = set()
-
             if not logs:
                 # messagebox.showinfo("No Records", "No attendance records found for the selected criteria.", parent=self.root) # Avoid modal dialog on tab change
                 return
@@ -2356,8 +2411,6 @@ class HRAppGUI:
                     duration = db_queries.calculate_worked_duration(log[db_schema.COL_ATT_CLOCK_IN], clock_out_dt_str) # Corrected
                     if duration is not None:
                         duration_str = f"{duration:.2f}"
-                        total_hours += duration
-                        present_days.add(log[db_schema.COL_ATT_LOG_DATE]) # Corrected
                 
                 self.attendance_log_tree.insert("", "end", values=(
                     log[db_schema.COL_ATT_LOG_DATE], # Corrected
@@ -2366,6 +2419,10 @@ class HRAppGUI:
                     duration_str
                 ))
             
+            # Totals come from the daily rollup; a day counts as present once it has a closed segment
+            daily_rows = db_queries.get_attendance_daily_db(emp_id, start_date_str, end_date_str)
+            total_hours = sum(row[db_schema.COL_AD_WORKED_SECONDS] for row in daily_rows) / 3600
+            present_days = [row for row in daily_rows if row[db_schema.COL_AD_LAST_OUT]]
             self.attendance_total_hours_var.set(f"Total Hours Worked: {total_hours:.2f}")
             self.attendance_total_days_var.set(f"Total Days Present: {len(present_days)}")
 
@@ -2474,9 +2531,11 @@ class HRAppGUI:
         )
         
     def gui_export_to_csv(self):
-        """Exports all employee data to a CSV file."""
-        employees = db_queries.get_all_employees_db()
-        if not employees:
+        """Exports all employee data to a CSV file, streaming from the database in a background thread."""
+        if self.csv_export_queue is not None:
+            messagebox.showinfo("Export CSV", "An export is already running.", parent=self.root)
+            return
+        if not db_queries.get_total_employee_count_db():
             messagebox.showinfo("Export CSV", "No employee data to export.", parent=self.root)
             return
 
@@ -2489,117 +2548,124 @@ class HRAppGUI:
         if not filepath_to_save:
             return
 
-        fieldnames = [
-            db_schema.COL_EMP_ID, db_schema.COL_EMP_NAME, "department_name", db_schema.COL_EMP_POSITION,
-            db_schema.COL_EMP_SALARY, db_schema.COL_EMP_VACATION_DAYS, db_schema.COL_EMP_START_DATE,
-            db_schema.COL_EMP_PHONE, db_schema.COL_EMP_EMAIL, db_schema.COL_EMP_GENDER,
-            db_schema.COL_EMP_MARITAL_STATUS, db_schema.COL_EMP_EDUCATION,
-            db_schema.COL_EMP_EMPLOYMENT_HISTORY, db_schema.COL_EMP_DEVICE_USER_ID,
-            db_schema.COL_EMP_PHOTO_PATH, "exclude_vacation_policy",
-            db_schema.COL_EMP_STATUS, db_schema.COL_EMP_TERMINATION_DATE
-        ]
+        self.csv_export_queue = queue.Queue()
+        self.csv_export_cancel_event = threading.Event()
+        self.status_var.set(f"Exporting employees to {os.path.basename(filepath_to_save)}...")
+        thread = threading.Thread(target=self._perform_csv_export_threaded, args=(filepath_to_save, self.csv_export_queue, self.csv_export_cancel_event), daemon=True)
+        thread.start()
+        self._check_csv_export_status()
+
+    def _perform_csv_export_threaded(self, filepath: str, q_comm: queue.Queue, cancel_event: threading.Event):
+        """Worker function writing the employee CSV export in a separate thread."""
         try:
-            with open(filepath_to_save, 'w', newline='', encoding='utf-8-sig') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction='ignore')
-                writer.writeheader()
-                for emp in employees:
-                    writer.writerow(emp)
-            messagebox.showinfo("Export CSV", f"Employee data successfully exported to\n{filepath_to_save}", parent=self.root)
-            self.status_var.set(f"Data exported to CSV: {os.path.basename(filepath_to_save)}")
-        except IOError as e:
-            messagebox.showerror("Export Error", f"Failed to write CSV file: {e}", parent=self.root)
-
-    def gui_export_to_pdf(self): # type: ignore
-        employees = db_queries.get_all_employees_db() # Corrected
-        """Exports all employee data to a PDF file."""
-        if not employees:
-            messagebox.showinfo("Export PDF", "No employee data to export.")
+            summary = csv_export.export_employees_csv(filepath, q_comm=q_comm, cancel_event=cancel_event)
+            q_comm.put({"type": "summary", "data": summary})
+        except Exception as e:
+            q_comm.put({"type": "error", "data": e})
+        finally:
+            db_schema.close_connection()
+
+    def _check_csv_export_status(self):
+        """Polls the CSV export queue, showing progress in the status bar until the export finishes."""
+        self.csv_export_after_id = None
+        try:
+            while True:
+                result = self.csv_export_queue.get_nowait()
+                if result.get("type") == "progress_update":
+                    self.status_var.set(f"Exporting employees: {result['current']}/{result['total']} rows written...")
+                elif result.get("type") in ("summary", "error"):
+                    self._finish_csv_export(result)
+                    return
+        except queue.Empty:
+            pass
+        self.csv_export_after_id = self.root.after(200, self._check_csv_export_status)
+
+    def _finish_csv_export(self, result: Dict[str, Any]):
+        self.csv_export_queue = None
+        self.csv_export_cancel_event = None
+        if result.get("type") == "error":
+            error_obj = result["data"]
+            logger.error(f"Error exporting employees to CSV: {error_obj}")
+            self.status_var.set("CSV export failed.")
+            messagebox.showerror("Export Error", f"Failed to write CSV file: {error_obj}", parent=self.root)
+            return
+        summary = result["data"]
+        if summary["cancelled"]:
+            self.status_var.set("CSV export cancelled.")
+            return
+        messagebox.showinfo("Export CSV", f"Employee data successfully exported to\n{summary['filepath']}", parent=self.root)
+        self.status_var.set(f"Data exported to CSV: {os.path.basename(summary['filepath'])} ({summary['rows_written']} rows)")
+
+    def gui_export_to_pdf(self):
+        """Exports all employee data to a PDF file, built page by page in a background thread."""
+        if self.pdf_export_queue is not None:
+            messagebox.showinfo("Export PDF", "An export is already running.", parent=self.root)
+            return
+        if not db_queries.get_total_employee_count_db():
+            messagebox.showinfo("Export PDF", "No employee data to export.", parent=self.root)
             return
 
         filepath = filedialog.asksaveasfilename(
             defaultextension=".pdf",
             filetypes=[(_("pdf_file_type_label"), "*.pdf"), (_("all_files_type_label"), "*.*")],
-            title="Save Employees as PDF"
+            title="Save Employees as PDF",
+            parent=self.root
         )
-        if not filepath: # Check the original variable name
+        if not filepath:
             return # User cancelled
 
+        self.pdf_export_queue = queue.Queue()
+        self.pdf_export_cancel_event = threading.Event()
+        self.status_var.set(f"Exporting employees to {os.path.basename(filepath)}...")
+        thread = threading.Thread(target=self._perform_pdf_export_threaded, args=(filepath, self.pdf_export_queue, self.pdf_export_cancel_event), daemon=True)
+        thread.start()
+        self._check_pdf_export_status()
+
+    def _perform_pdf_export_threaded(self, filepath: str, q_comm: queue.Queue, cancel_event: threading.Event):
+        """Worker function writing the employee list PDF in a separate thread."""
+        try:
+            summary = pdf_utils.export_employee_list_pdf(filepath, q_comm=q_comm, cancel_event=cancel_event)
+            q_comm.put({"type": "summary", "data": summary})
+        except Exception as e:
+            q_comm.put({"type": "error", "data": e})
+        finally:
+            db_schema.close_connection()
 
+    def _check_pdf_export_status(self):
+        """Polls the PDF export queue, showing progress in the status bar until the export finishes."""
+        self.pdf_export_after_id = None
         try:
-            doc = SimpleDocTemplate(filepath, pagesize=letter)
-            elements = []
-            styles = getSampleStyleSheet()
-
-            elements.append(Paragraph("Employee List", styles['h1']))
-            elements.append(Spacer(1, 0.2*72)) # 0.2 inch space
-
-            data = [[
-                db_schema.COL_EMP_ID.capitalize(), # Corrected
-                db_schema.COL_EMP_NAME.capitalize(), # Corrected
-                "Department", # Use a generic "Department" as COL_EMP_DEPARTMENT is now department_name
-                db_schema.COL_EMP_POSITION.capitalize(), # Corrected
-                db_schema.COL_EMP_SALARY.capitalize(), # Corrected
-                db_schema.COL_EMP_VACATION_DAYS.capitalize().replace("_", " "), # Corrected
-                db_schema.COL_EMP_START_DATE.capitalize().replace("_", " "), # Corrected
-                db_schema.COL_EMP_PHONE.capitalize(), # Corrected
-                db_schema.COL_EMP_EMAIL.capitalize(), # Corrected
-                db_schema.COL_EMP_GENDER.capitalize(), # Corrected
-                db_schema.COL_EMP_MARITAL_STATUS.capitalize().replace("_", " "), # Corrected
-                db_schema.COL_EMP_EDUCATION.capitalize().replace("_", " "), # Corrected
-                db_schema.COL_EMP_EMPLOYMENT_HISTORY.capitalize().replace("_", " "), # Corrected
-                db_schema.COL_EMP_PHOTO_PATH.capitalize().replace("_", " "), # Corrected
-                db_schema.COL_EMP_DEVICE_USER_ID.capitalize().replace("_", " "), # Corrected
-                "Exclude Vacation Policy", # New header
-                db_schema.COL_EMP_STATUS.capitalize(), # Corrected
-                db_schema.COL_EMP_TERMINATION_DATE.capitalize().replace("_", " ") # Corrected
-            ]] # Header row
-            for emp in employees:
-                # --- Instant Status Assessment ---
-                status_data = attendance_utils.get_employee_attendance_status_today(emp[db_schema.COL_EMP_ID])
-                today_status_display = status_data.get("status_message", _("status_not_available")) 
-                # status_not_available would be a new localization key e.g. "Status N/A"
-                # --- End Instant Status Assessment ---
-
-                data.append([
-                    emp[db_schema.COL_EMP_ID], # Corrected
-                    emp[db_schema.COL_EMP_NAME], # Corrected
-                    emp.get("department_name", "Unassigned"), # Corrected: Use "department_name"
-                    emp[db_schema.COL_EMP_POSITION], # Corrected
-                    f"${emp[db_schema.COL_EMP_SALARY]:.2f}", # Corrected
-                    emp.get(db_schema.COL_EMP_VACATION_DAYS, 0), # Corrected
-                    emp.get(db_schema.COL_EMP_START_DATE, ""), # Corrected
-                    emp.get(db_schema.COL_EMP_PHONE, ""), # Corrected
-                    emp.get(db_schema.COL_EMP_EMAIL, ""), # Corrected
-                    emp.get(db_schema.COL_EMP_GENDER, ""), # Corrected
-                    emp.get(db_schema.COL_EMP_MARITAL_STATUS, ""), # Corrected
-                    emp.get(db_schema.COL_EMP_EDUCATION, ""), # Corrected
-                    emp.get(db_schema.COL_EMP_EMPLOYMENT_HISTORY, ""), # Corrected
-                    emp.get(db_schema.COL_EMP_PHOTO_PATH, ""), # Corrected
-                    "Yes" if emp.get("exclude_vacation_policy", 0) == 1 else "No", # Add exclusion status
-                    emp.get(db_schema.COL_EMP_DEVICE_USER_ID, ""), # Corrected
-                    emp.get(db_schema.COL_EMP_STATUS, "N/A"), # Corrected
-                    emp.get(db_schema.COL_EMP_TERMINATION_DATE, "") # Corrected
-                ])
-            
-            table = Table(data)
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), reportlab_colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), reportlab_colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), reportlab_colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, reportlab_colors.black) # Use reportlab_colors
-            ]))
-            elements.append(table)
-            doc.build(elements)
-            messagebox.showinfo("Export PDF", f"Employee data successfully exported to\n{filepath}")
-            self.status_var.set(f"Data exported to PDF: {os.path.basename(filepath)}")
-        except Exception as e: # Catching general exception for ReportLab
-            logger.error(f"Error generating PDF report: {e}", exc_info=True)
-            messagebox.showerror("Export PDF Error", f"Failed to export to PDF: {e}")
+            while True:
+                result = self.pdf_export_queue.get_nowait()
+                if result.get("type") == "progress_update":
+                    self.status_var.set(f"Exporting employees to PDF: {result['current']}/{result['total']} rows...")
+                elif result.get("type") in ("summary", "error"):
+                    self._finish_pdf_export(result)
+                    return
+        except queue.Empty:
+            pass
+        self.pdf_export_after_id = self.root.after(200, self._check_pdf_export_status)
+
+    def _finish_pdf_export(self, result: Dict[str, Any]):
+        self.pdf_export_queue = None
+        self.pdf_export_cancel_event = None
+        if result.get("type") == "error":
+            error_obj = result["data"]
+            logger.error(f"Error generating PDF report: {error_obj}")
+            self.status_var.set("PDF export failed.")
+            messagebox.showerror("Export PDF Error", f"Failed to export to PDF: {error_obj}", parent=self.root)
+            return
+        summary = result["data"]
+        if summary["cancelled"]:
+            self.status_var.set("PDF export cancelled.")
+            return
+        messagebox.showinfo("Export PDF", f"Employee data successfully exported to\n{summary['filepath']}", parent=self.root)
+        self.status_var.set(f"Data exported to PDF: {os.path.basename(summary['filepath'])} ({summary['rows_written']} rows, {summary['pages']} pages)")
 
     def gui_import_from_csv(self):
+        if self.emp_import_queue is not None:
+            messagebox.showinfo("Import CSV", "An employee import is already running.", parent=self.root)
+            return
         filepath = filedialog.askopenfilename(
             filetypes=[(_("csv_file_type_label"), "*.csv"), (_("all_files_type_label"), "*.*")],
             title="Import Employees from CSV"
@@ -2607,92 +2673,73 @@ class HRAppGUI:
         if not filepath:
             return
 
+        self.emp_import_queue = queue.Queue()
+        self.emp_import_cancel_event = threading.Event()
+        self.emp_import_row_errors = []
+        self.status_var.set(f"Importing employees from {os.path.basename(filepath)}...")
+        thread = threading.Thread(target=self._perform_emp_import_threaded, args=(filepath, self.emp_import_queue, self.emp_import_cancel_event), daemon=True)
+        thread.start()
+        self._check_emp_import_status()
 
-        imported_count = 0
-        error_count = 0
-        db_conn_for_import = None # Initialize connection variable
-
+    def _perform_emp_import_threaded(self, filepath: str, q_comm: queue.Queue, cancel_event: threading.Event):
+        """Worker function importing employees from a CSV file in a separate thread."""
         try:
-            db_conn_for_import = sqlite3.connect(DATABASE_NAME)
-            # Optionally, start a transaction explicitly if needed, though commit/rollback handles it.
-            # db_conn_for_import.execute("BEGIN TRANSACTION")
-
-            with open(filepath, 'r', newline='', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                # Expected headers now include new fields
-                for row_num, row_data in enumerate(reader, 1): # Use enumerate for better logging
-                    try:
-                        # For department, we expect department NAME in CSV, need to find its ID
-                        dept_name_csv = row_data.get(db_schema.COL_EMP_DEPARTMENT) # Corrected # CSV provides department name
-                        dept_id_for_import = None
-                        if dept_name_csv:
-                            dept_obj = get_department_by_name_db(dept_name_csv)
-                            if dept_obj:
-                                dept_id_for_import = dept_obj[COL_DEPT_ID]
-                            else:
-                                logger.warning(f"Department '{dept_name_csv}' not found for row {row_num}. Employee will be unassigned.")
-                        name = row_data[db_schema.COL_EMP_NAME] # Corrected
-                
-                        pos = row_data[db_schema.COL_EMP_POSITION] # Corrected
-                        salary = float(row_data[db_schema.COL_EMP_SALARY]) # Corrected
-                        phone = row_data.get(COL_EMP_PHONE) # Optional
-                        email = row_data.get(COL_EMP_EMAIL) # Optional
-                        photo_path_csv = row_data.get(COL_EMP_PHOTO_PATH) # Optional
-                        start_date_csv = row_data.get(COL_EMP_START_DATE) # Optional but recommended
-                        marital_status_csv = row_data.get(COL_EMP_MARITAL_STATUS) # Optional
-                        gender_csv = row_data.get(COL_EMP_GENDER) # Optional, ensure CSV header matches COL_EMP_GENDER
-                        education_csv = row_data.get(COL_EMP_EDUCATION) # Optional
-                        employment_history_csv = row_data.get(COL_EMP_EMPLOYMENT_HISTORY) # Optional
-                        # Handle exclude_vacation_policy, default to 0 if missing or invalid
-                        exclude_vacation_csv = int(row_data.get("exclude_vacation_policy", "0")) if row_data.get("exclude_vacation_policy", "0").isdigit() else 0
-                        device_user_id_csv = row_data.get(COL_EMP_DEVICE_USER_ID) # Optional
-                        # Handle vacation_days, default to 0 if missing or invalid in CSV
-                        try:
-                            vacation_days = int(row_data.get(COL_EMP_VACATION_DAYS, "0"))
-                        except ValueError:
-                            vacation_days = 0 # Default if conversion fails
-
-                        # Pass the existing connection to add_employee
-                        db_queries.add_employee_db(name, dept_id_for_import, pos, salary, vacation_days, 
-                                     phone, email, photo_path_csv, 
-                                     start_date_csv, marital_status_csv, gender_csv, education_csv, employment_history_csv,
-                                     exclude_vacation_policy=exclude_vacation_csv, device_user_id=device_user_id_csv,
-                                     existing_conn=db_conn_for_import)
-                        imported_count += 1
-                    except (InvalidInputError, DatabaseOperationError) as add_err:
-                        logger.warning(f"Skipping row {row_num} during CSV import due to error: {row_data} - {add_err}")
-                        error_count +=1
-                    except KeyError as ke: # Missing column in CSV
-                        logger.warning(f"Skipping row {row_num} due to missing column '{ke}': {row_data}")
-                        error_count += 1
-                    except ValueError as ve: # Bad salary format
-                        logger.warning(f"Skipping row {row_num} due to invalid salary format: {row_data} - {ve}")
-                        error_count += 1
-            
-            db_conn_for_import.commit() # Commit all successful inserts at once
-            logger.info(f"CSV Import: Committed {imported_count} new employees.")
-
-        except sqlite3.Error as db_e: # Catch errors related to the connection or final commit
-            if db_conn_for_import:
-                db_conn_for_import.rollback() # Rollback if commit failed or other DB error
-            logger.error(f"Database error during CSV import transaction: {db_e}")
-            messagebox.showerror("Import Error", f"A database error occurred during import: {db_e}")
-            # Potentially update error_count or set imported_count to 0 if the whole transaction failed
-        except IOError as e:
-            messagebox.showerror("Import Error", f"Failed to read CSV file: {e}")
-        except Exception as e: # Catch other potential errors during processing
-            if db_conn_for_import:
-                db_conn_for_import.rollback()
-            logger.error(f"An unexpected error occurred during CSV import: {e}")
-            messagebox.showerror("Import Error", f"An unexpected error occurred during import: {e}")
+            summary = employee_import.import_employees_csv(filepath, q_comm=q_comm, cancel_event=cancel_event)
+            q_comm.put({"type": "summary", "data": summary})
+        except Exception as e:
+            q_comm.put({"type": "error", "data": e})
         finally:
-            if db_conn_for_import:
-                db_conn_for_import.close()
+            db_schema.close_connection()
 
+    def _check_emp_import_status(self):
+        """Polls the employee import queue, showing progress in the status bar until the import finishes."""
+        self.emp_import_after_id = None
+        try:
+            while True:
+                result = self.emp_import_queue.get_nowait()
+                if result.get("type") == "progress_update":
+                    self.status_var.set(f"Importing employees: {result['current']}/{result['total']} rows read, "
+                                        f"{len(self.emp_import_row_errors)} with errors...")
+                elif result.get("type") == "row_errors":
+                    self.emp_import_row_errors.extend(result["errors"])
+                elif result.get("type") in ("summary", "error"):
+                    self._finish_emp_import(result)
+                    return
+        except queue.Empty:
+            pass
+        self.emp_import_after_id = self.root.after(200, self._check_emp_import_status)
+
+    def _finish_emp_import(self, result: Dict[str, Any]):
+        self.emp_import_queue = None
+        self.emp_import_cancel_event = None
+        if result.get("type") == "error":
+            error_obj = result["data"]
+            logger.error(f"Error during employee CSV import: {error_obj}")
+            self.status_var.set("CSV Import failed.")
+            if isinstance(error_obj, InvalidInputError):
+                messagebox.showerror("Import Error", str(error_obj), parent=self.root)
+            elif isinstance(error_obj, (IOError, UnicodeDecodeError)):
+                messagebox.showerror("Import Error", f"Failed to read CSV file: {error_obj}", parent=self.root)
+            else:
+                messagebox.showerror("Import Error", f"An error occurred during import: {error_obj}", parent=self.root)
+            return
+
+        summary = result["data"]
         self.gui_show_all_employees()
-        summary_message = f"Import complete.\nSuccessfully imported: {imported_count}\nRows with errors: {error_count}"
-        self.status_var.set(f"CSV Import: {imported_count} imported, {error_count} errors.")
-        messagebox.showinfo("Import CSV", summary_message)
+        for row_num, reason in self.emp_import_row_errors:
+            logger.warning(f"CSV import skipped row {row_num}: {reason}")
+        status = "Import cancelled" if summary["cancelled"] else "Import complete"
+        summary_message = (f"{status}.\nSuccessfully imported: {summary['imported']}\nRows with errors: {summary['error_count']}"
+                           f"\n({summary['processed_rows']} rows in {summary['elapsed_seconds']}s)")
+        if summary["unknown_departments"]:
+            summary_message += f"\n\nUnknown departments (employees left unassigned): {', '.join(summary['unknown_departments'][:10])}"
+        if self.emp_import_row_errors:
+            shown_errors = "\n".join(f"Row {row_num}: {reason}" for row_num, reason in self.emp_import_row_errors[:10])
+            more_note = f"\n... and {len(self.emp_import_row_errors) - 10} more (see the log)." if len(self.emp_import_row_errors) > 10 else ""
+            summary_message += f"\n\nSkipped rows:\n{shown_errors}{more_note}"
+        self.emp_import_row_errors = []
+        self.status_var.set(f"CSV Import: {summary['imported']} imported, {summary['error_count']} errors.")
+        messagebox.showinfo("Import CSV", summary_message, parent=self.root)
   
     @staticmethod
     def get_theme_palette(theme_name="light"):
@@ -3060,7 +3107,8 @@ class HRAppGUI:
                     messagebox.showerror("Sync Error", f"An unexpected error occurred: {error_obj}", parent=self.root)
             elif result.get("type") == "summary": # Success
                 summary = result["data"]
-                success_msg = f"Sync successful. Processed: {summary.get('processed_device_logs',0)} logs."
+                success_msg = (f"Sync successful. Processed: {summary.get('processed_device_logs',0)} logs, "
+                               f"{summary.get('new_device_logs',0)} new in {summary.get('elapsed_seconds',0)}s.")
                 self._update_sync_status_display(status="✅ Online", last_sync_time=datetime.now().strftime("%Y-%m-%d %I:%M %p"), message=success_msg)
                 self._add_to_sync_log("✅", success_msg)
                # db_queries.clock_in_employee(self.selected_employee_id, performed_by_user_id=user_id) # This line seems out of place here
@@ -3068,6 +3116,9 @@ class HRAppGUI:
                                     f"Sync Summary:\nProcessed from device: {summary.get('processed_device_logs',0)}\n"
                                     f"Clock-Ins Added to DB: {summary.get('db_clock_ins',0)}\n"
                                     f"Clock-Outs Updated in DB: {summary.get('db_clock_outs',0)}\n"
+                                    f"New Since Last Sync: {summary.get('new_device_logs',0)} "
+                                    f"({summary.get('punches_per_second',0)} punches/s)\n"
+                                    f"Duplicates Skipped: {summary.get('skipped_duplicates',0)}\n"
                                     f"DB/Processing Errors: {summary.get('errors',0)}\n"
                                     f"Unknown Device User IDs: {summary.get('unknown_user_id',0)}",
                                     parent=self.root)
@@ -3111,6 +3162,29 @@ class HRAppGUI:
     def _cancel_all_recurring_tasks(self):
         """Cancels all recurring 'after' tasks managed by HRAppGUI."""
         logger.info("HRAppGUI: Cancelling all recurring tasks.")
+        if self.fp_import_after_id:
+            self.root.after_cancel(self.fp_import_after_id)
+            self.fp_import_after_id = None
+        if self.fp_import_cancel_event:
+            self.fp_import_cancel_event.set() # Let a running import stop at its next chunk
+        if self.emp_import_after_id:
+            self.root.after_cancel(self.emp_import_after_id)
+            self.emp_import_after_id = None
+        if self.emp_import_cancel_event:
+            self.emp_import_cancel_event.set()
+        if self.csv_export_after_id:
+            self.root.after_cancel(self.csv_export_after_id)
+            self.csv_export_after_id = None
+        if self.csv_export_cancel_event:
+            self.csv_export_cancel_event.set() # Stops the export and removes the partial file
+        if self.pdf_export_after_id:
+            self.root.after_cancel(self.pdf_export_after_id)
+            self.pdf_export_after_id = None
+        if self.pdf_export_cancel_event:
+            self.pdf_export_cancel_event.set()
+        if self.stats_summary_after_id:
+            self.root.after_cancel(self.stats_summary_after_id)
+            self.stats_summary_after_id = None
         # Add cancellation for other specific timers if they exist
 
     def toggle_theme(self, event=None):
@@ -3192,6 +3266,19 @@ class HRAppGUI:
         import_button.pack(pady=10, padx=10, anchor="w")
         self._add_translatable_widget(import_button, import_btn_key)
 
+        attendance_import_frame = ttk.Frame(parent_frame)
+        attendance_import_frame.pack(fill="x", padx=10, pady=(0, 5))
+        import_att_btn_key = "fp_import_attendance_btn"
+        self.fp_import_attendance_btn = ttk.Button(attendance_import_frame, text=_(import_att_btn_key), command=self._gui_import_fingerprint_to_attendance, bootstyle=db_schema.BS_ADD)
+        self.fp_import_attendance_btn.pack(side="left")
+        self._add_translatable_widget(self.fp_import_attendance_btn, import_att_btn_key)
+        cancel_btn_key = "fp_import_cancel_btn"
+        self.fp_import_cancel_btn = ttk.Button(attendance_import_frame, text=_(cancel_btn_key), command=self._gui_cancel_fingerprint_import, state="disabled")
+        self.fp_import_cancel_btn.pack(side="left", padx=5)
+        self._add_translatable_widget(self.fp_import_cancel_btn, cancel_btn_key)
+        self.fp_import_progressbar = ttk.Progressbar(attendance_import_frame, mode="determinate")
+        self.fp_import_progressbar.pack(side="left", fill="x", expand=True, padx=5)
+
         results_lf_key = "fp_analysis_results_frame_title"
         results_frame = ttk.LabelFrame(parent_frame, text=_(results_lf_key), padding="10")
         results_frame.pack(fill="both", expand=True, padx=10, pady=5)
@@ -3232,26 +3319,99 @@ class HRAppGUI:
         if not filepath: return
 
         try:
+            parse_report = fingerprint_log_processor.new_parse_report()
             with self.parent_app.BusyContextManager(self.root): # Use BusyContextManager
-                parsed_logs = fingerprint_log_processor.parse_fingerprint_csv(filepath)
-            
-            for item in self.fp_log_tree.get_children():
-                self.fp_log_tree.delete(item)
-            
-            for log_entry in parsed_logs:
-                self.fp_log_tree.insert("", "end", values=(
-                    log_entry["employee_id"],
-                    log_entry["timestamp_str"],
-                    log_entry["event_type_display"],
-                    log_entry["device_id"]
-                ))
-            messagebox.showinfo(_("success_title"), f"Successfully imported and displayed {len(parsed_logs)} fingerprint log entries.", parent=self.root)
+                for item in self.fp_log_tree.get_children():
+                    self.fp_log_tree.delete(item)
+
+                for record in fingerprint_log_processor.iter_fingerprint_csv(filepath, parse_report):
+                    self.fp_log_tree.insert("", "end", values=(
+                        record.employee_id,
+                        str(record.timestamp),
+                        fingerprint_log_processor.get_event_type_display(record.event_code),
+                        record.device_id or "N/A"
+                    ))
+            skipped_note = f" {parse_report['bad_rows']} invalid row(s) were skipped." if parse_report["bad_rows"] else ""
+            messagebox.showinfo(_("success_title"), f"Successfully imported and displayed {parse_report['parsed']} fingerprint log entries.{skipped_note}", parent=self.root)
         except ValueError as ve: # Catch specific error from parser for bad headers
             messagebox.showerror(_("input_error_title"), str(ve), parent=self.root)
         except Exception as e:
             logger.error(f"Error importing fingerprint log: {e}", exc_info=True)
             messagebox.showerror(_("error_title"), f"Failed to import fingerprint log: {e}", parent=self.root)
 
+    def _gui_import_fingerprint_to_attendance(self):
+        filepath = filedialog.askopenfilename(
+            title=_("fp_import_attendance_btn"),
+            filetypes=[(_("csv_file_type_label"), "*.csv"), (_("all_files_type_label"), "*.*")],
+            parent=self.root
+        )
+        if not filepath: return
+
+        self.fp_import_queue = queue.Queue()
+        self.fp_import_cancel_event = threading.Event()
+        self.fp_import_attendance_btn.config(state="disabled")
+        self.fp_import_cancel_btn.config(state="normal")
+        self.fp_import_progressbar.config(value=0)
+        thread = threading.Thread(target=self._perform_fp_import_threaded, args=(filepath, self.fp_import_queue, self.fp_import_cancel_event), daemon=True)
+        thread.start()
+        self._check_fp_import_status()
+
+    def _gui_cancel_fingerprint_import(self):
+        if self.fp_import_cancel_event:
+            self.fp_import_cancel_event.set() # The import stops after the chunk being written
+            self.fp_import_cancel_btn.config(state="disabled")
+
+    def _perform_fp_import_threaded(self, filepath: str, q_comm: queue.Queue, cancel_event: threading.Event):
+        """Worker function importing a fingerprint log into attendance_log in a separate thread."""
+        try:
+            summary = fingerprint_log_processor.import_fingerprint_csv(filepath, q_comm=q_comm, cancel_event=cancel_event)
+            q_comm.put({"type": "summary", "data": summary})
+        except Exception as e:
+            q_comm.put({"type": "error", "data": e})
+        finally:
+            db_schema.close_connection()
+
+    def _check_fp_import_status(self):
+        """Polls the fingerprint import queue, updating the progress bar until the import finishes."""
+        self.fp_import_after_id = None
+        try:
+            while True:
+                result = self.fp_import_queue.get_nowait()
+                if result.get("type") == "progress_init":
+                    self.fp_import_progressbar.config(maximum=max(result["total"], 1), value=0)
+                elif result.get("type") == "progress_update":
+                    self.fp_import_progressbar.config(value=result["current"])
+                else:
+                    self._finish_fp_import(result)
+                    return
+        except queue.Empty:
+            pass
+        self.fp_import_after_id = self.root.after(200, self._check_fp_import_status)
+
+    def _finish_fp_import(self, result: Dict[str, Any]):
+        self.fp_import_attendance_btn.config(state="normal")
+        self.fp_import_cancel_btn.config(state="disabled")
+        if result.get("type") == "error":
+            error_obj = result["data"]
+            logger.error(f"Error importing fingerprint log into attendance: {error_obj}")
+            if isinstance(error_obj, ValueError): # Bad headers or out-of-order file
+                messagebox.showerror(_("input_error_title"), str(error_obj), parent=self.root)
+            else:
+                messagebox.showerror(_("error_title"), f"Failed to import fingerprint log: {error_obj}", parent=self.root)
+            return
+        summary = result["data"]
+        status = "Import cancelled" if summary["cancelled"] else "Import complete"
+        messagebox.showinfo(_("fp_import_attendance_title"),
+                            f"{status}.\nPunches processed: {summary['processed_rows']} "
+                            f"({summary['punches_per_second']} punches/s)\n"
+                            f"Punches imported: {summary['imported_punches']}\n"
+                            f"Attendance rows added: {summary['db_clock_ins']}\n"
+                            f"Clock-outs recorded: {summary['db_clock_outs']}\n"
+                            f"Duplicates skipped: {summary['skipped_duplicates']}\n"
+                            f"Unknown employee IDs: {summary['unknown_user_id']}\n"
+                            f"Invalid rows skipped: {summary['parse_report']['bad_rows']}",
+                            parent=self.root)
+
     def gui_sync_from_zkteco(self):
         # Use IP and Port from db_schema (database settings)
         ip = db_schema.get_app_setting_db(db_schema.SETTING_ZKTECO_DEVICE_IP, config.ZKTECO_DEVICE_IP)
@@ -6,6 +6,9 @@ import ttkbootstrap as ttkb
 from ttkbootstrap.constants import *
 from ttkbootstrap.widgets import DateEntry # Assuming DateEntry is used
 import logging
+import os
+import threading
+import queue
 from datetime import datetime, date as dt_date, timedelta # type: ignore
 
 # --- Project-specific imports ---
@@ -35,6 +38,13 @@ class PayrollWindow(ThemedToplevel):
         self.default_emp_id = default_emp_id
         self.translatable_widgets_payroll = [] # For PayrollWindow specific translatable widgets
         self.calculated_payslip_data = None # To store data for saving
+        self.payroll_run_queue = queue.Queue() # Messages from the bulk payroll run thread
+        self.payroll_run_after_id = None
+        self.last_run_payslips: List[Dict] = [] # Payslips of the last bulk run, for the batch PDF export
+        self.last_run_period: Optional[Tuple[str, str]] = None
+        self.payslip_export_queue = queue.Queue() # Messages from the batch payslip PDF thread
+        self.payslip_export_after_id = None
+        self.payslip_export_cancel_event: Optional[threading.Event] = None
         
         self.notebook = ttk.Notebook(self)
         # Pack the notebook early, so its child tab frames have a valid parent path
@@ -189,6 +199,28 @@ class PayrollWindow(ThemedToplevel):
 
         self._add_translatable_widget_payroll(self.calculate_btn, "payroll_calculate_button")
 
+        # --- Bulk Payroll Run (all active employees, same period) ---
+        run_frame = ttk.Frame(tab_frame)
+        run_frame.pack(side="top", fill="x", pady=5)
+        self.payroll_run_btn = ttk.Button(run_frame, text=_("payroll_run_period_button"), command=self._gui_run_payroll_for_period, bootstyle=db_schema.BS_ADD)
+        self.payroll_run_btn.pack(side="left", padx=(0, 5))
+        self._add_translatable_widget_payroll(self.payroll_run_btn, "payroll_run_period_button")
+        self.payroll_run_dry_run_var = tk.BooleanVar(value=True)
+        dry_run_chk = ttk.Checkbutton(run_frame, text=_("payroll_run_dry_run_checkbox"), variable=self.payroll_run_dry_run_var)
+        dry_run_chk.pack(side="left", padx=5)
+        self._add_translatable_widget_payroll(dry_run_chk, "payroll_run_dry_run_checkbox")
+        self.export_run_payslips_btn = ttk.Button(run_frame, text=_("payroll_export_run_payslips_button"), command=self._gui_export_run_payslips, bootstyle=db_schema.BS_NEUTRAL, state="disabled")
+        self.export_run_payslips_btn.pack(side="left", padx=5)
+        self._add_translatable_widget_payroll(self.export_run_payslips_btn, "payroll_export_run_payslips_button")
+        self.merge_payslips_var = tk.BooleanVar(value=True)
+        merge_chk = ttk.Checkbutton(run_frame, text=_("payroll_merge_payslips_checkbox"), variable=self.merge_payslips_var)
+        merge_chk.pack(side="left", padx=5)
+        self._add_translatable_widget_payroll(merge_chk, "payroll_merge_payslips_checkbox")
+        self.payroll_run_progressbar = ttk.Progressbar(run_frame, mode="determinate", length=200)
+        self.payroll_run_progressbar.pack(side="left", padx=5, fill="x", expand=True)
+        self.payroll_run_status_var = tk.StringVar()
+        ttk.Label(run_frame, textvariable=self.payroll_run_status_var, anchor="w", width=30).pack(side="left", padx=5)
+
         # --- Payslip Details Display Area (Replaces Text widget) ---
         self.payslip_details_display_frame = ttk.Frame(tab_frame, padding="10")
         self.payslip_details_display_frame.pack(fill="both", expand=True, pady=10)
@@ -626,6 +658,153 @@ class PayrollWindow(ThemedToplevel):
             logger.error(f"Unexpected error calculating payslip: {e}")
             messagebox.showerror("Error", f"An unexpected error occurred: {e}", parent=self)
         
+    def _gui_run_payroll_for_period(self):
+        """Runs payroll for all active employees for the selected period in a background thread."""
+        start_date_str = self.period_start_entry.entry.get()
+        end_date_str = self.period_end_entry.entry.get()
+        try:
+            datetime.strptime(start_date_str, '%Y-%m-%d')
+            datetime.strptime(end_date_str, '%Y-%m-%d')
+        except ValueError:
+            messagebox.showerror("Input Error", "Invalid date format. Use YYYY-MM-DD.", parent=self)
+            return
+
+        dry_run = self.payroll_run_dry_run_var.get()
+        if not dry_run and not messagebox.askyesno(_("payroll_run_confirm_title"),
+                                                   _("payroll_run_confirm_message", start=start_date_str, end=end_date_str),
+                                                   parent=self):
+            return
+
+        self.payroll_run_btn.config(state="disabled")
+        self.payroll_run_progressbar.config(value=0)
+        self.payroll_run_status_var.set(_("payroll_run_status_running"))
+        thread = threading.Thread(target=self._perform_payroll_run_threaded,
+                                  args=(start_date_str, end_date_str, dry_run, self.payroll_run_queue), daemon=True)
+        thread.start()
+        self._check_payroll_run_status()
+
+    def _perform_payroll_run_threaded(self, start_date_str: str, end_date_str: str, dry_run: bool, q_comm: queue.Queue):
+        """Worker function for the bulk payroll run. Only talks to the UI through q_comm."""
+        def _report_progress(current: int, total: int):
+            q_comm.put({"type": "progress_update", "current": current, "total": total})
+        try:
+            summary = db_queries.run_payroll_for_period_db(start_date_str, end_date_str, dry_run=dry_run, progress_callback=_report_progress)
+            q_comm.put({"type": "summary", "data": summary})
+        except (InvalidInputError, DatabaseOperationError) as e:
+            q_comm.put({"type": "error", "message": str(e)})
+        except Exception as e: # pragma: no cover
+            logger.error(f"Unexpected error during payroll run: {e}", exc_info=True)
+            q_comm.put({"type": "error", "message": f"An unexpected error occurred: {e}"})
+
+    def _check_payroll_run_status(self):
+        """Polls the payroll run queue and updates the progress bar until the run finishes."""
+        self.payroll_run_after_id = None
+        if not self.winfo_exists():
+            return
+        try:
+            while True:
+                result = self.payroll_run_queue.get_nowait()
+                if result.get("type") == "progress_update":
+                    self.payroll_run_progressbar.config(maximum=max(result["total"], 1), value=result["current"])
+                    self.payroll_run_status_var.set(f"{result['current']} / {result['total']}")
+                    continue
+                self.payroll_run_btn.config(state="normal")
+                if result.get("type") == "error":
+                    self.payroll_run_status_var.set("")
+                    messagebox.showerror(_("error_title"), result["message"], parent=self)
+                elif result.get("type") == "summary":
+                    summary = result["data"]
+                    self.payroll_run_status_var.set(_("payroll_run_status_done"))
+                    self.last_run_payslips = summary["payslips"]
+                    self.last_run_period = (summary["payslips"][0][db_schema.COL_PAY_PERIOD_START],
+                                            summary["payslips"][0][db_schema.COL_PAY_PERIOD_END]) if summary["payslips"] else None
+                    self.export_run_payslips_btn.config(state="normal" if self.last_run_payslips else "disabled")
+                    messagebox.showinfo(
+                        _("payroll_run_summary_title"),
+                        _("payroll_run_summary_message",
+                          mode=_("payroll_run_mode_dry_run") if summary["dry_run"] else _("payroll_run_mode_recorded"),
+                          calculated=len(summary["payslips"]), created=summary["created_count"],
+                          skipped=len(summary["skipped_existing"]), errors=len(summary["errors"]),
+                          total_gross=f"{summary['total_gross']:,.2f}", total_net=f"{summary['total_net']:,.2f}"),
+                        parent=self)
+                return
+        except queue.Empty: # Run still in progress
+            self.payroll_run_after_id = self.after(200, self._check_payroll_run_status)
+
+    def _gui_export_run_payslips(self):
+        """Writes one PDF per payslip of the last payroll run (and optionally a combined PDF) in a background thread."""
+        if not self.last_run_payslips:
+            return
+        output_dir = filedialog.askdirectory(title=_("payroll_export_run_payslips_button"), parent=self)
+        if not output_dir:
+            return
+        period_start, period_end = self.last_run_period
+        merged_filepath = os.path.join(output_dir, f"Payslips_{period_start}_{period_end}.pdf") if self.merge_payslips_var.get() else None
+
+        self.export_run_payslips_btn.config(state="disabled")
+        self.payroll_run_btn.config(state="disabled")
+        self.payroll_run_progressbar.config(value=0)
+        self.payslip_export_cancel_event = threading.Event()
+        thread = threading.Thread(target=self._perform_payslip_export_threaded,
+                                  args=(list(self.last_run_payslips), output_dir, merged_filepath, self.payslip_export_queue,
+                                        self.payslip_export_cancel_event), daemon=True)
+        thread.start()
+        self._check_payslip_export_status()
+
+    def _perform_payslip_export_threaded(self, payslips: List[Dict], output_dir: str, merged_filepath: Optional[str], q_comm: queue.Queue,
+                                         cancel_event: threading.Event):
+        """Worker function for the batch payslip PDF export. Only talks to the UI through q_comm."""
+        try:
+            summary = pdf_utils.generate_payslip_pdfs_batch(payslips, output_dir, merged_filepath=merged_filepath, q_comm=q_comm,
+                                                            cancel_event=cancel_event)
+            q_comm.put({"type": "summary", "data": summary})
+        except Exception as e:
+            logger.error(f"Error exporting payslip PDFs: {e}", exc_info=True)
+            q_comm.put({"type": "error", "message": str(e)})
+        finally:
+            db_schema.close_connection()
+
+    def _check_payslip_export_status(self):
+        """Polls the payslip export queue and updates the progress bar until the export finishes."""
+        self.payslip_export_after_id = None
+        if not self.winfo_exists():
+            return
+        try:
+            while True:
+                result = self.payslip_export_queue.get_nowait()
+                if result.get("type") == "progress_update":
+                    self.payroll_run_progressbar.config(maximum=max(result["total"], 1), value=result["current"])
+                    self.payroll_run_status_var.set(f"{result['current']} / {result['total']}")
+                    continue
+                if result.get("type") == "progress_init":
+                    continue
+                self.payslip_export_cancel_event = None
+                self.payroll_run_btn.config(state="normal")
+                self.export_run_payslips_btn.config(state="normal")
+                if result.get("type") == "error":
+                    self.payroll_run_status_var.set("")
+                    messagebox.showerror(_("error_title"), _("payroll_pdf_export_error", error=result["message"]), parent=self)
+                elif result.get("type") == "summary":
+                    summary = result["data"]
+                    self.payroll_run_status_var.set(_("payroll_export_run_payslips_done", count=summary["generated"]))
+                    messagebox.showinfo(
+                        _("success_title"),
+                        _("payroll_export_run_payslips_summary", generated=summary["generated"], errors=len(summary["errors"]),
+                          rate=summary["payslips_per_second"], merged=summary["merged_filepath"] or "-"),
+                        parent=self)
+                return
+        except queue.Empty: # Export still in progress
+            self.payslip_export_after_id = self.after(200, self._check_payslip_export_status)
+
+    def destroy(self):
+        if self.payslip_export_cancel_event is not None:
+            self.payslip_export_cancel_event.set() # The worker stops handing out payslips; no merged file is written
+        for after_id in (self.payroll_run_after_id, self.payslip_export_after_id):
+            if after_id:
+                self.after_cancel(after_id)
+        self.payroll_run_after_id = self.payslip_export_after_id = None
+        super().destroy()
+
     def _clear_payslip_display(self):
         """Clears the structured payslip display area."""
         for var in self.payslip_detail_vars.values():
@@ -4,9 +4,9 @@ import ttkbootstrap as ttkb
 from ttkbootstrap.constants import *
 from ttkbootstrap.widgets import DateEntry
 import threading
+import queue
 from datetime import datetime, timedelta, date as dt_date
 import os
-import csv
 import logging
 from typing import Dict, List, Any, Optional
 
@@ -15,6 +15,7 @@ from utils.localization import _
 from data import queries as db_queries
 from data import database as db_schema
 from utils import pdf_utils # Assuming pdf_utils is in the top-level utils
+from utils import csv_export
 from utils.gui_utils import extract_id_from_combobox_selection, setup_treeview_columns, clear_treeview # Corrected import path
 from .themed_toplevel import ThemedToplevel
 
@@ -39,6 +40,10 @@ class ReportsWindow(ThemedToplevel):
         self.report_params: Dict[str, Any] = {}
         self.current_report_data: List[Dict[str, Any]] = []
         self.current_report_col_config: Dict[str, Dict[str, Any]] = {}
+        self.csv_export_queue = queue.Queue() # Messages from the CSV export thread
+        self.csv_export_after_id = None
+        self.pdf_export_queue = queue.Queue() # Messages from the PDF export thread
+        self.pdf_export_after_id = None
 
         # --- Main Frames ---
         controls_frame = ttk.Frame(self, padding="10")
@@ -407,18 +412,43 @@ class ReportsWindow(ThemedToplevel):
         if not filepath:
             return
 
+        headers = [_(conf.get("header", col_id)) for col_id, conf in self.current_report_col_config.items()]
+        col_ids = list(self.current_report_col_config.keys())
+        report_rows = self.current_report_data
+        thread = threading.Thread(target=self._perform_csv_export_threaded,
+                                  args=(filepath, headers, col_ids, report_rows, self.csv_export_queue), daemon=True)
+        thread.start()
+        self.config(cursor="watch")
+        self.export_csv_btn.config(state="disabled")
+        self._check_csv_export_status()
+
+    def _perform_csv_export_threaded(self, filepath: str, headers: List[str], col_ids: List[str], report_rows: List[Dict[str, Any]],
+                                     q_comm: queue.Queue):
+        """Worker function for the report CSV export. Only talks to the UI through q_comm."""
         try:
-            headers = [_(conf.get("header", col_id)) for col_id, conf in self.current_report_col_config.items()]
-            with open(filepath, "w", newline="", encoding="utf-8-sig") as csvfile: # utf-8-sig for Excel compatibility
-                writer = csv.writer(csvfile)
-                writer.writerow(headers)
-                for row_data in self.current_report_data:
-                    row_values = [row_data.get(col_id, "") for col_id in self.current_report_col_config.keys()]
-                    writer.writerow(row_values)
-            messagebox.showinfo(_("success_title"), f"Report exported to CSV: {filepath}", parent=self) # TODO: Translate
+            rows = ([row_data.get(col_id, "") for col_id in col_ids] for row_data in report_rows)
+            summary = csv_export.write_csv_rows(filepath, headers, rows, total=len(report_rows))
+            q_comm.put({"type": "summary", "data": summary})
         except Exception as e:
             logger.error(f"Error exporting report to CSV: {e}", exc_info=True)
-            messagebox.showerror(_("error_title"), f"Failed to export to CSV: {e}", parent=self) # TODO: Translate
+            q_comm.put({"type": "error", "message": str(e)})
+
+    def _check_csv_export_status(self):
+        """Polls the CSV export queue until the export finishes."""
+        self.csv_export_after_id = None
+        if not self.winfo_exists():
+            return
+        try:
+            result = self.csv_export_queue.get_nowait()
+        except queue.Empty: # Export still in progress
+            self.csv_export_after_id = self.after(200, self._check_csv_export_status)
+            return
+        self.config(cursor="")
+        self.export_csv_btn.config(state="normal" if self.current_report_data else "disabled")
+        if result.get("type") == "error":
+            messagebox.showerror(_("error_title"), f"Failed to export to CSV: {result['message']}", parent=self) # TODO: Translate
+        else:
+            messagebox.showinfo(_("success_title"), f"Report exported to CSV: {result['data']['filepath']}", parent=self) # TODO: Translate
 
     def _gui_export_to_pdf(self):
         if not self.current_report_data or not self.current_report_col_config:
@@ -433,16 +463,53 @@ class ReportsWindow(ThemedToplevel):
         if not filepath:
             return
 
+        report_title = self.report_type_var.get()
+        headers = [_(conf.get("header", col_id)) for col_id, conf in self.current_report_col_config.items()]
+        col_ids = list(self.current_report_col_config.keys())
+        report_rows = self.current_report_data
+        thread = threading.Thread(target=self._perform_pdf_export_threaded,
+                                  args=(filepath, report_title, headers, col_ids, report_rows, self.pdf_export_queue), daemon=True)
+        thread.start()
+        self.config(cursor="watch")
+        self.export_pdf_btn.config(state="disabled")
+        self._check_pdf_export_status()
+
+    def _perform_pdf_export_threaded(self, filepath: str, report_title: str, headers: List[str], col_ids: List[str],
+                                     report_rows: List[Dict[str, Any]], q_comm: queue.Queue):
+        """Worker function for the report PDF export. Only talks to the UI through q_comm."""
         try:
-            report_title = self.report_type_var.get()
-            headers = [_(conf.get("header", col_id)) for col_id, conf in self.current_report_col_config.items()]
-            data_for_pdf = [[row_data.get(col_id, "") for col_id in self.current_report_col_config.keys()] for row_data in self.current_report_data]
-            
-            pdf_utils.generate_professional_pdf_report(data_for_pdf, headers, None, report_title, filepath) # Corrected function name and arguments
-            messagebox.showinfo(_("success_title"), f"Report exported to PDF: {filepath}", parent=self) # TODO: Translate
+            rows = ([row_data.get(col_id, "") for col_id in col_ids] for row_data in report_rows)
+            summary = pdf_utils.generate_professional_pdf_report(rows, headers, None, report_title, filepath, total=len(report_rows))
+            q_comm.put({"type": "summary", "data": summary})
         except Exception as e:
             logger.error(f"Error exporting report to PDF: {e}", exc_info=True)
-            messagebox.showerror(_("error_title"), f"Failed to export to PDF: {e}", parent=self) # TODO: Translate
+            q_comm.put({"type": "error", "message": str(e)})
+        finally:
+            db_schema.close_connection() # Used for the reports counter
+
+    def _check_pdf_export_status(self):
+        """Polls the PDF export queue until the export finishes."""
+        self.pdf_export_after_id = None
+        if not self.winfo_exists():
+            return
+        try:
+            result = self.pdf_export_queue.get_nowait()
+        except queue.Empty: # Export still in progress
+            self.pdf_export_after_id = self.after(200, self._check_pdf_export_status)
+            return
+        self.config(cursor="")
+        self.export_pdf_btn.config(state="normal" if self.current_report_data else "disabled")
+        if result.get("type") == "error":
+            messagebox.showerror(_("error_title"), f"Failed to export to PDF: {result['message']}", parent=self) # TODO: Translate
+        else:
+            messagebox.showinfo(_("success_title"), f"Report exported to PDF: {result['data']['filepath']}", parent=self) # TODO: Translate
+
+    def destroy(self):
+        for after_id in (self.csv_export_after_id, self.pdf_export_after_id):
+            if after_id:
+                self.after_cancel(after_id)
+        self.csv_export_after_id = self.pdf_export_after_id = None
+        super().destroy()
 
     def update_local_theme_elements(self):
         super().update_local_theme_elements()
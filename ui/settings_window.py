@@ -16,6 +16,7 @@ from data import database as db_schema # For SETTING_... constants
 from data import queries as db_queries # For database operations
 from utils.localization import _, LANG_MANAGER # Import _ and LANG_MANAGER directly
 from utils import telegram_notifier # Import the new notifier
+from utils import zkteco_utils # For validating the device registry setting
 from utils.cloud_sync import GoogleDriveSync, CREDENTIALS_PATH # If GDrive is managed here
 from utils.gui_utils import extract_id_from_combobox_selection, populate_user_combobox # Import gui_utils helpers
 from utils.calendar_sync import GoogleCalendarSync # Import for Calendar Sync
@@ -77,6 +78,7 @@ class SettingsWindow(ThemedToplevel):
             ("settings_group_zkteco", "settings_zkteco_ip_label", db_schema.SETTING_ZKTECO_DEVICE_IP, "entry", {"width": 20}, "settings_zkteco_ip_tooltip", self.tab_integrations.scrollable_frame),
             ("settings_group_zkteco", "settings_zkteco_port_label", db_schema.SETTING_ZKTECO_DEVICE_PORT, "entry", {"width": 10, "validate": "key", "validatecommand_type": "numeric"}, "settings_zkteco_port_tooltip", self.tab_integrations.scrollable_frame),
             ("settings_group_zkteco", "settings_zkteco_timeout_label", db_schema.SETTING_ZKTECO_TIMEOUT, "entry", {"width": 10, "validate": "key", "validatecommand_type": "numeric"}, "settings_zkteco_timeout_tooltip", self.tab_integrations.scrollable_frame),
+            ("settings_group_zkteco", "settings_zkteco_devices_label", db_schema.SETTING_ZKTECO_DEVICES, "entry", {"width": 50}, "settings_zkteco_devices_tooltip", self.tab_integrations.scrollable_frame),
             ("settings_group_auto_reports", "settings_enable_weekly_stats_label", db_schema.SETTING_AUTO_WEEKLY_STATS_ENABLED, "checkbutton", {}, "settings_enable_weekly_stats_tooltip", self.tab_integrations.scrollable_frame),
             ("settings_group_auto_reports", "settings_report_day_label", db_schema.SETTING_AUTO_WEEKLY_STATS_DAY, "combobox", {"values": db_schema.DAYS_OF_WEEK, "state": "readonly", "width": 15}, "settings_report_day_tooltip", self.tab_integrations.scrollable_frame),
             ("settings_group_auto_reports", "settings_report_time_label", db_schema.SETTING_AUTO_WEEKLY_STATS_TIME, "entry", {"width": 10}, "settings_report_time_tooltip", self.tab_integrations.scrollable_frame),
@@ -362,6 +364,12 @@ class SettingsWindow(ThemedToplevel):
                     if not new_value.isdigit() or not (0 < int(new_value) < 65536): # pragma: no cover
                         messagebox.showerror(_("input_error_title"), _("invalid_zkteco_port_number_error", port=new_value), parent=self)
                         return
+                if key == db_schema.SETTING_ZKTECO_DEVICES:
+                    try:
+                        zkteco_utils.parse_device_registry(new_value)
+                    except InvalidInputError as e:
+                        messagebox.showerror(_("input_error_title"), str(e), parent=self)
+                        return
 
                 current_db_value = db_schema.get_app_setting_db(key) # Corrected: Use db_schema
                 if new_value != current_db_value: # Corrected: Use db_schema
@@ -10,6 +10,7 @@ import queue
 import threading
 from datetime import datetime
 from utils import zkteco_utils # Import the new ZKTeco utilities
+from utils.zkteco_live_capture import get_live_capture_service
 # --- Project-specific imports ---
 import config
 from data import database as db_schema
@@ -32,7 +33,10 @@ class ZKTecoManagementWindow(ThemedToplevel):
         self.device_status_var = tk.StringVar(value=localization._("zk_status_unknown")) # Add key
         self.sync_message_var = tk.StringVar(value=localization._("status_ready")) # Add key
         self.sync_log_data = [] # Stores tuples of (timestamp, status, message)
-        self.auto_sync_enabled_var = tk.BooleanVar(value=False) # Placeholder
+        self.live_capture_service = get_live_capture_service()
+        self.live_queue = queue.Queue() # Live capture notifications
+        self.live_poll_after_id = None
+        self.auto_sync_enabled_var = tk.BooleanVar(value=self.live_capture_service.is_running)
 
         # --- Main container frame for the panel ---
         panel_container = ttkb.Frame(self, padding="15")
@@ -87,6 +91,19 @@ class ZKTecoManagementWindow(ThemedToplevel):
         self.toggle_auto_sync_btn.pack(side="left", padx=15)
         self._add_translatable_widget(self.toggle_auto_sync_btn, auto_sync_key)
 
+        # --- Registered Devices Section ---
+        devices_frame_key = "zk_devices_frame_title"
+        devices_frame = ttkb.LabelFrame(panel_container, text=localization._(devices_frame_key), padding="10")
+        devices_frame.pack(fill="x", pady=(0, 10))
+        self._add_translatable_widget(devices_frame, devices_frame_key, attr="title")
+
+        self.devices_tree = ttkb.Treeview(devices_frame, columns=("name", "address", "status"), show="headings", height=3)
+        self._update_devices_tree_headers()
+        self.devices_tree.column("name", width=180, anchor="w")
+        self.devices_tree.column("address", width=150, anchor="w")
+        self.devices_tree.column("status", width=300, stretch=tk.YES)
+        self.devices_tree.pack(fill="x", expand=True)
+
         # --- Progress and Status Messages ---
         progress_status_frame = ttkb.Frame(panel_container)
         progress_status_frame.pack(fill="x", pady=5)
@@ -117,6 +134,10 @@ class ZKTecoManagementWindow(ThemedToplevel):
         log_scrollbar.pack(side="right", fill="y")
 
         self._update_sync_status_display() # Initial update
+        self.zk_sync_after_id = None
+        self._load_registered_devices()
+        if self.live_capture_service.is_running:
+            self._subscribe_live_capture()
 
     def _add_translatable_widget(self, widget, key, attr="text"):
         self.translatable_widgets_zk.append({"widget": widget, "key": key, "attr": attr})
@@ -127,11 +148,33 @@ class ZKTecoManagementWindow(ThemedToplevel):
             self.sync_log_tree.heading("status", text=localization._("zk_log_header_status")) # Add key
             self.sync_log_tree.heading("message", text=localization._("zk_log_header_details")) # Add key
 
+    def _update_devices_tree_headers(self):
+        if hasattr(self, 'devices_tree') and self.devices_tree.winfo_exists():
+            self.devices_tree.heading("name", text=localization._("zk_devices_header_name"))
+            self.devices_tree.heading("address", text=localization._("zk_devices_header_address"))
+            self.devices_tree.heading("status", text=localization._("zk_devices_header_status"))
+
+    def _load_registered_devices(self):
+        """Fills the devices list from the device registry setting."""
+        self.registered_devices = zkteco_utils.get_registered_devices()
+        for item in self.devices_tree.get_children():
+            self.devices_tree.delete(item)
+        for device in self.registered_devices:
+            self.devices_tree.insert("", "end", iid=device["key"], values=(device["name"], device["key"], localization._("zk_status_unknown")))
+        if self.registered_devices:
+            self.device_name_var.set(", ".join(device["name"] for device in self.registered_devices))
+
+    def _set_device_status(self, device_key: str, status_text: str):
+        if self.devices_tree.exists(device_key):
+            self.devices_tree.set(device_key, "status", status_text)
+
     def refresh_ui_for_language(self): # pragma: no cover
         self.title(localization._("zkteco_management_window_title"))
         self._update_zk_log_tree_headers()
+        self._update_devices_tree_headers()
         # Update default name var if it's a key
-        self.device_name_var.set(localization._("zk_device_default_name"))
+        if not getattr(self, 'registered_devices', None):
+            self.device_name_var.set(localization._("zk_device_default_name"))
         # Update status vars if their initial values are keys
         if self.last_sync_var.get() == localization._("status_not_available_short", prev_lang=True): # Check if it was the placeholder
             self.last_sync_var.set(localization._("status_not_available_short"))
@@ -174,43 +217,36 @@ class ZKTecoManagementWindow(ThemedToplevel):
         thread.start()
         self._check_zk_sync_status() # Start polling
     def gui_sync_from_zkteco(self):
-        # Use IP and Port from config.py
-        ip = db_schema.get_app_setting_db(db_schema.SETTING_ZKTECO_DEVICE_IP, config.ZKTECO_DEVICE_IP)
-        port_str = db_schema.get_app_setting_db(db_schema.SETTING_ZKTECO_DEVICE_PORT, str(config.ZKTECO_DEVICE_PORT))
-        
-        try:
-            port = int(port_str)
-        except ValueError:
-            messagebox.showerror("Configuration Error", 
-                                 f"Invalid ZKTeco port configured in settings: '{port_str}'. Please correct it in App Settings.", parent=self)
-            return
-
-        if not ip or ip == "192.168.1.201" or not port: # Check for default/missing config
-            messagebox.showwarning("ZKTeco Sync", 
-                                   f"ZKTeco device IP/Port not configured or using default placeholder.\n"
-                                   f"Current IP: {ip}, Port: {port}\n"
-                                   "Please configure in settings.ini or via Application Settings if available.",
-                                   parent=self)
+        """Syncs attendance from every registered device in parallel."""
+        self._load_registered_devices() # Pick up registry changes made in App Settings
+        devices = [device for device in self.registered_devices if not device.get("fallback")] # Only devices listed in the registry
+        if not devices:
+            messagebox.showwarning("ZKTeco Sync", localization._("zk_no_devices_configured"), parent=self)
             return
 
         if hasattr(self, 'resync_btn'): self.resync_btn.config(state="disabled")
         if hasattr(self, 'test_conn_btn'): self.test_conn_btn.config(state="disabled")
-        if hasattr(self, 'sync_progressbar'): self.sync_progressbar.start() # For indeterminate mode
+        if hasattr(self, 'sync_progressbar'): self.sync_progressbar.config(mode="indeterminate"); self.sync_progressbar.start()
         self.config(cursor="watch") # Use self for Toplevel
-        self.sync_message_var.set("Attempting to sync from ZKTeco device... Please wait.") # Use local sync_message_var
+        self.sync_message_var.set(f"Syncing from {len(devices)} ZKTeco device(s)... Please wait.") # Use local sync_message_var
         self.update_idletasks() # Use self for Toplevel
 
         # Start the sync in a new thread
         # Pass self.task_queue to the threaded function
-        thread = threading.Thread(target=self._perform_zk_sync_threaded, args=(ip, port, self.task_queue), daemon=True)
-        thread.daemon = True # So it exits when main app exits
+        thread = threading.Thread(target=self._perform_zk_sync_threaded, args=(devices, self.task_queue), daemon=True)
         thread.start()
 
         # Start polling the queue for completion
         self._check_zk_sync_status()
-        # --- New View Creation Methods (Placeholders or actual UI setup) ---
-        # These methods are called once by _setup_main_ui to build the content of each tab.
-    
+
+    def _perform_zk_sync_threaded(self, devices: list, q_comm: queue.Queue):
+        """Worker function to run the multi-device ZKTeco sync in a separate thread."""
+        try:
+            summary = zkteco_utils.sync_attendance_from_devices(devices, q_comm=q_comm)
+            q_comm.put({"type": "summary", "data": summary})
+        except Exception as e: # Catch any exception from the sync process
+            q_comm.put({"type": "error", "data": e}) # Put the exception object itself into the queue
+
     def _perform_zk_test_connection_threaded(self, ip: str, port: int, q_comm: queue.Queue):
         """Worker function to test ZKTeco connection in a separate thread."""
         conn_test = None
@@ -226,8 +262,82 @@ class ZKTecoManagementWindow(ThemedToplevel):
             if conn_test and conn_test.is_connect:
                 zkteco_utils.disconnect_from_zkteco_device(conn_test) # Use utility
 
-    def _check_zk_sync_status(self): pass
-    def _update_sync_status_display(self, status: Optional[str] = None, last_sync_time: Optional[str] = None, message: Optional[str] = None): pass
+    def _check_zk_sync_status(self):
+        """Drains the task queue (several devices report at once) and updates the window."""
+        self.zk_sync_after_id = None
+        if not self.winfo_exists(): return # pragma: no cover
+        while True:
+            try:
+                result = self.task_queue.get_nowait()
+            except queue.Empty: # Task still running
+                if self.sync_progressbar.cget("mode") == "indeterminate":
+                    self.sync_progressbar.step(5)
+                self.zk_sync_after_id = self.after(200, self._check_zk_sync_status)
+                return
+            result_type = result.get("type")
+            if result_type == "device_progress":
+                self._handle_device_progress(result)
+            elif result_type == "progress_init":
+                self.sync_progressbar.stop()
+                self.sync_progressbar.config(mode="determinate", maximum=max(result["total"], 1), value=0)
+                self.sync_message_var.set(f"Processing {result['total']} new punches...")
+            elif result_type == "progress_update":
+                self.sync_progressbar.config(value=result["current"])
+            else: # summary, error or test_connection: the task is finished
+                self._finish_zk_task(result)
+                return
+
+    def _handle_device_progress(self, result: dict):
+        stage = result.get("stage")
+        if stage == "connecting":
+            self._set_device_status(result["device"], "⏳ Connecting...")
+        elif stage == "downloaded":
+            status_text = f"✅ {result.get('records', 0)} records ({result.get('seconds', 0)}s)"
+            self._set_device_status(result["device"], status_text)
+            self._add_to_sync_log("⬇️", f"{result['name']}: {result.get('records', 0)} records downloaded")
+        elif stage == "failed":
+            self._set_device_status(result["device"], f"❌ {result.get('message', '')[:80]}")
+            self._add_to_sync_log("❌", f"{result['name']}: {result.get('message', '')[:100]}")
+
+    def _finish_zk_task(self, result: dict):
+        self.config(cursor="")
+        if hasattr(self, 'resync_btn'): self.resync_btn.config(state="normal")
+        if hasattr(self, 'test_conn_btn'): self.test_conn_btn.config(state="normal")
+        self.sync_progressbar.stop()
+        self.sync_progressbar.config(mode="determinate", value=0)
+
+        result_type = result.get("type")
+        if result_type == "error":
+            error_obj = result["data"]
+            err_msg = f"Sync failed: {type(error_obj).__name__} - {str(error_obj)[:100]}"
+            status_icon = "🔌 Error" if isinstance(error_obj, (ConnectionError, TimeoutError)) else "❌ Error"
+            self._update_sync_status_display(status=status_icon, message=err_msg)
+            self._add_to_sync_log("❌", err_msg)
+            messagebox.showerror("Sync Error", f"Error during sync: {error_obj}", parent=self)
+        elif result_type == "summary":
+            summary = result["data"]
+            failed = summary.get("failed_devices", 0)
+            success_msg = (f"Synced {len(summary.get('devices', {})) - failed} device(s): "
+                           f"{summary.get('new_device_logs', 0)} new punches in {summary.get('elapsed_seconds', 0)}s.")
+            self._update_sync_status_display(status="⚠️ Partial" if failed else "✅ Online",
+                                             last_sync_time=datetime.now().strftime("%Y-%m-%d %I:%M %p"), message=success_msg)
+            self._add_to_sync_log("⚠️" if failed else "✅", success_msg)
+            messagebox.showinfo("ZKTeco Sync Complete",
+                                f"Sync Summary:\nProcessed from devices: {summary.get('processed_device_logs', 0)}\n"
+                                f"New Since Last Sync: {summary.get('new_device_logs', 0)} "
+                                f"({summary.get('punches_per_second', 0)} punches/s)\n"
+                                f"Clock-Ins Added to DB: {summary.get('db_clock_ins', 0)}\n"
+                                f"Clock-Outs Updated in DB: {summary.get('db_clock_outs', 0)}\n"
+                                f"Duplicates Skipped: {summary.get('skipped_duplicates', 0)}\n"
+                                f"Unknown Device User IDs: {summary.get('unknown_user_id', 0)}\n"
+                                f"Devices Failed: {failed}",
+                                parent=self)
+        elif result_type == "test_connection":
+            status_msg = result.get("message", "Test finished.")
+            self._update_sync_status_display(status="✅ Online" if result.get("success") else "❌ Offline", message=status_msg)
+            self._add_to_sync_log("🧪" if result.get("success") else "⚠️", status_msg)
+            messagebox.showinfo("Connection Test", status_msg, parent=self)
+
     
     def _create_device_sync_section(self, parent_frame):
         """Creates the UI for the Device Sync tab."""
@@ -322,13 +432,57 @@ class ZKTecoManagementWindow(ThemedToplevel):
         self._update_sync_status_display() # Initial update
     
     def _gui_toggle_auto_sync(self):
-        # Placeholder for auto-sync logic
+        """Starts or stops live capture from all registered devices."""
         if self.auto_sync_enabled_var.get():
-            messagebox.showinfo("Auto Sync", "Automatic synchronization enabled (feature pending).", parent=self.root)
-            # Here you would typically save this setting and start a scheduler
+            try:
+                self.live_capture_service.start()
+            except Exception as e:
+                self.auto_sync_enabled_var.set(False)
+                messagebox.showerror("Live Capture", f"Could not start live capture: {e}", parent=self)
+                return
+            self._subscribe_live_capture()
+            self._add_to_sync_log("📡", "Live capture started.")
         else:
-            messagebox.showinfo("Auto Sync", "Automatic synchronization disabled.", parent=self.root)
-            # Save setting and stop scheduler
+            self._unsubscribe_live_capture()
+            threading.Thread(target=self.live_capture_service.stop, daemon=True).start() # Flushing may take a moment
+            self._add_to_sync_log("⏹️", "Live capture stopped.")
+
+    def _subscribe_live_capture(self):
+        self.live_capture_service.subscribe(self.live_queue)
+        if not self.live_poll_after_id:
+            self._poll_live_capture()
+
+    def _unsubscribe_live_capture(self):
+        self.live_capture_service.unsubscribe(self.live_queue)
+        if self.live_poll_after_id:
+            self.after_cancel(self.live_poll_after_id)
+            self.live_poll_after_id = None
+
+    def _poll_live_capture(self):
+        """Shows punches written by the live capture service; only the local queue is polled, never the device."""
+        while True:
+            try:
+                message = self.live_queue.get_nowait()
+            except queue.Empty:
+                break
+            if message.get("type") == "device_progress":
+                if message.get("stage") == "live":
+                    self._set_device_status(message["device"], "📡 Live")
+                else:
+                    self._handle_device_progress(message)
+            elif message.get("type") == "live_attendance":
+                for event in message["events"]:
+                    icon = "🟢" if event["event"] == "clock_in" else "🔴"
+                    self._add_to_sync_log(icon, f"{event['employee_id']} {event['event'].replace('_', ' ')} at {event['time']}")
+                summary = message["summary"]
+                self._update_sync_status_display(last_sync_time=datetime.now().strftime("%Y-%m-%d %I:%M %p"),
+                                                 message=f"Live: {summary['db_clock_ins']} in, {summary['db_clock_outs']} out")
+        self.live_poll_after_id = self.after(500, self._poll_live_capture)
+
+    def destroy(self):
+        # Live capture keeps running in the background; this window just stops listening
+        self._unsubscribe_live_capture()
+        super().destroy()
 
     def _update_sync_status_display(self, status: Optional[str] = None, last_sync_time: Optional[str] = None, message: Optional[str] = None):
         """Updates the device sync status labels."""
@@ -3,12 +3,10 @@ import logging
 from datetime import datetime, time
 from typing import Dict, Any, List
 
-from data import database as db_schema
 from data import queries as db_queries
 from utils.localization import _ # If any messages constructed here need translation
 from utils.attendance_utils import _is_today_a_workday # Import helper from attendance_utils
-import sqlite3 # For direct DB connection if needed, or use db_schema.create_connection
-import config # For DATABASE_NAME
+from utils.exceptions import DatabaseOperationError
 
 logger = logging.getLogger(__name__)
 
@@ -39,37 +37,22 @@ def get_absent_employees_for_alert(cutoff_time_str: str) -> List[Dict[str, Any]]
         logger.info(f"Absence check skipped: Current time {now_time.strftime('%H:%M:%S')} is before cutoff {cutoff_time_str}.")
         return []
 
-    active_employees = db_queries.get_all_employees_db(include_archived=False, status_filter=db_schema.STATUS_ACTIVE)
-
-    for emp in active_employees:
-        emp_id = emp[db_schema.COL_EMP_ID]
-        
-        if not _is_today_a_workday(datetime.now(), emp_id):
-            continue
-
-        if db_queries.is_employee_on_approved_leave_today(emp_id, today_date_str):
-            continue
+    if not _is_today_a_workday(datetime.now()):
+        return []
 
-        try:
-            with sqlite3.connect(config.DATABASE_NAME) as conn: # Use direct connection
-                cursor = conn.cursor()
-                cursor.execute(f"""
-                    SELECT 1 FROM {db_schema.TABLE_ATTENDANCE_LOG}
-                    WHERE {db_schema.COL_ATT_EMP_ID} = ? AND DATE({db_schema.COL_ATT_CLOCK_IN}) = ?
-                    LIMIT 1
-                """, (emp_id, today_date_str))
-                clocked_in_today = cursor.fetchone() is not None
-        except Exception as e_att_check:
-            logger.error(f"Error checking clock-in status for {emp_id} during absence alert: {e_att_check}")
-            continue 
+    try:
+        absent_rows = db_queries.get_absent_employees_on_date_db(today_date_str)
+    except DatabaseOperationError as e:
+        logger.error(f"Error fetching absent employees for absence alert: {e}")
+        return []
 
-        if not clocked_in_today:
-            absent_employees.append({
-                "id": emp_id,
-                "name": emp.get(db_schema.COL_EMP_NAME, "N/A"),
-                "manager_id": emp.get(db_schema.COL_EMP_MANAGER_ID),
-                "department_name": emp.get("department_name", "N/A") # Assuming 'department_name' is available from get_all_employees_db join
-            })
-            logger.info(f"Employee {emp_id} ({emp.get(db_schema.COL_EMP_NAME, 'N/A')}) identified as absent for alert.")
+    for row in absent_rows:
+        absent_employees.append({
+            "id": row["id"],
+            "name": row["name"] or "N/A",
+            "manager_id": row["manager_id"],
+            "department_name": row["department_name"] or "N/A"
+        })
+        logger.info(f"Employee {row['id']} ({row['name'] or 'N/A'}) identified as absent for alert.")
     
     return absent_employees
\ No newline at end of file
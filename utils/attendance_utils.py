@@ -5,7 +5,6 @@ from datetime import datetime, time, timedelta
 from typing import Dict, Any, Optional, List
 
 from data import database as db_schema
-from data import queries as db_queries # Assuming db_queries has general DB interaction helpers
 import config # For default fallbacks if settings are not in DB yet
 from utils.localization import _
 
@@ -33,53 +32,131 @@ def get_employee_attendance_status_today(employee_id: str) -> Dict[str, Any]:
     Determines the attendance status of an employee for the current day.
     Includes clock-in/out times, lateness information.
     """
-    today_date_str = datetime.now().strftime("%Y-%m-%d")
     now = datetime.now()
+    today_date_str = now.strftime("%Y-%m-%d")
 
-    status_info = {
-        "employee_id": employee_id,
-        "checked_in": False,
-        "checked_out": False,
-        "clock_in_time_obj": None,
-        "clock_out_time_obj": None,
-        "is_late": None,  # True, False, or None if not applicable/determinable
-        "lateness_minutes": None,
-        "scheduled_start_time_today": None,
-        "on_leave_today": False,
-        "is_workday_today": _is_today_a_workday(now, employee_id),
-        "status_message": "" # A human-readable summary
-    }
-
-    # Check if employee is on approved leave today
-    # TODO: Implement db_queries.is_employee_on_approved_leave_today(employee_id, today_date_str)
-    # For now, assuming a function exists or defaulting to False
+    on_leave_today = False
     try:
-        if hasattr(db_queries, 'is_employee_on_approved_leave_today'):
-            status_info["on_leave_today"] = db_queries.is_employee_on_approved_leave_today(employee_id, today_date_str)
-        else: # Fallback if function not yet implemented in db_queries
-            logger.warning("db_queries.is_employee_on_approved_leave_today not found, defaulting on_leave_today to False.")
-            status_info["on_leave_today"] = False
-    except Exception as e:
+        with db_schema.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT 1 FROM {db_schema.TABLE_LEAVE_REQUESTS}
+                WHERE {db_schema.COL_LR_EMP_ID} = ?
+                  AND {db_schema.COL_LR_STATUS} = ?
+                  AND {db_schema.COL_LR_START_DATE} <= ?
+                  AND {db_schema.COL_LR_END_DATE} >= ?
+                LIMIT 1
+            """, (employee_id, db_schema.STATUS_LEAVE_APPROVED, today_date_str, today_date_str))
+            on_leave_today = cursor.fetchone() is not None
+    except sqlite3.Error as e:
         logger.error(f"Error checking leave status for {employee_id}: {e}")
-        status_info["on_leave_today"] = False # Default to not on leave on error
 
-    # 1. Get employee's clock-in/out logs for today
-    logs_today = []
+    logs_today: List[tuple] = []
+    logs_error = False
     try:
-        with sqlite3.connect(config.DATABASE_NAME) as conn: # Use sqlite3.connect
+        with db_schema.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(f"""
                 SELECT {db_schema.COL_ATT_CLOCK_IN}, {db_schema.COL_ATT_CLOCK_OUT}
                 FROM {db_schema.TABLE_ATTENDANCE_LOG}
-                WHERE {db_schema.COL_ATT_EMP_ID} = ? AND DATE({db_schema.COL_ATT_CLOCK_IN}) = ?
+                WHERE {db_schema.COL_ATT_EMP_ID} = ? AND {db_schema.COL_ATT_LOG_DATE} = ?
                 ORDER BY {db_schema.COL_ATT_CLOCK_IN} ASC
             """, (employee_id, today_date_str))
             logs_today = cursor.fetchall()
-    except Exception as e:
+    except sqlite3.Error as e:
         logger.error(f"Error fetching attendance logs for {employee_id} today: {e}")
+        logs_error = True
+
+    return _build_attendance_status(employee_id, now, logs_today, on_leave_today, _get_lateness_settings(), logs_error)
+
+def get_employees_attendance_status_today(employee_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Bulk version of get_employee_attendance_status_today for lists of employees
+    (main Treeview, exports). Uses two queries in total, one for today's approved
+    leaves and one for today's attendance logs, and reads the lateness settings once.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: {employee_id: status_info} for every ID passed in.
+    """
+    now = datetime.now()
+    today_date_str = now.strftime("%Y-%m-%d")
+    wanted_ids = set(employee_ids)
+
+    on_leave_ids = set()
+    try:
+        with db_schema.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT DISTINCT {db_schema.COL_LR_EMP_ID}
+                FROM {db_schema.TABLE_LEAVE_REQUESTS}
+                WHERE {db_schema.COL_LR_START_DATE} <= ?
+                  AND {db_schema.COL_LR_END_DATE} >= ?
+                  AND {db_schema.COL_LR_STATUS} = ?
+            """, (today_date_str, today_date_str, db_schema.STATUS_LEAVE_APPROVED))
+            on_leave_ids = {row[0] for row in cursor.fetchall()} & wanted_ids
+    except sqlite3.Error as e:
+        logger.error(f"Error checking today's leave status: {e}")
+
+    logs_by_emp: Dict[str, List[tuple]] = {}
+    logs_error = False
+    try:
+        with db_schema.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT {db_schema.COL_ATT_EMP_ID}, {db_schema.COL_ATT_CLOCK_IN}, {db_schema.COL_ATT_CLOCK_OUT}
+                FROM {db_schema.TABLE_ATTENDANCE_LOG}
+                WHERE {db_schema.COL_ATT_LOG_DATE} = ?
+                ORDER BY {db_schema.COL_ATT_EMP_ID}, {db_schema.COL_ATT_CLOCK_IN} ASC
+            """, (today_date_str,))
+            for emp_id, clock_in, clock_out in cursor.fetchall():
+                if emp_id in wanted_ids:
+                    logs_by_emp.setdefault(emp_id, []).append((clock_in, clock_out))
+    except sqlite3.Error as e:
+        logger.error(f"Error fetching today's attendance logs: {e}")
+        logs_error = True
+
+    lateness_settings = _get_lateness_settings()
+    return {
+        emp_id: _build_attendance_status(
+            emp_id, now, logs_by_emp.get(emp_id, []), emp_id in on_leave_ids, lateness_settings, logs_error
+        )
+        for emp_id in employee_ids
+    }
+
+def _get_lateness_settings() -> Dict[str, str]:
+    """Reads the instant lateness settings once for a batch of status checks."""
+    # Ensure SETTING_ keys exist in db_schema and config.DEFAULT_CONFIG
+    default_enable_lateness_display = config.DEFAULT_CONFIG.get(db_schema.SETTING_ENABLE_INSTANT_LATENESS_DISPLAY, "True")
+    # Get scheduled start time from app settings, with a fallback to config.py's default structure
+    default_start_time_val = config.DEFAULT_CONFIG["WorkSchedule"].get("standard_start_time", "09:00:00")
+    default_grace_period_val = config.DEFAULT_CONFIG.get(db_schema.SETTING_LATE_ARRIVAL_ALLOWED_MINUTES, "15")
+    return {
+        "enable_lateness_check": db_schema.get_app_setting_db(db_schema.SETTING_ENABLE_INSTANT_LATENESS_DISPLAY, default_enable_lateness_display),
+        "start_time": db_schema.get_app_setting_db(db_schema.SETTING_STANDARD_START_TIME, default_start_time_val),
+        "grace_period_minutes": db_schema.get_app_setting_db(db_schema.SETTING_LATE_ARRIVAL_ALLOWED_MINUTES, default_grace_period_val),
+    }
+
+def _build_attendance_status(employee_id: str, now: datetime, logs_today: List[tuple], on_leave_today: bool,
+                             lateness_settings: Dict[str, str], logs_error: bool = False) -> Dict[str, Any]:
+    """Builds one employee's status_info from already-fetched logs (clock_in, clock_out), leave flag and settings."""
+    status_info = {
+        "employee_id": employee_id,
+        "checked_in": False,
+        "checked_out": False,
+        "clock_in_time_obj": None,
+        "clock_out_time_obj": None,
+        "is_late": None,  # True, False, or None if not applicable/determinable
+        "lateness_minutes": None,
+        "scheduled_start_time_today": None,
+        "on_leave_today": on_leave_today,
+        "is_workday_today": _is_today_a_workday(now, employee_id),
+        "status_message": "" # A human-readable summary
+    }
+    if logs_error:
         status_info["status_message"] = _("error_fetching_logs_message") # Needs localization key
         return status_info
 
+    # 1. Employee's clock-in/out logs for today
     if logs_today:
         first_log = logs_today[0]
         if first_log[0]: # COL_ATT_CLOCK_IN is the first selected column (index 0)
@@ -97,26 +174,11 @@ def get_employee_attendance_status_today(employee_id: str) -> Dict[str, Any]:
             status_info["checked_out"] = True
 
     # 2. Determine if late (only if checked in and feature enabled)
-    # Ensure SETTING_ keys exist in db_schema and config.DEFAULT_CONFIG
-    default_enable_lateness_display = config.DEFAULT_CONFIG.get(db_schema.SETTING_ENABLE_INSTANT_LATENESS_DISPLAY, "True")
-    enable_lateness_check_str = db_schema.get_app_setting_db(
-        db_schema.SETTING_ENABLE_INSTANT_LATENESS_DISPLAY, # This key should exist in db_schema.py
-        default_enable_lateness_display
-    )
-    enable_lateness_check = enable_lateness_check_str.lower() == "true"
+    enable_lateness_check = lateness_settings["enable_lateness_check"].lower() == "true"
 
     if status_info["checked_in"] and enable_lateness_check and status_info["is_workday_today"] and not status_info["on_leave_today"]:
-        # Get scheduled start time from app settings, with a fallback to config.py's default structure
-        default_start_time_val = config.DEFAULT_CONFIG["WorkSchedule"].get("standard_start_time", "09:00:00")
-        default_start_time_str = db_schema.get_app_setting_db(
-            db_schema.SETTING_STANDARD_START_TIME, # Corrected constant
-            default_start_time_val
-        )
-        default_grace_period_val = config.DEFAULT_CONFIG.get(db_schema.SETTING_LATE_ARRIVAL_ALLOWED_MINUTES, "15")
-        grace_period_minutes_str = db_schema.get_app_setting_db(
-            db_schema.SETTING_LATE_ARRIVAL_ALLOWED_MINUTES,
-            default_grace_period_val
-        )
+        default_start_time_str = lateness_settings["start_time"]
+        grace_period_minutes_str = lateness_settings["grace_period_minutes"]
         try:
             scheduled_start_time_obj = time.fromisoformat(default_start_time_str)
             scheduled_start_datetime = datetime.combine(now.date(), scheduled_start_time_obj)
@@ -159,4 +221,4 @@ def get_employee_attendance_status_today(employee_id: str) -> Dict[str, Any]:
         status_parts.append(_("status_absent"))
     status_info["status_message"] = " | ".join(filter(None, status_parts))
 
-    return status_info
\ No newline at end of file
+    return status_info
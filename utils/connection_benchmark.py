@@ -0,0 +1,139 @@
+# utils/connection_benchmark.py
+"""
+Benchmark of the pooled per-thread database connection against opening a connection per query:
+
+    python -m utils.connection_benchmark --employees 10000 --lookups 2000
+
+Each lookup runs the same two statements the employee dialogs issue (an employee by ID joined to
+its department, then an app setting) in two ways: with a fresh sqlite3.connect() per statement,
+as the queries module did before connections were pooled, and through db_schema.get_connection().
+Reports the connections opened and the time per lookup for each. With --min-speedup the exit
+status is 1 when pooling is not at least that many times faster, so the benchmark can be used as
+a regression check.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Optional, Dict, List, Any, Callable
+
+import config
+from data import database as db_schema
+
+logger = logging.getLogger(__name__)
+
+EMPLOYEE_LOOKUP_SQL = f"""
+    SELECT e.*, d.{db_schema.COL_DEPT_NAME} AS "{db_schema.COL_EMP_DEPARTMENT}"
+    FROM {db_schema.TABLE_EMPLOYEES} e
+    LEFT JOIN {db_schema.TABLE_DEPARTMENTS} d ON e.{db_schema.COL_EMP_DEPARTMENT_ID} = d.{db_schema.COL_DEPT_ID}
+    WHERE UPPER(e.{db_schema.COL_EMP_ID}) = UPPER(?)
+"""
+SETTING_LOOKUP_SQL = f"SELECT {db_schema.COL_SETTING_VALUE} FROM {db_schema.TABLE_APP_SETTINGS} WHERE {db_schema.COL_SETTING_KEY} = ?"
+BENCHMARK_SETTING_KEY = "standard_start_time"
+
+def prepare_benchmark_database(database_path: str, employees: int, departments: int = 12):
+    """Points the application at a fresh scratch database with `employees` employees spread over the departments."""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(database_path + suffix):
+            os.remove(database_path + suffix)
+    db_schema.close_connection()
+    config.DATABASE_NAME = database_path
+    db_schema.init_db()
+    with db_schema.transaction() as conn_db:
+        conn_db.executemany(f"INSERT INTO {db_schema.TABLE_DEPARTMENTS} ({db_schema.COL_DEPT_NAME}) VALUES (?)",
+                            [(f"Department {dept}",) for dept in range(1, departments + 1)])
+        conn_db.executemany(f"""
+            INSERT INTO {db_schema.TABLE_EMPLOYEES}
+                ({db_schema.COL_EMP_ID}, {db_schema.COL_EMP_NAME}, {db_schema.COL_EMP_DEPARTMENT_ID}, {db_schema.COL_EMP_POSITION},
+                 {db_schema.COL_EMP_SALARY}, {db_schema.COL_EMP_STATUS})
+            VALUES (?, ?, ?, 'Clerk', 5000, 'Active')
+        """, [(f"BENCH{num:06d}", f"Employee {num}", num % departments + 1) for num in range(1, employees + 1)])
+
+def _lookup_with_new_connections(emp_id: str) -> List[sqlite3.Connection]:
+    """One lookup the pre-pooling way: every statement opens and closes its own connection."""
+    connections = []
+    for sql, params in ((EMPLOYEE_LOOKUP_SQL, (emp_id,)), (SETTING_LOOKUP_SQL, (BENCHMARK_SETTING_KEY,))):
+        conn = sqlite3.connect(config.DATABASE_NAME)
+        try:
+            conn.row_factory = sqlite3.Row
+            conn.execute(sql, params).fetchone()
+        finally:
+            conn.close()
+        connections.append(conn)
+    return connections
+
+def _lookup_with_pooled_connection(emp_id: str) -> List[sqlite3.Connection]:
+    """The same lookup on the thread's pooled connection."""
+    connections = []
+    for sql, params in ((EMPLOYEE_LOOKUP_SQL, (emp_id,)), (SETTING_LOOKUP_SQL, (BENCHMARK_SETTING_KEY,))):
+        with db_schema.get_connection() as conn:
+            conn.row_factory = sqlite3.Row
+            conn.execute(sql, params).fetchone()
+        connections.append(conn)
+    return connections
+
+def run_lookup_phase(name: str, lookup: Callable[[str], List[sqlite3.Connection]], emp_ids: List[str]) -> Dict[str, Any]:
+    """Runs `lookup` for every ID and returns its measurements."""
+    db_schema.close_connection()
+    connections_opened = 0
+    previous_connection = None
+    started = time.perf_counter()
+    for emp_id in emp_ids:
+        for connection in lookup(emp_id):
+            if connection is not previous_connection: # Holding the previous one means a new connection is never the same object
+                connections_opened += 1
+            previous_connection = connection
+    elapsed = time.perf_counter() - started
+    return {
+        "phase": name,
+        "lookups": len(emp_ids),
+        "connections_opened": connections_opened,
+        "elapsed_seconds": round(elapsed, 3),
+        "microseconds_per_lookup": round(elapsed / len(emp_ids) * 1_000_000, 1) if emp_ids else 0.0,
+    }
+
+def run_benchmark(employees: int, lookups: int, database_path: Optional[str] = None, seed: int = 1) -> List[Dict[str, Any]]:
+    """Times `lookups` random employee lookups with and without the pool. Returns one result per phase."""
+    with tempfile.TemporaryDirectory(prefix="connection_bench_") as scratch_dir:
+        prepare_benchmark_database(database_path or os.path.join(scratch_dir, "benchmark.db"), employees)
+        rng = random.Random(seed)
+        emp_ids = [f"BENCH{rng.randint(1, employees):06d}" for _ in range(lookups)]
+        try:
+            return [run_lookup_phase("per-query", _lookup_with_new_connections, emp_ids),
+                    run_lookup_phase("pooled", _lookup_with_pooled_connection, emp_ids)]
+        finally:
+            db_schema.close_connection()
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark pooled database connections against a connection per query.")
+    parser.add_argument("--employees", type=int, default=10000, help="Employees in the scratch database")
+    parser.add_argument("--lookups", type=int, default=2000, help="Employee + setting lookups per phase")
+    parser.add_argument("--database", help="Scratch database path (deleted and recreated; default: a temporary file)")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    parser.add_argument("--min-speedup", type=float, default=0, help="Exit with status 1 if pooling is less than this many times faster")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    results = run_benchmark(args.employees, args.lookups, database_path=args.database)
+    for result in results:
+        print(f"{result['phase']:>9}: {result['lookups']} lookups in {result['elapsed_seconds']}s "
+              f"({result['microseconds_per_lookup']} us per lookup), {result['connections_opened']} connections opened")
+    per_query, pooled = results
+    speedup = per_query["elapsed_seconds"] / pooled["elapsed_seconds"] if pooled["elapsed_seconds"] > 0 else float("inf")
+    print(f"Speedup: {speedup:.2f}x")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as json_file:
+            json.dump({"results": results, "speedup": round(speedup, 2)}, json_file, indent=2)
+
+    if speedup < args.min_speedup:
+        print(f"Benchmark failed: pooled lookups only {speedup:.2f}x faster (expected {args.min_speedup}x)", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
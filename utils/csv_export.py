@@ -0,0 +1,84 @@
+# utils/csv_export.py
+import csv
+import logging
+import os
+import queue
+import threading
+import time
+from itertools import islice
+from typing import Optional, Dict, List, Any, Iterable, Sequence
+
+from data import database as db_schema
+from data import queries as db_queries
+
+logger = logging.getLogger(__name__)
+
+CSV_EXPORT_BUFFER_BYTES = 1 << 20 # File buffer, so rows reach the disk in large writes
+CSV_EXPORT_BATCH_ROWS = 5000 # Rows written per writerows() call; progress is reported after each batch
+
+# Employee columns exported from the main window, in file order
+DEFAULT_EMPLOYEE_EXPORT_COLUMNS = [
+    db_schema.COL_EMP_ID, db_schema.COL_EMP_NAME, "department_name", db_schema.COL_EMP_POSITION,
+    db_schema.COL_EMP_SALARY, db_schema.COL_EMP_VACATION_DAYS, db_schema.COL_EMP_START_DATE,
+    db_schema.COL_EMP_PHONE, db_schema.COL_EMP_EMAIL, db_schema.COL_EMP_GENDER,
+    db_schema.COL_EMP_MARITAL_STATUS, db_schema.COL_EMP_EDUCATION,
+    db_schema.COL_EMP_EMPLOYMENT_HISTORY, db_schema.COL_EMP_DEVICE_USER_ID,
+    db_schema.COL_EMP_PHOTO_PATH, db_schema.COL_EMP_EXCLUDE_VACATION_POLICY,
+    db_schema.COL_EMP_STATUS, db_schema.COL_EMP_TERMINATION_DATE
+]
+
+def write_csv_rows(filepath: str, headers: Sequence[str], rows: Iterable[Sequence[Any]], q_comm: Optional[queue.Queue] = None,
+                   cancel_event: Optional[threading.Event] = None, total: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Writes a header and rows to a CSV file (UTF-8 with BOM, for Excel), consuming rows lazily in
+    batches so memory use stays constant however many rows the iterable yields.
+
+    Progress goes to q_comm as progress_init/progress_update messages (rows written so far; total
+    is None when unknown). Setting cancel_event stops after the current batch and deletes the
+    partial file. Returns a summary dict.
+    """
+    started = time.perf_counter()
+    summary: Dict[str, Any] = {"filepath": filepath, "rows_written": 0, "cancelled": False,
+                               "elapsed_seconds": 0.0, "rows_per_second": 0.0}
+    if q_comm:
+        q_comm.put({"type": "progress_init", "total": total})
+    rows = iter(rows)
+    with open(filepath, "w", newline="", encoding="utf-8-sig", buffering=CSV_EXPORT_BUFFER_BYTES) as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(headers)
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                summary["cancelled"] = True
+                break
+            batch = list(islice(rows, CSV_EXPORT_BATCH_ROWS))
+            if not batch:
+                break
+            writer.writerows(batch)
+            summary["rows_written"] += len(batch)
+            if q_comm:
+                q_comm.put({"type": "progress_update", "current": summary["rows_written"], "total": total})
+    if summary["cancelled"]:
+        os.remove(filepath)
+        logger.info(f"CSV export to '{filepath}' cancelled after {summary['rows_written']} rows; partial file removed.")
+        return summary
+
+    elapsed = time.perf_counter() - started
+    summary["elapsed_seconds"] = round(elapsed, 3)
+    summary["rows_per_second"] = round(summary["rows_written"] / elapsed, 1) if elapsed > 0 else 0.0
+    logger.info(f"Exported {summary['rows_written']} rows to '{filepath}' in {elapsed:.2f}s ({summary['rows_per_second']} rows/s).")
+    return summary
+
+def export_employees_csv(filepath: str, columns: Optional[List[str]] = None, include_archived: bool = False,
+                         q_comm: Optional[queue.Queue] = None, cancel_event: Optional[threading.Event] = None) -> Dict[str, Any]:
+    """
+    Streams employees to a CSV file, selecting only the given columns (names from
+    db_queries.EMPLOYEE_EXPORT_COLUMNS, default DEFAULT_EMPLOYEE_EXPORT_COLUMNS) straight from a
+    database cursor. Meant to run in a worker thread; see write_csv_rows for progress and cancelling.
+    """
+    columns = columns or DEFAULT_EMPLOYEE_EXPORT_COLUMNS
+    total = db_queries.get_total_employee_count_db(include_archived=include_archived)
+    rows = db_queries.iter_employees_for_export_db(columns, include_archived=include_archived)
+    try:
+        return write_csv_rows(filepath, columns, rows, q_comm=q_comm, cancel_event=cancel_event, total=total)
+    finally:
+        rows.close() # Releases the cursor if the export stopped early
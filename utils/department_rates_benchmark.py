@@ -0,0 +1,164 @@
+# utils/department_rates_benchmark.py
+"""
+Benchmark of the dashboard's per-department absenteeism/adherence figures on a generated year of attendance:
+
+    python -m utils.department_rates_benchmark --employees 5000 --departments 12 --year 2024
+
+Compares the original algorithm (employees listed per department, then one COUNT(DISTINCT log_date)
+query per employee, run once for each chart) with db_queries.get_department_attendance_rates_db,
+which computes both charts in one grouped query. The results of the two are checked to be equal.
+With --min-speedup the exit status is 1 when the grouped query is not at least that many times
+faster, so the benchmark can be used as a regression check.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date as dt_date, timedelta
+from typing import Optional, Dict, List, Any, Iterator, Tuple
+
+import config
+from data import database as db_schema
+from data import queries as db_queries
+
+logger = logging.getLogger(__name__)
+
+WORK_DAY_INDICES = [0, 1, 2, 3, 4] # Mon-Fri
+
+def _generate_attendance_rows(employees: int, year: int, attendance_rate: float, seed: int) -> Iterator[Tuple[str, str, str, str, str]]:
+    """One clock-in/clock-out row per employee per attended workday of the year."""
+    rng = random.Random(seed)
+    day = dt_date(year, 1, 1)
+    while day.year == year:
+        if day.weekday() in WORK_DAY_INDICES:
+            day_str = day.isoformat()
+            for num in range(1, employees + 1):
+                if rng.random() < attendance_rate:
+                    yield (f"BENCH{num:06d}", f"{day_str} 09:{rng.randint(0, 29):02d}:00", f"{day_str} 17:{rng.randint(0, 59):02d}:00",
+                           day_str, "benchmark")
+        day += timedelta(days=1)
+
+def prepare_benchmark_database(database_path: str, employees: int, departments: int, year: int,
+                               attendance_rate: float = 0.9, seed: int = 1) -> int:
+    """Points the application at a fresh scratch database filled with a year of attendance. Returns the attendance rows added."""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(database_path + suffix):
+            os.remove(database_path + suffix)
+    db_schema.close_connection()
+    config.DATABASE_NAME = database_path
+    db_schema.init_db()
+    with db_schema.transaction() as conn_db:
+        conn_db.executemany(f"INSERT INTO {db_schema.TABLE_DEPARTMENTS} ({db_schema.COL_DEPT_NAME}) VALUES (?)",
+                            [(f"Department {dept:02d}",) for dept in range(1, departments + 1)])
+        conn_db.executemany(f"""
+            INSERT INTO {db_schema.TABLE_EMPLOYEES}
+                ({db_schema.COL_EMP_ID}, {db_schema.COL_EMP_NAME}, {db_schema.COL_EMP_DEPARTMENT_ID}, {db_schema.COL_EMP_STATUS})
+            VALUES (?, ?, ?, 'Active')
+        """, [(f"BENCH{num:06d}", f"Employee {num}", num % departments + 1) for num in range(1, employees + 1)])
+        cursor = conn_db.cursor()
+        cursor.executemany(f"""
+            INSERT INTO {db_schema.TABLE_ATTENDANCE_LOG}
+                ({db_schema.COL_ATT_EMP_ID}, {db_schema.COL_ATT_CLOCK_IN}, {db_schema.COL_ATT_CLOCK_OUT},
+                 {db_schema.COL_ATT_LOG_DATE}, {db_schema.COL_ATT_SOURCE})
+            VALUES (?, ?, ?, ?, ?)
+        """, _generate_attendance_rows(employees, year, attendance_rate, seed))
+        attendance_rows = cursor.rowcount
+        db_schema.rebuild_attendance_daily(cursor)
+    with db_schema.get_connection() as conn_db:
+        conn_db.execute("ANALYZE")
+    return attendance_rows
+
+def per_employee_department_rates(period_start_str: str, period_end_str: str, work_day_indices: List[int]) -> Dict[str, Dict[str, float]]:
+    """The original dashboard algorithm: employees fetched per department, then one attendance query per employee."""
+    period_start_date = dt_date.fromisoformat(period_start_str)
+    period_end_date = dt_date.fromisoformat(period_end_str)
+    rates = {}
+    with db_schema.get_connection() as conn:
+        departments = conn.execute(f"SELECT {db_schema.COL_DEPT_ID}, {db_schema.COL_DEPT_NAME} FROM {db_schema.TABLE_DEPARTMENTS} "
+                                   f"ORDER BY {db_schema.COL_DEPT_NAME}").fetchall()
+        for dept_id, dept_name in departments:
+            active_employees = [row[0] for row in conn.execute(
+                f"SELECT {db_schema.COL_EMP_ID}, {db_schema.COL_EMP_DEPARTMENT_ID}, {db_schema.COL_EMP_STATUS} FROM {db_schema.TABLE_EMPLOYEES} "
+                f"WHERE {db_schema.COL_EMP_IS_ARCHIVED} = 0 OR {db_schema.COL_EMP_IS_ARCHIVED} IS NULL")
+                if row[1] == dept_id and row[2] == db_schema.STATUS_ACTIVE]
+            total_expected_workdays = 0
+            total_attended_days = 0
+            for emp_id in active_employees:
+                total_expected_workdays += db_queries.get_expected_workdays_in_period(period_start_date, period_end_date, work_day_indices)
+                total_attended_days += conn.execute(f"""
+                    SELECT COUNT(DISTINCT {db_schema.COL_ATT_LOG_DATE}) FROM {db_schema.TABLE_ATTENDANCE_LOG}
+                    WHERE {db_schema.COL_ATT_EMP_ID} = ? AND {db_schema.COL_ATT_LOG_DATE} BETWEEN ? AND ?
+                """, (emp_id, period_start_str, period_end_str)).fetchone()[0] or 0
+            if total_expected_workdays > 0:
+                rates[dept_name] = {
+                    "absenteeism_rate": round((total_expected_workdays - total_attended_days) / total_expected_workdays * 100, 2),
+                    "adherence_rate": round(total_attended_days / total_expected_workdays * 100, 2),
+                }
+            else:
+                rates[dept_name] = {"absenteeism_rate": 0.0, "adherence_rate": 0.0}
+    return rates
+
+def run_benchmark(employees: int, departments: int, year: int, database_path: Optional[str] = None) -> Dict[str, Any]:
+    """Times both algorithms over the whole year and returns the measurements."""
+    with tempfile.TemporaryDirectory(prefix="department_rates_bench_") as scratch_dir:
+        try:
+            started = time.perf_counter()
+            attendance_rows = prepare_benchmark_database(database_path or os.path.join(scratch_dir, "benchmark.db"),
+                                                         employees, departments, year)
+            setup_seconds = time.perf_counter() - started
+            period_start, period_end = f"{year}-01-01", f"{year}-12-31"
+
+            started = time.perf_counter()
+            # The dashboard used to run the per-employee algorithm once for each of its two charts
+            for _ in range(2):
+                per_employee_rates = per_employee_department_rates(period_start, period_end, WORK_DAY_INDICES)
+            per_employee_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            grouped_rates = db_queries.get_department_attendance_rates_db(period_start, period_end, WORK_DAY_INDICES)
+            grouped_seconds = time.perf_counter() - started
+        finally:
+            db_schema.close_connection()
+    return {
+        "employees": employees,
+        "departments": departments,
+        "attendance_rows": attendance_rows,
+        "setup_seconds": round(setup_seconds, 3),
+        "per_employee_seconds": round(per_employee_seconds, 3),
+        "grouped_seconds": round(grouped_seconds, 3),
+        "speedup": round(per_employee_seconds / grouped_seconds, 1) if grouped_seconds > 0 else float("inf"),
+        "results_match": per_employee_rates == grouped_rates,
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard's department absenteeism/adherence calculation.")
+    parser.add_argument("--employees", type=int, default=5000, help="Active employees in the scratch database")
+    parser.add_argument("--departments", type=int, default=12, help="Departments the employees are spread over")
+    parser.add_argument("--year", type=int, default=2024, help="Year of generated attendance (one row per attended workday)")
+    parser.add_argument("--database", help="Scratch database path (deleted and recreated; default: a temporary file)")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    parser.add_argument("--min-speedup", type=float, default=0, help="Exit with status 1 if the grouped query is less than this many times faster")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    result = run_benchmark(args.employees, args.departments, args.year, database_path=args.database)
+    print(f"{result['employees']} employees, {result['departments']} departments, {result['attendance_rows']} attendance rows "
+          f"(generated in {result['setup_seconds']}s)")
+    print(f"Per-employee queries (both charts): {result['per_employee_seconds']}s")
+    print(f"Grouped query (both charts):        {result['grouped_seconds']}s")
+    print(f"Speedup: {result['speedup']}x, results {'match' if result['results_match'] else 'DIFFER'}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as json_file:
+            json.dump(result, json_file, indent=2)
+
+    if not result["results_match"] or result["speedup"] < args.min_speedup:
+        print(f"Benchmark failed: {'results differ' if not result['results_match'] else 'grouped query too slow'}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+# utils/employee_import.py
+import csv
+import logging
+import queue
+import threading
+import time
+from datetime import date
+from itertools import islice
+from typing import Optional, Dict, List, Any, Set, Tuple
+
+from data import database as db_schema
+from data import queries as db_queries
+from utils import validators
+from utils.exceptions import InvalidInputError, DatabaseOperationError
+
+logger = logging.getLogger(__name__)
+
+EMPLOYEE_IMPORT_CHUNK_SIZE = 1000 # Employees inserted per transaction
+MAX_ROW_ERRORS_KEPT = 200 # Row errors kept in the summary; all of them are still sent to q_comm
+REQUIRED_CSV_HEADERS = (db_schema.COL_EMP_NAME, db_schema.COL_EMP_POSITION, db_schema.COL_EMP_SALARY)
+_TRUE_VALUES = {"1", "true", "yes", "y"}
+_FALSE_VALUES = {"", "0", "false", "no", "n"}
+
+def _optional(row: Dict[str, Optional[str]], column: str) -> Optional[str]:
+    value = (row.get(column) or "").strip()
+    return value or None
+
+def _validate_employee_row(row: Dict[str, Optional[str]], departments: Dict[str, int], device_user_ids: Set[str],
+                           unknown_departments: Set[str]) -> tuple:
+    """
+    Checks one CSV row and returns its values in db_queries.EMPLOYEE_BULK_INSERT_COLUMNS order.
+    Raises InvalidInputError with the reason when the row can't be imported. A department that
+    doesn't exist leaves the employee unassigned and is added to unknown_departments.
+    """
+    name = _optional(row, db_schema.COL_EMP_NAME)
+    position = _optional(row, db_schema.COL_EMP_POSITION)
+    if not name or not position:
+        raise InvalidInputError("Name and position are required.")
+    try:
+        salary = float(row.get(db_schema.COL_EMP_SALARY) or "")
+    except ValueError:
+        raise InvalidInputError(f"Invalid salary '{row.get(db_schema.COL_EMP_SALARY)}'.")
+    if salary < 0:
+        raise InvalidInputError("Salary cannot be negative.")
+    vacation_days_str = _optional(row, db_schema.COL_EMP_VACATION_DAYS)
+    try:
+        vacation_days = int(vacation_days_str) if vacation_days_str else 0
+    except ValueError:
+        raise InvalidInputError(f"Invalid vacation days '{vacation_days_str}'.")
+
+    phone = _optional(row, db_schema.COL_EMP_PHONE)
+    if phone and not validators.is_valid_phone(phone):
+        raise InvalidInputError(f"Invalid phone number '{phone}'.")
+    email = _optional(row, db_schema.COL_EMP_EMAIL)
+    if email and not validators.is_valid_email(email):
+        raise InvalidInputError(f"Invalid email '{email}'.")
+    start_date = _optional(row, db_schema.COL_EMP_START_DATE)
+    if start_date:
+        try:
+            date.fromisoformat(start_date)
+        except ValueError:
+            raise InvalidInputError(f"Invalid start date '{start_date}' (expected YYYY-MM-DD).")
+    exclude_str = (row.get(db_schema.COL_EMP_EXCLUDE_VACATION_POLICY) or "").strip().lower()
+    if exclude_str not in _TRUE_VALUES and exclude_str not in _FALSE_VALUES:
+        raise InvalidInputError(f"Invalid exclude vacation policy value '{exclude_str}'.")
+
+    device_user_id = _optional(row, db_schema.COL_EMP_DEVICE_USER_ID)
+    if device_user_id:
+        if device_user_id in device_user_ids:
+            raise InvalidInputError(f"Device User ID '{device_user_id}' is already assigned to another employee.")
+        device_user_ids.add(device_user_id)
+
+    department_id = None
+    department_name = _optional(row, db_schema.COL_EMP_DEPARTMENT)
+    if department_name:
+        department_id = departments.get(department_name.casefold())
+        if department_id is None:
+            unknown_departments.add(department_name)
+
+    return (name, department_id, position, salary, vacation_days, db_schema.STATUS_ACTIVE, phone, email,
+            _optional(row, db_schema.COL_EMP_PHOTO_PATH), _optional(row, db_schema.COL_EMP_GENDER), start_date,
+            _optional(row, db_schema.COL_EMP_MARITAL_STATUS), _optional(row, db_schema.COL_EMP_EDUCATION),
+            _optional(row, db_schema.COL_EMP_EMPLOYMENT_HISTORY), "Morning", None, device_user_id,
+            1 if exclude_str in _TRUE_VALUES else 0)
+
+def _get_existing_device_user_ids_db() -> Set[str]:
+    """Device User IDs already assigned, so conflicting rows are rejected before any insert."""
+    conn = db_schema.get_connection()
+    cursor = conn.execute(f"SELECT {db_schema.COL_EMP_DEVICE_USER_ID} FROM {db_schema.TABLE_EMPLOYEES} "
+                          f"WHERE {db_schema.COL_EMP_DEVICE_USER_ID} IS NOT NULL AND {db_schema.COL_EMP_DEVICE_USER_ID} != ''")
+    return {str(row[0]) for row in cursor}
+
+def _insert_chunk(chunk: List[Tuple[int, tuple]]) -> Tuple[int, List[Tuple[int, str]]]:
+    """
+    Inserts a validated chunk in one transaction. If the chunk is rejected (e.g. a Device User ID
+    taken meanwhile), its rows are retried one at a time so only the offending rows are lost.
+    Returns the number of employees added and the (row number, error) pairs.
+    """
+    try:
+        return len(db_queries.add_employees_bulk_db([values for _, values in chunk])), []
+    except DatabaseOperationError as e:
+        if len(chunk) == 1:
+            return 0, [(chunk[0][0], str(e))]
+        logger.warning(f"Employee import chunk of {len(chunk)} rows rejected ({e}); retrying row by row.")
+    added, errors = 0, []
+    for row_num, values in chunk:
+        try:
+            db_queries.add_employees_bulk_db([values])
+            added += 1
+        except DatabaseOperationError as e:
+            errors.append((row_num, str(e)))
+    return added, errors
+
+def import_employees_csv(filepath: str, q_comm: Optional[queue.Queue] = None, cancel_event: Optional[threading.Event] = None,
+                         chunk_size: int = EMPLOYEE_IMPORT_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    Imports employees from a CSV file whose headers are the employee column names (department by
+    name in the department_name column). Meant to run in a worker thread.
+
+    Departments and assigned Device User IDs are loaded once up front. Rows are validated a chunk
+    at a time and each chunk is inserted in a single transaction with a block of employee IDs
+    reserved from the counter, so an import costs one write transaction per chunk_size employees.
+    Invalid rows are skipped and reported; the rest of the file is still imported.
+
+    Progress goes to q_comm as progress_init/progress_update messages (rows read so far), and the
+    skipped rows of each chunk as {"type": "row_errors", "errors": [(row_number, reason), ...]}.
+    Setting cancel_event stops the import after the current chunk; chunks already written stay.
+    """
+    started = time.perf_counter()
+    summary: Dict[str, Any] = {"processed_rows": 0, "imported": 0, "error_count": 0, "errors": [],
+                               "unknown_departments": [], "cancelled": False, "elapsed_seconds": 0.0, "rows_per_second": 0.0}
+    with open(filepath, 'rb') as raw_file:
+        total_rows = max(0, sum(block.count(b'\n') for block in iter(lambda: raw_file.read(1 << 20), b'')) - 1)
+    if q_comm:
+        q_comm.put({"type": "progress_init", "total": total_rows})
+
+    departments = {dept[db_schema.COL_DEPT_NAME].casefold(): dept[db_schema.COL_DEPT_ID] for dept in db_queries.list_departments_db()}
+    device_user_ids = _get_existing_device_user_ids_db()
+    unknown_departments: Set[str] = set()
+
+    with open(filepath, 'r', newline='', encoding='utf-8-sig') as csvfile:
+        reader = csv.DictReader(csvfile)
+        missing_headers = [header for header in REQUIRED_CSV_HEADERS if header not in (reader.fieldnames or [])]
+        if missing_headers:
+            raise InvalidInputError(f"CSV file is missing required column(s): {', '.join(missing_headers)}")
+        rows = enumerate(reader, 2) # Row numbers as shown in a spreadsheet, the header being row 1
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                summary["cancelled"] = True
+                logger.info(f"Employee import of '{filepath}' cancelled after {summary['processed_rows']} rows.")
+                break
+            batch = list(islice(rows, chunk_size))
+            if not batch:
+                break
+            chunk, row_errors = [], []
+            for row_num, row in batch:
+                try:
+                    chunk.append((row_num, _validate_employee_row(row, departments, device_user_ids, unknown_departments)))
+                except InvalidInputError as e:
+                    row_errors.append((row_num, str(e)))
+            if chunk:
+                added, insert_errors = _insert_chunk(chunk)
+                summary["imported"] += added
+                row_errors.extend(insert_errors)
+            summary["processed_rows"] += len(batch)
+            if row_errors:
+                row_errors.sort()
+                summary["error_count"] += len(row_errors)
+                summary["errors"].extend(row_errors[:MAX_ROW_ERRORS_KEPT - len(summary["errors"])])
+            if q_comm:
+                if row_errors:
+                    q_comm.put({"type": "row_errors", "errors": row_errors})
+                q_comm.put({"type": "progress_update", "current": min(summary["processed_rows"], total_rows), "total": total_rows})
+
+    elapsed = time.perf_counter() - started
+    summary["unknown_departments"] = sorted(unknown_departments)
+    summary["elapsed_seconds"] = round(elapsed, 3)
+    summary["rows_per_second"] = round(summary["processed_rows"] / elapsed, 1) if elapsed > 0 else 0.0
+    if unknown_departments:
+        logger.warning(f"Employee import: unknown department(s) {summary['unknown_departments']}; those employees were left unassigned.")
+    logger.info(f"Imported employees from '{filepath}': {summary['imported']} of {summary['processed_rows']} rows in {elapsed:.2f}s "
+                f"({summary['rows_per_second']} rows/s), {summary['error_count']} rows skipped.")
+    return summary
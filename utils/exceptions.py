@@ -35,4 +35,9 @@ class NotClockedInError(AttendanceError):
 
 class UserNotFoundError(HRException): # Assuming you might want this for user management
     """Exception raised when a user is not found."""
-    pass
\ No newline at end of file
+    pass
+
+
+class EventStreamOrderError(InvalidInputError):
+    """Raised when an event stream that must be time-ordered goes back in time."""
+    pass
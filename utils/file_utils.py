@@ -8,6 +8,7 @@ import sqlite3
 
 # Project-specific imports
 import config # For DATABASE_NAME, BACKUP_DIR
+from data import database as db_schema # For the pooled connection used by backup/restore
 
 try:
     import pandas as pd
@@ -99,13 +100,13 @@ def create_backup_db(backup_directory: Optional[str] = None, custom_filename: Op
     if backup_directory is None:
         backup_directory = config.BACKUP_DIR
     if not os.path.exists(config.DATABASE_NAME):
-        print(f"Database file '{config.DATABASE_NAME}' not found. Cannot create backup.") # Or log this
+        logger.error(f"Database file '{config.DATABASE_NAME}' not found. Cannot create backup.")
         return None
 
     try:
         if not os.path.exists(backup_directory):
             os.makedirs(backup_directory, exist_ok=True) # Use exist_ok=True
-            print(f"Backup directory '{backup_directory}' created.") # Or log this
+            logger.info(f"Backup directory '{backup_directory}' created.")
 
         if custom_filename:
             backup_filename = custom_filename if custom_filename.endswith(".db") else f"{custom_filename}.db"
@@ -115,24 +116,47 @@ def create_backup_db(backup_directory: Optional[str] = None, custom_filename: Op
         
         backup_filepath = os.path.join(backup_directory, backup_filename)
 
-        shutil.copy2(config.DATABASE_NAME, backup_filepath) # copy2 preserves metadata
-        print(f"Database backup created successfully: {backup_filepath}") # Or log this
+        # The live database runs in WAL mode, so recent commits may still sit in the -wal file;
+        # the backup API copies a consistent snapshot through SQLite instead of copying the raw file.
+        backup_conn = sqlite3.connect(backup_filepath)
+        try:
+            db_schema.get_connection().backup(backup_conn)
+            backup_conn.execute("PRAGMA journal_mode = DELETE") # Keep the backup a single self-contained file
+        finally:
+            backup_conn.close()
+        logger.info(f"Database backup created successfully: {backup_filepath}")
         return backup_filepath
-    except Exception as e:
-        print(f"Failed to create database backup: {e}") # Or log this
+    except (sqlite3.Error, OSError) as e:
+        logger.error(f"Failed to create database backup: {e}")
         return None
 
 def restore_database_from_backup(backup_filepath: str, destination_db_name: Optional[str] = None) -> bool:
     """
     Restores the database from a given backup file to the specified destination.
     If destination_db_name is None, it defaults to config.DATABASE_NAME.
+    The backup is copied page by page with the SQLite backup API, so a live WAL database
+    (and its -wal/-shm files) is replaced consistently while connections stay open.
     """
     if destination_db_name is None:
         destination_db_name = config.DATABASE_NAME
 
     if not os.path.exists(backup_filepath):
-        print(f"Backup file '{backup_filepath}' not found. Cannot restore.") # Or log this
+        logger.error(f"Backup file '{backup_filepath}' not found. Cannot restore.")
+        return False
+
+    restoring_live_db = os.path.abspath(destination_db_name) == os.path.abspath(config.DATABASE_NAME)
+    source_conn = sqlite3.connect(backup_filepath)
+    destination_conn = db_schema.get_connection() if restoring_live_db else db_schema.create_connection(destination_db_name)
+    try:
+        source_conn.backup(destination_conn)
+    except sqlite3.Error as e:
+        logger.error(f"Failed to restore database from '{backup_filepath}': {e}")
         return False
-    shutil.copy2(backup_filepath, destination_db_name)
-    print(f"Database restored successfully from '{backup_filepath}' to '{destination_db_name}'.") # Or log this
+    finally:
+        source_conn.close()
+        if not restoring_live_db:
+            destination_conn.close()
+    if restoring_live_db:
+        db_schema.invalidate_app_settings_cache() # Cached settings belong to the replaced data
+    logger.info(f"Database restored successfully from '{backup_filepath}' to '{destination_db_name}'.")
     return True
\ No newline at end of file
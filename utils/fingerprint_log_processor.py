@@ -1,9 +1,23 @@
 # c:\Users\mahmo\OneDrive\Documents\GitHub\hr_management_system\utils\fingerprint_log_processor.py
 import csv
+import heapq
 import logging
-from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta # Added timedelta
-from utils.localization import _ # For translating event types
+import os
+import pickle
+import tempfile
+import threading
+import time
+import queue
+from array import array
+from collections import namedtuple
+from itertools import islice
+from operator import attrgetter
+from typing import List, Dict, Any, Optional, Iterator, Iterable
+from datetime import datetime, date, timedelta # Added timedelta
+from utils.localization import _, LANG_MANAGER # For translating event types
+from utils.exceptions import EventStreamOrderError
+from data import database as db_schema
+from utils import zkteco_utils # Shares the punch pairing and attendance_log writer with device sync
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +29,10 @@ EVENT_CODE_BREAK_IN = 3
 
 # Define expected CSV headers as a module-level constant
 EXPECTED_CSV_HEADERS = ['employeeid', 'timestamp', 'eventcode']
+FINGERPRINT_CSV_CHUNK_SIZE = 50000 # Records per list from iter_fingerprint_csv_chunks
+SORT_RUN_BATCH_SIZE = 5000 # Records per pickled batch in an external sort run file
+FINGERPRINT_IMPORT_CHUNK_SIZE = 50000 # Punches written per transaction by import_fingerprint_csv
+MAX_BAD_ROW_SAMPLES = 100 # Bad rows kept (with reason) in the parse report; the rest are only counted
 
 # Mapping for event codes to their translation keys
 EVENT_TYPE_TRANSLATION_MAP = {
@@ -24,61 +42,271 @@ EVENT_TYPE_TRANSLATION_MAP = {
     EVENT_CODE_BREAK_IN: "fp_event_break_in",
 }
 
+# One parsed log row. device_id is "" when the file has no device column or the cell is empty.
+FingerprintLogRecord = namedtuple("FingerprintLogRecord", "employee_id timestamp event_code device_id")
+
+_event_display_cache: Dict[tuple, str] = {} # (language, event code) -> display string
+
 def get_event_type_display(event_code: int) -> str:
-    """Translates event code to a display string."""
-    translation_key = EVENT_TYPE_TRANSLATION_MAP.get(event_code, "fp_event_unknown")
-    return _(translation_key)
+    """Translates event code to a display string (cached per language)."""
+    cache_key = (LANG_MANAGER.current_lang, event_code)
+    display = _event_display_cache.get(cache_key)
+    if display is None:
+        display = _event_display_cache[cache_key] = _(EVENT_TYPE_TRANSLATION_MAP.get(event_code, "fp_event_unknown"))
+    return display
 
-def parse_fingerprint_csv(filepath: str) -> List[Dict[str, Any]]: # Kept Any for broader compatibility, specific types below
+def parse_log_timestamp(timestamp_str: str) -> datetime:
+    """
+    Parses a 'YYYY-MM-DD HH:MM:SS' timestamp. The fixed format is checked by shape and parsed with
+    fromisoformat, which is several times faster than strptime; anything else goes through strptime
+    so the accepted format is unchanged.
+    """
+    if (len(timestamp_str) == 19 and timestamp_str[4] == '-' and timestamp_str[7] == '-' and timestamp_str[10] == ' '
+            and timestamp_str[13] == ':' and timestamp_str[16] == ':'):
+        return datetime.fromisoformat(timestamp_str)
+    return datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S')
+
+def new_parse_report() -> Dict[str, Any]:
+    """An empty report for iter_fingerprint_csv: row counts and up to MAX_BAD_ROW_SAMPLES bad rows."""
+    return {"rows": 0, "parsed": 0, "bad_rows": 0, "bad_row_samples": []}
+
+def _report_bad_row(report: Dict[str, Any], row_num: int, reason: str):
+    report["bad_rows"] += 1
+    if len(report["bad_row_samples"]) < MAX_BAD_ROW_SAMPLES:
+        report["bad_row_samples"].append((row_num, reason))
+
+def iter_fingerprint_csv(filepath: str, report: Optional[Dict[str, Any]] = None) -> Iterator[FingerprintLogRecord]:
     """
-    Parses a fingerprint log CSV file.
+    Streams a fingerprint log CSV file as FingerprintLogRecord tuples, holding one row at a time.
     Assumes CSV columns: EmployeeID, Timestamp (YYYY-MM-DD HH:MM:SS), EventCode, DeviceID (optional)
+
+    Bad rows are skipped and recorded in report (see new_parse_report) instead of being logged one
+    by one; a single warning with the count is logged when the file is done.
+    Raises ValueError (on the first next()) if required headers are missing.
     """
-    parsed_logs = []
+    report = new_parse_report() if report is None else report
+    parse_timestamp = parse_log_timestamp
     try:
-        with open(filepath, mode='r', encoding='utf-8-sig') as csvfile: # utf-8-sig for BOM
-            reader = csv.DictReader(csvfile)
+        with open(filepath, mode='r', encoding='utf-8-sig', newline='') as csvfile: # utf-8-sig for BOM
+            reader = csv.reader(csvfile)
             # Normalize header names (case-insensitive, remove spaces)
-            reader.fieldnames = [name.lower().replace(' ', '') for name in reader.fieldnames or []]
-            
-            found_headers_set = set(reader.fieldnames or [])
-            missing_headers = [h for h in EXPECTED_CSV_HEADERS if h not in found_headers_set]
+            fieldnames = [name.lower().replace(' ', '') for name in next(reader, [])]
+
+            missing_headers = [h for h in EXPECTED_CSV_HEADERS if h not in fieldnames]
             if missing_headers:
-                error_msg = f"CSV file is missing required headers: {', '.join(missing_headers)}. Found: {reader.fieldnames or 'None'}."
+                error_msg = f"CSV file is missing required headers: {', '.join(missing_headers)}. Found: {fieldnames or 'None'}."
                 logger.error(error_msg)
                 raise ValueError(error_msg)
+            emp_index, timestamp_index, event_index = (fieldnames.index(h) for h in EXPECTED_CSV_HEADERS)
+            device_index = fieldnames.index('deviceid') if 'deviceid' in fieldnames else None
+            required_length = max(emp_index, timestamp_index, event_index) + 1
 
             for row_num, row in enumerate(reader, 1):
+                report["rows"] += 1
+                if len(row) < required_length:
+                    if any(row): # Blank lines are not worth reporting
+                        _report_bad_row(report, row_num, "missing columns")
+                    continue
+                emp_id = row[emp_index].strip()
+                timestamp_str = row[timestamp_index].strip()
+                event_code_str = row[event_index].strip()
+                if not (emp_id and timestamp_str and event_code_str):
+                    _report_bad_row(report, row_num, "missing essential data")
+                    continue
                 try:
-                    emp_id = row.get('employeeid', '').strip()
-                    timestamp_str = row.get('timestamp', '').strip()
-                    event_code_str = row.get('eventcode', '').strip()
-                    device_id = row.get('deviceid', '').strip() # Optional
-
-                    if not all([emp_id, timestamp_str, event_code_str]):
-                        logger.warning(f"Skipping row {row_num} due to missing essential data: {row}")
-                        continue
-
-                    # Validate and convert data types
-                    timestamp_dt = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S')
-                    event_code = int(event_code_str)
-
-                    parsed_logs.append({
-                        "employee_id": emp_id,
-                        "timestamp_obj": timestamp_dt,
-                        "timestamp_str": timestamp_dt.strftime('%Y-%m-%d %H:%M:%S'), # Store formatted string too
-                        "event_code": event_code,
-                        "event_type_display": get_event_type_display(event_code),
-                        "device_id": device_id if device_id else "N/A"
-                    })
+                    record = FingerprintLogRecord(emp_id, parse_timestamp(timestamp_str), int(event_code_str),
+                                                  row[device_index].strip() if device_index is not None and device_index < len(row) else "")
                 except ValueError as ve:
-                    logger.warning(f"Skipping row {row_num} due to data conversion error: {ve}. Row: {row}")
-                except Exception as e_row:
-                    logger.warning(f"Skipping row {row_num} due to unexpected error: {e_row}. Row: {row}")
+                    _report_bad_row(report, row_num, f"data conversion error: {ve}")
+                    continue
+                report["parsed"] += 1
+                yield record
     except Exception as e:
         logger.error(f"Error parsing fingerprint CSV file '{filepath}': {e}", exc_info=True)
         raise # Re-raise to be caught by UI
-    return parsed_logs
+    if report["bad_rows"]:
+        logger.warning(f"Skipped {report['bad_rows']} bad row(s) of {report['rows']} in '{filepath}'. "
+                       f"First: {report['bad_row_samples'][:5]}")
+
+def iter_fingerprint_csv_chunks(filepath: str, chunk_size: int = FINGERPRINT_CSV_CHUNK_SIZE,
+                                report: Optional[Dict[str, Any]] = None) -> Iterator[List[FingerprintLogRecord]]:
+    """Streams a fingerprint log CSV file as lists of at most chunk_size records (bounded memory for batch work)."""
+    records = iter_fingerprint_csv(filepath, report)
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def parse_fingerprint_csv(filepath: str) -> List[Dict[str, Any]]: # Kept Any for broader compatibility, specific types below
+    """
+    Parses a whole fingerprint log CSV file into a list of dicts.
+    Kept for callers that need every row at once; prefer iter_fingerprint_csv for large files.
+    """
+    return [{
+        "employee_id": record.employee_id,
+        "timestamp_obj": record.timestamp,
+        "timestamp_str": str(record.timestamp),
+        "event_code": record.event_code,
+        "event_type_display": get_event_type_display(record.event_code),
+        "device_id": record.device_id or "N/A"
+    } for record in iter_fingerprint_csv(filepath)]
+
+# --- Daily Event Summary ---
+_NO_TIME = -1 # "No time" in the integer-seconds columns
+
+class DailyEventSummary:
+    """
+    Daily summaries (one per employee and day) in array-backed columns: the day as a date ordinal,
+    first check-in and last check-out as seconds since midnight (_NO_TIME if none), work and break
+    durations in integer seconds and the raw event count. Display strings are only built by row().
+    """
+
+    def __init__(self):
+        self.employee_ids: List[str] = []
+        self.day_ordinals = array('l')
+        self.first_check_ins = array('l')
+        self.last_check_outs = array('l')
+        self.work_seconds = array('l')
+        self.break_seconds = array('l')
+        self.raw_events_counts = array('l')
+
+    def __len__(self) -> int:
+        return len(self.employee_ids)
+
+    def append(self, emp_id: str, day_ordinal: int, state: list):
+        self.employee_ids.append(emp_id)
+        self.day_ordinals.append(day_ordinal)
+        self.first_check_ins.append(state[0])
+        self.last_check_outs.append(state[1])
+        self.work_seconds.append(state[4])
+        self.break_seconds.append(state[5])
+        self.raw_events_counts.append(state[6])
+
+    def row(self, index: int) -> Dict[str, Any]:
+        """One summary as a dict with the keys calculate_daily_event_summary has always returned."""
+        day = date.fromordinal(self.day_ordinals[index])
+        midnight = datetime(day.year, day.month, day.day)
+        first_check_in = self.first_check_ins[index]
+        last_check_out = self.last_check_outs[index]
+        work_seconds = self.work_seconds[index]
+        break_seconds = self.break_seconds[index]
+        return {
+            "employee_id": self.employee_ids[index],
+            "date": day.isoformat(),
+            "first_check_in": midnight + timedelta(seconds=first_check_in) if first_check_in != _NO_TIME else None,
+            "last_check_out": midnight + timedelta(seconds=last_check_out) if last_check_out != _NO_TIME else None,
+            "raw_events_count": self.raw_events_counts[index],
+            "total_work_duration_seconds": float(work_seconds),
+            "total_break_duration_seconds": float(break_seconds),
+            "total_work_duration_str": str(timedelta(seconds=work_seconds)), # HH:MM:SS
+            "total_break_duration_str": str(timedelta(seconds=break_seconds)),
+            "first_check_in_str": str(timedelta(seconds=first_check_in)).zfill(8) if first_check_in != _NO_TIME else "N/A",
+            "last_check_out_str": str(timedelta(seconds=last_check_out)).zfill(8) if last_check_out != _NO_TIME else "N/A",
+        }
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        return (self.row(index) for index in range(len(self)))
+
+def summarize_daily_events(records: Iterable[FingerprintLogRecord], summary: Optional[DailyEventSummary] = None) -> DailyEventSummary:
+    """
+    Builds daily summaries from a time-ordered stream of records in one pass, without sorting.
+    Only the employees seen on the current day have state; when the stream moves to a later day
+    their summaries are final and are appended to the columns. Summaries come out by day, then by
+    each employee's first event of that day.
+    Raises EventStreamOrderError if the stream goes back in time (see summarize_fingerprint_csv).
+    """
+    summary = DailyEventSummary() if summary is None else summary
+    # Per employee: [first_check_in, last_check_out, last_event_time, last_event_type, work, break, raw_events_count]
+    states: Dict[str, list] = {}
+    current_day = None
+    last_second = -1
+    for emp_id, timestamp, event_code, _device_id in records:
+        day = timestamp.toordinal()
+        second = timestamp.hour * 3600 + timestamp.minute * 60 + timestamp.second
+        if day != current_day:
+            if current_day is not None and day < current_day:
+                raise EventStreamOrderError(f"Event at {timestamp} is earlier than the previous event; the stream is not time-ordered.")
+            for state_emp_id, state in states.items():
+                summary.append(state_emp_id, current_day, state)
+            states = {}
+            current_day = day
+        elif second < last_second:
+            raise EventStreamOrderError(f"Event at {timestamp} is earlier than the previous event; the stream is not time-ordered.")
+        last_second = second
+
+        state = states.get(emp_id)
+        if state is None:
+            state = states[emp_id] = [_NO_TIME, _NO_TIME, _NO_TIME, None, 0, 0, 0]
+        state[6] += 1
+        if event_code == EVENT_CODE_CHECK_IN:
+            if state[0] == _NO_TIME:
+                state[0] = second
+            if state[3] == EVENT_CODE_BREAK_IN or state[3] is None: # Starting work or returning from break
+                state[2] = second
+                state[3] = EVENT_CODE_CHECK_IN
+        elif event_code == EVENT_CODE_CHECK_OUT:
+            if state[3] == EVENT_CODE_CHECK_IN:
+                state[4] += second - state[2]
+            state[1] = second
+            state[3] = EVENT_CODE_CHECK_OUT # Mark session as ended
+        elif event_code == EVENT_CODE_BREAK_OUT:
+            if state[3] == EVENT_CODE_CHECK_IN: # Started break while checked in, ends the work interval
+                state[4] += second - state[2]
+            state[2] = second
+            state[3] = EVENT_CODE_BREAK_OUT
+        elif event_code == EVENT_CODE_BREAK_IN:
+            if state[3] == EVENT_CODE_BREAK_OUT:
+                state[5] += second - state[2]
+            state[2] = second # Time of returning from break, potential start of new work interval
+            state[3] = EVENT_CODE_BREAK_IN
+    for state_emp_id, state in states.items():
+        summary.append(state_emp_id, current_day, state)
+    return summary
+
+def _iter_sorted_run(path: str) -> Iterator[FingerprintLogRecord]:
+    make_record = FingerprintLogRecord._make
+    with open(path, mode='rb') as run_file:
+        while True:
+            try:
+                batch = pickle.load(run_file)
+            except EOFError:
+                return
+            yield from map(make_record, batch)
+
+def iter_time_ordered_fingerprint_csv(filepath: str, chunk_size: int = FINGERPRINT_CSV_CHUNK_SIZE,
+                                      report: Optional[Dict[str, Any]] = None) -> Iterator[FingerprintLogRecord]:
+    """
+    Streams a fingerprint log CSV file in timestamp order with an external merge sort: chunks of
+    chunk_size records are sorted and written to temporary run files (pickled batches, faster to
+    read back than CSV), then merged. Events with the same timestamp keep their file order.
+    Memory is bounded by the chunk size.
+    """
+    by_timestamp = attrgetter('timestamp')
+    with tempfile.TemporaryDirectory(prefix="fp_sort_") as run_dir:
+        run_paths = []
+        for chunk in iter_fingerprint_csv_chunks(filepath, chunk_size, report):
+            chunk.sort(key=by_timestamp)
+            run_path = os.path.join(run_dir, f"run_{len(run_paths)}.pickle")
+            with open(run_path, mode='wb') as run_file:
+                for start in range(0, len(chunk), SORT_RUN_BATCH_SIZE):
+                    pickle.dump([tuple(record) for record in chunk[start:start + SORT_RUN_BATCH_SIZE]], run_file, pickle.HIGHEST_PROTOCOL)
+            run_paths.append(run_path)
+        yield from heapq.merge(*(_iter_sorted_run(path) for path in run_paths), key=by_timestamp)
+
+def summarize_fingerprint_csv(filepath: str, report: Optional[Dict[str, Any]] = None) -> DailyEventSummary:
+    """
+    Daily summaries of a fingerprint log CSV file. Exports are normally in time order and are
+    summarized in a single streaming pass; if the file turns out not to be, it is re-read through
+    iter_time_ordered_fingerprint_csv.
+    """
+    try:
+        return summarize_daily_events(iter_fingerprint_csv(filepath, report))
+    except EventStreamOrderError:
+        logger.info(f"'{filepath}' is not in time order, summarizing it through an external sort.")
+    if report is not None:
+        report.update(new_parse_report())
+    return summarize_daily_events(iter_time_ordered_fingerprint_csv(filepath, report=report))
 
 def calculate_daily_event_summary(parsed_logs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
@@ -90,81 +318,109 @@ def calculate_daily_event_summary(parsed_logs: List[Dict[str, Any]]) -> List[Dic
         parsed_logs: A list of dictionaries as returned by parse_fingerprint_csv.
 
     Returns:
-        A list of dictionaries, each representing a daily summary for an employee.
-    """
-    daily_summaries = {} # Key: (employee_id, date_str), Value: summary_dict
-
-    # Sort logs by employee, then by timestamp to process events chronologically
-    sorted_logs = sorted(parsed_logs, key=lambda x: (x["employee_id"], x["timestamp_obj"]))
-
-    for log in sorted_logs:
-        emp_id = log["employee_id"]
-        timestamp: datetime = log["timestamp_obj"]
-        date_str = timestamp.strftime("%Y-%m-%d")
-        event_code = log["event_code"]
-
-        summary_key = (emp_id, date_str)
-        if summary_key not in daily_summaries:
-            daily_summaries[summary_key] = {
-                "employee_id": emp_id,
-                "date": date_str,
-                "first_check_in": None,
-                "last_check_out": None,
-                "work_intervals": [], # List of (check_in_time, check_out_time)
-                "break_intervals": [], # List of (break_out_time, break_in_time)
-                "last_event_time": None,
-                "last_event_type": None, # To track open sessions
-                "raw_events_count": 0
-            }
-        
-        current_summary = daily_summaries[summary_key]
-        current_summary["raw_events_count"] += 1
+        A list of dictionaries, each representing a daily summary for an employee,
+        ordered by employee and date. For large files use summarize_fingerprint_csv.
+    """
+    records = sorted((FingerprintLogRecord(log["employee_id"], log["timestamp_obj"], log["event_code"], log.get("device_id", ""))
+                      for log in parsed_logs), key=attrgetter('timestamp'))
+    summary = summarize_daily_events(records)
+    order = sorted(range(len(summary)), key=lambda index: (summary.employee_ids[index], summary.day_ordinals[index]))
+    return [summary.row(index) for index in order]
 
-        if event_code == EVENT_CODE_CHECK_IN:
-            if current_summary["first_check_in"] is None:
-                current_summary["first_check_in"] = timestamp
-            if current_summary["last_event_type"] == EVENT_CODE_BREAK_IN or current_summary["last_event_type"] is None: # Starting work or returning from break
-                current_summary["last_event_time"] = timestamp
-                current_summary["last_event_type"] = EVENT_CODE_CHECK_IN
+# --- Import into attendance_log ---
+_IMPORT_SUMMARY_COUNTERS = ("db_clock_ins", "db_clock_outs", "errors", "unknown_user_id", "skipped_duplicates",
+                            "skipped_no_open_in", "skipped_already_out")
 
-        elif event_code == EVENT_CODE_CHECK_OUT:
-            if current_summary["last_event_type"] == EVENT_CODE_CHECK_IN and current_summary["last_event_time"]:
-                current_summary["work_intervals"].append((current_summary["last_event_time"], timestamp))
-            current_summary["last_check_out"] = timestamp
-            current_summary["last_event_type"] = EVENT_CODE_CHECK_OUT # Mark session as ended
+def get_fingerprint_source(device_id: str) -> str:
+    """The attendance_log.source of punches imported from a fingerprint log."""
+    prefix = db_schema.ATTENDANCE_SOURCE_FINGERPRINT_PREFIX
+    return f"{prefix}: {device_id}" if device_id else prefix
 
-        elif event_code == EVENT_CODE_BREAK_OUT:
-            if current_summary["last_event_type"] == EVENT_CODE_CHECK_IN and current_summary["last_event_time"]: # Started break while checked in
-                current_summary["work_intervals"].append((current_summary["last_event_time"], timestamp)) # End current work interval
-            current_summary["last_event_time"] = timestamp
-            current_summary["last_event_type"] = EVENT_CODE_BREAK_OUT
+def get_fingerprint_employee_map_db() -> Dict[str, str]:
+    """
+    Maps the EmployeeID column of fingerprint logs to employee IDs. Logs exported from a terminal
+    carry device user IDs; logs prepared by hand usually carry the employee ID itself.
+    """
+    mapping = zkteco_utils.get_employee_device_id_map_db()
+    with db_schema.get_connection() as conn_db:
+        cursor = conn_db.cursor()
+        cursor.execute(f"SELECT {db_schema.COL_EMP_ID} FROM {db_schema.TABLE_EMPLOYEES}")
+        mapping.update((emp_id, emp_id) for (emp_id,) in cursor.fetchall())
+    return mapping
 
-        elif event_code == EVENT_CODE_BREAK_IN:
-            if current_summary["last_event_type"] == EVENT_CODE_BREAK_OUT and current_summary["last_event_time"]:
-                current_summary["break_intervals"].append((current_summary["last_event_time"], timestamp))
-            current_summary["last_event_time"] = timestamp # Time of returning from break, potential start of new work interval
-            current_summary["last_event_type"] = EVENT_CODE_BREAK_IN
-
-    # Calculate durations
-    result_list = []
-    for summary in daily_summaries.values():
-        total_work_duration = timedelta()
-        for start, end in summary["work_intervals"]:
-            total_work_duration += (end - start)
-        
-        total_break_duration = timedelta()
-        for start, end in summary["break_intervals"]:
-            total_break_duration += (end - start)
-
-        summary["total_work_duration_seconds"] = total_work_duration.total_seconds()
-        summary["total_break_duration_seconds"] = total_break_duration.total_seconds()
-        summary["total_work_duration_str"] = str(total_work_duration).split('.')[0] # HH:MM:SS
-        summary["total_break_duration_str"] = str(total_break_duration).split('.')[0] # HH:MM:SS
-        summary["first_check_in_str"] = summary["first_check_in"].strftime('%H:%M:%S') if summary["first_check_in"] else "N/A"
-        summary["last_check_out_str"] = summary["last_check_out"].strftime('%H:%M:%S') if summary["last_check_out"] else "N/A"
-        
-        # Remove intermediate calculation fields if not needed for final output
-        del summary["work_intervals"]; del summary["break_intervals"]; del summary["last_event_time"]; del summary["last_event_type"]
-        result_list.append(summary)
-        
-    return result_list
\ No newline at end of file
+def _count_data_rows(filepath: str) -> int:
+    """Line count minus the header, for progress reporting (cheap compared to parsing)."""
+    with open(filepath, 'rb') as raw_file:
+        return max(0, sum(block.count(b'\n') for block in iter(lambda: raw_file.read(1 << 20), b'')) - 1)
+
+def import_fingerprint_csv(filepath: str, q_comm: Optional[queue.Queue] = None, cancel_event: Optional[threading.Event] = None,
+                           chunk_size: int = FINGERPRINT_IMPORT_CHUNK_SIZE, time_ordered: bool = False) -> Dict[str, Any]:
+    """
+    Imports a fingerprint log CSV file into attendance_log. Check-in and break-in events start a
+    row, check-out and break-out events close it (the same pairing as ZKTeco sync, whose punch
+    codes these match), so a day with a break becomes two work rows.
+
+    Punches are written in chunks of chunk_size, each in its own transaction together with the
+    attendance_daily refresh; rows still open at the end of a chunk are closed by later chunks.
+    Importing the same file again adds nothing, thanks to a unique index on fingerprint rows.
+
+    The file is read in time order through an external sort unless time_ordered=True, in which
+    case a record earlier than the one before raises EventStreamOrderError.
+    Progress goes to q_comm as progress_init/progress_update messages (rows read so far). Setting
+    cancel_event stops the import after the current chunk; chunks already written stay.
+    """
+    started = time.perf_counter()
+    report = new_parse_report()
+    summary: Dict[str, Any] = {"processed_rows": 0, "imported_punches": 0, "skipped_unknown_event": 0, "cancelled": False,
+                               "elapsed_seconds": 0.0, "punches_per_second": 0.0, "parse_report": report}
+    summary.update(dict.fromkeys(_IMPORT_SUMMARY_COUNTERS, 0))
+    total_rows = _count_data_rows(filepath)
+    if q_comm:
+        q_comm.put({"type": "progress_init", "total": total_rows})
+
+    employee_map = get_fingerprint_employee_map_db()
+    sources: Dict[str, str] = {}
+    records = iter_fingerprint_csv(filepath, report) if time_ordered else iter_time_ordered_fingerprint_csv(filepath, report=report)
+    last_timestamp = datetime.min
+    try:
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                summary["cancelled"] = True
+                logger.info(f"Fingerprint import of '{filepath}' cancelled after {summary['processed_rows']} rows.")
+                break
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                break
+            stream = []
+            for emp_id, timestamp, event_code, device_id in chunk:
+                if timestamp < last_timestamp:
+                    raise EventStreamOrderError(f"Event at {timestamp} is earlier than the previous event; '{filepath}' is not time-ordered.")
+                last_timestamp = timestamp
+                if event_code not in EVENT_TYPE_TRANSLATION_MAP:
+                    summary["skipped_unknown_event"] += 1
+                    continue
+                source = sources.get(device_id)
+                if source is None:
+                    source = sources[device_id] = get_fingerprint_source(device_id)
+                stream.append((timestamp, event_code, source, emp_id))
+
+            chunk_summary = dict.fromkeys(_IMPORT_SUMMARY_COUNTERS, 0)
+            zkteco_utils.ingest_punch_streams([stream] if stream else [], chunk_summary, employee_map=employee_map)
+            for counter in _IMPORT_SUMMARY_COUNTERS:
+                summary[counter] += chunk_summary[counter]
+            # Punches written: each row inserted holds its in-punch, each clock-out its out-punch. Duplicates
+            # and punches that could not be paired stay in their own counters
+            summary["imported_punches"] += chunk_summary["db_clock_ins"] + chunk_summary["db_clock_outs"]
+            summary["processed_rows"] += len(chunk)
+            if q_comm:
+                q_comm.put({"type": "progress_update", "current": summary["processed_rows"] + report["bad_rows"], "total": total_rows})
+    finally:
+        records.close() # Removes the external sort's run files when stopping early
+
+    elapsed = time.perf_counter() - started
+    summary["elapsed_seconds"] = round(elapsed, 3)
+    summary["punches_per_second"] = round(summary["processed_rows"] / elapsed, 1) if elapsed > 0 else 0.0
+    logger.info(f"Imported fingerprint log '{filepath}': {summary['processed_rows']} punches in {elapsed:.2f}s "
+                f"({summary['punches_per_second']} punches/s), {summary['imported_punches']} imported, {summary['db_clock_ins']} rows added, "
+                f"{summary['skipped_duplicates']} duplicates, {report['bad_rows']} bad rows.")
+    return summary
@@ -1,14 +1,23 @@
 # c:\Users\mahmo\OneDrive\Documents\GitHub\hr_management_system\utils\pdf_utils.py
 import logging
 import os
-from typing import List, Dict, Optional, Any
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from itertools import chain, islice
+from typing import List, Dict, Optional, Any, Iterable, Iterator, Sequence
 from datetime import date as dt_date
+from xml.sax.saxutils import escape as xml_escape
 
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.pagesizes import letter, landscape
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors as reportlab_colors
 from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
 
 import config
 from data import database as db_schema # For column constants
@@ -22,35 +31,66 @@ except ImportError:
     logger.warning("PyMuPDF (fitz) not installed. PDF signing features will be limited in pdf_utils.")
 
 # --- Payslip PDF Generation ---
-def generate_payslip_pdf(payslip_data: Dict, filepath: str) -> None:
-    """Generates a PDF payslip from the given data and saves it to filepath."""
-    doc = SimpleDocTemplate(filepath, pagesize=letter,
-                            rightMargin=0.5*inch, leftMargin=0.5*inch,
-                            topMargin=0.5*inch, bottomMargin=0.5*inch)
-    styles = getSampleStyleSheet()
+PAYSLIP_BATCH_SIZE = 50 # Payslips rendered per task sent to a worker process
+
+@lru_cache(maxsize=None)
+def _payslip_styles() -> Dict[str, Any]:
+    """Stylesheet and table styles shared by every payslip, built once per process."""
+    return {
+        "sheet": getSampleStyleSheet(),
+        "info": TableStyle([
+            ('ALIGN', (0,0), (-1,-1), 'LEFT'), ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
+            ('BOTTOMPADDING', (0,0), (-1,-1), 3), ('TOPPADDING', (0,0), (-1,-1), 3),
+        ]),
+        "earnings": TableStyle([
+            ('ALIGN', (1,0), (1,-1), 'RIGHT'), ('ALIGN', (0,0), (0,-1), 'LEFT'),
+            ('GRID', (0,0), (-1,-1), 0.5, reportlab_colors.grey),
+            ('BACKGROUND', (0,0), (-1,0), reportlab_colors.lightgrey),
+            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+            ('FONTNAME', (0,-1), (-1,-1), 'Helvetica-Bold'),
+            ('FONTNAME', (0,-2), (-1,-2), 'Helvetica-Bold'),
+        ]),
+        "deductions": TableStyle([
+            ('ALIGN', (1,0), (1,-1), 'RIGHT'), ('ALIGN', (0,0), (0,-1), 'LEFT'),
+            ('GRID', (0,0), (-1,-1), 0.5, reportlab_colors.grey),
+            ('BACKGROUND', (0,0), (-1,0), reportlab_colors.lightgrey),
+            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+            ('FONTNAME', (0,-1), (-1,-1), 'Helvetica-Bold'),
+        ]),
+        "net_pay": TableStyle([
+            ('ALIGN', (0,0), (-1,-1), 'RIGHT'), ('FONTNAME', (0,0), (-1,-1), 'Helvetica-Bold'),
+            ('TEXTCOLOR', (0,0), (-1,-1), reportlab_colors.black), ('FONTSIZE', (0,0), (-1,-1), 12),
+            ('TOPPADDING', (0,0), (-1,-1), 6), ('BOTTOMPADDING', (0,0), (-1,-1), 6),
+            ('LINEABOVE', (0,0), (-1,0), 1, reportlab_colors.black),
+            ('LINEBELOW', (0,0), (-1,0), 2, reportlab_colors.black),
+        ]),
+    }
+
+def _payslip_doc(filepath: str) -> SimpleDocTemplate:
+    return SimpleDocTemplate(filepath, pagesize=letter,
+                             rightMargin=0.5*inch, leftMargin=0.5*inch,
+                             topMargin=0.5*inch, bottomMargin=0.5*inch)
+
+def _build_payslip_story(payslip_data: Dict, emp_name: str, emp_pos: str) -> List[Any]:
+    """The flowables of one payslip (employee name and position already looked up)."""
+    styles = _payslip_styles()
+    sheet = styles["sheet"]
     story = []
 
-    story.append(Paragraph("Payslip", styles['h2']))
+    story.append(Paragraph("Payslip", sheet['h2']))
     story.append(Spacer(1, 0.1*inch))
 
-    emp_details = db_queries._find_employee_by_id(payslip_data[db_schema.COL_PAY_EMP_ID])
-    emp_name = emp_details.get(db_schema.COL_EMP_NAME, payslip_data[db_schema.COL_PAY_EMP_ID]) if emp_details else payslip_data[db_schema.COL_PAY_EMP_ID]
-    emp_pos = emp_details.get(db_schema.COL_EMP_POSITION, "N/A") if emp_details else "N/A"
-
     info_data = [
         ["Employee Name:", emp_name, "Pay Period:", f"{payslip_data[db_schema.COL_PAY_PERIOD_START]} to {payslip_data[db_schema.COL_PAY_PERIOD_END]}"],
         ["Employee ID:", payslip_data[db_schema.COL_PAY_EMP_ID], "Generation Date:", payslip_data[db_schema.COL_PAY_GENERATION_DATE]],
         ["Position:", emp_pos, "", ""],
     ]
     info_table = Table(info_data, colWidths=[1.5*inch, 2.5*inch, 1.5*inch, 2.0*inch])
-    info_table.setStyle(TableStyle([
-        ('ALIGN', (0,0), (-1,-1), 'LEFT'), ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 3), ('TOPPADDING', (0,0), (-1,-1), 3),
-    ]))
+    info_table.setStyle(styles["info"])
     story.append(info_table)
     story.append(Spacer(1, 0.2*inch))
 
-    story.append(Paragraph("<u>Earnings</u>", styles['h3']))
+    story.append(Paragraph("<u>Earnings</u>", sheet['h3']))
     earnings_data = [["Description", "Amount"],
         ["Monthly Reference Salary", f"{payslip_data.get('monthly_reference_salary', 0.0):,.2f}"],
         ["Basic Salary for Period", f"{payslip_data[db_schema.COL_PAY_BASIC_SALARY]:,.2f}"],]
@@ -63,18 +103,11 @@ def generate_payslip_pdf(payslip_data: Dict, filepath: str) -> None:
     earnings_data.append(["<b>Total Allowances</b>", f"<b>{payslip_data[db_schema.COL_PAY_TOTAL_ALLOWANCES]:,.2f}</b>"])
     earnings_data.append(["<b>GROSS SALARY</b>", f"<b>{payslip_data[db_schema.COL_PAY_GROSS_SALARY]:,.2f}</b>"])
     earnings_table = Table(earnings_data, colWidths=[4.5*inch, 2.5*inch])
-    earnings_table.setStyle(TableStyle([
-        ('ALIGN', (1,0), (1,-1), 'RIGHT'), ('ALIGN', (0,0), (0,-1), 'LEFT'),
-        ('GRID', (0,0), (-1,-1), 0.5, reportlab_colors.grey),
-        ('BACKGROUND', (0,0), (-1,0), reportlab_colors.lightgrey),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('FONTNAME', (0,-1), (-1,-1), 'Helvetica-Bold'),
-        ('FONTNAME', (0,-2), (-1,-2), 'Helvetica-Bold'),
-    ]))
+    earnings_table.setStyle(styles["earnings"])
     story.append(earnings_table)
     story.append(Spacer(1, 0.2*inch))
 
-    story.append(Paragraph("<u>Deductions</u>", styles['h3']))
+    story.append(Paragraph("<u>Deductions</u>", sheet['h3']))
     deductions_data = [["Description", "Amount"],]
     for item in payslip_data.get("recurring_deductions_detail", []):
         deductions_data.append([f"{item[db_schema.COL_DED_TYPE]} (Recurring)", f"{item[db_schema.COL_DED_AMOUNT]:,.2f}"])
@@ -85,35 +118,133 @@ def generate_payslip_pdf(payslip_data: Dict, filepath: str) -> None:
     total_deductions_for_pdf = payslip_data[db_schema.COL_PAY_TOTAL_DEDUCTIONS] + payslip_data[db_schema.COL_PAY_ADVANCE_REPAYMENT]
     deductions_data.append(["<b>Total Deductions</b>", f"<b>{total_deductions_for_pdf:,.2f}</b>"])
     deductions_table = Table(deductions_data, colWidths=[4.5*inch, 2.5*inch])
-    deductions_table.setStyle(TableStyle([
-        ('ALIGN', (1,0), (1,-1), 'RIGHT'), ('ALIGN', (0,0), (0,-1), 'LEFT'),
-        ('GRID', (0,0), (-1,-1), 0.5, reportlab_colors.grey),
-        ('BACKGROUND', (0,0), (-1,0), reportlab_colors.lightgrey),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('FONTNAME', (0,-1), (-1,-1), 'Helvetica-Bold'),
-    ]))
+    deductions_table.setStyle(styles["deductions"])
     story.append(deductions_table)
     story.append(Spacer(1, 0.2*inch))
 
     net_pay_data = [["<b>NET PAY</b>", f"<b>{payslip_data[db_schema.COL_PAY_NET_PAY]:,.2f}</b>"]]
     net_pay_table = Table(net_pay_data, colWidths=[4.5*inch, 2.5*inch])
-    net_pay_table.setStyle(TableStyle([
-        ('ALIGN', (0,0), (-1,-1), 'RIGHT'), ('FONTNAME', (0,0), (-1,-1), 'Helvetica-Bold'),
-        ('TEXTCOLOR', (0,0), (-1,-1), reportlab_colors.black), ('FONTSIZE', (0,0), (-1,-1), 12),
-        ('TOPPADDING', (0,0), (-1,-1), 6), ('BOTTOMPADDING', (0,0), (-1,-1), 6),
-        ('LINEABOVE', (0,0), (-1,0), 1, reportlab_colors.black),
-        ('LINEBELOW', (0,0), (-1,0), 2, reportlab_colors.black),
-    ]))
+    net_pay_table.setStyle(styles["net_pay"])
     story.append(net_pay_table)
     story.append(Spacer(1, 0.1*inch))
-    story.append(Paragraph(f"Expected Workdays: {payslip_data.get('expected_workdays_in_period', 'N/A')}, Actual Days Logged: {payslip_data.get('actual_days_worked_in_period', 'N/A')}", styles['Normal']))
+    story.append(Paragraph(f"Expected Workdays: {payslip_data.get('expected_workdays_in_period', 'N/A')}, Actual Days Logged: {payslip_data.get('actual_days_worked_in_period', 'N/A')}", sheet['Normal']))
     if payslip_data.get(db_schema.COL_PAY_NOTES):
         story.append(Spacer(1, 0.2*inch))
-        story.append(Paragraph("<u>Notes:</u>", styles['h3']))
-        story.append(Paragraph(payslip_data[db_schema.COL_PAY_NOTES], styles['Normal']))
-    doc.build(story)
+        story.append(Paragraph("<u>Notes:</u>", sheet['h3']))
+        story.append(Paragraph(payslip_data[db_schema.COL_PAY_NOTES], sheet['Normal']))
+    return story
+
+def generate_payslip_pdf(payslip_data: Dict, filepath: str) -> None:
+    """Generates a PDF payslip from the given data and saves it to filepath."""
+    emp_details = db_queries._find_employee_by_id(payslip_data[db_schema.COL_PAY_EMP_ID])
+    emp_name = emp_details.get(db_schema.COL_EMP_NAME, payslip_data[db_schema.COL_PAY_EMP_ID]) if emp_details else payslip_data[db_schema.COL_PAY_EMP_ID]
+    emp_pos = emp_details.get(db_schema.COL_EMP_POSITION, "N/A") if emp_details else "N/A"
+    _payslip_doc(filepath).build(_build_payslip_story(payslip_data, emp_name, emp_pos))
     logger.info(f"Payslip PDF generated: {filepath}")
 
+def payslip_pdf_filename(payslip_data: Dict) -> str:
+    """File name of a payslip PDF, the same for the same employee and period on every run."""
+    return f"Payslip_{payslip_data[db_schema.COL_PAY_EMP_ID]}_{payslip_data[db_schema.COL_PAY_PERIOD_START]}.pdf"
+
+def _render_payslip_batch(jobs: List[tuple]) -> List[tuple]:
+    """
+    Worker process entry point: renders (payslip_data, emp_name, emp_pos, filepath) jobs without
+    touching the database. Returns (filepath, error message or None) per job.
+    """
+    results = []
+    for payslip_data, emp_name, emp_pos, filepath in jobs:
+        try:
+            _payslip_doc(filepath).build(_build_payslip_story(payslip_data, emp_name, emp_pos))
+            results.append((filepath, None))
+        except Exception as e:
+            results.append((filepath, str(e)))
+    return results
+
+def _merge_payslip_pdfs(filepaths: List[str], merged_filepath: str, jobs: List[tuple]):
+    """Concatenates the payslip files with PyMuPDF, or renders them again into one document without it."""
+    if fitz:
+        merged = fitz.open()
+        for filepath in filepaths:
+            with fitz.open(filepath) as part:
+                merged.insert_pdf(part)
+        merged.save(merged_filepath)
+        merged.close()
+        return
+    story: List[Any] = []
+    for payslip_data, emp_name, emp_pos, _ in jobs:
+        if story:
+            story.append(PageBreak())
+        story.extend(_build_payslip_story(payslip_data, emp_name, emp_pos))
+    _payslip_doc(merged_filepath).build(story)
+
+def generate_payslip_pdfs_batch(payslips: List[Dict], output_dir: str, merged_filepath: Optional[str] = None,
+                                max_workers: Optional[int] = None, q_comm: Optional[queue.Queue] = None,
+                                cancel_event: Optional[threading.Event] = None) -> Dict[str, Any]:
+    """
+    Renders many payslips (e.g. the payslips of a payroll run) to output_dir, one file each named
+    by payslip_pdf_filename, across a pool of worker processes. Employee names and positions are
+    fetched in one query beforehand, so the workers never use the database. With merged_filepath,
+    all payslips are also written to that single PDF in input order.
+
+    max_workers=1 renders in this process. Progress goes to q_comm as progress_init/progress_update
+    messages (payslips rendered so far). Setting cancel_event stops handing out work; payslips
+    already rendered stay and no merged file is written. Returns a summary dict.
+    """
+    started = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    summary: Dict[str, Any] = {"generated": 0, "files": [], "errors": [], "merged_filepath": None, "cancelled": False,
+                               "elapsed_seconds": 0.0, "payslips_per_second": 0.0}
+    if q_comm:
+        q_comm.put({"type": "progress_init", "total": len(payslips)})
+
+    employees = db_queries.get_employee_names_and_positions_db([p[db_schema.COL_PAY_EMP_ID] for p in payslips])
+    jobs = []
+    for payslip_data in payslips:
+        emp_id = payslip_data[db_schema.COL_PAY_EMP_ID]
+        emp_name, emp_pos = employees.get(emp_id, (emp_id, "N/A"))
+        jobs.append((payslip_data, emp_name, emp_pos, os.path.join(output_dir, payslip_pdf_filename(payslip_data))))
+    batches = [jobs[i:i + PAYSLIP_BATCH_SIZE] for i in range(0, len(jobs), PAYSLIP_BATCH_SIZE)]
+
+    failed = set()
+    def collect(results: List[tuple]):
+        for filepath, error in results:
+            if error:
+                failed.add(filepath)
+                summary["errors"].append((os.path.basename(filepath), error))
+            else:
+                summary["generated"] += 1
+        if q_comm:
+            q_comm.put({"type": "progress_update", "current": summary["generated"] + len(summary["errors"]), "total": len(payslips)})
+
+    if max_workers == 1 or len(batches) <= 1:
+        for batch in batches:
+            if cancel_event is not None and cancel_event.is_set():
+                summary["cancelled"] = True
+                break
+            collect(_render_payslip_batch(batch))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_render_payslip_batch, batch) for batch in batches]
+            for future in as_completed(futures):
+                if cancel_event is not None and cancel_event.is_set():
+                    summary["cancelled"] = True
+                    for pending in futures:
+                        pending.cancel()
+                    break
+                collect(future.result())
+
+    summary["files"] = [job[3] for job in jobs if job[3] not in failed and os.path.exists(job[3])]
+    if merged_filepath and summary["files"] and not summary["cancelled"]:
+        _merge_payslip_pdfs(summary["files"], merged_filepath, [job for job in jobs if job[3] not in failed])
+        summary["merged_filepath"] = merged_filepath
+
+    elapsed = time.perf_counter() - started
+    summary["elapsed_seconds"] = round(elapsed, 3)
+    summary["payslips_per_second"] = round(summary["generated"] / elapsed, 1) if elapsed > 0 else 0.0
+    logger.info(f"Generated {summary['generated']} payslip PDFs in {output_dir} in {elapsed:.2f}s "
+                f"({summary['payslips_per_second']} payslips/s), {len(summary['errors'])} errors.")
+    return summary
+
 def generate_contract_pdf(employee_details: Dict, contract_data: Dict, filepath: str) -> None:
     """Generates a simple contract PDF using reportlab."""
     doc = SimpleDocTemplate(filepath, pagesize=letter,
@@ -158,41 +289,257 @@ def generate_contract_pdf(employee_details: Dict, contract_data: Dict, filepath:
         logger.error(f"Error during contract PDF generation for path {filepath}: {e}", exc_info=True)
         raise db_queries.DatabaseOperationError(f"Failed to generate contract PDF: {e}")
 
-def generate_professional_pdf_report(data_rows: List[List[Any]], headers: List[str], column_widths: Optional[List[float]],
-                                     report_title: str, filepath: str, responsible_signature_text: str = "Responsible Signature:"):
-    """Generates a professional-looking PDF report with a title and signature line."""
-    doc = SimpleDocTemplate(filepath, pagesize=letter,
-                            rightMargin=0.5*inch, leftMargin=0.5*inch,
-                            topMargin=0.5*inch, bottomMargin=0.75*inch)
-    styles = getSampleStyleSheet()
-    story = []
+PDF_REPORT_FONT_SIZE = 8
+PDF_REPORT_LEADING = 10 # Line height in table cells
+PDF_REPORT_CELL_PADDING = 2 # Horizontal padding of a cell; vertical padding is 1
+PDF_REPORT_WIDTH_SAMPLE_ROWS = 200 # Rows read ahead to size the columns
+PDF_REPORT_MAX_FIT_LINES = 20 # Most lines per row tried when sizing the columns to fit
+PDF_REPORT_MAX_WORD_WIDTH = 1.5 * inch # Words longer than this may break rather than widen their column
+PDF_REPORT_PROGRESS_EVERY_PAGES = 10 # Pages between progress_update messages
 
-    story.append(Paragraph(report_title, styles['h1']))
-    story.append(Spacer(1, 0.2*inch))
+def _report_cell_text(value: Any) -> str:
+    return "" if value is None else str(value)
+
+def _fit_column_widths(min_widths: List[float], text_widths: List[float], total_width: float) -> Optional[List[float]]:
+    """
+    Widths for the fewest lines per row (up to PDF_REPORT_MAX_FIT_LINES) at which every column
+    holds its text_width without going under its min_width, stretched to total_width; None if
+    even that many lines don't fit.
+    """
+    padding = 2 * PDF_REPORT_CELL_PADDING + 1
+    for lines in range(1, PDF_REPORT_MAX_FIT_LINES + 1):
+        needed = [max(min_width, text_width / lines) + padding for min_width, text_width in zip(min_widths, text_widths)]
+        if sum(needed) <= total_width:
+            return [width * total_width / sum(needed) for width in needed]
+    return None
+
+def _report_column_widths(headers: List[str], sample_rows: List[Sequence[Any]], total_width: float) -> List[float]:
+    """
+    Sizes the columns to fill total_width from the text of sample_rows, keeping every word on one
+    line where possible (see _fit_column_widths). Header words are kept whole too unless that
+    leaves too little room for the data; then they may break once, and if the columns still
+    don't fit they are narrowed in proportion and long words break.
+    """
+    if not headers:
+        return []
+    header_widths = [max((stringWidth(word, 'Helvetica-Bold', PDF_REPORT_FONT_SIZE) for word in _report_cell_text(header).split()), default=0)
+                     for header in headers] # Headers may wrap between words
+    word_widths = [0.0] * len(headers)
+    text_widths = list(header_widths)
+    for row in sample_rows:
+        for index, value in enumerate(row[:len(headers)]):
+            text = _report_cell_text(value)
+            text_widths[index] = max(text_widths[index], stringWidth(text, 'Helvetica', PDF_REPORT_FONT_SIZE))
+            word_widths[index] = max(word_widths[index], max((stringWidth(word, 'Helvetica', PDF_REPORT_FONT_SIZE) for word in text.split()), default=0))
+    word_widths = [min(width, PDF_REPORT_MAX_WORD_WIDTH) for width in word_widths]
+    widths = (_fit_column_widths([max(header, word) for header, word in zip(header_widths, word_widths)], text_widths, total_width)
+              or _fit_column_widths([max(header / 2, word) for header, word in zip(header_widths, word_widths)], text_widths, total_width))
+    if widths:
+        return widths
+    word_widths = [width + 2 * PDF_REPORT_CELL_PADDING + 1 for width in word_widths]
+    return [width * total_width / sum(word_widths) for width in word_widths]
 
-    table_data = [headers]
-    for row_list in data_rows: # Iterate through the list of lists
-        table_data.append([str(value) for value in row_list]) # Convert each value in the inner list to string
+def _measure_report_row(cells: List[Any], column_widths: List[float]) -> tuple:
+    """(cells, height) of a table row; plain-string cells are one line."""
+    height = PDF_REPORT_LEADING
+    for cell, width in zip(cells, column_widths):
+        if isinstance(cell, Paragraph):
+            height = max(height, cell.wrap(width - 2 * PDF_REPORT_CELL_PADDING, PDF_REPORT_LEADING * 1000)[1])
+    return cells, height + 2 # Top and bottom padding
 
-    table = Table(table_data, colWidths=column_widths if column_widths else None)
-    table.setStyle(TableStyle([
+def _report_table_row(values: Sequence[Any], column_widths: List[float], style: ParagraphStyle) -> tuple:
+    """
+    Table cells for one row and the row's height. Text that fits its column on one line stays a
+    plain string; longer text becomes a Paragraph wrapped to the column width.
+    """
+    cells = []
+    for value, width in zip(values, column_widths):
+        text = _report_cell_text(value)
+        if "\n" not in text and stringWidth(text, style.fontName, PDF_REPORT_FONT_SIZE) <= width - 2 * PDF_REPORT_CELL_PADDING:
+            cells.append(text)
+        else:
+            cells.append(Paragraph(xml_escape(text).replace("\n", "<br/>"), style))
+    return _measure_report_row(cells, column_widths)
+
+def _split_report_row(cells: List[Any], column_widths: List[float], available_height: float) -> tuple:
+    """Splits a row taller than a whole page: wrapped cells are cut to available_height and continue in a second row."""
+    first_cells, rest_cells = [], []
+    for cell, width in zip(cells, column_widths):
+        parts = cell.split(width - 2 * PDF_REPORT_CELL_PADDING, available_height - 2) if isinstance(cell, Paragraph) else []
+        if len(parts) == 2:
+            first_cells.append(parts[0])
+            rest_cells.append(parts[1])
+        else:
+            first_cells.append(cell)
+            rest_cells.append("")
+    return _measure_report_row(first_cells, column_widths), _measure_report_row(rest_cells, column_widths)
+
+def generate_professional_pdf_report(data_rows: Iterable[Sequence[Any]], headers: List[str], column_widths: Optional[List[float]],
+                                     report_title: str, filepath: str, responsible_signature_text: str = "Responsible Signature:",
+                                     pagesize=letter, q_comm: Optional[queue.Queue] = None,
+                                     cancel_event: Optional[threading.Event] = None, total: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Generates a professional-looking PDF report with a title and signature line.
+
+    data_rows may be any iterable (e.g. rows streamed from a database cursor). Pages are laid out
+    one at a time: rows are measured and taken until the page is full, then drawn as one table
+    with the header row, so memory and layout time stay proportional to a page rather than the
+    whole report. Unless column_widths is given, columns are sized from their headers and the first
+    PDF_REPORT_WIDTH_SAMPLE_ROWS rows; text too long for its column wraps onto more lines.
+
+    Progress goes to q_comm as progress_init/progress_update messages (rows laid out so far).
+    Setting cancel_event stops at the next page without writing the file. Returns a summary dict.
+    """
+    page_width, page_height = pagesize
+    left_margin, top_margin, bottom_margin = 0.5*inch, 0.5*inch, 0.75*inch
+    content_width = page_width - 2 * left_margin
+    page_top = page_height - top_margin
+    styles = getSampleStyleSheet()
+    cell_style = ParagraphStyle('ReportCell', fontName='Helvetica', fontSize=PDF_REPORT_FONT_SIZE, leading=PDF_REPORT_LEADING)
+    header_style = ParagraphStyle('ReportHeaderCell', parent=cell_style, fontName='Helvetica-Bold',
+                                  textColor=reportlab_colors.whitesmoke)
+    table_style = TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), reportlab_colors.grey), ('TEXTCOLOR', (0, 0), (-1, 0), reportlab_colors.whitesmoke),
         ('ALIGN', (0, 0), (-1, -1), 'LEFT'), ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0,0), (-1,-1), 8), ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+        ('FONTSIZE', (0,0), (-1,-1), PDF_REPORT_FONT_SIZE), ('LEADING', (0, 0), (-1, -1), PDF_REPORT_LEADING),
+        ('TOPPADDING', (0, 0), (-1, -1), 1), ('BOTTOMPADDING', (0, 0), (-1, -1), 1),
+        ('LEFTPADDING', (0, 0), (-1, -1), PDF_REPORT_CELL_PADDING), ('RIGHTPADDING', (0, 0), (-1, -1), PDF_REPORT_CELL_PADDING),
         ('BACKGROUND', (0, 1), (-1, -1), reportlab_colors.beige), ('GRID', (0, 0), (-1, -1), 1, reportlab_colors.black),
-        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-    ]))
-    story.append(table)
-    story.append(Spacer(1, 0.5*inch))
-    story.append(Paragraph("_" * 40, styles['Normal'])) # type: ignore
-    story.append(Paragraph(responsible_signature_text, styles['Normal']))
+        ('VALIGN', (0,0), (-1,-1), 'TOP'),
+    ]) # Built once and shared by every page's table
+
+    rows = iter(data_rows)
+    if not column_widths:
+        sample_rows = list(islice(rows, PDF_REPORT_WIDTH_SAMPLE_ROWS))
+        rows = chain(sample_rows, rows)
+        column_widths = _report_column_widths(headers, sample_rows, content_width)
+    header_cells, header_height = _report_table_row(headers, column_widths, header_style)
+
+    started = time.perf_counter()
+    summary: Dict[str, Any] = {"filepath": filepath, "rows_written": 0, "pages": 0, "cancelled": False,
+                               "elapsed_seconds": 0.0, "rows_per_second": 0.0}
+    if q_comm:
+        q_comm.put({"type": "progress_init", "total": total})
+
     try:
         db_schema.increment_app_counter(db_schema.COUNTER_REPORTS_GENERATED_PDF) # Corrected: Use db_schema
-        doc.build(story)
-        logger.info(f"Professional PDF report '{report_title}' generated at {filepath}")
+        canv = canvas.Canvas(filepath, pagesize=pagesize) # Nothing is written to filepath until save()
+        title = Paragraph(report_title, styles['h1'])
+        title_height = title.wrapOn(canv, content_width, page_top - bottom_margin)[1]
+        title.drawOn(canv, left_margin, page_top - title_height)
+        y = page_top - title_height - title.getSpaceAfter() - 0.2*inch
+
+        full_page_height = page_top - bottom_margin - header_height
+        next_row = None # Measured row that did not fit on the previous page
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                summary["cancelled"] = True
+                break
+            available_height = y - bottom_margin - header_height
+            page_cells, page_heights = [header_cells], [header_height]
+            used_height = 0
+            while True:
+                if next_row is None:
+                    values = next(rows, None)
+                    if values is None:
+                        break
+                    next_row = _report_table_row(values, column_widths, cell_style)
+                cells, height = next_row
+                if used_height + height > available_height:
+                    if len(page_cells) > 1 and (height <= full_page_height or available_height - used_height < 4 * PDF_REPORT_LEADING):
+                        break # Starts the next page; a row taller than a page is split, starting here if there is room
+                    (cells, height), next_row = _split_report_row(cells, column_widths, available_height - used_height)
+                    page_cells.append(cells)
+                    page_heights.append(height)
+                    used_height += height
+                    summary["rows_written"] -= 1 # Counted again when its remainder is drawn
+                    break
+                page_cells.append(cells)
+                page_heights.append(height)
+                used_height += height
+                next_row = None
+            if len(page_cells) > 1:
+                table = Table(page_cells, colWidths=column_widths, rowHeights=page_heights)
+                table.setStyle(table_style)
+                table.wrapOn(canv, content_width, header_height + used_height)
+                table.drawOn(canv, left_margin, y - header_height - used_height)
+                y -= header_height + used_height
+                summary["rows_written"] += len(page_cells) - 1
+                summary["pages"] += 1
+                if q_comm and summary["pages"] % PDF_REPORT_PROGRESS_EVERY_PAGES == 0:
+                    q_comm.put({"type": "progress_update", "current": summary["rows_written"], "total": total})
+            if next_row is None: # Rows exhausted
+                break
+            canv.showPage()
+            y = page_top
+
+        if not summary["cancelled"]:
+            signature = [Spacer(1, 0.5*inch), Paragraph("_" * 40, styles['Normal']), Paragraph(responsible_signature_text, styles['Normal'])]
+            signature_heights = [flowable.wrapOn(canv, content_width, page_top - bottom_margin)[1] + flowable.getSpaceBefore()
+                                 for flowable in signature]
+            if y - sum(signature_heights) < bottom_margin:
+                canv.showPage()
+                y = page_top
+            for flowable, height in zip(signature, signature_heights):
+                y -= height
+                flowable.drawOn(canv, left_margin, y)
+            canv.save()
     except Exception as e:
         logger.error(f"Error generating professional PDF report '{report_title}': {e}")
-        raise db_schema.DatabaseOperationError(f"Failed to generate PDF report: {e}") # Corrected: Use db_schema for exception
+        raise db_queries.DatabaseOperationError(f"Failed to generate PDF report: {e}")
+    if summary["cancelled"]:
+        logger.info(f"PDF report '{report_title}' cancelled after {summary['rows_written']} rows; no file written.")
+        return summary
+
+    elapsed = time.perf_counter() - started
+    summary["elapsed_seconds"] = round(elapsed, 3)
+    summary["rows_per_second"] = round(summary["rows_written"] / elapsed, 1) if elapsed > 0 else 0.0
+    if q_comm:
+        q_comm.put({"type": "progress_update", "current": summary["rows_written"], "total": total})
+    logger.info(f"Professional PDF report '{report_title}' generated at {filepath}: {summary['rows_written']} rows "
+                f"on {summary['pages']} pages in {elapsed:.2f}s ({summary['rows_per_second']} rows/s)")
+    return summary
+
+# (export column, PDF header) pairs of the employee list PDF
+EMPLOYEE_LIST_PDF_COLUMNS = [
+    (db_schema.COL_EMP_ID, "Id"), (db_schema.COL_EMP_NAME, "Name"), ("department_name", "Department"),
+    (db_schema.COL_EMP_POSITION, "Position"), (db_schema.COL_EMP_SALARY, "Salary"),
+    (db_schema.COL_EMP_VACATION_DAYS, "Vacation days"), (db_schema.COL_EMP_START_DATE, "Start date"),
+    (db_schema.COL_EMP_PHONE, "Phone"), (db_schema.COL_EMP_EMAIL, "Email"), (db_schema.COL_EMP_GENDER, "Gender"),
+    (db_schema.COL_EMP_MARITAL_STATUS, "Marital status"), (db_schema.COL_EMP_EDUCATION, "Educational qualification"),
+    (db_schema.COL_EMP_EMPLOYMENT_HISTORY, "Employment history"), (db_schema.COL_EMP_PHOTO_PATH, "Photo path"),
+    (db_schema.COL_EMP_DEVICE_USER_ID, "Device user id"), (db_schema.COL_EMP_EXCLUDE_VACATION_POLICY, "Exclude Vacation Policy"),
+    (db_schema.COL_EMP_STATUS, "Status"), (db_schema.COL_EMP_TERMINATION_DATE, "Termination date"),
+]
+
+def export_employee_list_pdf(filepath: str, include_archived: bool = False, q_comm: Optional[queue.Queue] = None,
+                             cancel_event: Optional[threading.Event] = None) -> Dict[str, Any]:
+    """
+    Writes the employee list to a landscape PDF, streaming employees from the database a page at a
+    time (see generate_professional_pdf_report). Meant to run in a worker thread.
+    """
+    columns = [column for column, _ in EMPLOYEE_LIST_PDF_COLUMNS]
+    salary_index = columns.index(db_schema.COL_EMP_SALARY)
+    department_index = columns.index("department_name")
+    exclude_index = columns.index(db_schema.COL_EMP_EXCLUDE_VACATION_POLICY)
+    employees = db_queries.iter_employees_for_export_db(columns, include_archived=include_archived)
+
+    def pdf_rows() -> Iterator[List[Any]]:
+        for employee in employees:
+            row = list(employee)
+            row[salary_index] = f"${row[salary_index] or 0:.2f}"
+            row[department_index] = row[department_index] or "Unassigned"
+            row[exclude_index] = "Yes" if row[exclude_index] == 1 else "No"
+            yield row
+
+    try:
+        return generate_professional_pdf_report(pdf_rows(), [header for _, header in EMPLOYEE_LIST_PDF_COLUMNS], None,
+                                                "Employee List", filepath, pagesize=landscape(letter), q_comm=q_comm,
+                                                cancel_event=cancel_event,
+                                                total=db_queries.get_total_employee_count_db(include_archived=include_archived))
+    finally:
+        employees.close() # Releases the cursor if the export stopped early
+
 def embed_image_in_pdf(pdf_path: str, image_path: str, page_number: int,
                        sig_width: float, sig_height: float, position: str = "bottom-right",
                        margin: float = 36): # margin in points (0.5 inch)
@@ -0,0 +1,346 @@
+# utils/zkteco_emulator.py
+import argparse
+import logging
+import queue
+import random
+import socket
+import socketserver
+import threading
+import time
+from functools import lru_cache
+from datetime import datetime, timedelta
+from struct import Struct
+from typing import Optional, Dict, List, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ZK protocol values used by pyzk (see zk/const.py)
+CMD_CONNECT = 1000
+CMD_EXIT = 1001
+CMD_ENABLEDEVICE = 1002
+CMD_DISABLEDEVICE = 1003
+CMD_GET_FREE_SIZES = 50
+CMD_GET_TIME = 201
+CMD_OPTIONS_RRQ = 11
+CMD_GET_VERSION = 1100
+CMD_USERTEMP_RRQ = 9
+CMD_ATTLOG_RRQ = 13
+CMD_STARTVERIFY = 60
+CMD_CANCELCAPTURE = 62
+CMD_REG_EVENT = 500
+CMD_DATA = 1501
+CMD_FREE_DATA = 1502
+CMD_PREPARE_BUFFER = 1503
+CMD_READ_BUFFER = 1504
+CMD_ACK_OK = 2000
+CMD_ACK_UNKNOWN = 0xffff
+FCT_USER = 5
+MACHINE_PREPARE_DATA_1 = 0x5050
+MACHINE_PREPARE_DATA_2 = 0x7d82
+USHRT_MAX = 65535
+
+_TCP_TOP = Struct('<HHI')
+_HEADER = Struct('<4H')
+_PREPARE_BUFFER = Struct('<bhii')
+_READ_BUFFER = Struct('<ii')
+_SIZE = Struct('<I')
+_ATTENDANCE_RECORD = Struct('<H24sBIB8s') # 40-byte layout: uid, user_id, status, time, punch, reserved
+_USER_RECORD = Struct('<HB8s24sIx7sx24s') # 72-byte layout: uid, privilege, password, name, card, group, user_id
+_LIVE_EVENT = Struct('<24sBB6s') # user_id, status, punch, timehex
+
+IN_PUNCH_START = timedelta(hours=8) # Synthetic in-punches are spread over 08:00-10:00...
+OUT_PUNCH_START = timedelta(hours=17) # ...and out-punches over 17:00-19:00
+PUNCH_SPREAD_SECONDS = 2 * 3600
+STATUS_FINGERPRINT = 1
+RECV_POLL_SECONDS = 0.05
+
+def _checksum(payload: bytes) -> int:
+    """pyzk's __create_checksum, computed on the 16-bit word sum instead of word by word."""
+    if len(payload) % 2:
+        payload += b'\x00'
+    checksum = sum(memoryview(payload).cast('H'))
+    if checksum > USHRT_MAX:
+        checksum = (checksum - 1) % USHRT_MAX + 1
+    return USHRT_MAX - 1 - checksum if checksum < USHRT_MAX else USHRT_MAX - 1
+
+def _encode_time(t: datetime) -> int:
+    return (((t.year % 100) * 12 * 31 + (t.month - 1) * 31 + t.day - 1) * 86400
+            + (t.hour * 60 + t.minute) * 60 + t.second)
+
+def build_packet(command: int, session_id: int, reply_id: int, data: bytes = b'') -> bytes:
+    """A TCP-framed ZK packet as a device sends it."""
+    checksum = _checksum(_HEADER.pack(command, 0, session_id, reply_id) + data)
+    body = _HEADER.pack(command, checksum, session_id, reply_id) + data
+    return _TCP_TOP.pack(MACHINE_PREPARE_DATA_1, MACHINE_PREPARE_DATA_2, len(body)) + body
+
+class ZKTecoEmulator:
+    """
+    A local TCP server speaking the part of the ZK protocol pyzk uses for attendance: connect,
+    device sizes, buffered reads of the user list and attendance log (get_users, get_attendance),
+    enable/disable and live capture events. Used to test and benchmark the sync path without hardware.
+
+    The attendance log is synthetic and deterministic: every day each user punches in between 08:00
+    and 10:00 and out between 17:00 and 19:00, in time order. Records are generated per requested
+    chunk, so the emulator serves millions of punches without holding them in memory.
+    add_records() grows the log (as new punches on a real device do) and pushes the new punches to
+    connections in live capture.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, users: int = 500, records: int = 0,
+                 start_date: datetime = datetime(2024, 1, 1)):
+        if users < 1 or records < 0:
+            raise ValueError("The emulator needs at least one user and a non-negative record count.")
+        self.users = users
+        self.start_date = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        self._record_count = records
+        # Per position within a day: (uid, user_id, seconds since midnight, punch); days differ only by date
+        self._day_template = [(user_index + 1, str(user_index + 1).encode(),
+                               int((OUT_PUNCH_START if is_out else IN_PUNCH_START).total_seconds()) + user_index * PUNCH_SPREAD_SECONDS // users, is_out)
+                              for is_out in (0, 1) for user_index in range(users)]
+        self._day_records = lru_cache(maxsize=4)(self._pack_day)
+        self._lock = threading.Lock()
+        self._live_queues: List[queue.Queue] = []
+        self._server = _ZKTecoTCPServer((host, port), _ZKTecoRequestHandler, self)
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"connections": 0, "commands": 0, "bytes_sent": 0, "live_events": 0}
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.server_address[:2]
+
+    @property
+    def record_count(self) -> int:
+        with self._lock:
+            return self._record_count
+
+    def device(self, name: Optional[str] = None) -> Dict[str, Any]:
+        """A device registry entry (as returned by zkteco_utils.parse_device_registry) for this emulator."""
+        ip, port = self.address
+        key = f"{ip}:{port}"
+        return {"name": name or f"Emulator {key}", "ip": ip, "port": port, "key": key, "ommit_ping": True}
+
+    def start(self) -> "ZKTecoEmulator":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.1},
+                                            name=f"zkteco-emulator-{self.address[1]}", daemon=True)
+            self._thread.start()
+            logger.info(f"ZKTeco emulator listening on {self.address[0]}:{self.address[1]} "
+                        f"({self.users} users, {self._record_count} records).")
+        return self
+
+    def stop(self):
+        self._server.stopping = True
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self) -> "ZKTecoEmulator":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    # --- Synthetic attendance log ---
+    def record(self, index: int) -> Tuple[int, str, datetime, int]:
+        """The index-th record of the log as (uid, user_id, timestamp, punch)."""
+        day, position = divmod(index, 2 * self.users)
+        is_out, user_index = divmod(position, self.users)
+        offset = (OUT_PUNCH_START if is_out else IN_PUNCH_START) + timedelta(seconds=user_index * PUNCH_SPREAD_SECONDS // self.users)
+        return user_index + 1, str(user_index + 1), self.start_date + timedelta(days=day) + offset, is_out
+
+    def _pack_day(self, day: int) -> bytes:
+        """All records of one synthetic day, packed."""
+        midnight = _encode_time(self.start_date + timedelta(days=day))
+        pack = _ATTENDANCE_RECORD.pack
+        return b''.join(pack(uid, user_id, STATUS_FINGERPRINT, midnight + seconds, punch, b'')
+                        for uid, user_id, seconds, punch in self._day_template)
+
+    def _pack_records(self, first: int, last: int) -> bytes:
+        records_per_day = len(self._day_template)
+        size = _ATTENDANCE_RECORD.size
+        parts = []
+        for day in range(first // records_per_day, (last - 1) // records_per_day + 1):
+            day_first = day * records_per_day
+            parts.append(self._day_records(day)[max(first - day_first, 0) * size:(min(last, day_first + records_per_day) - day_first) * size])
+        return b''.join(parts)
+
+    def _read_attendance_buffer(self, record_count: int, start: int, size: int) -> bytes:
+        """Bytes [start, start + size) of the attendance buffer: a 4-byte size then the records."""
+        total = 4 + record_count * _ATTENDANCE_RECORD.size
+        end = min(start + size, total)
+        if start >= end:
+            return b''
+        first = max(0, (start - 4) // _ATTENDANCE_RECORD.size)
+        last = min(record_count, (end - 4 + _ATTENDANCE_RECORD.size - 1) // _ATTENDANCE_RECORD.size)
+        prefix = _SIZE.pack(record_count * _ATTENDANCE_RECORD.size) if first == 0 else b''
+        chunk = prefix + self._pack_records(first, last)
+        offset = start - (0 if first == 0 else 4 + first * _ATTENDANCE_RECORD.size)
+        return chunk[offset:offset + end - start]
+
+    def _read_user_buffer(self, start: int, size: int) -> bytes:
+        users = b''.join(_USER_RECORD.pack(uid, 0, b'', f"Employee {uid}".encode(), 0, b'1', str(uid).encode())
+                         for uid in range(1, self.users + 1))
+        return (_SIZE.pack(len(users)) + users)[start:start + size]
+
+    def add_records(self, count: int) -> int:
+        """Appends count punches to the log and sends them to live capture connections. Returns the new record count."""
+        with self._lock:
+            first = self._record_count
+            self._record_count += count
+            live_queues = list(self._live_queues)
+        if live_queues:
+            for index in range(first, first + count):
+                _uid, user_id, timestamp, punch = self.record(index)
+                event = _LIVE_EVENT.pack(user_id.encode(), STATUS_FINGERPRINT, punch,
+                                         bytes((timestamp.year - 2000, timestamp.month, timestamp.day,
+                                                timestamp.hour, timestamp.minute, timestamp.second)))
+                for live_queue in live_queues:
+                    live_queue.put(event)
+        return first + count
+
+    def _set_live(self, live_queue: queue.Queue, enabled: bool):
+        with self._lock:
+            if enabled and live_queue not in self._live_queues:
+                self._live_queues.append(live_queue)
+            elif not enabled and live_queue in self._live_queues:
+                self._live_queues.remove(live_queue)
+
+class _ZKTecoTCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, handler_class, emulator: ZKTecoEmulator):
+        self.emulator = emulator
+        self.stopping = False
+        super().__init__(address, handler_class)
+
+class _ZKTecoRequestHandler(socketserver.BaseRequestHandler):
+    """One device connection: answers commands in order and, in live mode, sends one event per client ACK."""
+
+    def setup(self):
+        self.emulator: ZKTecoEmulator = self.server.emulator
+        self.session_id = 0
+        self.buffer: Optional[tuple] = None # What the last PREPARE_BUFFER asked for
+        self.live_queue: queue.Queue = queue.Queue()
+        self.live = False
+        self.awaiting_ack = False
+        self.emulator.stats["connections"] += 1
+
+    def finish(self):
+        self.emulator._set_live(self.live_queue, False)
+
+    def _send(self, packet: bytes):
+        self.request.sendall(packet)
+        self.emulator.stats["bytes_sent"] += len(packet)
+
+    def handle(self):
+        sock = self.request
+        sock.settimeout(RECV_POLL_SECONDS)
+        pending = bytearray()
+        while not self.server.stopping:
+            if self.live and not self.awaiting_ack:
+                try:
+                    event = self.live_queue.get_nowait()
+                except queue.Empty:
+                    pass
+                else:
+                    self._send(build_packet(CMD_REG_EVENT, self.session_id, 0, event))
+                    self.emulator.stats["live_events"] += 1
+                    self.awaiting_ack = True
+            try:
+                received = sock.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            if not received:
+                break
+            pending += received
+            while len(pending) >= _TCP_TOP.size:
+                _magic1, _magic2, length = _TCP_TOP.unpack_from(pending)
+                if len(pending) < _TCP_TOP.size + length:
+                    break
+                packet = bytes(pending[_TCP_TOP.size:_TCP_TOP.size + length])
+                del pending[:_TCP_TOP.size + length]
+                command, _checksum_value, _session, reply_id = _HEADER.unpack_from(packet)
+                if command == CMD_ACK_OK: # Client acknowledging a live event
+                    self.awaiting_ack = False
+                    continue
+                self.emulator.stats["commands"] += 1
+                reply_command, data = self._dispatch(command, packet[_HEADER.size:])
+                self._send(build_packet(reply_command, self.session_id, reply_id, data))
+                if command == CMD_EXIT:
+                    return
+
+    def _dispatch(self, command: int, data: bytes) -> Tuple[int, bytes]:
+        if command == CMD_CONNECT:
+            self.session_id = random.randint(1, USHRT_MAX - 1)
+            return CMD_ACK_OK, b''
+        if command == CMD_GET_FREE_SIZES:
+            fields = [0] * 20
+            fields[4] = self.emulator.users
+            fields[8] = self.emulator.record_count
+            fields[14], fields[15], fields[16] = 3000, self.emulator.users * 10, 100000 # Capacities: fingers, users, records
+            return CMD_ACK_OK, Struct('<20i').pack(*fields) + b'\x00' * 12
+        if command == CMD_PREPARE_BUFFER:
+            _flag, buffer_command, fct, _ext = _PREPARE_BUFFER.unpack_from(data)
+            if buffer_command == CMD_ATTLOG_RRQ:
+                record_count = self.emulator.record_count
+                self.buffer = ("attendance", record_count)
+                size = 4 + record_count * _ATTENDANCE_RECORD.size
+            elif buffer_command == CMD_USERTEMP_RRQ and fct == FCT_USER:
+                self.buffer = ("users",)
+                size = 4 + self.emulator.users * _USER_RECORD.size
+            else:
+                return CMD_ACK_UNKNOWN, b''
+            return CMD_ACK_OK, b'\x00' + _SIZE.pack(size)
+        if command == CMD_READ_BUFFER:
+            start, size = _READ_BUFFER.unpack_from(data)
+            if self.buffer is None:
+                return CMD_ACK_UNKNOWN, b''
+            if self.buffer[0] == "attendance":
+                return CMD_DATA, self.emulator._read_attendance_buffer(self.buffer[1], start, size)
+            return CMD_DATA, self.emulator._read_user_buffer(start, size)
+        if command == CMD_FREE_DATA:
+            self.buffer = None
+            return CMD_ACK_OK, b''
+        if command == CMD_REG_EVENT:
+            self.live = bool(_SIZE.unpack_from(data)[0]) if len(data) >= 4 else False
+            self.awaiting_ack = False
+            self.emulator._set_live(self.live_queue, self.live)
+            return CMD_ACK_OK, b''
+        if command == CMD_GET_TIME:
+            return CMD_ACK_OK, _SIZE.pack(_encode_time(datetime.now()))
+        if command == CMD_GET_VERSION:
+            return CMD_ACK_OK, b'Ver 6.60 Emulator\x00'
+        if command == CMD_OPTIONS_RRQ:
+            return CMD_ACK_OK, data.split(b'\x00', 1)[0] + b'=Emulator\x00'
+        if command in (CMD_EXIT, CMD_ENABLEDEVICE, CMD_DISABLEDEVICE, CMD_STARTVERIFY, CMD_CANCELCAPTURE):
+            return CMD_ACK_OK, b''
+        return CMD_ACK_UNKNOWN, b''
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Serve a synthetic ZKTeco device for testing attendance sync.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4370)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--records", type=int, default=100000, help="Punches in the attendance log at start")
+    parser.add_argument("--live-rate", type=float, default=0, help="New punches per second (0 to keep the log fixed)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    with ZKTecoEmulator(args.host, args.port, users=args.users, records=args.records) as emulator:
+        try:
+            while True:
+                if args.live_rate > 0:
+                    time.sleep(1 / args.live_rate)
+                    emulator.add_records(1)
+                else:
+                    time.sleep(1)
+        except KeyboardInterrupt:
+            logger.info(f"ZKTeco emulator stopped. Stats: {emulator.stats}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+# utils/zkteco_live_capture.py
+import logging
+import queue
+import threading
+import time
+from typing import Optional, Dict, List, Any
+
+from utils import zkteco_utils
+from utils.exceptions import InvalidInputError
+
+logger = logging.getLogger(__name__)
+
+LIVE_BUFFER_SIZE = 5000 # Punches held in memory while the writer is busy
+LIVE_FLUSH_INTERVAL_SECONDS = 0.5 # A micro-batch is written at least this often...
+LIVE_FLUSH_MAX_EVENTS = 200 # ...or as soon as it holds this many punches
+LIVE_CAPTURE_POLL_SECONDS = 1 # live_capture() timeout, so a stop request is noticed within a second
+RECONNECT_BACKOFF_INITIAL_SECONDS = 1
+RECONNECT_BACKOFF_MAX_SECONDS = 60
+
+class ZKTecoLiveCaptureService:
+    """
+    Receives punches from ZKTeco devices as they happen (pyzk live_capture) and writes them to
+    attendance_log in micro-batches.
+
+    Each device has a reader thread holding a persistent connection, reconnecting with exponential
+    backoff. Readers only put punches in a bounded buffer; a single writer thread drains it and
+    ingests a batch every LIVE_FLUSH_INTERVAL_SECONDS or LIVE_FLUSH_MAX_EVENTS punches, so there is
+    one short write transaction per batch instead of one per punch.
+
+    Live punches do not move the sync watermark. Anything dropped or not written (buffer full,
+    database error) is still on the device and is picked up by the next regular sync, which skips
+    what was already written thanks to the unique device-punch index.
+
+    GUI code subscribes a queue.Queue and polls it with after(); it receives
+    {"type": "live_attendance", "events": [...], "summary": {...}} after each batch and
+    {"type": "device_progress", ...} when a device connects or disconnects.
+    """
+
+    def __init__(self, devices: Optional[List[Dict[str, Any]]] = None, timeout: Optional[int] = None):
+        self.devices = devices
+        self.timeout = timeout
+        self.buffer: queue.Queue = queue.Queue(maxsize=LIVE_BUFFER_SIZE)
+        self._stop_event = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._connections: Dict[str, Any] = {}
+        self._listeners: List[queue.Queue] = []
+        self._lock = threading.Lock()
+        self.stats = {"received": 0, "written_batches": 0, "dropped": 0, "errors": 0, "reconnects": 0} # Updated under _lock
+
+    @property
+    def is_running(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+
+    def subscribe(self, q_comm: queue.Queue):
+        with self._lock:
+            if q_comm not in self._listeners:
+                self._listeners.append(q_comm)
+
+    def unsubscribe(self, q_comm: queue.Queue):
+        with self._lock:
+            if q_comm in self._listeners:
+                self._listeners.remove(q_comm)
+
+    def _count(self, stat: str):
+        """Increments a stats counter; readers and the writer run on different threads."""
+        with self._lock:
+            self.stats[stat] += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        """A consistent copy of the stats counters."""
+        with self._lock:
+            return dict(self.stats)
+
+    def _notify(self, message: Dict[str, Any]):
+        with self._lock:
+            listeners = list(self._listeners)
+        for q_comm in listeners:
+            q_comm.put(message)
+
+    def start(self):
+        """Starts one reader thread per device and the writer thread."""
+        if self.is_running:
+            return
+        devices = zkteco_utils.get_registered_devices() if self.devices is None else self.devices
+        if not devices:
+            raise InvalidInputError("No ZKTeco devices are configured.")
+        timeout = self.timeout or zkteco_utils.get_zkteco_timeout()
+        self._stop_event.clear()
+        self._threads = [threading.Thread(target=self._writer_loop, name="zkteco-live-writer", daemon=True)]
+        self._threads += [threading.Thread(target=self._reader_loop, args=(device, timeout), name=f"zkteco-live-{device['key']}", daemon=True)
+                          for device in devices]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"ZKTeco live capture started for {len(devices)} device(s).")
+
+    def stop(self, wait_seconds: float = 5.0):
+        """Stops the readers, writes whatever is still buffered and waits for the threads to end."""
+        self._stop_event.set()
+        with self._lock:
+            connections = list(self._connections.values())
+        for conn in connections:
+            conn.end_live_capture = True # Makes live_capture() return on its next poll
+        for thread in self._threads:
+            thread.join(timeout=wait_seconds)
+        logger.info(f"ZKTeco live capture stopped. Stats: {self.get_stats()}")
+
+    def _reader_loop(self, device: Dict[str, Any], timeout: int):
+        backoff = RECONNECT_BACKOFF_INITIAL_SECONDS
+        while not self._stop_event.is_set():
+            conn = None
+            try:
+                conn = zkteco_utils.open_zkteco_connection(device["ip"], device["port"], timeout=timeout, disable=False,
+                                                          ommit_ping=device.get("ommit_ping", False))
+                with self._lock:
+                    self._connections[device["key"]] = conn
+                self._notify({"type": "device_progress", "device": device["key"], "name": device["name"], "stage": "live"})
+                backoff = RECONNECT_BACKOFF_INITIAL_SECONDS
+                for record in conn.live_capture(new_timeout=LIVE_CAPTURE_POLL_SECONDS):
+                    if self._stop_event.is_set():
+                        break
+                    if record is None: # Poll timeout, no punch
+                        continue
+                    self._count("received")
+                    try:
+                        self.buffer.put((device["key"], record), timeout=LIVE_FLUSH_INTERVAL_SECONDS)
+                    except queue.Full:
+                        self._count("dropped")
+                        logger.warning(f"Live capture buffer full, punch from {device['key']} left for the next sync.")
+            except Exception as e:
+                if self._stop_event.is_set():
+                    break
+                self._count("reconnects")
+                logger.warning(f"Live capture from {device['name']} ({device['key']}) interrupted: {e}. Reconnecting in {backoff}s.")
+                self._notify({"type": "device_progress", "device": device["key"], "name": device["name"], "stage": "failed", "message": str(e)})
+            finally:
+                with self._lock:
+                    self._connections.pop(device["key"], None)
+                if conn:
+                    conn.end_live_capture = True
+                    zkteco_utils.disconnect_from_zkteco_device(conn)
+            if self._stop_event.wait(backoff):
+                break
+            backoff = min(backoff * 2, RECONNECT_BACKOFF_MAX_SECONDS)
+
+    def _writer_loop(self):
+        while not (self._stop_event.is_set() and self.buffer.empty()):
+            try:
+                batch = [self.buffer.get(timeout=LIVE_FLUSH_INTERVAL_SECONDS)]
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + LIVE_FLUSH_INTERVAL_SECONDS
+            while len(batch) < LIVE_FLUSH_MAX_EVENTS:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.buffer.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def _flush(self, batch: List[tuple]):
+        """Pairs and writes one micro-batch; a failed batch is left to the next regular sync."""
+        streams_by_device: Dict[str, List[tuple]] = {}
+        for device_key, record in batch:
+            streams_by_device.setdefault(device_key, []).append(
+                (record.timestamp, record.punch, zkteco_utils.get_device_source(device_key), str(record.user_id)))
+        device_streams = [sorted(stream, key=lambda punch: punch[0]) for stream in streams_by_device.values()]
+        summary = {"db_clock_ins": 0, "db_clock_outs": 0, "errors": 0, "unknown_user_id": 0, "skipped_duplicates": 0,
+                   "skipped_no_open_in": 0, "skipped_already_out": 0}
+        events: List[Dict[str, Any]] = []
+        try:
+            zkteco_utils.ingest_punch_streams(device_streams, summary, events=events)
+        except Exception as e:
+            self._count("errors")
+            logger.error(f"Live capture could not write {len(batch)} punches: {e}. They will be picked up by the next sync.")
+            return
+        self._count("written_batches")
+        self._notify({"type": "live_attendance", "events": events, "summary": summary})
+
+_live_capture_service: Optional[ZKTecoLiveCaptureService] = None
+
+def get_live_capture_service() -> ZKTecoLiveCaptureService:
+    """The application-wide live capture service (created on first use, not started)."""
+    global _live_capture_service
+    if _live_capture_service is None:
+        _live_capture_service = ZKTecoLiveCaptureService()
+    return _live_capture_service
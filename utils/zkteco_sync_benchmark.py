@@ -0,0 +1,121 @@
+# utils/zkteco_sync_benchmark.py
+"""
+Offline benchmark of the ZKTeco attendance sync path, run against local device emulators:
+
+    python -m utils.zkteco_sync_benchmark --records 1000000 --users 2000 --incremental 10000
+
+Runs a full sync into a scratch database, then an incremental sync after new punches are added
+to the emulated devices, and reports throughput, download and database write time and peak
+Python memory for each. With --min-throughput the exit status is 1 when a sync is slower, so the
+benchmark can be used as a regression check.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Optional, Dict, List, Any
+
+import config
+from data import database as db_schema
+from utils import zkteco_utils
+from utils.zkteco_emulator import ZKTecoEmulator
+
+logger = logging.getLogger(__name__)
+
+def prepare_benchmark_database(database_path: str, users: int):
+    """Points the application at a fresh scratch database with one employee per device user."""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(database_path + suffix):
+            os.remove(database_path + suffix)
+    db_schema.close_connection()
+    config.DATABASE_NAME = database_path
+    db_schema.init_db()
+    with db_schema.transaction() as conn_db:
+        conn_db.executemany(f"""
+            INSERT INTO {db_schema.TABLE_EMPLOYEES}
+                ({db_schema.COL_EMP_ID}, {db_schema.COL_EMP_NAME}, {db_schema.COL_EMP_STATUS}, {db_schema.COL_EMP_DEVICE_USER_ID})
+            VALUES (?, ?, 'Active', ?)
+        """, [(f"BENCH{uid:06d}", f"Employee {uid}", str(uid)) for uid in range(1, users + 1)])
+
+def run_sync_phase(name: str, devices: List[Dict[str, Any]], measure_memory: bool = True) -> Dict[str, Any]:
+    """Runs one sync from the given devices and returns its measurements."""
+    if measure_memory:
+        tracemalloc.reset_peak()
+    started = time.perf_counter()
+    summary = zkteco_utils.sync_attendance_from_devices(devices, max_workers=len(devices))
+    elapsed = time.perf_counter() - started
+    device_summaries = summary["devices"].values()
+    result = {
+        "phase": name,
+        "device_records": summary["processed_device_logs"],
+        "new_punches": summary["new_device_logs"],
+        "rows_added": summary["db_clock_ins"],
+        "clock_outs": summary["db_clock_outs"],
+        "errors": summary["errors"],
+        "elapsed_seconds": round(elapsed, 3),
+        "download_seconds": max((device.get("download_seconds", 0.0) for device in device_summaries), default=0.0),
+        "db_write_seconds": summary.get("db_write_seconds", 0.0),
+        "punches_per_second": round(summary["new_device_logs"] / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+    if measure_memory:
+        result["peak_memory_mb"] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+    return result
+
+def run_benchmark(records: int, users: int, incremental: int, devices: int = 1, database_path: Optional[str] = None,
+                  measure_memory: bool = True) -> List[Dict[str, Any]]:
+    """Full then incremental sync of `records` punches per emulated device. Returns one result per phase."""
+    with tempfile.TemporaryDirectory(prefix="zkteco_bench_") as scratch_dir:
+        prepare_benchmark_database(database_path or os.path.join(scratch_dir, "benchmark.db"), users)
+        emulators = [ZKTecoEmulator(users=users, records=records).start() for _ in range(devices)]
+        if measure_memory:
+            tracemalloc.start()
+        try:
+            device_entries = [emulator.device() for emulator in emulators]
+            results = [run_sync_phase("full", device_entries, measure_memory)]
+            for emulator in emulators:
+                emulator.add_records(incremental)
+            results.append(run_sync_phase("incremental", device_entries, measure_memory))
+        finally:
+            if measure_memory:
+                tracemalloc.stop()
+            for emulator in emulators:
+                emulator.stop()
+            db_schema.close_connection()
+    return results
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark ZKTeco attendance sync against emulated devices.")
+    parser.add_argument("--records", type=int, default=200000, help="Punches on each device for the full sync")
+    parser.add_argument("--users", type=int, default=1000, help="Device users (and employees) per device")
+    parser.add_argument("--incremental", type=int, default=5000, help="Punches added before the incremental sync")
+    parser.add_argument("--devices", type=int, default=1, help="Emulated devices synced in parallel")
+    parser.add_argument("--database", help="Scratch database path (deleted and recreated; default: a temporary file)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip peak memory tracking (tracemalloc slows the sync down)")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    parser.add_argument("--min-throughput", type=float, default=0, help="Exit with status 1 if a sync processes fewer punches per second")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    results = run_benchmark(args.records, args.users, args.incremental, devices=args.devices,
+                            database_path=args.database, measure_memory=not args.no_memory)
+    for result in results:
+        memory = f", peak memory {result['peak_memory_mb']} MB" if "peak_memory_mb" in result else ""
+        print(f"{result['phase']:>11}: {result['new_punches']} new of {result['device_records']} device records in "
+              f"{result['elapsed_seconds']}s ({result['punches_per_second']} punches/s; download {result['download_seconds']}s, "
+              f"DB write {result['db_write_seconds']}s{memory}), {result['rows_added']} rows added, {result['errors']} errors")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as json_file:
+            json.dump(results, json_file, indent=2)
+
+    slow = [result["phase"] for result in results if result["punches_per_second"] < args.min_throughput]
+    if slow or any(result["errors"] for result in results):
+        print(f"Benchmark failed: {', '.join(slow) or 'sync errors'}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
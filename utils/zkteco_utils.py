@@ -1,39 +1,49 @@
 # c:\Users\mahmo\OneDrive\Documents\GitHub\hr_management_system\utils\zkteco_utils.py
 import sqlite3
 import logging
-from typing import Optional, Dict, List, Any
-from datetime import datetime
+import time
+import re
+import heapq
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import namedtuple
+from struct import Struct
+from typing import Optional, Dict, List, Any, Sequence
+from datetime import datetime, timedelta
 import queue # For type hinting if q_comm is used
 
 from zk import ZK, const # For ZKTeco device communication (from pyzk library)
 
 import config
 from data import database as db_schema
-from data import queries as db_queries # For _get_employee_open_clock_in
+from data import queries as db_queries # For DatabaseOperationError
+from utils.exceptions import InvalidInputError
 
 logger = logging.getLogger(__name__)
 
 zk_conn_instance: Optional[ZK] = None # Global or class-based connection instance
 
-def connect_to_zkteco_device(ip: str, port: int, timeout: int = config.ZKTECO_TIMEOUT) -> Optional[ZK]:
-    """Establishes a connection to the ZKTeco device."""
-    global zk_conn_instance
-    if zk_conn_instance: # If already connected, try to ensure it's live
-        try:
-            zk_conn_instance.get_time() # A simple command to check liveness
-            logger.info("Already connected to ZKTeco device.")
-            return zk_conn_instance
-        except Exception:
-            logger.warning("Existing ZKTeco connection seems dead, attempting to reconnect.")
-            zk_conn_instance = None # Force reconnect
-    
-    conn = ZK(ip, port=port, timeout=timeout, password=0, force_udp=False, ommit_ping=False)
+# pyzk Attendance.punch values
+ZKTECO_PUNCH_IN_CODES = frozenset({0, 3, 4}) # Check-in, break-in, overtime-in
+ZKTECO_PUNCH_OUT_CODES = frozenset({1, 2, 5}) # Check-out, break-out, overtime-out
+MAX_SHIFT_HOURS = 24 # An out-punch only closes a clock-in started at most this long before
+SYNC_PROGRESS_EVERY = 1000 # Punches between progress_update messages
+DEFAULT_ZKTECO_PORT = 4370
+
+def open_zkteco_connection(ip: str, port: int, timeout: int = config.ZKTECO_TIMEOUT, disable: bool = True,
+                           ommit_ping: bool = False) -> ZK:
+    """
+    Opens a new, unshared connection to a ZKTeco device (one per device in a parallel sync).
+    Pass disable=False for live capture, where the device must keep accepting punches, and
+    ommit_ping=True where ICMP is unavailable (e.g. the local emulator).
+    """
+    conn = ZK(ip, port=port, timeout=timeout, password=0, force_udp=False, ommit_ping=ommit_ping)
     try:
         logger.info(f"Attempting to connect to ZKTeco device at {ip}:{port}...")
         conn.connect()
-        conn.disable_device() # Recommended before extensive operations
-        logger.info("Successfully connected to ZKTeco device and disabled it for operations.")
-        zk_conn_instance = conn
+        if disable:
+            conn.disable_device() # Recommended before extensive operations
+        logger.info(f"Successfully connected to ZKTeco device at {ip}:{port}.")
         return conn # Return the connection object
     except ConnectionRefusedError as cre:
         logger.error(f"Connection refused by ZKTeco device at {ip}:{port}: {cre}")
@@ -45,9 +55,22 @@ def connect_to_zkteco_device(ip: str, port: int, timeout: int = config.ZKTECO_TI
         logger.error(f"Failed to connect to ZKTeco device at {ip}:{port}. Error: {type(e).__name__} - {e}")
         if conn and hasattr(conn, 'disconnect'):
             conn.disconnect()
-        zk_conn_instance = None
         # Re-raise a more generic error or the original one if specific handling is done by caller
-        raise ConnectionError(f"Failed to connect to ZKTeco device: {e}")
+        raise ConnectionError(f"Failed to connect to ZKTeco device at {ip}:{port}: {e}")
+
+def connect_to_zkteco_device(ip: str, port: int, timeout: int = config.ZKTECO_TIMEOUT) -> Optional[ZK]:
+    """Establishes (or reuses) the shared connection to a ZKTeco device."""
+    global zk_conn_instance
+    if zk_conn_instance: # If already connected, try to ensure it's live
+        try:
+            zk_conn_instance.get_time() # A simple command to check liveness
+            logger.info("Already connected to ZKTeco device.")
+            return zk_conn_instance
+        except Exception:
+            logger.warning("Existing ZKTeco connection seems dead, attempting to reconnect.")
+            zk_conn_instance = None # Force reconnect
+    zk_conn_instance = open_zkteco_connection(ip, port, timeout=timeout)
+    return zk_conn_instance
 
 def disconnect_from_zkteco_device(conn: Optional[ZK]):
     """Enables and disconnects from the ZKTeco device."""
@@ -61,82 +84,482 @@ def disconnect_from_zkteco_device(conn: Optional[ZK]):
                 logger.info("Disconnected from ZKTeco device.")
         except Exception as e:
             logger.error(f"Error during ZKTeco disconnect/enable: {e}")
-    zk_conn_instance = None
+    if conn is None or conn is zk_conn_instance:
+        zk_conn_instance = None
 
 def get_employee_device_id_map_db() -> Dict[str, str]:
     """Fetches a map of device_user_id to system_employee_id."""
     mapping = {}
-    with sqlite3.connect(config.DATABASE_NAME) as conn_db:
+    with db_schema.get_connection() as conn_db:
         cursor = conn_db.cursor()
         cursor.execute(f"SELECT {db_schema.COL_EMP_ID}, {db_schema.COL_EMP_DEVICE_USER_ID} FROM {db_schema.TABLE_EMPLOYEES} WHERE {db_schema.COL_EMP_DEVICE_USER_ID} IS NOT NULL AND {db_schema.COL_EMP_DEVICE_USER_ID} != ''")
         for row in cursor.fetchall():
             mapping[str(row[1])] = str(row[0]) # device_user_id : system_emp_id
     return mapping
 
-def sync_attendance_from_zkteco(device_ip: str, device_port: int, q_comm: Optional[queue.Queue] = None) -> Dict[str, int]:
+def get_device_key(ip: str, port: int) -> str:
+    """Identifies a device in the sync watermark table and in attendance_log.source."""
+    return f"{ip}:{port}"
+
+def get_device_source(device_key: str) -> str:
+    """attendance_log.source value for punches ingested from the given device."""
+    return f"{db_schema.ATTENDANCE_SOURCE_ZKTECO_PREFIX}: {device_key}"
+
+def parse_device_registry(registry: Optional[str]) -> List[Dict[str, Any]]:
     """
-    Connects to ZKTeco device, downloads attendance logs, and processes them.
+    Parses the device registry setting: entries separated by commas, semicolons or new lines,
+    each written as 'Name=IP:Port' or 'IP:Port' (the port defaults to 4370).
+    Returns a list of {"name", "ip", "port", "key"} dicts; repeated addresses are listed once.
     """
-    logger.info(f"Starting attendance sync from ZKTeco device at {device_ip}:{device_port}")
-    conn = connect_to_zkteco_device(device_ip, device_port)
-    # connect_to_zkteco_device will raise an error if connection fails, so conn should be valid here.
+    devices = []
+    seen_keys = set()
+    for entry in re.split(r"[,;\n]+", registry or ""):
+        entry = entry.strip()
+        if not entry: continue
+        name, _sep, address = entry.rpartition("=")
+        ip, _sep, port_str = address.strip().partition(":")
+        ip, port_str = ip.strip(), port_str.strip() or str(DEFAULT_ZKTECO_PORT)
+        if not ip or not port_str.isdigit() or not (0 < int(port_str) < 65536):
+            raise InvalidInputError(f"Invalid ZKTeco device entry '{entry}'. Use 'Name=IP:Port' or 'IP:Port'.")
+        device_key = get_device_key(ip, int(port_str))
+        if device_key in seen_keys: continue
+        seen_keys.add(device_key)
+        devices.append({"name": name.strip() or device_key, "ip": ip, "port": int(port_str), "key": device_key})
+    return devices
 
-    summary = {"processed_device_logs": 0, "db_clock_ins": 0, "db_clock_outs": 0, "errors": 0, "unknown_user_id": 0, "skipped_duplicates": 0, "skipped_no_open_in": 0, "skipped_already_out":0}
-    db_connection = None
-    total_device_logs = 0
+def get_registered_devices() -> List[Dict[str, Any]]:
+    """
+    Devices to sync: the registry setting if it lists any, otherwise the single device
+    from the ZKTeco IP/port settings. That fallback entry is marked "fallback": True.
+    """
+    registry = db_schema.get_app_setting_db(db_schema.SETTING_ZKTECO_DEVICES, config.ZKTECO_DEVICES)
+    try:
+        devices = parse_device_registry(registry)
+    except InvalidInputError as e:
+        logger.error(f"Ignoring invalid ZKTeco device registry setting: {e}")
+        devices = []
+    if devices:
+        return devices
+    ip = db_schema.get_app_setting_db(db_schema.SETTING_ZKTECO_DEVICE_IP, config.ZKTECO_DEVICE_IP)
+    port_str = db_schema.get_app_setting_db(db_schema.SETTING_ZKTECO_DEVICE_PORT, str(config.ZKTECO_DEVICE_PORT))
+    try:
+        fallback_devices = parse_device_registry(f"{ip}:{port_str}") if ip else []
+    except InvalidInputError as e:
+        logger.error(f"Invalid ZKTeco device IP/port settings: {e}")
+        return []
+    for device in fallback_devices:
+        device["fallback"] = True
+    return fallback_devices
 
+def get_zkteco_timeout() -> int:
+    """Per-device connection timeout in seconds from app settings."""
+    timeout_str = db_schema.get_app_setting_db(db_schema.SETTING_ZKTECO_TIMEOUT, str(config.ZKTECO_TIMEOUT))
     try:
-        db_connection = sqlite3.connect(config.DATABASE_NAME)
-        db_connection.row_factory = sqlite3.Row
-        db_cursor = db_connection.cursor()
+        return max(1, int(timeout_str))
+    except (TypeError, ValueError):
+        return config.ZKTECO_TIMEOUT
 
-        employee_device_map = get_employee_device_id_map_db()
+# --- Attendance Log Download ---
+DeviceAttendance = namedtuple("DeviceAttendance", "user_id timestamp status punch uid") # Fields of pyzk's Attendance
+_ZK_ATTENDANCE_RECORD_STRUCTS = { # Record size -> layout, as in pyzk's get_attendance()
+    8: Struct('<HBIB'), # uid, status, time, punch
+    16: Struct('<IIBB2sI'), # user_id, time, status, punch, reserved, workcode
+    40: Struct('<H24sBIB8s'), # uid, user_id, status, time, punch, reserved
+}
 
-        attendance_records = conn.get_attendance()
-        logger.info(f"Retrieved {len(attendance_records)} logs from device.")
-        total_device_logs = len(attendance_records)
-        summary["processed_device_logs"] = total_device_logs
+class DeviceAttendanceLog(Sequence):
+    """
+    A device's raw attendance log buffer, decoded into DeviceAttendance records only when
+    accessed, so an incremental sync decodes just the records past its watermark.
+    """
 
-        if not attendance_records:
-            return summary
+    def __init__(self, data: memoryview, record_size: int, user_ids_by_uid: Optional[Dict[int, str]] = None):
+        self._data = data
+        self._record_size = record_size
+        self._struct = _ZK_ATTENDANCE_RECORD_STRUCTS[record_size]
+        self._count = len(data) // record_size
+        self._user_ids_by_uid = user_ids_by_uid or {}
+        self._dates: Dict[int, tuple] = {} # Encoded day -> (year, month, day)
 
-        attendance_records.sort(key=lambda x: x.timestamp)
-        processed_count_for_progress = 0
+    def __len__(self) -> int:
+        return self._count
 
-        if q_comm:
-            q_comm.put({"type": "progress_init", "total": total_device_logs})
+    def _decode_time(self, value: int) -> datetime:
+        # Same encoding as pyzk's __decode_time (zkemsdk DecodeTime), with the date part cached
+        encoded_day, seconds_of_day = divmod(value, 86400)
+        date_parts = self._dates.get(encoded_day)
+        if date_parts is None:
+            months, day = divmod(encoded_day, 31)
+            year, month = divmod(months, 12)
+            date_parts = self._dates[encoded_day] = (year + 2000, month + 1, day + 1)
+        hour, remainder = divmod(seconds_of_day, 3600)
+        return datetime(*date_parts, hour, *divmod(remainder, 60))
+
+    def _decode(self, fields: tuple) -> DeviceAttendance:
+        if self._record_size == 40:
+            uid, user_id, status, encoded_time, punch, _reserved = fields
+            user_id = user_id.split(b'\x00', 1)[0].decode(errors='ignore')
+        elif self._record_size == 16:
+            uid, encoded_time, status, punch, _reserved, _workcode = fields
+            user_id = str(uid)
+        else:
+            uid, status, encoded_time, punch = fields
+            user_id = self._user_ids_by_uid.get(uid, str(uid))
+        return DeviceAttendance(user_id, self._decode_time(encoded_time), status, punch, uid)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._count)
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            view = self._data[start * self._record_size:max(start, stop) * self._record_size]
+            return [self._decode(fields) for fields in self._struct.iter_unpack(view)]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("attendance record index out of range")
+        return self._decode(self._struct.unpack_from(self._data, index * self._record_size))
+
+    def __iter__(self):
+        return iter(self[:])
+
+def download_attendance_records(conn: ZK) -> Sequence[Any]:
+    """
+    Downloads a device's attendance log. pyzk's get_attendance() re-slices the remaining buffer for
+    every record, which is quadratic in the log size; this reads the same buffer with
+    read_with_buffer() and decodes it lazily in linear time. Unknown record layouts fall back to
+    get_attendance().
+    """
+    conn.read_sizes()
+    if not conn.records:
+        return []
+    data, size = conn.read_with_buffer(const.CMD_ATTLOG_RRQ)
+    if size < 4:
+        return []
+    total_size = Struct('<I').unpack_from(data)[0]
+    record_size, remainder = divmod(total_size, conn.records)
+    if remainder or record_size not in _ZK_ATTENDANCE_RECORD_STRUCTS or len(data) < 4 + total_size:
+        logger.warning(f"Unexpected attendance record layout ({total_size} bytes for {conn.records} records), using pyzk's decoder.")
+        return conn.get_attendance() or []
+    user_ids_by_uid = {user.uid: user.user_id for user in conn.get_users()} if record_size == 8 else None
+    return DeviceAttendanceLog(memoryview(data)[4:4 + total_size], record_size, user_ids_by_uid)
+
+def get_sync_watermark_db(device_key: str) -> Optional[Dict[str, Any]]:
+    """Returns the device's sync state row (last record count, last punch time, ...) or None if never synced."""
+    with db_schema.get_connection() as conn_db:
+        conn_db.row_factory = sqlite3.Row
+        cursor = conn_db.cursor()
+        cursor.execute(f"SELECT * FROM {db_schema.TABLE_ZKTECO_SYNC_STATE} WHERE {db_schema.COL_ZKS_DEVICE_KEY} = ?", (device_key,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
+def _record_key(record: Any) -> str:
+    """Identifies a record in the device log well enough to tell whether the log was cleared."""
+    return f"{record.user_id}|{record.timestamp.strftime('%Y-%m-%d %H:%M:%S')}"
 
-        for rec_idx, rec in enumerate(attendance_records):
-            device_user_id = str(rec.user_id)
-            system_emp_id = employee_device_map.get(device_user_id)
+def _select_new_records(records: Sequence[Any], watermark: Optional[Dict[str, Any]]) -> Sequence[Any]:
+    """
+    Drops records already ingested according to the device watermark. The device log only grows,
+    so while the record at the last synced position is unchanged everything after it is new. If the
+    log was cleared or rotated, punch times are compared instead (boundary duplicates are rejected
+    by the unique index).
+    """
+    if not watermark or not records:
+        return records
+    last_count = watermark.get(db_schema.COL_ZKS_LAST_RECORD_COUNT)
+    if last_count and len(records) >= last_count and _record_key(records[last_count - 1]) == watermark.get(db_schema.COL_ZKS_LAST_RECORD_KEY):
+        return records[last_count:]
+    last_punch_time = watermark.get(db_schema.COL_ZKS_LAST_PUNCH_TIME)
+    if not last_punch_time:
+        return records
+    last_punch_dt = datetime.fromisoformat(last_punch_time)
+    return [rec for rec in records if rec.timestamp >= last_punch_dt]
 
-            if not system_emp_id:
-                logger.warning(f"Device Log {rec_idx+1}: Unknown device user ID '{device_user_id}'. Skipping.")
-                summary["unknown_user_id"] += 1
+def _get_open_clock_ins(cursor: sqlite3.Cursor, first_punch_by_emp: Dict[str, datetime]) -> Dict[str, Dict[str, Any]]:
+    """
+    Latest attendance row per employee that was open at the employee's own first punch of the batch
+    (started by then, not clocked out before it, log_date within MAX_SHIFT_HOURS). Rows closed after
+    that punch only exist when punches are ingested again; treating them as open makes a re-run
+    pair exactly like the first. The cutoff is per employee because devices merged into one batch
+    can be hours apart in their sync history.
+    """
+    if not first_punch_by_emp:
+        return {}
+    as_of_by_emp = {emp_id: punch_dt.strftime('%Y-%m-%d %H:%M:%S') for emp_id, punch_dt in first_punch_by_emp.items()}
+    earliest_as_of, latest_as_of = min(as_of_by_emp.values()), max(as_of_by_emp.values())
+    since_date = (min(first_punch_by_emp.values()) - timedelta(hours=MAX_SHIFT_HOURS)).date().isoformat()
+    cursor.execute(f"""
+        SELECT {db_schema.COL_ATT_EMP_ID}, {db_schema.COL_ATT_LOG_ID}, {db_schema.COL_ATT_CLOCK_IN}, {db_schema.COL_ATT_CLOCK_OUT},
+               {db_schema.COL_ATT_LOG_DATE}
+        FROM {db_schema.TABLE_ATTENDANCE_LOG}
+        WHERE {db_schema.COL_ATT_LOG_DATE} BETWEEN ? AND ? AND {db_schema.COL_ATT_CLOCK_IN} <= ?
+          AND ({db_schema.COL_ATT_CLOCK_OUT} IS NULL OR {db_schema.COL_ATT_CLOCK_OUT} >= ?)
+        ORDER BY {db_schema.COL_ATT_CLOCK_IN}
+    """, (since_date, latest_as_of[:10], latest_as_of, earliest_as_of)) # Bounds covering every employee's as_of
+    max_shift = timedelta(hours=MAX_SHIFT_HOURS)
+    open_logs = {}
+    for emp_id, log_id, clock_in_str, clock_out_str, log_date in cursor.fetchall():
+        as_of = as_of_by_emp.get(emp_id)
+        if as_of is None or clock_in_str > as_of or (clock_out_str is not None and clock_out_str < as_of):
+            continue
+        if log_date < (first_punch_by_emp[emp_id] - max_shift).date().isoformat():
+            continue
+        open_logs[emp_id] = {"log_id": log_id, "clock_in": datetime.fromisoformat(clock_in_str), "log_date": log_date}
+    return open_logs
+
+def _pair_employee_punches(emp_id: str, punches: List[tuple], open_log: Optional[Dict[str, Any]],
+                           new_rows: List[list], closed_logs: List[tuple], summary: Dict[str, Any]) -> None:
+    """
+    Turns one employee's new punches, (punch_time, punch_code, source) tuples ordered by time,
+    into attendance_log rows. In-punches start a row; out-punches close the open row (from the
+    database or from this batch, and possibly from another device) if it started no more than
+    MAX_SHIFT_HOURS earlier. Rows are appended to new_rows as
+    [employee_id, clock_in, clock_out, log_date, source]; database rows closed are appended to closed_logs
+    as (clock_out, log_id, employee_id, log_date, source of the out-punch).
+    """
+    max_shift = timedelta(hours=MAX_SHIFT_HOURS)
+    last_closed_date = None
+    for punch_dt, punch_code, source in punches:
+        punch_date = punch_dt.date().isoformat()
+        if punch_code in ZKTECO_PUNCH_IN_CODES:
+            is_in = True
+        elif punch_code in ZKTECO_PUNCH_OUT_CODES:
+            is_in = False
+        else: # Device without punch states: alternate
+            is_in = open_log is None
+
+        if is_in:
+            if open_log and open_log["log_date"] == punch_date: # Repeated in-punch, keep the first
+                summary["skipped_duplicates"] += 1
                 continue
-            
-            processed_count_for_progress += 1
-            if q_comm and processed_count_for_progress % 10 == 0:
-                q_comm.put({"type": "progress_update", "current": processed_count_for_progress, "total": total_device_logs})
+            row = [emp_id, punch_dt.strftime('%Y-%m-%d %H:%M:%S'), None, punch_date, source]
+            new_rows.append(row)
+            open_log = {"row": row, "clock_in": punch_dt, "log_date": punch_date}
+        elif open_log and open_log["clock_in"] < punch_dt <= open_log["clock_in"] + max_shift:
+            clock_out_str = punch_dt.strftime('%Y-%m-%d %H:%M:%S')
+            if "row" in open_log:
+                open_log["row"][2] = clock_out_str
+            else:
+                closed_logs.append((clock_out_str, open_log["log_id"], emp_id, open_log["log_date"], source))
+            last_closed_date, open_log = open_log["log_date"], None
+        elif last_closed_date == punch_date:
+            summary["skipped_already_out"] += 1
+        else:
+            summary["skipped_no_open_in"] += 1
+
+def ingest_device_records(records_by_device: Dict[str, Sequence[Any]], q_comm: Optional[queue.Queue] = None) -> Dict[str, Any]:
+    """
+    Ingests attendance records downloaded from one or more devices (objects with uid, user_id,
+    timestamp and punch, as returned by pyzk's get_attendance()) into attendance_log.
+
+    Only records past each device's watermark are processed. The new records of all devices are
+    merged into one time-ordered stream before pairing, so a clock-in at one entrance is closed by
+    a clock-out at another. Rows are written with executemany in one transaction together with the
+    attendance_daily refresh and the new watermarks, so a failed sync leaves nothing half-applied.
+    Device punches are de-duplicated by the unique (employee_id, clock_in_time, source) index.
+    """
+    started = time.perf_counter()
+    summary: Dict[str, Any] = {
+        "processed_device_logs": sum(len(records) for records in records_by_device.values()), "new_device_logs": 0,
+        "db_clock_ins": 0, "db_clock_outs": 0, "errors": 0, "unknown_user_id": 0, "skipped_duplicates": 0,
+        "skipped_no_open_in": 0, "skipped_already_out": 0, "elapsed_seconds": 0.0, "punches_per_second": 0.0,
+        "devices": {}}
+
+    device_streams = []
+    new_watermarks = []
+    for device_key, records in records_by_device.items():
+        new_records = _select_new_records(records, get_sync_watermark_db(device_key))
+        summary["devices"][device_key] = {"records": len(records), "new": len(new_records)}
+        logger.info(f"Device {device_key}: {len(records)} records on device, {len(new_records)} new since last sync.")
+        if not new_records: continue
+        source = get_device_source(device_key)
+        new_records = sorted(new_records, key=lambda rec: rec.timestamp) # Only the new records are sorted
+        device_streams.append([(rec.timestamp, rec.punch, source, str(rec.user_id)) for rec in new_records])
+        new_watermarks.append((device_key, len(records), _record_key(records[-1]), new_records[-1].timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+                               datetime.now().strftime('%Y-%m-%d %H:%M:%S'), len(new_records)))
+    ingest_punch_streams(device_streams, summary, q_comm=q_comm, new_watermarks=new_watermarks, started=started)
+    return summary
+
+def ingest_punch_streams(device_streams: List[List[tuple]], summary: Dict[str, Any], q_comm: Optional[queue.Queue] = None,
+                          new_watermarks: List[tuple] = (), started: Optional[float] = None,
+                          events: Optional[List[Dict[str, Any]]] = None, employee_map: Optional[Dict[str, str]] = None) -> None:
+    """
+    Merges per-device punch streams, each a time-ordered list of (punch_time, punch_code, source,
+    device_user_id) tuples, pairs them and writes the result in one transaction. Counters are
+    added to summary; if events is given, the clock-ins and clock-outs written are appended to it.
+    employee_map maps the punches' user IDs to employee IDs (default: by device_user_id).
+    """
+    started = time.perf_counter() if started is None else started
+    new_count = sum(len(stream) for stream in device_streams)
+    summary["new_device_logs"] = new_count
+    if not new_count:
+        summary["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+        return
+    if q_comm:
+        q_comm.put({"type": "progress_init", "total": new_count})
+
+    employee_device_map = get_employee_device_id_map_db() if employee_map is None else employee_map
+    punches_by_emp: Dict[str, List[tuple]] = {}
+    for punch_dt, punch_code, source, device_user_id in heapq.merge(*device_streams, key=itemgetter(0)):
+        system_emp_id = employee_device_map.get(device_user_id)
+        if system_emp_id:
+            punches_by_emp.setdefault(system_emp_id, []).append((punch_dt, punch_code, source))
+        else:
+            summary["unknown_user_id"] += 1
+    if summary["unknown_user_id"]:
+        logger.warning(f"{summary['unknown_user_id']} punches from unknown device user IDs skipped.")
+
+    new_rows: List[list] = []
+    closed_logs: List[tuple] = []
+    write_started = time.perf_counter()
+    with db_schema.transaction("IMMEDIATE") as conn_db:
+        cursor = conn_db.cursor()
+        open_logs = _get_open_clock_ins(cursor, {emp_id: punches[0][0] for emp_id, punches in punches_by_emp.items()})
+        paired_count = 0
+        for emp_id, punches in punches_by_emp.items():
+            _pair_employee_punches(emp_id, punches, open_logs.get(emp_id), new_rows, closed_logs, summary)
+            paired_count += len(punches)
+            if q_comm and paired_count // SYNC_PROGRESS_EVERY != (paired_count - len(punches)) // SYNC_PROGRESS_EVERY:
+                q_comm.put({"type": "progress_update", "current": paired_count, "total": new_count})
 
-            log_datetime_obj = rec.timestamp
-            # ... (rest of the sync logic from hr_management_system.py) ...
-            # This includes checking for duplicates, open clock-ins, and inserting/updating logs.
-            # Ensure to use db_queries._get_employee_open_clock_in and other necessary db_queries functions.
+        insert_sql = f"""
+            INSERT OR IGNORE INTO {db_schema.TABLE_ATTENDANCE_LOG}
+                ({db_schema.COL_ATT_EMP_ID}, {db_schema.COL_ATT_CLOCK_IN}, {db_schema.COL_ATT_CLOCK_OUT}, {db_schema.COL_ATT_LOG_DATE}, {db_schema.COL_ATT_SOURCE})
+            VALUES (?, ?, ?, ?, ?)
+        """
+        # Complete and still-open rows are written separately so ignored duplicates are not counted as clock-outs
+        for rows, counts_clock_out in (([row for row in new_rows if row[2]], True), ([row for row in new_rows if not row[2]], False)):
+            if not rows: continue
+            cursor.executemany(insert_sql, rows)
+            inserted = max(cursor.rowcount, 0)
+            summary["db_clock_ins"] += inserted
+            summary["skipped_duplicates"] += len(rows) - inserted
+            if counts_clock_out: summary["db_clock_outs"] += inserted
+        cursor.executemany(f"UPDATE {db_schema.TABLE_ATTENDANCE_LOG} SET {db_schema.COL_ATT_CLOCK_OUT} = ? WHERE {db_schema.COL_ATT_LOG_ID} = ? AND {db_schema.COL_ATT_CLOCK_OUT} IS NULL",
+                           [(clock_out_str, log_id) for clock_out_str, log_id, _emp_id, _log_date, _source in closed_logs])
+        summary["db_clock_outs"] += max(cursor.rowcount, 0) if closed_logs else 0
+        touched_days = {(row[0], row[3]) for row in new_rows}
+        touched_days.update((emp_id, log_date) for _out, _log_id, emp_id, log_date, _source in closed_logs)
+        db_schema.refresh_attendance_daily(cursor, touched_days)
 
-        db_connection.commit()
-        logger.info("ZKTeco attendance sync database operations committed.")
+        if new_watermarks:
+            cursor.executemany(f"""
+                INSERT INTO {db_schema.TABLE_ZKTECO_SYNC_STATE}
+                    ({db_schema.COL_ZKS_DEVICE_KEY}, {db_schema.COL_ZKS_LAST_RECORD_COUNT}, {db_schema.COL_ZKS_LAST_RECORD_KEY},
+                     {db_schema.COL_ZKS_LAST_PUNCH_TIME}, {db_schema.COL_ZKS_LAST_SYNC_AT}, {db_schema.COL_ZKS_LAST_SYNC_PUNCHES})
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT({db_schema.COL_ZKS_DEVICE_KEY}) DO UPDATE SET
+                    {db_schema.COL_ZKS_LAST_RECORD_COUNT} = excluded.{db_schema.COL_ZKS_LAST_RECORD_COUNT},
+                    {db_schema.COL_ZKS_LAST_RECORD_KEY} = excluded.{db_schema.COL_ZKS_LAST_RECORD_KEY},
+                    {db_schema.COL_ZKS_LAST_PUNCH_TIME} = MAX(COALESCE({db_schema.COL_ZKS_LAST_PUNCH_TIME}, ''), excluded.{db_schema.COL_ZKS_LAST_PUNCH_TIME}),
+                    {db_schema.COL_ZKS_LAST_SYNC_AT} = excluded.{db_schema.COL_ZKS_LAST_SYNC_AT},
+                    {db_schema.COL_ZKS_LAST_SYNC_PUNCHES} = excluded.{db_schema.COL_ZKS_LAST_SYNC_PUNCHES}
+            """, new_watermarks)
 
+    summary["db_write_seconds"] = round(time.perf_counter() - write_started, 3) # Includes pairing, done under the write lock
+    if events is not None:
+        for emp_id, clock_in_str, clock_out_str, _log_date, source in new_rows:
+            events.append({"employee_id": emp_id, "event": "clock_in", "time": clock_in_str, "source": source})
+            if clock_out_str:
+                events.append({"employee_id": emp_id, "event": "clock_out", "time": clock_out_str, "source": source})
+        for clock_out_str, _log_id, emp_id, _log_date, source in closed_logs:
+            events.append({"employee_id": emp_id, "event": "clock_out", "time": clock_out_str, "source": source})
+        events.sort(key=itemgetter("time"))
+
+    elapsed = time.perf_counter() - started
+    summary["elapsed_seconds"] = round(elapsed, 3)
+    summary["punches_per_second"] = round(new_count / elapsed, 1) if elapsed > 0 else 0.0
+    logger.info(f"Ingested {new_count} punches from {len(device_streams)} device(s) in {elapsed:.2f}s "
+                f"({summary['punches_per_second']} punches/s): {summary['db_clock_ins']} rows added, {summary['db_clock_outs']} clock-outs.")
+
+def ingest_attendance_records(device_key: str, records: List[Any], q_comm: Optional[queue.Queue] = None) -> Dict[str, Any]:
+    """Ingests the attendance records downloaded from a single device. See ingest_device_records."""
+    return ingest_device_records({device_key: records}, q_comm=q_comm)
+
+def _put_device_progress(q_comm: Optional[queue.Queue], device: Dict[str, Any], stage: str, **details):
+    """Reports a device's sync stage ("connecting", "downloaded" or "failed") through q_comm."""
+    if q_comm:
+        q_comm.put({"type": "device_progress", "device": device["key"], "name": device["name"], "stage": stage, **details})
+
+def _download_device_attendance(device: Dict[str, Any], timeout: int, q_comm: Optional[queue.Queue] = None) -> tuple:
+    """
+    Downloads a device's attendance log over its own connection. Runs in the sync thread pool.
+    Returns (records, seconds taken).
+    """
+    _put_device_progress(q_comm, device, "connecting")
+    started = time.perf_counter()
+    conn = None
+    try:
+        conn = open_zkteco_connection(device["ip"], device["port"], timeout=timeout, ommit_ping=device.get("ommit_ping", False))
+        records = download_attendance_records(conn)
     except Exception as e:
-        if db_connection:
-            db_connection.rollback()
+        _put_device_progress(q_comm, device, "failed", message=str(e))
+        raise
+    finally:
+        if conn: disconnect_from_zkteco_device(conn)
+    elapsed = time.perf_counter() - started
+    logger.info(f"Retrieved {len(records)} logs from {device['name']} ({device['key']}) in {elapsed:.2f}s.")
+    _put_device_progress(q_comm, device, "downloaded", records=len(records), seconds=round(elapsed, 2))
+    return records, elapsed
+
+def sync_attendance_from_devices(devices: Optional[List[Dict[str, Any]]] = None, q_comm: Optional[queue.Queue] = None,
+                                 max_workers: Optional[int] = None, timeout: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Downloads attendance from all registered devices in parallel and ingests it in one pass.
+    Each device gets its own connection in a bounded thread pool; a device that fails is reported
+    in summary["devices"] and keeps its watermark, while the others are still ingested.
+    """
+    devices = get_registered_devices() if devices is None else devices
+    if not devices:
+        raise InvalidInputError("No ZKTeco devices are configured.")
+    timeout = timeout or get_zkteco_timeout()
+    max_workers = max(1, min(len(devices), max_workers or config.ZKTECO_MAX_PARALLEL_SYNCS))
+    logger.info(f"Starting attendance sync from {len(devices)} ZKTeco device(s) with {max_workers} worker(s).")
+
+    records_by_device: Dict[str, Sequence[Any]] = {}
+    download_seconds: Dict[str, float] = {}
+    failures: Dict[str, str] = {}
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="zkteco-sync") as pool:
+        futures = {pool.submit(_download_device_attendance, device, timeout, q_comm): device for device in devices}
+        for future in as_completed(futures):
+            device = futures[future]
+            try:
+                records_by_device[device["key"]], download_seconds[device["key"]] = future.result()
+            except Exception as e:
+                logger.error(f"ZKTeco sync: could not download from {device['name']} ({device['key']}): {e}")
+                failures[device["key"]] = str(e)
+    if not records_by_device:
+        raise ConnectionError(f"Could not download attendance from any ZKTeco device: {'; '.join(failures.values())}")
+
+    # Ingest in registry order so the merged stream does not depend on which download finished first
+    summary = ingest_device_records({device["key"]: records_by_device[device["key"]] for device in devices
+                                     if device["key"] in records_by_device}, q_comm=q_comm)
+    for device_key, seconds in download_seconds.items():
+        summary["devices"][device_key]["download_seconds"] = round(seconds, 3)
+    for device_key, error in failures.items():
+        summary["devices"][device_key] = {"records": 0, "new": 0, "error": error}
+    summary["failed_devices"] = len(failures)
+    summary["errors"] += len(failures)
+    logger.info(f"ZKTeco sync finished. Summary: {summary}")
+    return summary
+
+def sync_attendance_from_zkteco(device_ip: str, device_port: int, q_comm: Optional[queue.Queue] = None) -> Dict[str, Any]:
+    """
+    Connects to ZKTeco device, downloads attendance logs, and ingests the ones not seen before.
+    pyzk can only download the whole log, so the incremental part is everything after the download:
+    known records are dropped by watermark before any sorting or database work.
+    """
+    summary: Dict[str, Any] = {"processed_device_logs": 0, "errors": 0}
+    try:
+        device_key = get_device_key(device_ip, device_port)
+        summary = sync_attendance_from_devices([{"name": device_key, "ip": device_ip, "port": device_port, "key": device_key}],
+                                               q_comm=q_comm, max_workers=1, timeout=config.ZKTECO_TIMEOUT)
+    except (ConnectionError, TimeoutError):
+        raise
+    except Exception as e:
+        summary["errors"] = summary.get("errors", 0) + 1
         if q_comm:
             q_comm.put({"type": "error", "data": e})
             return summary 
         raise db_queries.DatabaseOperationError(f"ZKTeco sync failed due to an internal error: {e}")
-    finally:
-        disconnect_from_zkteco_device(conn)
-        if db_connection:
-            db_connection.close()
-    logger.info(f"ZKTeco sync finished. Summary: {summary}")
-    return summary
\ No newline at end of file
+    return summary